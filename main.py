@@ -13,22 +13,17 @@ warnings.filterwarnings(
 from src.forms.main_form import MainForm
 from src.utils import WindowManager, ThemeManager, PathManager, ErrorHandler
 from src.utils.utils import WidgetFactory
-import pandas as pd
 import logging
 from tkinter import filedialog, simpledialog
 from typing import Optional
-import threading
-import time
-from src.utils.doc_generator import render_templates
+from src.utils.jobs import JobScheduler
+from src.utils.coordinator import WorkbookBusyError
+from src.utils.startup import preload_in_background
+from src.utils.logging_setup import setup_logging
+from src.utils.perf import annotate, setup_perf, timed
 from pathlib import Path
 from src.utils import constants as _const
 
-# Configuration du logging
-logging.basicConfig(
-    filename='app.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 class MainApp(tk.Tk):
@@ -45,9 +40,17 @@ class MainApp(tk.Tk):
         # Dictionnaire pour stocker toutes les valeurs
         self.values = {}
 
+        # Background generation queue (bounded concurrency) and its panel
+        self.job_scheduler = JobScheduler(max_workers=2)
+        self.jobs_panel = None
+        self.protocol('WM_DELETE_WINDOW', self.on_quit)
+
         # Création de l'interface
         self.setup_gui()
 
+        # pandas/openpyxl are imported lazily; warm them up once the window is shown
+        self.after_idle(preload_in_background)
+
     def setup_gui(self):
         """Configure l'interface utilisateur principale"""
         # Create main container
@@ -96,6 +99,13 @@ class MainApp(tk.Tk):
         )
         gen_btn.pack(side='left', padx=6)
 
+        # Generation jobs panel (non-modal)
+        WidgetFactory.create_button(
+            row,
+            text="📋 Tâches",
+            command=self.show_jobs_panel
+        ).pack(side='left', padx=6)
+
         # (Theme toggle removed) — keep toolbar focused and simple. Theme is
         # still managed programmatically via ThemeManager and the
         # configuration dialog.
@@ -107,7 +117,7 @@ class MainApp(tk.Tk):
         # Right-side control buttons (packed in reverse so visual order is left->right)
         try:
             # Pack Quitter first (will appear at the far right)
-            WidgetFactory.create_button(row, text="❌ Quitter", command=self.quit).pack(side='right', padx=6)
+            WidgetFactory.create_button(row, text="❌ Quitter", command=self.on_quit).pack(side='right', padx=6)
 
             # Suivant
             _btn = WidgetFactory.create_button(row, text="Suivant ▶", command=self.main_form.next_page)
@@ -202,105 +212,52 @@ class MainApp(tk.Tk):
             if not out_dir:
                 return
 
-            # Create modal progress window with counts and lists
-            progress_win = tk.Toplevel(self)
-            progress_win.title("Génération en cours")
-            progress_win.transient(self)
-            progress_win.grab_set()
-            # center the progress window
-            from src.utils.utils import WindowManager
-            WindowManager.center_window(progress_win)
-            progress_frame = ttk.Frame(progress_win, padding=12)
-            progress_frame.pack(fill='both', expand=True)
-
-            ttk.Label(progress_frame, text="Génération des documents", font=('Segoe UI', 12, 'bold')).pack(anchor='w')
-            counts_label = ttk.Label(progress_frame, text="0 / 0")
-            counts_label.pack(anchor='w', pady=(6, 0))
-
-            pb = ttk.Progressbar(progress_frame, orient='horizontal', length=400, mode='determinate')
-            pb.pack(pady=(6, 6))
-
-            status_text = tk.Text(progress_frame, height=8, width=80, state='disabled')
-            status_text.pack(fill='both', expand=True)
-
-            # progress callback updates the UI from the worker thread via after()
-            def progress_cb(processed, total, template_name, entry):
-                def _update():
-                    counts_label.configure(text=f"{processed} / {total}")
-                    pb['maximum'] = total
-                    pb['value'] = processed
-                    status_text.configure(state='normal')
-                    status_text.insert('end', f"[{entry.get('status')}] {template_name} - {entry.get('error') or ''}\n")
-                    status_text.see('end')
-                    status_text.configure(state='disabled')
-                self.after(1, _update)
-
-            def worker():
-                try:
-                    report = render_templates(
-                        self.values,
-                        str(PathManager.MODELS_DIR),
-                        out_dir,
-                        to_pdf=to_pdf,
-                        templates_list=tpl_paths,
-                        progress_callback=progress_cb,
-                    )
-
-                    def _show_done(rep):
-                        # Try to determine the actual generated folder from report entries
-                        try:
-                            import os
-                            from pathlib import Path as _P
-                            paths = [str(_P(e.get('out_docx')).parent) for e in rep if e.get('out_docx')]
-                            folder = os.path.commonpath(paths) if paths else out_dir
-                        except Exception:
-                            folder = out_dir
-                        self.after(10, lambda: messagebox.showinfo('Génération terminée', f"Génération terminée. {len(rep)} modèles traités. Fichiers enregistrés dans {folder}"))
-
-                    self.after(10, lambda r=report: _show_done(r))
-
-                except Exception as e:
-                    logging.exception('Generation failed: %s', e)
-                    self.after(10, lambda: ErrorHandler.handle_error(e, 'Erreur pendant la génération'))
-
-                finally:
-                    self.after(10, lambda: (progress_win.grab_release(), progress_win.destroy()))
-
-            t = threading.Thread(target=worker, daemon=True)
-            t.start()
+            # Queue the generation; the jobs panel shows progress without
+            # blocking the forms so the next company can be entered meanwhile.
+            self.submit_generation(out_dir, to_pdf, tpl_paths)
 
         except Exception as e:
             logger.exception('Erreur pendant la génération unifiée: %s', e)
 
     def start_generation(self, out_dir: str, to_pdf: bool, templates_list: Optional[list] = None):
-        """Start generation on a background thread and show modal progress."""
-        # Create modal progress window
-        progress_win = tk.Toplevel(self)
-        progress_win.title("Génération en cours")
-        progress_win.transient(self)
-        progress_win.grab_set()
-        ttk.Label(progress_win, text="Génération en cours, veuillez patienter...").pack(padx=20, pady=(10, 5))
-        pb = ttk.Progressbar(progress_win, mode='indeterminate', length=300)
-        pb.pack(padx=20, pady=(0, 10))
-        pb.start(10)
-
-        def worker():
-            try:
-                # call generator (pass templates_list if provided)
-                report = render_templates(self.values, str(PathManager.MODELS_DIR), out_dir, to_pdf=to_pdf, templates_list=templates_list)
-                # Save a short summary to log
-                logging.info('Generation finished, %d templates processed', len(report))
-                # Show final message in main thread
-                self.after(10, lambda: messagebox.showinfo('Génération terminée', f"Génération terminée. Fichiers enregistrés dans {out_dir}"))
-            except Exception as e:
-                logging.exception('Generation failed: %s', e)
-                self.after(10, lambda: ErrorHandler.handle_error(e, 'Erreur pendant la génération'))
-            finally:
-                # stop progress and destroy modal
-                self.after(10, lambda: (pb.stop(), progress_win.grab_release(), progress_win.destroy()))
-
-        t = threading.Thread(target=worker, daemon=True)
-        t.start()
+        """Queue a generation of the current values (kept for backward compatibility)."""
+        return self.submit_generation(out_dir, to_pdf, templates_list)
+
+    def submit_generation(self, out_dir: str, to_pdf: bool, templates_list: Optional[list] = None):
+        """Queue a generation job for the current values and show the jobs panel."""
+        societe = self.values.get('societe') or {}
+        label = societe.get('denomination') or societe.get('DEN_STE') or 'Société'
+        job = self.job_scheduler.submit(
+            self.values,
+            out_dir,
+            to_pdf=to_pdf,
+            templates_list=templates_list,
+            templates_dir=str(PathManager.MODELS_DIR),
+            label=label,
+        )
+        self.show_jobs_panel()
+        return job
+
+    def show_jobs_panel(self):
+        """Open (or bring back) the non-modal generation jobs panel."""
+        from src.forms.jobs_panel import JobsPanel
+        panel = self.jobs_panel
+        if panel is None or not panel.winfo_exists():
+            self.jobs_panel = JobsPanel(self, self.job_scheduler)
+        else:
+            panel.show()
+
+    def on_quit(self):
+        """Quit the application, cancelling pending generation jobs after confirmation."""
+        pending = self.job_scheduler.pending_count()
+        if pending:
+            if not messagebox.askyesno(
+                'Tâches en cours',
+                f"{pending} génération(s) en attente ou en cours seront annulées. Quitter quand même ?"
+            ):
+                return
+        self.job_scheduler.shutdown(wait=False, cancel=True)
+        self.quit()
 
     def choose_templates(self):
         """Open a modal dialog to let the user pick which .docx templates in Models/ to generate.
@@ -423,21 +380,27 @@ class MainApp(tk.Tk):
         to_pdf = result['format'] in ('pdf', 'both')
         return result['paths'], to_pdf
 
+    @timed('save_to_db')
     def save_to_db(self):
         """Sauvegarde les données dans la base"""
         try:
             self.collect_values()
 
-            # Use centralized DB filename from constants
-            db_path = PathManager.DATABASE_DIR / _const.DB_FILENAME
+            from src.utils.storage import bootstrap_database, default_db_path, migrate_excel_workbook, societe_exists
+            from src.utils.store import DataStore
 
-            # Ensure workbook and sheets exist
-            from src.utils.utils import ensure_excel_db, write_records_to_db, migrate_excel_workbook, societe_exists
-            ensure_excel_db(db_path, _const.excel_sheets)
+            # Same database as the data store (DOMICILIATION_DB may override it)
+            db_path = default_db_path()
+
+            # Ensure workbook and sheets exist (a quick check once the database is stamped)
+            bootstrap_database(db_path, _const.excel_sheets)
 
             # Run migration to reconcile older/misnamed sheets into canonical ones
             try:
-                migrate_excel_workbook(db_path)
+                # The migration rewrites the workbook: one writer at a time across PCs
+                from src.utils.coordinator import WriteCoordinator
+                with WriteCoordinator.instance(db_path).transaction():
+                    migrate_excel_workbook(db_path)
             except Exception:
                 # Migration is best-effort; don't block saving if it fails
                 logger.exception('Migration of legacy sheets failed')
@@ -458,13 +421,18 @@ class MainApp(tk.Tk):
                 # Defensive: on any failure of the check, log and continue with save
                 logger.exception('Failed to perform duplicate societe check')
 
-            # Delegate the heavy lifting to the utility that handles IDs and date conversion
-            write_records_to_db(db_path, societe_vals, associes_list, contrat_vals)
+            # Delegate the heavy lifting to the utility that handles IDs and date conversion;
+            # going through the shared data store pushes the new rows to open views
+            changes = DataStore.instance(db_path).save_records(societe_vals, associes_list, contrat_vals)
+            annotate(rows=sum(len(change.keys) for change in changes), bytes_written=db_path.stat().st_size)
             # Do not show a modal message here — let the caller (finish or other
             # UI action) present a single, consolidated message to the user.
             logger.info("Données sauvegardées avec succès dans %s", db_path)
             return db_path
 
+        except WorkbookBusyError:
+            messagebox.showerror('Base occupée', "La base de données est en cours de modification sur un autre poste. Réessayez dans un instant.")
+            return None
         except Exception as e:
             ErrorHandler.handle_error(e, "Erreur lors de la sauvegarde des données.")
             return None
@@ -480,10 +448,12 @@ class MainApp(tk.Tk):
             ErrorHandler.handle_error(e, "Erreur lors de la réinitialisation du formulaire.")
 
 if __name__ == "__main__":
+    setup_logging()
+    setup_perf()
     try:
         app = MainApp()
         app.mainloop()
     except Exception as e:
-        logging.critical(f"Failed to start application: {e}", exc_info=True)
+        logging.critical("Failed to start application: %s", e, exc_info=True)
         tk.Tk().withdraw()  # Hide root tkinter window
         messagebox.showerror("Application Error", f"A critical error occurred and the application cannot start.\n\nDetails: {e}\n\nCheck app.log for more information.")
@@ -0,0 +1,269 @@
+"""Benchmark the storage, dashboard and generation paths on synthetic databases.
+
+Usage:
+  python scripts/benchmark.py --out benchmarks/baseline.json
+  python scripts/benchmark.py --sizes 1000 10000 --compare benchmarks/baseline.json --threshold 0.25
+
+Workbooks of 1k/10k/100k companies (by default) are built by
+src/utils/synthetic.py (seeded, so every run measures the same data) and
+kept in --workdir so later runs skip the build. Each
+operation runs --repeat times on a fresh copy of the workbook when it writes
+to it; the median is the figure compared. Operations that read through the
+snapshot cache are timed cold (no snapshot) and warm.
+
+The legacy write_records_to_db takes minutes on the 100k workbook; pass
+--sizes for a quicker run.
+
+The dashboard is measured without a window: loading the store, then what a
+refresh computes before touching the Treeview (expiry index, rows rendered
+as text, search index). render_templates is timed per template once, as it
+does not depend on the database size.
+
+With --compare, every operation whose median exceeds the baseline by more
+than --threshold (and by more than --min-delta seconds, to ignore timer
+noise) is reported and the exit code is 1.
+"""
+from pathlib import Path
+import argparse
+import datetime
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import constants as _const  # noqa: E402
+from src.utils import synthetic  # noqa: E402
+
+logger = logging.getLogger('benchmark')
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.20
+DEFAULT_MIN_DELTA = 0.005
+SEED = 1234
+SAMPLE_VALUES = {
+    'societe': {'denomination': 'BENCH NOUVELLE', 'forme_juridique': 'SARL', 'capital': '10 000',
+                'adresse': _const.SteAdresse[0], 'tribunal': _const.Tribunnaux[0]},
+    'associes': [{'civilite': 'Monsieur', 'nom': 'BENCH', 'prenom': 'Test', 'num_parts': '100',
+                  'date_naiss': '01/01/1980', 'est_gerant': True}],
+    'contrat': {'date_contrat': '01/03/2025', 'period': '12', 'prix_mensuel': '500',
+                'date_debut': '01/03/2025', 'date_fin': '28/02/2026'},
+}
+
+
+# -- synthetic workbooks ---------------------------------------------------
+
+def workbook_for(workdir: Path, companies: int, seed: int = SEED) -> Path:
+    path = workdir / f'bench_{companies}_{seed}.xlsx'
+    if not path.exists():
+        started = time.perf_counter()
+        synthetic.write_workbook(path, companies, seed)
+        logger.info('Built %s in %.1fs', path.name, time.perf_counter() - started)
+    return path
+
+
+# -- timing ----------------------------------------------------------------
+
+def _clear_caches(path: Path):
+    """Remove what earlier runs left next to the workbook (snapshot, backups)."""
+    from src.utils.backup import BACKUP_DIRNAME, flush_backups
+    from src.utils.snapshot import snapshot_path
+
+    # Background backups of the previous run must not overlap the next one
+    flush_backups()
+    snapshot_path(path).unlink(missing_ok=True)
+    shutil.rmtree(path.parent / BACKUP_DIRNAME, ignore_errors=True)
+
+
+def time_operation(run: Callable[[object], object], setup: Optional[Callable[[], object]] = None,
+                   repeat: int = DEFAULT_REPEAT) -> Dict:
+    """Median/min/max seconds of `run(setup())` over `repeat` runs (setup is not timed)."""
+    runs = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        run(state)
+        runs.append(time.perf_counter() - started)
+    return {'median': statistics.median(runs), 'min': min(runs), 'max': max(runs), 'runs': runs}
+
+
+def storage_operations(source: Path, scratch: Path) -> Dict[str, tuple]:
+    """name -> (run, setup) for the workbook functions of src/utils/storage.py."""
+    from src.utils import storage
+
+    def fresh_copy(warm: bool = False):
+        _clear_caches(scratch)
+        shutil.copyfile(source, scratch)
+        if warm:
+            from src.utils.snapshot import read_tables
+            read_tables(scratch)
+        return scratch
+
+    # The first company of every synthetic workbook
+    name = next(synthetic.companies(1, SEED)).societe['DEN_STE']
+    return {
+        'write_records_to_db': (lambda p: storage.write_records_to_db(
+            p, SAMPLE_VALUES['societe'], SAMPLE_VALUES['associes'], SAMPLE_VALUES['contrat']), fresh_copy),
+        'societe_exists[cold]': (lambda p: storage.societe_exists(name, p), fresh_copy),
+        'societe_exists[warm]': (lambda p: storage.societe_exists(name, p), lambda: fresh_copy(warm=True)),
+        'get_reference_data': (lambda p: storage.get_reference_data('SteAdresses', p), fresh_copy),
+        # The check done before every save (synthetic workbooks are stamped)
+        'bootstrap_database': (storage.bootstrap_database, fresh_copy),
+        'migrate_excel_workbook': (storage.migrate_excel_workbook, fresh_copy),
+    }
+
+
+def dashboard_operations(source: Path, scratch: Path) -> Dict[str, tuple]:
+    """name -> (run, setup) for what DashboardView computes on load and refresh."""
+    from src.utils.contracts import ExpiryIndex
+    from src.utils.schema import to_text
+    from src.utils.search import SUBSTRING, SearchIndex
+    from src.utils.sorting import as_text
+    from src.utils.store import DataStore
+
+    columns = [c for c in _const.societe_headers if not c.startswith('ID_')]
+
+    def fresh_store(warm: bool = False):
+        _clear_caches(scratch)
+        shutil.copyfile(source, scratch)
+        if warm:
+            DataStore(scratch).load()
+        return DataStore(scratch)
+
+    def loaded_store():
+        store = fresh_store(warm=True)
+        store.load()
+        return store
+
+    def render(store):
+        societes = store.table('Societes')
+        ExpiryIndex.from_frame(store.table('Contrats'))
+        to_text(societes.reindex(columns=columns, fill_value=''))
+        as_text(societes['ID_SOCIETE'])
+
+    def search(store):
+        SearchIndex(store.table('Societes')).search('sky', SUBSTRING)
+
+    def save(store):
+        store.save_records(SAMPLE_VALUES['societe'], SAMPLE_VALUES['associes'], SAMPLE_VALUES['contrat'])
+
+    return {
+        'dashboard_load[cold]': (lambda s: s.load(), fresh_store),
+        'dashboard_load[warm]': (lambda s: s.load(), lambda: fresh_store(warm=True)),
+        'dashboard_render': (render, loaded_store),
+        'dashboard_search': (search, loaded_store),
+        # What the application saves through since the data store (write_records_to_db is the legacy path)
+        'store_save_records': (save, loaded_store),
+    }
+
+
+def template_timings(out_dir: Path, repeat: int = DEFAULT_REPEAT) -> Dict[str, Dict]:
+    """Per-template seconds of render_templates (from its report entries)."""
+    from src.utils.doc_generator import render_templates
+    from src.utils.storage import MODELS_DIR
+
+    runs: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        report = render_templates(SAMPLE_VALUES, str(MODELS_DIR), str(out_dir), to_pdf=False, profile=False)
+        for entry in report:
+            if entry.get('status') != 'error':
+                runs.setdefault(f"render_templates[{entry['template']}]", []).append(float(entry['duration_seconds']))
+    return {name: {'median': statistics.median(values), 'min': min(values), 'max': max(values), 'runs': values}
+            for name, values in runs.items()}
+
+
+def run_suite(sizes, workdir: Path, repeat: int = DEFAULT_REPEAT, templates: bool = True) -> Dict:
+    results: Dict[str, Dict] = {}
+    for size in sizes:
+        source = workbook_for(workdir, size)
+        scratch_dir = workdir / f'scratch_{size}'
+        scratch_dir.mkdir(parents=True, exist_ok=True)
+        scratch = scratch_dir / 'db.xlsx'
+        operations = {**storage_operations(source, scratch), **dashboard_operations(source, scratch)}
+        for name, (run, setup) in operations.items():
+            key = f'{name}@{size}'
+            results[key] = time_operation(run, setup, repeat)
+            logger.info('%-40s %8.4fs', key, results[key]['median'])
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    if templates:
+        out_dir = workdir / 'generation'
+        results.update(template_timings(out_dir, repeat))
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'sizes': list(sizes),
+        'results': results,
+    }
+
+
+# -- comparison ------------------------------------------------------------
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD,
+            min_delta: float = DEFAULT_MIN_DELTA) -> List[Dict]:
+    """Rows for the operations present in both runs; `regression` marks the slow ones."""
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        old, new = before['median'], result['median']
+        ratio = new / old if old else float('inf')
+        rows.append({'name': name, 'baseline': old, 'current': new, 'ratio': ratio,
+                     'regression': ratio > 1 + threshold and new - old > min_delta})
+    return rows
+
+
+def print_comparison(rows: List[Dict]):
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['name']:<48} {row['baseline']:9.4f}s -> {row['current']:9.4f}s  x{row['ratio']:5.2f}  {flag}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='companies per workbook')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--workdir', type=Path, help='where workbooks are built and kept (temporary by default)')
+    parser.add_argument('--no-templates', action='store_true', help='skip render_templates')
+    parser.add_argument('--out', type=Path, help='write the results (JSON baseline) to this file')
+    parser.add_argument('--compare', type=Path, help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed slowdown (0.2 = +20%%)')
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA, help='ignore slowdowns below this many seconds')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    # The application modules log every save and migration
+    logging.getLogger('src').setLevel(logging.WARNING)
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix='domiciliation-bench-'))
+    try:
+        results = run_suite(args.sizes, workdir, repeat=max(1, args.repeat), templates=not args.no_templates)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(results, indent=2), encoding='utf-8')
+        logger.info('Results written to %s', args.out)
+    if args.compare:
+        rows = compare(results, json.loads(args.compare.read_text(encoding='utf-8')), args.threshold, args.min_delta)
+        print_comparison(rows)
+        regressions = [row['name'] for row in rows if row['regression']]
+        if regressions:
+            logger.error('%d regression(s): %s', len(regressions), ', '.join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
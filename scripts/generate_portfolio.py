@@ -0,0 +1,39 @@
+"""Write a synthetic portfolio for load testing (see src/utils/synthetic.py).
+
+Usage:
+  python scripts/generate_portfolio.py --companies 100000 --seed 7 --out databases/load_test.xlsx
+  python scripts/generate_portfolio.py --companies 500 --out societes.json
+  python -m src.cli --db databases/load_test.xlsx save societes.json
+
+A .json target receives a list of form-key aggregates (the input of
+`python -m src.cli save` and of POST /companies); any other target a
+complete workbook the application can open.
+"""
+from pathlib import Path
+import argparse
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import synthetic  # noqa: E402
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--companies', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, required=True, help='.xlsx workbook or .json aggregates')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.out.suffix.lower() == '.json':
+        counts = {'aggregates': synthetic.write_json(args.out, args.companies, args.seed)}
+    else:
+        counts = synthetic.write_workbook(args.out, args.companies, args.seed)
+    print(f'{args.out}: {counts} in {time.perf_counter() - started:.1f}s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,73 +1,52 @@
-import tkinter as tk
+"""Generate every model with sample values, without the GUI.
+
+Builds an aggregate from the first entry of each reference list in
+src/utils/constants.py (the same defaults the forms show) and renders it
+through src/utils/records.py. For real companies use the command line:
+
+    python -m src.cli generate --id 12 --out tmp_out
+"""
 from pathlib import Path
 import json
 import sys
 
-try:
-    # Some utility modules import pandas at import-time. The dev environment
-    # used for these quick checks may not have pandas installed. To avoid
-    # import errors while we only need form defaults, inject a lightweight
-    # fake `pandas` module into sys.modules before importing project code.
-    import types
-    if 'pandas' not in sys.modules:
-        sys.modules['pandas'] = types.ModuleType('pandas')
-
-    # Import forms and generator
-    from src.forms.societe_form import SocieteForm
-    from src.forms.associe_form import AssocieForm
-    from src.forms.contrat_form import ContratForm
-    from src.utils.doc_generator import render_templates
-    from src.utils.utils import PathManager
-except Exception as e:
-    print('Import error:', e)
-    raise
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import constants as _const  # noqa: E402
+from src.utils.records import generate  # noqa: E402
+from src.utils.storage import MODELS_DIR  # noqa: E402
+
+
+def sample_values() -> dict:
+    return {
+        'societe': {
+            'denomination': _const.DenSte[0], 'forme_juridique': _const.Formjur[0],
+            'capital': _const.Capital[0], 'parts_social': _const.PartsSocial[0],
+            'adresse': _const.SteAdresse[0], 'tribunal': _const.Tribunnaux[0],
+            'activites': [_const.Activities[0]],
+        },
+        'associes': [{
+            'civilite': _const.Civility[0], 'nom': 'NOM', 'prenom': 'Prénom',
+            'nationalite': _const.Nationalite[0], 'qualite': _const.QualityGerant[0],
+            'num_parts': _const.PartsSocial[0], 'est_gerant': True,
+        }],
+        'contrat': {'period': _const.Nbmois[1]},
+    }
 
 
 def main():
-    root = tk.Tk()
-    root.withdraw()
-
-    # instantiate forms attached to the hidden root to get default values
-    soc = SocieteForm(root)
-    assoc = AssocieForm(root)
-    # ensure at least one associe exists
-    try:
-        if len(assoc.associe_vars) == 0:
-            assoc.add_associe()
-    except Exception:
-        try:
-            assoc.add_associe()
-        except Exception:
-            pass
-    contr = ContratForm(root)
-
-    values = {
-        'societe': soc.get_values(),
-        'associes': assoc.get_values(),
-        'contrat': contr.get_values()
-    }
-
+    values = sample_values()
     out_dir = Path('tmp_out')
-    models_dir = Path(PathManager.MODELS_DIR)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    print('Using models_dir=', models_dir)
+    print('Using models_dir=', MODELS_DIR)
     print('Using out_dir=', out_dir)
     print('Values snapshot:')
     print(json.dumps(values, ensure_ascii=False, indent=2))
 
-    try:
-        report = render_templates(values, models_dir, out_dir, to_pdf=False)
-        print('\nGeneration report:')
-        print(json.dumps(report, ensure_ascii=False, indent=2))
-    except Exception as e:
-        print('Generation error:', e)
-        raise
-    finally:
-        try:
-            root.destroy()
-        except Exception:
-            pass
+    report = generate(values, out_dir)
+    print('\nGeneration report:')
+    print(json.dumps(report, ensure_ascii=False, indent=2, default=str))
 
 
 if __name__ == '__main__':
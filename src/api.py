@@ -0,0 +1,435 @@
+"""Local JSON API for company records and document generation.
+
+Lets other tools on the same PC (CRM, spreadsheet macros) save and read
+companies and generate documents without the Tk window:
+
+    python -m src.cli serve --port 8765
+
+    GET  /health                      -> {"status": "ok", "pending_jobs": 0}
+    GET  /companies?q=sky&limit=20    -> [{"ID_SOCIETE": "12", "DEN_STE": ...}, ...]
+    GET  /companies/12                -> generation aggregate {"societe", "associes", "contrat"}
+    POST /companies                   <- aggregate or list of aggregates -> 201 {"saved": [...ids]}
+    POST /generate                    <- {"ids": ["12"]} or {"values": {...}}, optional
+                                         "templates": [...], "pdf": false -> 202 {"jobs": [...]}
+    GET  /jobs/3                      -> job status and documents
+    GET  /jobs/3/download             -> zip of the generated documents (streamed)
+
+The server only binds to the loopback interface and never imports tkinter.
+Every request must carry the per-install token of config/api_token
+(created on first start, readable by the current user only) as
+`Authorization: Bearer <token>`, and a Host header naming the server
+itself (127.0.0.1 or localhost with its port), so web pages opened in a
+browser on the same PC cannot reach it, even through DNS rebinding. JSON
+bodies must be sent as `Content-Type: application/json`.
+Connections are handled by a fixed pool of threads fed by a bounded queue:
+when the queue is full the server answers 503 with Retry-After right away
+instead of piling up work. Generations run on a JobScheduler and are
+refused with 429 beyond `max_pending_jobs`, so a burst of requests cannot
+start more Word renderings than the PC can take.
+"""
+import hmac
+import io
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import zipfile
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+# Connection threads and accepted connections waiting for one
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 32
+# Generation jobs queued or running before /generate answers 429
+DEFAULT_MAX_PENDING_JOBS = 20
+DEFAULT_GENERATION_WORKERS = 2
+MAX_BODY_BYTES = 5 * 1024 * 1024
+TOKEN_FILENAME = 'api_token'
+RETRY_AFTER_SECONDS = 2
+
+
+class ApiError(Exception):
+    """Error answered to the client with `status` and a JSON message."""
+
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class _ChunkedWriter(io.RawIOBase):
+    """Write-only stream sending HTTP/1.1 chunks (zipfile streams into it)."""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        if data:
+            self._wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        return len(data)
+
+    def finish(self):
+        self._wfile.write(b'0\r\n\r\n')
+        self._wfile.flush()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'DomiciliationAPI/1.0'
+    # Idle connections must not hold a pool thread forever
+    timeout = 15
+
+    routes = (
+        ('GET', re.compile(r'^/health$'), 'health'),
+        ('GET', re.compile(r'^/companies$'), 'list_companies'),
+        ('GET', re.compile(r'^/companies/(?P<societe_id>[^/]+)$'), 'get_company'),
+        ('POST', re.compile(r'^/companies$'), 'save_companies'),
+        ('POST', re.compile(r'^/generate$'), 'generate'),
+        ('GET', re.compile(r'^/jobs/(?P<job_id>\d+)$'), 'get_job'),
+        ('GET', re.compile(r'^/jobs/(?P<job_id>\d+)/download$'), 'download_job'),
+    )
+
+    def log_message(self, format, *args):
+        logger.info('%s - %s', self.address_string(), format % args)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def _dispatch(self, method: str):
+        # One request per connection keeps the connection pool fair
+        self.close_connection = True
+        url = urlsplit(self.path)
+        try:
+            self.server.api.check_request(self)
+            for route_method, pattern, name in self.routes:
+                match = pattern.match(url.path)
+                if match and route_method == method:
+                    getattr(self.server.api, name)(self, parse_qs(url.query), **match.groupdict())
+                    return
+            raise ApiError(HTTPStatus.NOT_FOUND, f'Unknown endpoint {method} {url.path}')
+        except ApiError as e:
+            self.send_json({'error': str(e)}, e.status, e.headers)
+        except Exception as e:
+            logger.exception('API request %s %s failed', method, url.path)
+            self.send_json({'error': str(e)}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def read_json(self):
+        content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            raise ApiError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, 'Expected Content-Type: application/json')
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Invalid Content-Length')
+        if length > MAX_BODY_BYTES:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Request body too large')
+        try:
+            return json.loads(self.rfile.read(length) or b'null')
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Invalid JSON body')
+
+    def send_json(self, data, status: int = HTTPStatus.OK, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(data, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Connection', 'close')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_zip(self, name: str, files: List[Path]):
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Disposition', f'attachment; filename="{name}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        writer = _ChunkedWriter(self.wfile)
+        # Documents are already compressed (docx is a zip, pdf streams are deflated)
+        with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for path in files:
+                archive.write(path, arcname=path.name)
+        writer.finish()
+
+
+class _PooledHTTPServer(HTTPServer):
+    """HTTPServer handing connections to a fixed pool of threads through a bounded queue."""
+
+    daemon_threads = True
+
+    def __init__(self, address, api: 'ApiServer', workers: int, queue_size: int):
+        self.api = api
+        self._connections: 'queue.Queue' = queue.Queue(maxsize=queue_size)
+        super().__init__(address, _Handler)
+        self._workers = [threading.Thread(target=self._work, name=f'api-worker-{i + 1}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._workers:
+            thread.start()
+
+    def process_request(self, request, client_address):
+        try:
+            self._connections.put_nowait((request, client_address))
+        except queue.Full:
+            logger.warning('API busy: refusing connection from %s', client_address[0])
+            try:
+                request.sendall(b'HTTP/1.1 503 Service Unavailable\r\nRetry-After: %d\r\n'
+                                b'Content-Length: 0\r\nConnection: close\r\n\r\n' % RETRY_AFTER_SECONDS)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _work(self):
+        while True:
+            item = self._connections.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        for _ in self._workers:
+            self._connections.put(None)
+
+
+class ApiServer:
+    """Endpoints over the data store, `records` helpers and a JobScheduler."""
+
+    def __init__(self, db_path=None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 out_dir=None, workers: int = DEFAULT_WORKERS, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 generation_workers: int = DEFAULT_GENERATION_WORKERS,
+                 max_pending_jobs: int = DEFAULT_MAX_PENDING_JOBS, runner: Optional[Callable] = None,
+                 token: Optional[str] = None):
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f'The API only listens on the loopback interface, not {host}')
+        from .utils.jobs import JobScheduler
+        from .utils.records import generate
+        from .utils.storage import BASE_DIR
+
+        self.db_path = db_path
+        self.out_dir = Path(out_dir) if out_dir is not None else BASE_DIR / 'tmp_out' / 'api'
+        self.max_pending_jobs = max_pending_jobs
+        self.token = token or load_token()
+        self.scheduler = JobScheduler(max_workers=generation_workers, runner=runner or generate)
+        self.httpd = _PooledHTTPServer((host, port), self, workers, queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._prepared = False
+        self._prepare_lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def _store(self, prepare: bool = False):
+        from .utils.records import open_store
+
+        # The workbook migration only needs to run before the first save;
+        # concurrent first saves wait for it instead of running it again
+        if prepare and not self._prepared:
+            with self._prepare_lock:
+                if not self._prepared:
+                    store = open_store(self.db_path, prepare=True)
+                    self._prepared = True
+                    return store
+        return open_store(self.db_path)
+
+    def check_request(self, handler):
+        """Refuse requests for another Host (DNS rebinding) or without the install token."""
+        port = self.httpd.server_address[1]
+        allowed = {f'{name}:{port}' for name in ('127.0.0.1', 'localhost', '[::1]')}
+        if (handler.headers.get('Host') or '').lower() not in allowed:
+            raise ApiError(HTTPStatus.FORBIDDEN, 'Host not allowed')
+        scheme, _, credentials = (handler.headers.get('Authorization') or '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(credentials.strip().encode(), self.token.encode()):
+            raise ApiError(HTTPStatus.UNAUTHORIZED, 'Missing or invalid API token', {'WWW-Authenticate': 'Bearer'})
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def serve_forever(self):
+        logger.info('API listening on %s', self.url)
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.scheduler.shutdown(wait=False)
+
+    def start(self) -> 'ApiServer':
+        """Serve on a background thread (tests, or embedding in the application)."""
+        self._thread = threading.Thread(target=self.serve_forever, name='api-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        if self._thread is not None:
+            self._thread.join()
+
+    # -- endpoints ---------------------------------------------------------
+
+    def health(self, handler, params):
+        handler.send_json({'status': 'ok', 'pending_jobs': self.scheduler.pending_count()})
+
+    def list_companies(self, handler, params):
+        from .utils.records import find_companies
+
+        try:
+            limit = int(params['limit'][0]) if 'limit' in params else None
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'limit must be an integer')
+        rows = find_companies(self._store(), (params.get('q') or [''])[0], ids=params.get('id', ()),
+                              prefix=(params.get('prefix') or [''])[0] in ('1', 'true'), limit=limit,
+                              columns=None if (params.get('full') or [''])[0] in ('1', 'true') else _summary())
+        handler.send_json(rows.to_dict('records'))
+
+    def get_company(self, handler, params, societe_id):
+        from .utils.records import company_values, find_companies
+
+        store = self._store()
+        if find_companies(store, ids=[societe_id], columns=['ID_SOCIETE']).empty:
+            raise ApiError(HTTPStatus.NOT_FOUND, f'No société {societe_id}')
+        handler.send_json(company_values(store, [societe_id])[0])
+
+    def save_companies(self, handler, params):
+        from .utils.records import DuplicateCompanyError, save_company
+
+        body = handler.read_json()
+        aggregates = body if isinstance(body, list) else [body]
+        allow_duplicate = (params.get('allow_duplicates') or [''])[0] in ('1', 'true')
+        store = self._store(prepare=True)
+        saved, errors = [], []
+        for values in aggregates:
+            try:
+                saved.append(save_company(store, values, allow_duplicate=allow_duplicate))
+            except DuplicateCompanyError as e:
+                errors.append({'status': 'duplicate', 'error': str(e)})
+            except ValueError as e:
+                errors.append({'status': 'invalid', 'error': str(e)})
+        status = HTTPStatus.CREATED if saved else HTTPStatus.CONFLICT if errors else HTTPStatus.BAD_REQUEST
+        handler.send_json({'saved': saved, 'errors': errors}, status)
+
+    def generate(self, handler, params):
+        from .utils.records import company_values, find_companies, template_paths
+        from .utils.storage import MODELS_DIR
+
+        body = handler.read_json() or {}
+        if not isinstance(body, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Expected {"ids": [...]} or {"values": ...}')
+        if body.get('values') is not None:
+            values = body['values']
+            aggregates = values if isinstance(values, list) else [values]
+            if not all(isinstance(values, dict) for values in aggregates):
+                raise ApiError(HTTPStatus.BAD_REQUEST, 'Each item of "values" must be an object')
+        elif body.get('ids'):
+            ids = [str(i) for i in (body['ids'] if isinstance(body['ids'], list) else [body['ids']])]
+            store = self._store()
+            found = set(find_companies(store, ids=ids, columns=['ID_SOCIETE'])['ID_SOCIETE'])
+            unknown = [i for i in ids if i not in found]
+            if unknown:
+                raise ApiError(HTTPStatus.NOT_FOUND, f'No société {", ".join(unknown)}')
+            aggregates = company_values(store, ids)
+        else:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Expected {"ids": [...]} or {"values": ...}')
+
+        pending = self.scheduler.pending_count()
+        if pending + len(aggregates) > self.max_pending_jobs:
+            raise ApiError(HTTPStatus.TOO_MANY_REQUESTS, f'{pending} generations already pending',
+                           {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        templates = template_paths(body.get('templates'), MODELS_DIR)
+        jobs = [self.scheduler.submit(values, str(self.out_dir), to_pdf=bool(body.get('pdf')),
+                                      templates_list=templates, templates_dir=str(MODELS_DIR),
+                                      label=(values.get('societe') or {}).get('denomination', ''))
+                for values in aggregates]
+        handler.send_json({'jobs': [_job_json(job) for job in jobs]}, HTTPStatus.ACCEPTED)
+
+    def _job(self, job_id):
+        job = self.scheduler.get(int(job_id))
+        if job is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f'No job {job_id}')
+        return job
+
+    def get_job(self, handler, params, job_id):
+        handler.send_json(_job_json(self._job(job_id)))
+
+    def download_job(self, handler, params, job_id):
+        job = self._job(job_id)
+        if not job.finished:
+            raise ApiError(HTTPStatus.CONFLICT, f'Job {job_id} is {job.status}',
+                           {'Retry-After': str(RETRY_AFTER_SECONDS)})
+        files = [Path(p) for p in _documents(job) if Path(p).is_file()]
+        if not files:
+            raise ApiError(HTTPStatus.NOT_FOUND, f'Job {job_id} produced no document')
+        handler.send_zip(f'documents_{job.id}.zip', files)
+
+
+def _summary():
+    from .utils.records import SUMMARY_COLUMNS
+    return SUMMARY_COLUMNS
+
+
+def _documents(job) -> List[str]:
+    return [entry[key] for entry in (job.report or []) for key in ('out_docx', 'out_pdf') if entry.get(key)]
+
+
+def _job_json(job) -> Dict:
+    return {
+        'id': job.id, 'label': job.label, 'status': job.status, 'error': job.error,
+        'processed': job.processed, 'total': job.total, 'documents': [Path(p).name for p in _documents(job)],
+    }
+
+
+def token_path() -> Path:
+    from .utils.storage import CONFIG_DIR
+    return CONFIG_DIR / TOKEN_FILENAME
+
+
+def load_token(path=None) -> str:
+    """The per-install API token, created (owner read/write only) on first use."""
+    path = Path(path) if path is not None else token_path()
+    if path.exists():
+        token = path.read_text(encoding='utf-8').strip()
+        if token:
+            return token
+    path.parent.mkdir(parents=True, exist_ok=True)
+    token = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(token)
+    logger.info('Created the API token in %s', path)
+    return token
+
+
+def serve(db_path=None, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, **kwargs):
+    """Run the API until interrupted."""
+    server = ApiServer(db_path, host=host, port=port, **kwargs)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,172 @@
+"""Command line interface: save, query and generate without the Tk window.
+
+    python -m src.cli save societes.json          # one aggregate or a list of them ('-' = stdin)
+    python -m src.cli query "sky" --limit 20      # JSON lines by default, --table for humans
+    python -m src.cli generate --id 12 --id 15 --out tmp_out --template My_Attest_domiciliation.docx
+    python -m src.cli generate --all --out /srv/attestations --workers 4
+    python -m src.cli serve --port 8765            # local JSON API (see src/api.py)
+
+Aggregates use the form keys of the GUI (see src/utils/records.py). The
+module never imports tkinter, and pandas/openpyxl are only imported by the
+commands that need them, so `--help` is immediate and every command can run
+from cron. The exit status is 0 on success, 1 when some records were
+rejected or some documents failed, 2 on usage errors.
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger('src.cli')
+
+
+def _read_aggregates(sources: Iterable[str]) -> List[dict]:
+    aggregates = []
+    for source in sources:
+        text = sys.stdin.read() if source == '-' else Path(source).read_text(encoding='utf-8')
+        data = json.loads(text)
+        aggregates.extend(data if isinstance(data, list) else [data])
+    return aggregates
+
+
+def _print_json(data, out=None):
+    out = out or sys.stdout
+    out.write(json.dumps(data, ensure_ascii=False) + '\n')
+
+
+def cmd_save(args) -> int:
+    from .utils.records import DuplicateCompanyError, open_store, save_company
+
+    store = open_store(args.db, prepare=True)
+    failed = 0
+    for values in _read_aggregates(args.files):
+        try:
+            ids = save_company(store, values, allow_duplicate=args.allow_duplicates)
+            _print_json({'status': 'saved', 'ids': ids})
+        except DuplicateCompanyError as e:
+            failed += 1
+            _print_json({'status': 'duplicate', 'error': str(e)})
+        except Exception as e:
+            failed += 1
+            logger.exception('Save failed')
+            _print_json({'status': 'error', 'error': str(e)})
+    return 1 if failed else 0
+
+
+def cmd_query(args) -> int:
+    from .utils.records import find_companies, open_store
+
+    store = open_store(args.db)
+    rows = find_companies(store, args.text or '', ids=args.ids or (), prefix=args.prefix,
+                          limit=args.limit, columns=None if args.all_columns else _summary_columns())
+    if args.table:
+        print(rows.to_string(index=False) if len(rows) else 'Aucune société')
+    else:
+        for record in rows.to_dict('records'):
+            _print_json(record)
+    return 0
+
+
+def _summary_columns():
+    from .utils.records import SUMMARY_COLUMNS
+    return SUMMARY_COLUMNS
+
+
+def cmd_generate(args) -> int:
+    from .utils.jobs import DONE, JobScheduler
+    from .utils.records import company_values, find_companies, generate, open_store, template_paths
+    from .utils.storage import MODELS_DIR
+
+    if args.values:
+        aggregates = _read_aggregates(args.values)
+    else:
+        store = open_store(args.db)
+        if not (args.ids or args.query or args.all):
+            raise SystemExit('generate: choose the companies with --id, --query, --all or --values')
+        ids = list(find_companies(store, args.query or '', ids=args.ids or (), columns=['ID_SOCIETE'])['ID_SOCIETE'])
+        aggregates = company_values(store, ids)
+    if not aggregates:
+        _print_json({'status': 'empty'})
+        return 0
+
+    templates_dir = Path(args.templates_dir) if args.templates_dir else MODELS_DIR
+    scheduler = JobScheduler(max_workers=max(1, args.workers), runner=generate)
+    jobs = [scheduler.submit(values, str(args.out), to_pdf=args.pdf,
+                             templates_list=template_paths(args.template, templates_dir),
+                             templates_dir=str(templates_dir),
+                             label=(values.get('societe') or {}).get('denomination', ''))
+            for values in aggregates]
+    scheduler.shutdown(wait=True, cancel=False)
+
+    failed = 0
+    for job in jobs:
+        errors = [e for e in (job.report or []) if e.get('status') == 'error']
+        failed += job.status != DONE or bool(errors)
+        _print_json({'company': job.label, 'status': job.status, 'error': job.error,
+                     'folder': job.output_folder(), 'documents': len(job.report or []), 'errors': len(errors)})
+    return 1 if failed else 0
+
+
+def cmd_serve(args) -> int:
+    from .api import load_token, serve, token_path
+
+    load_token()
+    print(f'Jeton API (Authorization: Bearer) : {token_path()}', file=sys.stderr)
+    serve(args.db, port=args.port, out_dir=args.out, workers=args.connections,
+          generation_workers=max(1, args.workers), max_pending_jobs=args.max_pending)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='Centre de domiciliation (sans interface)')
+    parser.add_argument('--db', type=Path, help='classeur Excel (par défaut databases/<DB_FILENAME>)')
+    parser.add_argument('-v', '--verbose', action='count', default=0, help='journal détaillé sur stderr')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    save = commands.add_parser('save', help='enregistrer des sociétés (JSON)')
+    save.add_argument('files', nargs='+', help="fichiers JSON (un agrégat ou une liste), '-' pour stdin")
+    save.add_argument('--allow-duplicates', action='store_true', help='accepter une dénomination déjà présente')
+    save.set_defaults(func=cmd_save)
+
+    query = commands.add_parser('query', help='rechercher des sociétés')
+    query.add_argument('text', nargs='?', help='texte recherché (mêmes règles que le tableau de bord)')
+    query.add_argument('--id', dest='ids', action='append', help='ID_SOCIETE (répétable)')
+    query.add_argument('--prefix', action='store_true', help='correspondance en début de mot')
+    query.add_argument('--limit', type=int)
+    query.add_argument('--all-columns', action='store_true', help='toutes les colonnes de la feuille Societes')
+    query.add_argument('--table', action='store_true', help='affichage en tableau plutôt qu’en JSON')
+    query.set_defaults(func=cmd_query)
+
+    generate = commands.add_parser('generate', help='générer les documents')
+    generate.add_argument('--id', dest='ids', action='append', help='ID_SOCIETE (répétable)')
+    generate.add_argument('--query', help='sociétés correspondant à ce texte')
+    generate.add_argument('--all', action='store_true', help='toutes les sociétés')
+    generate.add_argument('--values', action='append', help='agrégats JSON à générer sans passer par la base')
+    generate.add_argument('--out', type=Path, required=True, help='dossier de sortie')
+    generate.add_argument('--template', action='append', help='modèle .docx (répétable; tous par défaut)')
+    generate.add_argument('--templates-dir', help='dossier des modèles (Models/ par défaut)')
+    generate.add_argument('--pdf', action='store_true', help='convertir aussi en PDF')
+    generate.add_argument('--workers', type=int, default=2, help='générations en parallèle')
+    generate.set_defaults(func=cmd_generate)
+
+    serve = commands.add_parser('serve', help='API JSON locale (127.0.0.1 uniquement)')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--out', type=Path, help='dossier de sortie (tmp_out/api par défaut)')
+    serve.add_argument('--connections', type=int, default=4, help='requêtes traitées en parallèle')
+    serve.add_argument('--workers', type=int, default=2, help='générations en parallèle')
+    serve.add_argument('--max-pending', type=int, default=20, help='générations en attente avant refus (429)')
+    serve.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    level = logging.WARNING - 10 * min(args.verbose, 2)
+    logging.basicConfig(level=level, stream=sys.stderr, format='%(levelname)s %(name)s: %(message)s')
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
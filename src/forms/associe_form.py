@@ -4,6 +4,11 @@ from tkcalendar import DateEntry
 from typing import Optional
 from src.utils.utils import ThemeManager
 
+# set_values() loads more associés than this as collapsed summary cards: they
+# keep plain values and only build their widgets (and Tk variables) on expand.
+COLLAPSE_THRESHOLD = 3
+
+
 class AssocieForm(ttk.Frame):
     def __init__(self, parent, theme_manager: Optional[ThemeManager] = None, values_dict=None):
         """AssocieForm supports two calling conventions for backward compatibility:
@@ -74,44 +79,81 @@ class AssocieForm(ttk.Frame):
                 if len(values_dict) > 0:
                     self.set_values([values_dict])
 
-    def create_associe_vars(self):
-        """Crée et retourne les variables pour un nouvel associé"""
+    def default_associe_values(self):
+        """Valeurs par défaut d'un nouvel associé (dict simple, sans variables Tk)"""
+        return self._default_associe(self.nationalites, self.lieux_naissance)
+
+    @staticmethod
+    def default_values():
+        """Ce que get_values() renvoie pour une page neuve (un associé par défaut), sans widgets"""
+        from ..utils.utils import get_reference_data
+        return [AssocieForm._default_associe(get_reference_data('Nationalites'),
+                                             get_reference_data('LieuxNaissance'))]
+
+    @staticmethod
+    def _default_associe(nationalites, lieux_naissance):
         # sensible defaults per request:
         # - civilite default to 'M.'
         # - est_gerant checked by default
         # - qualite default to 'Associé Gérant'
         # - num_parts default to '1000'
         # - capital_detenu default to '100000'
-        default_nationalite = self.nationalites[0] if self.nationalites else ''
-        default_lieu = self.lieux_naissance[0] if self.lieux_naissance else ''
+        default_nationalite = nationalites[0] if nationalites else ''
+        default_lieu = lieux_naissance[0] if lieux_naissance else ''
 
         return {
-            'civilite': tk.StringVar(value='M.'),
-            'nom': tk.StringVar(value=''),
-            'prenom': tk.StringVar(value=''),
-            'parts': tk.StringVar(value=''),
-            'date_naiss': tk.StringVar(value=''),
-            'lieu_naiss': tk.StringVar(value=default_lieu),
-            'nationalite': tk.StringVar(value=default_nationalite),
-            'num_piece': tk.StringVar(value=''),
-            'validite_piece': tk.StringVar(value=''),
-            'adresse': tk.StringVar(value=''),
-            'telephone': tk.StringVar(value=''),
-            'email': tk.StringVar(value=''),
-            'est_gerant': tk.BooleanVar(value=True),
-            'qualite': tk.StringVar(value='Associé Gérant'),
-            'capital_detenu': tk.StringVar(value='100000'),
-            'num_parts': tk.StringVar(value='1000')
+            'civilite': 'M.',
+            'nom': '',
+            'prenom': '',
+            'parts': '',
+            'date_naiss': '',
+            'lieu_naiss': default_lieu,
+            'nationalite': default_nationalite,
+            'num_piece': '',
+            'validite_piece': '',
+            'adresse': '',
+            'telephone': '',
+            'email': '',
+            'est_gerant': True,
+            'qualite': 'Associé Gérant',
+            'capital_detenu': '100000',
+            'num_parts': '1000'
         }
 
-    def create_associe_fields(self, parent, index):
-        """Crée les champs pour un associé"""
-        vars_dict = self.create_associe_vars()
+    def create_associe_vars(self):
+        """Crée et retourne les variables pour un nouvel associé"""
+        return {
+            k: tk.BooleanVar(value=v) if isinstance(v, bool) else tk.StringVar(value=v)
+            for k, v in self.default_associe_values().items()
+        }
+
+    def create_associe_fields(self, parent, index, values=None, collapsed=False):
+        """Crée la carte d'un associé.
 
+        Expanded cards hold a dict of Tk variables in `associe_vars`. Collapsed
+        cards only show a one-line summary and hold a plain dict of values
+        until they are expanded.
+        """
         # Frame principal de l'associé
         frame = ttk.LabelFrame(parent, text=f"👤 Associé {index + 1}")
         frame.pack(fill="x", padx=5, pady=5, expand=True)
 
+        if collapsed:
+            entry = self.default_associe_values()
+            entry.update({k: v for k, v in (values or {}).items() if k in entry})
+            self._build_associe_summary(frame, entry)
+        else:
+            entry = self._build_associe_body(frame)
+            if values:
+                self._populate_vars(entry, values)
+
+        self.associe_vars.append(entry)
+        return frame
+
+    def _build_associe_body(self, frame):
+        """Construit tous les champs d'un associé dans `frame` et retourne ses variables"""
+        vars_dict = self.create_associe_vars()
+
         # Conteneur principal à deux colonnes
         main_grid = ttk.Frame(frame)
         main_grid.pack(fill="x", padx=5, pady=5, expand=True)
@@ -144,7 +186,7 @@ class AssocieForm(ttk.Frame):
         # Section Capital
         self.create_capital_section(right_column, vars_dict)
 
-        # Bouton Supprimer
+        # Boutons Réduire / Supprimer
         remove_btn = ttk.Button(
             frame,
             text="❌ Supprimer",
@@ -152,9 +194,95 @@ class AssocieForm(ttk.Frame):
             command=lambda: self.remove_associe(frame, vars_dict)
         )
         remove_btn.pack(side="right", padx=5, pady=5)
+        collapse_btn = ttk.Button(
+            frame,
+            text="🔼 Réduire",
+            command=lambda: self.collapse_associe(frame, vars_dict)
+        )
+        collapse_btn.pack(side="right", padx=5, pady=5)
 
-        self.associe_vars.append(vars_dict)
-        return frame
+        return vars_dict
+
+    def _build_associe_summary(self, frame, values):
+        """Construit la ligne de résumé d'un associé replié"""
+        row = ttk.Frame(frame)
+        row.pack(fill="x", padx=5, pady=5, expand=True)
+        ttk.Label(row, text=self.summarize_associe(values), anchor="w").pack(side="left", fill="x", expand=True)
+        ttk.Button(
+            row,
+            text="❌ Supprimer",
+            style='Danger.TButton',
+            command=lambda: self.remove_associe(frame, values)
+        ).pack(side="right", padx=5)
+        ttk.Button(
+            row,
+            text="🔽 Afficher",
+            command=lambda: self.expand_associe(frame, values)
+        ).pack(side="right", padx=5)
+
+    @staticmethod
+    def summarize_associe(values):
+        """Résumé d'une ligne: civilité, nom, parts, gérant"""
+        name = ' '.join(str(values.get(k) or '').strip() for k in ('civilite', 'prenom', 'nom')).strip()
+        parts = [name or '(sans nom)']
+        if values.get('num_parts'):
+            parts.append(f"{values.get('num_parts')} parts")
+        if values.get('est_gerant'):
+            parts.append(str(values.get('qualite') or 'Gérant'))
+        return ' · '.join(parts)
+
+    def expand_associe(self, frame, values):
+        """Construit les champs d'un associé replié à partir de ses valeurs"""
+        for child in list(frame.winfo_children()):
+            child.destroy()
+        vars_dict = self._build_associe_body(frame)
+        self._populate_vars(vars_dict, values)
+        self._replace_entry(values, vars_dict)
+
+    def collapse_associe(self, frame, vars_dict):
+        """Replie un associé: ses valeurs sont conservées, ses widgets détruits"""
+        values = self._read_entry(vars_dict)
+        for child in list(frame.winfo_children()):
+            child.destroy()
+        self._build_associe_summary(frame, values)
+        self._replace_entry(vars_dict, values)
+
+    def _replace_entry(self, old, new):
+        for i, entry in enumerate(self.associe_vars):
+            if entry is old:
+                self.associe_vars[i] = new
+                return
+
+    @staticmethod
+    def _populate_vars(vars_dict, values):
+        for k, val in values.items():
+            if k in vars_dict:
+                try:
+                    if isinstance(vars_dict[k], tk.BooleanVar):
+                        vars_dict[k].set(bool(val))
+                    else:
+                        vars_dict[k].set(val)
+                except Exception:
+                    pass
+
+    @staticmethod
+    def _read_entry(entry):
+        """Valeurs d'une entrée de `associe_vars` (variables Tk ou dict simple)"""
+        item = {}
+        for k, v in entry.items():
+            try:
+                # BooleanVar -> bool
+                if isinstance(v, tk.BooleanVar):
+                    item[k] = bool(v.get())
+                elif isinstance(v, tk.Variable):
+                    item[k] = v.get()
+                elif k == 'est_gerant':
+                    item[k] = bool(v)
+                else:
+                    item[k] = v
+            except Exception:
+                item[k] = None
+        return item
 
     def create_basic_info_section(self, parent, vars_dict):
         """Crée la section Informations de base"""
@@ -335,45 +463,24 @@ class AssocieForm(ttk.Frame):
 
     def get_values(self):
         """Retourne la liste des associés sous forme de dictionnaires."""
-        results = []
-        for vars_dict in self.associe_vars:
-            item = {}
-            for k, v in vars_dict.items():
-                try:
-                    # BooleanVar -> bool
-                    if isinstance(v, tk.BooleanVar):
-                        item[k] = bool(v.get())
-                    else:
-                        item[k] = v.get()
-                except Exception:
-                    item[k] = None
-            results.append(item)
-        return results
+        return [self._read_entry(entry) for entry in self.associe_vars]
 
     def set_values(self, associes_list):
         """Remplit le formulaire des associés avec une liste de dicts.
 
         Each element of associes_list should be a dict mapping the field names
-        to values. This will clear existing entries and recreate them.
+        to values. This will clear existing entries and recreate them. Beyond
+        COLLAPSE_THRESHOLD associés the cards are created collapsed.
         """
         # Clear existing UI
         for child in list(self.associes_frame.winfo_children()):
             child.destroy()
         self.associe_vars = []
 
+        collapsed = len(associes_list) > COLLAPSE_THRESHOLD
         for assoc in associes_list:
-            self.create_associe_fields(self.associes_frame, len(self.associe_vars))
-            # Populate the latest vars dict
-            vars_dict = self.associe_vars[-1]
-            for k, val in assoc.items():
-                if k in vars_dict:
-                    try:
-                        if isinstance(vars_dict[k], tk.BooleanVar):
-                            vars_dict[k].set(bool(val))
-                        else:
-                            vars_dict[k].set(val)
-                    except Exception:
-                        pass
+            self.create_associe_fields(self.associes_frame, len(self.associe_vars),
+                                       values=assoc, collapsed=collapsed)
 
     def reset(self):
         """Réinitialise le formulaire des associés avec un associé vierge par défaut"""
@@ -389,7 +496,9 @@ class AssocieForm(ttk.Frame):
         """Supprime un associé"""
         if messagebox.askyesno("Confirmation",
                              "Voulez-vous vraiment supprimer cet associé ?"):
-            self.associe_vars.remove(vars_dict)
+            # Match by identity: collapsed associés are plain dicts and two of
+            # them may hold equal values
+            self.associe_vars = [e for e in self.associe_vars if e is not vars_dict]
             frame.destroy()
             self.update_associes_numbers()
 
@@ -23,20 +23,31 @@ class ContratForm(ttk.Frame):
         # Création du formulaire
         self.setup_gui()
 
-    def initialize_variables(self):
-        """Initialise les variables du formulaire"""
+    @staticmethod
+    def default_values():
+        """Ce que get_values() renvoie pour un formulaire neuf, sans créer de widgets"""
         import datetime
-        from ..utils.constants import Nbmois
 
         today = datetime.date.today().strftime('%d/%m/%Y')
-
         # Defaults: today's date for contract and start, default period to 12 months if available
-        self.date_contrat_var = tk.StringVar(value=today)
-        self.period_var = tk.StringVar(value=(Nbmois[1] if len(Nbmois) > 1 else (Nbmois[0] if Nbmois else '')))
-        self.prix_mensuel_var = tk.StringVar(value='')
-        self.prix_inter_var = tk.StringVar(value='')
-        self.date_debut_var = tk.StringVar(value=today)
-        self.date_fin_var = tk.StringVar(value='')
+        return {
+            'date_contrat': today,
+            'period': Nbmois[1] if len(Nbmois) > 1 else (Nbmois[0] if Nbmois else ''),
+            'prix_mensuel': '',
+            'prix_inter': '',
+            'date_debut': today,
+            'date_fin': '',
+        }
+
+    def initialize_variables(self):
+        """Initialise les variables du formulaire"""
+        defaults = self.default_values()
+        self.date_contrat_var = tk.StringVar(value=defaults['date_contrat'])
+        self.period_var = tk.StringVar(value=defaults['period'])
+        self.prix_mensuel_var = tk.StringVar(value=defaults['prix_mensuel'])
+        self.prix_inter_var = tk.StringVar(value=defaults['prix_inter'])
+        self.date_debut_var = tk.StringVar(value=defaults['date_debut'])
+        self.date_fin_var = tk.StringVar(value=defaults['date_fin'])
         # When period or start date change, update end date automatically
         try:
             self.period_var.trace_add('write', lambda *a: self._update_date_fin())
@@ -230,16 +241,13 @@ class ContratForm(ttk.Frame):
 
     def reset(self):
         """Réinitialise complètement le formulaire"""
-        import datetime
-        from ..utils.constants import Nbmois
-        today = datetime.date.today().strftime('%d/%m/%Y')
-
-        self.date_contrat_var.set(today)
-        self.period_var.set((Nbmois[1] if len(Nbmois) > 1 else (Nbmois[0] if Nbmois else '')))
-        self.prix_mensuel_var.set('')
-        self.prix_inter_var.set('')
-        self.date_debut_var.set(today)
-        self.date_fin_var.set('')
+        defaults = self.default_values()
+        self.date_contrat_var.set(defaults['date_contrat'])
+        self.period_var.set(defaults['period'])
+        self.prix_mensuel_var.set(defaults['prix_mensuel'])
+        self.prix_inter_var.set(defaults['prix_inter'])
+        self.date_debut_var.set(defaults['date_debut'])
+        self.date_fin_var.set(defaults['date_fin'])
         self.values = {}
 
     def _cleanup(self, event=None):
@@ -1,18 +1,41 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
 from pathlib import Path
 import logging
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 from ..utils.utils import ThemeManager, WidgetFactory, PathManager, ErrorHandler
-from ..utils import constants as _const
 from ..utils.constants import societe_headers, associe_headers, contrat_headers
+from ..utils.search import SearchIndex, PREFIX, SUBSTRING
+from ..utils.sorting import SortCache, as_text
+from ..utils.schema import row_text, to_text
+from ..utils.contracts import ExpiryIndex, renew_contracts, renewal_values
+from ..utils.analytics import Analytics, analytics_for, GROUP_REPORTS, MONTHLY_REPORT
+from ..utils.perf import SUMMARY_COLUMNS as PERF_COLUMNS, annotate, recorder as perf_recorder, timed
+from ..utils.store import DataStore
+from ..utils.tree_sync import TreeSync
 
 logger = logging.getLogger(__name__)
 
+# Delay after the last keystroke before the search runs
+SEARCH_DEBOUNCE_MS = 150
+# Search results inserted in the table (the status bar shows the full count)
+MAX_SEARCH_RESULTS = 1000
+# Renewal alerts: selectable windows (days) and columns shown
+ALERT_WINDOWS = ('30', '60', '90', '180', '365')
+ALERT_COLUMNS = ['DEN_STE', 'DATE_CONTRAT', 'DOM_DATEDEB', 'DOM_DATEFIN', 'JOURS_RESTANTS']
+# Template generated for each renewed contract (in Models/)
+ATTESTATION_TEMPLATE = 'My_Attest_domiciliation.docx'
+# Column identifying a row across refreshes (other pages use their first column)
+ROW_KEYS = {'societe': 'ID_SOCIETE', 'associe': 'ID_ASSOCIE', 'contrat': 'ID_CONTRAT', 'alertes': 'ID_CONTRAT',
+            'perf': 'OPERATION'}
+# Statistics page: report key -> title (monthly revenue first)
+STATS_REPORTS = dict([MONTHLY_REPORT] + [(key, title) for key, (_, title) in GROUP_REPORTS.items()])
+
 
 class DashboardView(tk.Toplevel):
     """A compact, elegant dashboard modal for viewing and managing data."""
@@ -56,19 +79,31 @@ class DashboardView(tk.Toplevel):
         self._societes_df = None
         self._associes_df = None
         self._contrats_df = None
+        self._alerts_df = None
+        self._expiry_index = ExpiryIndex.from_frame(None)
+        # Store version of the frames shown (cached analytics follow it)
+        self._data_version = 0
+        # Shared tables: writes made anywhere in the app are pushed to us
+        self.store = DataStore.instance()
+        self._unsubscribe = self.store.subscribe(self._on_store_change)
         self._current_page = 'societe'
+        # Search indexes per page (built on first search, dropped on reload)
+        self._search_indexes = {}
+        self._search_after_id = None
+        # Sort permutations per page (dropped on reload) and (column, ascending) per page
+        self._sort_caches = {}
+        self._sort_state = {}
+        # DataFrame positions of the rows currently shown, in display order
+        self._view_positions = np.arange(0)
 
         # Layout
         self._build_header()
         self._build_body()
         self._build_status()
 
-        # Load data (after all widgets are created)
+        # Load data (after all widgets are created) and show the first page
         self._load_data()
 
-        # Show first page with data
-        self._show_page('societe')
-
         # Start clock
         self._update_clock()
 
@@ -104,6 +139,10 @@ class DashboardView(tk.Toplevel):
         WidgetFactory.create_button(nav, text="🏢 Sociétés", command=lambda: self._show_page('societe')).pack(fill='x', pady=5)
         WidgetFactory.create_button(nav, text="👥 Associés", command=lambda: self._show_page('associe')).pack(fill='x', pady=5)
         WidgetFactory.create_button(nav, text="📄 Contrats", command=lambda: self._show_page('contrat')).pack(fill='x', pady=5)
+        self.alerts_btn = WidgetFactory.create_button(nav, text="⏰ Échéances", command=lambda: self._show_page('alertes'))
+        self.alerts_btn.pack(fill='x', pady=5)
+        WidgetFactory.create_button(nav, text="📊 Statistiques", command=lambda: self._show_page('stats')).pack(fill='x', pady=5)
+        WidgetFactory.create_button(nav, text="⏱️ Performances", command=lambda: self._show_page('perf')).pack(fill='x', pady=5)
 
         # Action buttons
         action_frame = ttk.Frame(nav)
@@ -117,14 +156,33 @@ class DashboardView(tk.Toplevel):
         self.content = ttk.Frame(body)
         self.content.pack(side='left', fill='both', expand=True)
 
+        # Search bar (applies to the current page)
+        search_bar = ttk.Frame(self.content)
+        search_bar.pack(fill='x', padx=5, pady=(0, 5))
+        ttk.Label(search_bar, text='🔍 Rechercher:').pack(side='left')
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_bar, textvariable=self.search_var)
+        search_entry.pack(side='left', fill='x', expand=True, padx=5)
+        self.search_prefix_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_bar, text='Début de mot', variable=self.search_prefix_var,
+                        command=self._schedule_search).pack(side='left', padx=5)
+        WidgetFactory.create_button(search_bar, text='✖', command=lambda: self.search_var.set(''),
+                                    tooltip='Effacer la recherche').pack(side='left')
+        self.search_var.trace_add('write', lambda *a: self._schedule_search())
+
         self.pages = {}
         self.trees = {}
+        # Item id / content hash per row of each tree, for incremental refreshes
+        self._tree_syncs = {}
 
         # Create tables for each page
         for page_key, page_title, columns in [
             ('societe', 'Sociétés', [c for c in societe_headers if not c.startswith('ID_')]),
             ('associe', 'Associés', [c for c in associe_headers if not c.startswith('ID_')]),
             ('contrat', 'Contrats', [c for c in contrat_headers if not c.startswith('ID_')]),
+            ('alertes', 'Contrats arrivant à échéance', ALERT_COLUMNS),
+            ('stats', 'Statistiques', []),
+            ('perf', 'Durées des opérations (ms, médiane et 95e centile)', PERF_COLUMNS),
         ]:
             page = ttk.Frame(self.content)
             page.pack_forget()
@@ -132,6 +190,10 @@ class DashboardView(tk.Toplevel):
 
             # Title
             ttk.Label(page, text=page_title, font=('Segoe UI', 10, 'bold')).pack(anchor='w', padx=5, pady=(0, 5))
+            if page_key == 'alertes':
+                self._build_alert_controls(page)
+            elif page_key == 'stats':
+                self._build_stats_controls(page)
 
             # Table frame
             table_frame = ttk.Frame(page)
@@ -140,7 +202,7 @@ class DashboardView(tk.Toplevel):
             # Create Treeview
             tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=15)
             for col in columns:
-                tree.heading(col, text=col)
+                tree.heading(col, text=col, command=lambda p=page_key, c=col: self._sort_by(p, c))
                 tree.column(col, width=100, minwidth=50)
 
             # Scrollbars
@@ -153,46 +215,226 @@ class DashboardView(tk.Toplevel):
             tree.pack(fill='both', expand=True)
 
             self.trees[page_key] = tree
+            self._tree_syncs[page_key] = TreeSync(tree)
+
+    def _build_alert_controls(self, page):
+        """Window selector of the renewal alerts page."""
+        controls = ttk.Frame(page)
+        controls.pack(fill='x', padx=5)
+        ttk.Label(controls, text='Échéance dans les').pack(side='left')
+        self.alert_days_var = tk.StringVar(value=ALERT_WINDOWS[0])
+        days_cb = ttk.Combobox(controls, textvariable=self.alert_days_var, values=ALERT_WINDOWS, width=5, state='readonly')
+        days_cb.pack(side='left', padx=5)
+        days_cb.bind('<<ComboboxSelected>>', lambda e: self._update_alerts())
+        ttk.Label(controls, text='jours').pack(side='left')
+        self.alert_expired_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(controls, text='Inclure les contrats échus', variable=self.alert_expired_var,
+                        command=self._update_alerts).pack(side='left', padx=10)
+        WidgetFactory.create_button(controls, text='🔁 Renouveler', command=self._renew_contracts).pack(side='right')
+
+    def _build_stats_controls(self, page):
+        """Report selector, headline figures and export buttons of the statistics page."""
+        controls = ttk.Frame(page)
+        controls.pack(fill='x', padx=5)
+        ttk.Label(controls, text='Rapport:').pack(side='left')
+        self.stats_report_var = tk.StringVar(value=STATS_REPORTS[MONTHLY_REPORT[0]])
+        report_cb = ttk.Combobox(controls, textvariable=self.stats_report_var, values=list(STATS_REPORTS.values()),
+                                 width=30, state='readonly')
+        report_cb.pack(side='left', padx=5)
+        report_cb.bind('<<ComboboxSelected>>', lambda e: self._show_page('stats'))
+        WidgetFactory.create_button(controls, text='🌐 HTML', command=lambda: self._export_stats('html')).pack(side='right')
+        WidgetFactory.create_button(controls, text='📥 Excel', command=lambda: self._export_stats('xlsx')).pack(side='right', padx=5)
+        self.stats_summary_label = ttk.Label(page, text='')
+        self.stats_summary_label.pack(anchor='w', padx=5, pady=(5, 0))
+
+    def _analytics(self) -> Analytics:
+        return analytics_for(self._societes_df, self._contrats_df, self._data_version)
+
+    def _build_stats_df(self) -> pd.DataFrame:
+        """Selected report; the statistics tree takes the report's columns."""
+        key = next((k for k, title in STATS_REPORTS.items() if title == self.stats_report_var.get()),
+                   MONTHLY_REPORT[0])
+        analytics = self._analytics()
+        report = analytics.report(key)
+
+        tree = self.trees['stats']
+        columns = list(report.columns)
+        if list(tree['columns']) != columns:
+            self._tree_syncs['stats'].clear()
+            tree.configure(columns=columns)
+            for col in columns:
+                tree.heading(col, text=col, command=lambda c=col: self._sort_by('stats', c))
+                tree.column(col, width=120, minwidth=50)
+            self._sort_state.pop('stats', None)
+
+        summary = analytics.summary()
+        self.stats_summary_label.configure(
+            text=(f"Contrats actifs: {summary['contrats_actifs']} / {summary['contrats']} — "
+                  f"Revenu mensuel: {summary['mrr']:,.2f} MAD — "
+                  f"Commissions du mois: {summary['commissions_mois']:,.2f} MAD"))
+        return report
+
+    def _export_stats(self, fmt: str):
+        """Save every report to an Excel workbook or an HTML page."""
+        extension = '.xlsx' if fmt == 'xlsx' else '.html'
+        filetypes = [('Excel', '*.xlsx')] if fmt == 'xlsx' else [('HTML', '*.html')]
+        path = filedialog.asksaveasfilename(parent=self, title='Exporter les statistiques', defaultextension=extension,
+                                            initialfile=f"Statistiques_{datetime.now():%Y-%m-%d}{extension}",
+                                            filetypes=filetypes)
+        if not path:
+            return
+        try:
+            if fmt == 'xlsx':
+                self._analytics().export_xlsx(path)
+            else:
+                self._analytics().export_html(path)
+            self.status_label.config(text=f'Statistiques exportées: {path}')
+        except Exception as e:
+            logger.exception('Analytics export failed')
+            messagebox.showerror('Erreur', f"Export impossible: {e}")
+
+    def _build_alerts_df(self) -> pd.DataFrame:
+        """Contracts ending within the selected window, soonest first."""
+        index = self._expiry_index
+        window = index.expiring_within(self._alert_days(), include_expired=self.alert_expired_var.get())
+        contrats = self._contrats_df.iloc[index.positions[window]].reset_index(drop=True)
+        alerts = contrats.reindex(columns=['ID_CONTRAT', 'ID_SOCIETE', 'DATE_CONTRAT', 'DOM_DATEDEB', 'DOM_DATEFIN'],
+                                  fill_value='')
+        societes = self._societes_df
+        if societes is not None and {'ID_SOCIETE', 'DEN_STE'} <= set(societes.columns):
+            names = pd.Series(as_text(societes['DEN_STE']).to_numpy(), index=as_text(societes['ID_SOCIETE']).str.strip())
+            names = names[~names.index.duplicated()]
+            alerts.insert(0, 'DEN_STE', as_text(alerts['ID_SOCIETE']).str.strip().map(names).fillna(''))
+        else:
+            alerts.insert(0, 'DEN_STE', '')
+        alerts['JOURS_RESTANTS'] = index.days_left(window).astype(str)
+        return alerts
+
+    def _update_alerts(self):
+        """Rebuild the alerts table (after a data load or a window change)."""
+        try:
+            self._alerts_df = self._build_alerts_df()
+        except Exception:
+            logger.exception('Failed to build renewal alerts')
+            self._alerts_df = pd.DataFrame(columns=ALERT_COLUMNS)
+        try:
+            self.alerts_btn.configure(text=f"⏰ Échéances ({len(self._alerts_df)})")
+        except Exception:
+            pass
+        if self._current_page == 'alertes':
+            self._df = self._alerts_df
+            self._refresh_display()
+
+    def _alert_days(self) -> int:
+        try:
+            return int(self.alert_days_var.get())
+        except Exception:
+            return int(ALERT_WINDOWS[0])
+
+    def _renew_contracts(self):
+        """Renew every contract of the alerts window, then optionally queue their attestations."""
+        if self._alerts_df is None or self._alerts_df.empty:
+            messagebox.showinfo('Renouveler', 'Aucun contrat à renouveler dans cette période.')
+            return
+        if not messagebox.askyesno('Renouveler',
+                                   f"Renouveler les contrats arrivant à échéance dans les {self._alert_days()} jours ?"):
+            return
+        try:
+            # The store pushes the new rows back to this view
+            renewals = renew_contracts(self.store.path, days=self._alert_days(),
+                                       include_expired=self.alert_expired_var.get())
+        except Exception as e:
+            logger.exception('Bulk renewal failed')
+            messagebox.showerror('Erreur', f'Renouvellement impossible: {e}')
+            return
+
+        if renewals.empty:
+            messagebox.showinfo('Renouveler', 'Tous les contrats de cette période sont déjà renouvelés.')
+            return
+        if messagebox.askyesno('Renouveler', f"{len(renewals)} contrat(s) renouvelé(s).\n"
+                                             "Générer les attestations de domiciliation ?"):
+            self._queue_attestations(renewals)
+
+    def _queue_attestations(self, renewals: pd.DataFrame):
+        """Queue one attestation generation per renewed contract on the application's job scheduler."""
+        app = self.parent.winfo_toplevel()
+        scheduler = getattr(app, 'job_scheduler', None)
+        template = PathManager.MODELS_DIR / ATTESTATION_TEMPLATE
+        if scheduler is None or not template.exists():
+            messagebox.showwarning('Attestations', 'Génération des attestations indisponible.')
+            return
+        out_dir = filedialog.askdirectory(parent=self, title='Dossier de sortie des attestations')
+        if not out_dir:
+            return
+        for values in renewal_values(renewals, self._societes_df, self._associes_df):
+            label = values['societe'].get('denomination') or 'Société'
+            scheduler.submit(values, out_dir, templates_list=[str(template)],
+                             templates_dir=str(PathManager.MODELS_DIR), label=f'Attestation {label}')
+        if hasattr(app, 'show_jobs_panel'):
+            app.show_jobs_panel()
+            # The dashboard is modal: hand its grab to the panel so the jobs can be cancelled
+            panel = getattr(app, 'jobs_panel', None)
+            if panel is not None and hasattr(panel, 'show_over'):
+                panel.show_over(self)
+
+    def _payload_for_row(self, row) -> dict:
+        """Action payload (display strings) for a selected row; alerts act on their société."""
+        payload = row_text(row)
+        if self._current_page == 'alertes' and self._societes_df is not None and 'ID_SOCIETE' in self._societes_df.columns:
+            sid = payload.get('ID_SOCIETE', '').strip()
+            matches = self._societes_df[as_text(self._societes_df['ID_SOCIETE']).str.strip() == sid]
+            if not matches.empty:
+                payload = row_text(matches.iloc[0])
+        return payload
 
     def _build_status(self):
         """Build status bar"""
         self.status_label = ttk.Label(self, text='Prêt', relief=tk.SUNKEN)
         self.status_label.pack(fill='x', side='bottom')
 
-    def _load_data(self):
-        """Load data from database (all three sheets)"""
+    @timed('_load_data')
+    def _load_data(self, force: bool = False):
+        """Load the three sheets through the shared data store.
+
+        The store only re-reads the workbook when it changed on disk (or when
+        `force`); a re-read is delivered through `_on_store_change`.
+        """
         try:
             PathManager.ensure_directories()
-            excel_path = PathManager.get_database_path('DataBase_domiciliation.xlsx')
-
-            if excel_path.exists():
-                try:
-                    # Load all three main sheets
-                    self._societes_df = pd.read_excel(excel_path, sheet_name='Societes', dtype=str).fillna('')
-                    self._associes_df = pd.read_excel(excel_path, sheet_name='Associes', dtype=str).fillna('')
-                    self._contrats_df = pd.read_excel(excel_path, sheet_name='Contrats', dtype=str).fillna('')
-                    # Initialize with societes data
-                    self._df = self._societes_df
-                except Exception as e:
-                    logger.warning(f"Error loading sheets: {e}")
-                    self._societes_df = pd.DataFrame(columns=_const.societe_headers)
-                    self._associes_df = pd.DataFrame(columns=_const.associe_headers)
-                    self._contrats_df = pd.DataFrame(columns=_const.contrat_headers)
-                    self._df = self._societes_df
-            else:
-                self._societes_df = pd.DataFrame(columns=_const.societe_headers)
-                self._associes_df = pd.DataFrame(columns=_const.associe_headers)
-                self._contrats_df = pd.DataFrame(columns=_const.contrat_headers)
-                self._df = self._societes_df
-
-            self._refresh_display()
+            reloaded = self.store.load(force=force)
+            if not reloaded:
+                self._apply_store_tables()
+            annotate(rows=sum(len(df) for df in (self._societes_df, self._associes_df, self._contrats_df)),
+                     bytes_read=self.store.path.stat().st_size if reloaded and self.store.path.exists() else 0)
         except Exception as e:
-            logger.error(f"Error loading data: {e}")
+            logger.error("Error loading data: %s", e)
             self._societes_df = pd.DataFrame()
             self._associes_df = pd.DataFrame()
             self._contrats_df = pd.DataFrame()
             self._df = pd.DataFrame()
 
+    def _on_store_change(self, changes):
+        """Data store subscriber: rows were written by this or another view."""
+        try:
+            if self.winfo_exists():
+                self._apply_store_tables()
+        except Exception:
+            logger.exception('Failed to apply data store changes')
+
+    def _apply_store_tables(self):
+        """Take the store's current frames and rebuild what derives from them."""
+        self._societes_df = self.store.table('Societes')
+        self._associes_df = self.store.table('Associes')
+        self._contrats_df = self.store.table('Contrats')
+        self._data_version = self.store.version
+
+        # Cached search indexes, sort permutations and analytics describe the previous data
+        self._search_indexes = {}
+        self._sort_caches = {}
+        self._expiry_index = ExpiryIndex.from_frame(self._contrats_df)
+        self._update_alerts()
+        self._show_page(self._current_page)
+
     def _show_page(self, page_key: str):
         """Show a specific page and load corresponding data"""
         self._current_page = page_key
@@ -204,6 +446,20 @@ class DashboardView(tk.Toplevel):
             self._df = self._associes_df
         elif page_key == 'contrat':
             self._df = self._contrats_df
+        elif page_key == 'alertes':
+            self._df = self._alerts_df
+        elif page_key == 'stats':
+            try:
+                self._df = self._build_stats_df()
+            except Exception:
+                logger.exception('Failed to build statistics')
+                self._df = pd.DataFrame()
+        elif page_key == 'perf':
+            try:
+                self._df = perf_recorder.summary()
+            except Exception:
+                logger.exception('Failed to summarize operation timings')
+                self._df = pd.DataFrame(columns=PERF_COLUMNS)
 
         # Show/hide pages
         for key, page in self.pages.items():
@@ -214,47 +470,121 @@ class DashboardView(tk.Toplevel):
 
         self._refresh_display()
 
+    def _schedule_search(self):
+        """Debounce search input: run the search once typing pauses."""
+        if self._search_after_id is not None:
+            try:
+                self.after_cancel(self._search_after_id)
+            except Exception:
+                pass
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._apply_search)
+
+    def _apply_search(self):
+        self._search_after_id = None
+        self._refresh_display()
+
+    def _search_index(self) -> SearchIndex:
+        """Search index of the current page's DataFrame (built on first use)."""
+        cached = self._search_indexes.get(self._current_page)
+        if cached is None or cached[0] is not self._df:
+            cached = (self._df, SearchIndex(self._df))
+            self._search_indexes[self._current_page] = cached
+        return cached[1]
+
+    def _sort_cache(self) -> SortCache:
+        """Sort permutations of the current page's DataFrame (built on first use)."""
+        cached = self._sort_caches.get(self._current_page)
+        if cached is None or cached.df is not self._df:
+            cached = SortCache(self._df)
+            self._sort_caches[self._current_page] = cached
+        return cached
+
+    def _sort_by(self, page_key: str, column: str):
+        """Heading click: sort by `column`, toggling the direction on repeated clicks."""
+        previous = self._sort_state.get(page_key)
+        ascending = not previous[1] if previous and previous[0] == column else True
+        self._sort_state[page_key] = (column, ascending)
+        tree = self.trees.get(page_key)
+        if tree is not None:
+            for col in tree['columns']:
+                arrow = (' ▲' if ascending else ' ▼') if col == column else ''
+                tree.heading(col, text=f'{col}{arrow}')
+        if page_key == self._current_page:
+            self._refresh_display()
+
+    def _visible_positions(self):
+        """Positions in `_df` of the rows to show (sorted, filtered), and the match count."""
+        sort = self._sort_state.get(self._current_page)
+        order = self._sort_cache().permutation(*sort) if sort else np.arange(len(self._df))
+        query = self.search_var.get().strip() if hasattr(self, 'search_var') else ''
+        if not query:
+            return order, len(order)
+        mode = PREFIX if self.search_prefix_var.get() else SUBSTRING
+        matches = self._search_index().search(query, mode)
+        if sort:
+            # Keep the sort order: select matching rows from the permutation
+            selected = np.zeros(len(self._df), dtype=bool)
+            selected[matches] = True
+            matches = order[selected[order]]
+        return matches[:MAX_SEARCH_RESULTS], len(matches)
+
+    def _row_keys(self, positions) -> np.ndarray:
+        """Stable keys of the rows at `positions` of the current DataFrame."""
+        column = ROW_KEYS.get(self._current_page)
+        if column not in self._df.columns:
+            column = self._df.columns[0] if len(self._df.columns) else None
+        if column is None:
+            return np.asarray(positions).astype(str).astype(object)
+        return as_text(self._df[column]).to_numpy(dtype=object)[positions]
+
+    @timed('_refresh_display')
     def _refresh_display(self):
-        """Refresh the displayed data"""
+        """Refresh the displayed data, touching only the rows that changed."""
+        tree = self.trees.get(self._current_page)
         if self._df is None or self._df.empty:
+            self._view_positions = np.arange(0)
+            if tree is not None:
+                self._tree_syncs[self._current_page].sync(pd.DataFrame(), [])
             self.status_label.config(text='Aucune donnée')
             return
 
-        # Clear current trees
-        for tree in self.trees.values():
-            for item in tree.get_children():
-                tree.delete(item)
+        positions, matches = self._visible_positions()
+        self._view_positions = positions
+        annotate(rows=len(positions))
 
         # Populate current tree
-        tree = self.trees.get(self._current_page)
         if tree is not None:
             # Get column names from tree (these are display columns without ID_*)
             columns = list(tree["columns"])
-            logger.debug(f"Tree columns for '{self._current_page}': {columns}")
-            logger.debug(f"DataFrame columns: {list(self._df.columns)}")
-
-            # Populate tree with data
-            for idx, (_, row) in enumerate(self._df.iterrows()):
-                values = []
-                for col in columns:
-                    # Get value from row, handling missing columns gracefully
-                    if col in self._df.columns:
-                        val = row.get(col, '')
-                    else:
-                        logger.warning(f"Column '{col}' not found in DataFrame")
-                        val = ''
-                    values.append(str(val))
-
-                logger.debug(f"Row {idx} values: {values}")
-                tree.insert('', 'end', values=values)
-
-        self.status_label.config(text=f'Total: {len(self._df)} enregistrements')
+            missing = [col for col in columns if col not in self._df.columns]
+            if missing:
+                # Reported once per refresh rather than once per row
+                logger.warning("Columns not found in DataFrame: %s", missing)
+
+            # Typed rows are hashed as is and only the changed ones rendered as text
+            rows = self._df.iloc[positions].reindex(columns=columns, fill_value='')
+            counts = self._tree_syncs[self._current_page].sync(rows, self._row_keys(positions), render=to_text)
+            logger.debug("Refreshed %r: %s", self._current_page, counts)
+
+        if matches == len(self._df):
+            self.status_label.config(text=f'Total: {len(self._df)} enregistrements')
+        elif matches > len(positions):
+            self.status_label.config(text=f'{matches} résultats sur {len(self._df)} (affichage des {len(positions)} premiers)')
+        else:
+            self.status_label.config(text=f'{matches} résultat(s) sur {len(self._df)} enregistrements')
+
+    def _selected_row(self, tree, selection):
+        """DataFrame row behind the selected tree item (None if out of range)."""
+        selected_idx = tree.index(selection[0])
+        if selected_idx >= len(self._view_positions):
+            return None
+        return self._df.iloc[int(self._view_positions[selected_idx])]
 
     def _action(self, action: str):
         """Handle action buttons and send to parent MainForm"""
         try:
             if action == 'refresh':
-                self._load_data()
+                self._load_data(force=True)
                 messagebox.showinfo('Info', 'Données actualisées')
             elif action == 'add':
                 # Add new record - pass empty payload to MainForm
@@ -280,14 +610,13 @@ class DashboardView(tk.Toplevel):
                     messagebox.showwarning('Modifier', 'Aucune donnée disponible')
                     return
 
-                df = self._df  # Narrow type for type checker
-                selected_idx = tree.index(selection[0])
-                if selected_idx >= len(df):
+                # Map the tree position back through search and sort to the DataFrame row
+                row = self._selected_row(tree, selection)
+                if row is None:
                     messagebox.showerror('Modifier', 'Index de ligne invalide')
                     return
 
-                row = df.iloc[selected_idx]
-                payload = row.to_dict()
+                payload = self._payload_for_row(row)
 
                 # Send to parent
                 if hasattr(self.parent, 'handle_dashboard_action'):
@@ -312,14 +641,13 @@ class DashboardView(tk.Toplevel):
                     messagebox.showwarning('Supprimer', 'Aucune donnée disponible')
                     return
 
-                df = self._df  # Narrow type for type checker
-                selected_idx = tree.index(selection[0])
-                if selected_idx >= len(df):
+                # Map the tree position back through search and sort to the DataFrame row
+                row = self._selected_row(tree, selection)
+                if row is None:
                     messagebox.showerror('Supprimer', 'Index de ligne invalide')
                     return
 
-                row = df.iloc[selected_idx]
-                payload = row.to_dict()
+                payload = self._payload_for_row(row)
 
                 # Send to parent
                 if hasattr(self.parent, 'handle_dashboard_action'):
@@ -327,7 +655,7 @@ class DashboardView(tk.Toplevel):
                 else:
                     messagebox.showwarning('Supprimer', 'Parent window does not support this action')
         except Exception as e:
-            logger.error(f"Error in _action('{action}'): {e}")
+            logger.error("Error in _action(%r): %s", action, e)
             messagebox.showerror('Erreur', f'Erreur lors de l\'action: {e}')
 
     def _update_clock(self):
@@ -346,6 +674,11 @@ class DashboardView(tk.Toplevel):
 
     def _on_close(self, call_parent=True):
         """Close dashboard and restore parent"""
+        try:
+            self._unsubscribe()
+        except Exception:
+            pass
+
         try:
             if self._parent_disabled:
                 try:
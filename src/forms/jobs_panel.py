@@ -0,0 +1,253 @@
+import tkinter as tk
+from tkinter import ttk
+import logging
+from typing import Dict, Set
+
+from ..utils.utils import WidgetFactory
+from ..utils import jobs as _jobs
+from ..utils.progress import ProgressChannel, ProgressPump
+
+logger = logging.getLogger(__name__)
+
+STATUS_LABELS = {
+    _jobs.QUEUED: 'En attente',
+    _jobs.RUNNING: 'En cours',
+    _jobs.DONE: 'Terminé',
+    _jobs.CANCELLED: 'Annulé',
+    _jobs.ERROR: 'Erreur',
+}
+
+
+class RingLogView(ttk.Frame):
+    """Read-only text log keeping only the last `max_lines` lines.
+
+    Lines are appended in batches (one insert per batch) and the view only
+    follows the tail when the user has not scrolled up.
+    """
+
+    def __init__(self, parent, max_lines: int = 500, height: int = 8):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self.text = tk.Text(self, height=height, wrap='none', state='disabled')
+        y_scroll = ttk.Scrollbar(self, orient='vertical', command=self.text.yview)
+        self.text.configure(yscrollcommand=y_scroll.set)
+        y_scroll.pack(side='right', fill='y')
+        self.text.pack(fill='both', expand=True)
+
+    def append(self, lines, dropped: int = 0):
+        if not lines and not dropped:
+            return
+        chunk = ''
+        if dropped:
+            chunk += f"… {dropped} message(s) omis\n"
+        chunk += ''.join(f"{line}\n" for line in lines)
+        follow = self.text.yview()[1] >= 0.999
+        self.text.configure(state='normal')
+        self.text.insert('end', chunk)
+        # 'end' is one past the trailing newline, hence the -2
+        extra = int(self.text.index('end').split('.')[0]) - 2 - self.max_lines
+        if extra > 0:
+            self.text.delete('1.0', f'{extra + 1}.0')
+        self.text.configure(state='disabled')
+        if follow:
+            self.text.see('end')
+
+
+class JobsPanel(tk.Toplevel):
+    """Non-modal window listing the generation jobs of a JobScheduler.
+
+    The panel never grabs focus so staff can keep filling the forms while
+    earlier packs are generated. Closing it only hides it; jobs keep running.
+    Its progress pump only ticks while the panel is shown and jobs are
+    pending; `show()` (called after each submit) starts it again.
+    Opened from a modal window, `show_over()` hands it that window's grab
+    until the panel is hidden.
+    """
+
+    def __init__(self, parent, scheduler: _jobs.JobScheduler):
+        super().__init__(parent)
+        self.parent = parent
+        self.scheduler = scheduler
+        self.title("Tâches de génération")
+        self.geometry("760x380")
+        self.minsize(560, 260)
+        try:
+            self.transient(parent)
+        except Exception:
+            pass
+
+        self._items: Dict[int, str] = {}
+        # Modal window whose grab the panel holds while shown (see show_over)
+        self._grab_owner = None
+        # Jobs whose 'finished' event has been posted to the channel
+        self._finish_posted: Set[int] = set()
+        # Worker threads only post here; the pump applies updates once per tick
+        self.channel = ProgressChannel(max_lines=500)
+        self.pump = ProgressPump(self, self.channel, self._apply_batch, interval_ms=100,
+                                 keep_running=self._has_pending_updates)
+
+        self._build()
+        # Listen first: a job finishing meanwhile is either rendered below or posted
+        self._listener = self._on_job_event
+        scheduler.add_listener(self._listener)
+        for job in scheduler.jobs():
+            self._render_job(job)
+            if job.finished:
+                self._finish_posted.add(job.id)
+        self.pump.start()
+        self.protocol('WM_DELETE_WINDOW', self.hide)
+        self.bind('<Destroy>', self._on_destroy, add='+')
+
+    def _build(self):
+        frame = ttk.Frame(self, padding=10)
+        frame.pack(fill='both', expand=True)
+
+        columns = ('societe', 'statut', 'progression', 'dossier')
+        self.tree = ttk.Treeview(frame, columns=columns, show='headings', height=8, selectmode='browse')
+        for col, text, width in (('societe', 'Société', 200), ('statut', 'Statut', 100),
+                                 ('progression', 'Progression', 100), ('dossier', 'Dossier', 320)):
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=width, minwidth=60)
+        y_scroll = ttk.Scrollbar(frame, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=y_scroll.set)
+        y_scroll.pack(side='right', fill='y')
+        self.tree.pack(fill='both', expand=True)
+
+        buttons = ttk.Frame(self, padding=(10, 0, 10, 10))
+        buttons.pack(fill='x')
+        WidgetFactory.create_button(buttons, text="⏹ Annuler la tâche", command=self.cancel_selected).pack(side='left', padx=4)
+        WidgetFactory.create_button(buttons, text="🧹 Effacer les tâches terminées", command=self.clear_finished).pack(side='left', padx=4)
+        WidgetFactory.create_button(buttons, text="Fermer", command=self.hide).pack(side='right', padx=4)
+
+        self.summary_label = ttk.Label(self, text='', padding=(10, 0, 10, 6))
+        self.summary_label.pack(fill='x')
+
+        self.log_view = RingLogView(self, max_lines=500, height=6)
+        self.log_view.pack(fill='both', expand=False, padx=10, pady=(0, 10))
+
+    # --- scheduler events (worker threads) ---
+    def _on_job_event(self, job, event):
+        line = None
+        if event == 'progress':
+            entry = job.last_entry or {}
+            line = f"[{job.label}] [{entry.get('status')}] {job.last_template} - {entry.get('error') or ''}"
+        elif event == 'finished':
+            line = f"[{job.label}] {STATUS_LABELS.get(job.status, job.status)}"
+            if job.error:
+                line += f": {job.error}"
+        self.channel.post(job.id, job, line)
+        if event == 'finished':
+            self._finish_posted.add(job.id)
+
+    def _has_pending_updates(self) -> bool:
+        """True while a job may still post progress (pump keep_running)."""
+        return any(not job.finished or job.id not in self._finish_posted for job in self.scheduler.jobs())
+
+    # --- Tk thread ---
+    def _apply_batch(self, batch):
+        for job in batch.states.values():
+            self._render_job(job, update_summary=False)
+        self._update_summary()
+        self.log_view.append(batch.lines, batch.dropped)
+
+    def _render_job(self, job, update_summary: bool = True):
+        try:
+            progress = f"{job.processed} / {job.total}" if job.total else ''
+            status = STATUS_LABELS.get(job.status, job.status)
+            if job.status == _jobs.ERROR and job.error:
+                status = f"{status}: {job.error}"
+            folder = job.output_folder() if job.finished else job.out_dir
+            values = (job.label, status, progress, folder or '')
+            iid = self._items.get(job.id)
+            if iid and self.tree.exists(iid):
+                self.tree.item(iid, values=values)
+            else:
+                self._items[job.id] = self.tree.insert('', 'end', values=values)
+            if update_summary:
+                self._update_summary()
+        except tk.TclError:
+            pass
+
+    def _update_summary(self):
+        pending = self.scheduler.pending_count()
+        self.summary_label.config(text=f"Tâches en attente ou en cours: {pending}")
+
+    def _selected_job_id(self):
+        selection = self.tree.selection()
+        if not selection:
+            return None
+        for job_id, iid in self._items.items():
+            if iid == selection[0]:
+                return job_id
+        return None
+
+    def cancel_selected(self):
+        job_id = self._selected_job_id()
+        if job_id is not None:
+            self.scheduler.cancel(job_id)
+
+    def clear_finished(self):
+        self.scheduler.clear_finished()
+        for job_id in list(self._items):
+            if self.scheduler.get(job_id) is None:
+                self._finish_posted.discard(job_id)
+                try:
+                    self.tree.delete(self._items.pop(job_id))
+                except tk.TclError:
+                    pass
+        self._update_summary()
+
+    def show(self):
+        self.deiconify()
+        self.lift()
+        self.pump.flush()
+        self.pump.start()
+
+    def show_over(self, owner):
+        """Show the panel above the modal `owner`, taking its grab until hidden."""
+        if self._grab_owner is not None and self._grab_owner is not owner:
+            self._return_grab()
+        self._grab_owner = owner
+        try:
+            self.transient(owner)
+            owner.grab_release()
+            owner.bind('<Destroy>', lambda e: e.widget is owner and self._return_grab(closing=True), add='+')
+        except tk.TclError:
+            pass
+        self.show()
+        self._take_grab()
+
+    def _take_grab(self, attempts: int = 20):
+        if self._grab_owner is None:
+            return
+        try:
+            self.grab_set()
+        except tk.TclError:
+            # Not mapped yet
+            if attempts:
+                self.after(50, self._take_grab, attempts - 1)
+
+    def _return_grab(self, closing: bool = False):
+        owner, self._grab_owner = self._grab_owner, None
+        if owner is None:
+            return
+        try:
+            self.grab_release()
+            self.transient(self.parent)
+            if not closing and owner.winfo_exists():
+                owner.grab_set()
+        except tk.TclError:
+            pass
+
+    def hide(self):
+        """Withdraw the panel; updates wait in the channel until show()."""
+        self.withdraw()
+        self.pump.stop()
+        self._return_grab()
+
+    def _on_destroy(self, event=None):
+        if event is not None and event.widget is not self:
+            return
+        self.scheduler.remove_listener(self._listener)
+        self.pump.stop()
+        self._return_grab()
@@ -1,10 +1,11 @@
+import copy
 import tkinter as tk
 from tkinter import ttk, messagebox
 from typing import Optional
 from .societe_form import SocieteForm
 from .associe_form import AssocieForm
 from .contrat_form import ContratForm
-from ..utils.utils import ThemeManager, WidgetFactory, WindowManager, PathManager, ensure_excel_db
+from ..utils.utils import ThemeManager, WidgetFactory, WindowManager, PathManager, bootstrap_database
 from ..utils import constants as _const
 from pathlib import Path
 
@@ -116,16 +117,23 @@ class MainForm(ttk.Frame):
         create one frame (page) per section and provide Next/Previous
         navigation as well as Save and Finish actions.
         """
-        # Container for pages
+        # Container for pages. Each entry is (key, frame, form); frame and form
+        # stay None until the page is first shown (see _ensure_page), so only
+        # the first page is built at startup.
         self.pages = []
         self.current_page = 0
-
-        # Create pages
-        self.create_societe_page()
-        self.create_associe_page()
-        self.create_contrat_page()
-
-        # Show first page
+        self._page_builders = {
+            'societe': self.create_societe_page,
+            'associes': self.create_associe_page,
+            'contrat': self.create_contrat_page,
+        }
+        self._page_forms = {'societe': SocieteForm, 'associes': AssocieForm, 'contrat': ContratForm}
+        # Values set while a page was not built yet, applied when it is built
+        self._pending_values = {}
+        for key in self._page_builders:
+            self.pages.append((key, None, None))
+
+        # Show first page (builds it)
         self.show_page(0)
 
         # Setup navigation controls
@@ -172,7 +180,8 @@ class MainForm(ttk.Frame):
         header = self.create_section_header(page, "Informations de la Société", "📝", 0, 0)
         self.societe_form = SocieteForm(page, self.values.get('societe', {}))
         self.societe_form.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
-        self.pages.append(('societe', page, self.societe_form))
+        self._apply_pending_values('societe', self.societe_form)
+        return ('societe', page, self.societe_form)
 
     def create_associe_page(self):
         page = ttk.Frame(self.forms_container)
@@ -195,15 +204,17 @@ class MainForm(ttk.Frame):
                     child.destroy()
             except Exception:
                 pass
-        # Ensure exactly one initial associé form is present
+        # Apply associés set before the page existed (e.g. dashboard 'edit'),
+        # otherwise ensure exactly one initial associé form is present
         try:
+            self._apply_pending_values('associes', self.associe_form)
             # add one initial associé if none exist yet
             if len(self.associe_form.associe_vars) == 0:
                 self.associe_form.add_associe()
         except Exception:
             # conservative: ignore errors here to avoid breaking startup
             pass
-        self.pages.append(('associes', page, self.associe_form))
+        return ('associes', page, self.associe_form)
 
     def create_contrat_page(self):
         page = ttk.Frame(self.forms_container)
@@ -215,7 +226,27 @@ class MainForm(ttk.Frame):
         header = self.create_section_header(page, "Informations du Contrat", "📋", 0, 0)
         self.contrat_form = ContratForm(page, self.values.get('contrat', {}))
         self.contrat_form.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
-        self.pages.append(('contrat', page, self.contrat_form))
+        self._apply_pending_values('contrat', self.contrat_form)
+        return ('contrat', page, self.contrat_form)
+
+    def _apply_pending_values(self, key, form):
+        """Apply values given to set_values() before the page was built."""
+        pending = self._pending_values.pop(key, None)
+        if pending and hasattr(form, 'set_values'):
+            try:
+                form.set_values(pending)
+            except Exception:
+                pass
+
+    def _ensure_page(self, index: int):
+        """Build the page at `index` on first use and return its (key, frame, form)."""
+        key, frame, form = self.pages[index]
+        if form is None:
+            self.pages[index] = self._page_builders[key]()
+            if index != self.current_page:
+                # Built before being shown, keep it hidden
+                self.pages[index][1].grid_remove()
+        return self.pages[index]
 
     def create_collapsible_section(self, title, form_creator):
         """Create a collapsible section with the given title and form"""
@@ -372,10 +403,13 @@ class MainForm(ttk.Frame):
         """Get values from all forms"""
         # Ensure latest current page is saved before returning
         try:
-            # call get_values on each form present
+            # call get_values on each built form; pages never shown yet are not
+            # built for this, they give the values set on them or their defaults
             values = {}
             for key, _, form in self.pages:
-                if hasattr(form, 'get_values'):
+                if form is None:
+                    values[key] = self._unbuilt_page_values(key)
+                elif hasattr(form, 'get_values'):
                     values[key] = form.get_values()
             self.values = values
         except Exception:
@@ -387,19 +421,35 @@ class MainForm(ttk.Frame):
             }
         return self.values
 
+    def _unbuilt_page_values(self, key):
+        """Values of a page not built yet: those given to set_values(), else the form defaults."""
+        pending = self._pending_values.get(key)
+        if pending:
+            return copy.deepcopy(pending)
+        return self._page_forms[key].default_values()
+
     def set_values(self, values):
         """Set values for all forms"""
         self.values = values
         if values:
             for key, _, form in self.pages:
-                if key in values and hasattr(form, 'set_values'):
+                if key not in values:
+                    continue
+                if form is None:
+                    # Not built yet: applied by the page builder on first show
+                    self._pending_values[key] = values[key]
+                elif hasattr(form, 'set_values'):
                     form.set_values(values[key])
 
     def reset(self):
         """Reset all forms to their default state"""
         self.values = {}
+        self._pending_values = {}
         # Réinitialiser chaque formulaire individuellement
         for key, _, form in self.pages:
+            if form is None:
+                # Page not built yet: it will start from defaults
+                continue
             if hasattr(form, 'reset'):
                 # Appeler la méthode reset() si elle existe
                 form.reset()
@@ -413,8 +463,11 @@ class MainForm(ttk.Frame):
         """Show the page at `index` and hide others."""
         if index < 0 or index >= len(self.pages):
             return
+        self._ensure_page(index)
         self.current_page = index
         for i, (_key, frame, _form) in enumerate(self.pages):
+            if frame is None:
+                continue
             if i == index:
                 frame.tkraise()
                 frame.grid()
@@ -486,7 +539,7 @@ class MainForm(ttk.Frame):
                 values = {}
                 for key, _, form in self.pages:
                     try:
-                        values[key] = form.get_values() if hasattr(form, 'get_values') else {}
+                        values[key] = self._unbuilt_page_values(key) if form is None else form.get_values()
                     except Exception:
                         values[key] = {}
                 self.values = values
@@ -494,20 +547,14 @@ class MainForm(ttk.Frame):
             except Exception:
                 all_values = self.values
         # Ensure the Excel database exists and has expected sheets
-        # Build the DB path explicitly to avoid static-analysis warnings about
-        # PathManager.get_database_path. Use the centralized DB filename from
-        # constants so the path is consistent.
-        try:
-            db_path = Path(PathManager.DATABASE_DIR) / _const.DB_FILENAME
-        except Exception:
-            db_path = Path.cwd() / _const.DB_FILENAME
+        # (same path as the data store and save_to_db)
+        from ..utils.storage import default_db_path
+        db_path = default_db_path()
 
         try:
-            # Create the Excel DB using centralized headers from constants; ensure idempotent creation
-            ensure_excel_db(db_path, _const.excel_sheets)
-            # Initialize reference sheets with default data from constants
-            from ..utils.utils import initialize_reference_sheets
-            initialize_reference_sheets(db_path)
+            # Create the sheets, seed the reference ones and stamp the schema in one save
+            # (no-op on an initialized database)
+            bootstrap_database(db_path, _const.excel_sheets)
         except Exception as e:
             # non-fatal: log and show an error to the user
             try:
@@ -608,81 +655,51 @@ class MainForm(ttk.Frame):
                     return
 
                 # Map canonical DB fields back to form keys (reverse of write_records_to_db mapping)
-                soc_map = {
-                    'DEN_STE': 'denomination', 'FORME_JUR': 'forme_juridique', 'ICE': 'ice',
-                    'DATE_ICE': 'date_ice', 'CAPITAL': 'capital', 'PART_SOCIAL': 'parts_social',
-                    'STE_ADRESS': 'adresse', 'TRIBUNAL': 'tribunal'
-                }
+                soc_map = _const.societe_form_keys
                 soc_vals = {}
                 for k, v in (payload.items() if isinstance(payload, dict) else []):
                     if k in soc_map:
                         soc_vals[soc_map[k]] = v
 
-                # Attempt to also load associes and contrats from the workbook if possible
+                # Also load the société's associes and contrat from the shared data store
                 associes_list = []
                 contrat_vals = {}
                 try:
-                    import pandas as _pd
-                    db_path = Path(PathManager.DATABASE_DIR) / _const.DB_FILENAME
-                    if db_path.exists():
-                        try:
-                            assoc_df = _pd.read_excel(db_path, sheet_name='Associes', dtype=str).fillna('')
-                        except Exception:
-                            assoc_df = _pd.DataFrame()
-                        try:
-                            contrat_df = _pd.read_excel(db_path, sheet_name='Contrats', dtype=str).fillna('')
-                        except Exception:
-                            contrat_df = _pd.DataFrame()
-
-                        # Prefer matching by ID_SOCIETE when available
-                        sid = None
-                        if isinstance(payload, dict):
-                            sid = payload.get('ID_SOCIETE') or payload.get('ID_SOCIETE')
-                        if sid and not assoc_df.empty and 'ID_SOCIETE' in assoc_df.columns:
-                            matches = assoc_df[assoc_df['ID_SOCIETE'].astype(str).str.strip() == str(sid).strip()]
-                        else:
-                            den = (payload.get('DEN_STE') or '').strip() if isinstance(payload, dict) else ''
-                            if not assoc_df.empty and 'DEN_STE' in assoc_df.columns:
-                                matches = assoc_df[assoc_df['DEN_STE'].astype(str).str.strip().str.lower() == den.lower()]
-                            else:
-                                matches = _pd.DataFrame()
-
-                        if not matches.empty:
-                            # inverse mapping from canonical DB headers to AssocieForm keys
-                            inverse_assoc_map = {
-                                'CIVIL': 'civilite', 'PRENOM': 'prenom', 'NOM': 'nom',
-                                'PARTS': 'num_parts', 'DATE_NAISS': 'date_naiss', 'LIEU_NAISS': 'lieu_naiss',
-                                'NATIONALITY': 'nationalite', 'CIN_NUM': 'num_piece', 'CIN_VALIDATY': 'validite_piece',
-                                'ADRESSE': 'adresse', 'PHONE': 'telephone', 'EMAIL': 'email',
-                                'IS_GERANT': 'est_gerant', 'QUALITY': 'qualite', 'CAPITAL_DETENU': 'capital_detenu'
-                            }
-                            for _, ar in matches.iterrows():
-                                ad = {}
-                                for col in ar.index:
-                                    if col in inverse_assoc_map:
-                                        ad[inverse_assoc_map[col]] = ar.get(col)
-                                associes_list.append(ad)
+                    from ..utils.store import DataStore
+                    from ..utils.schema import to_text
+                    from ..utils.sorting import as_text
+                    store = DataStore.instance()
+                    store.load()
+
+                    # Prefer matching by ID_SOCIETE, fall back to the company name
+                    sid = str(payload.get('ID_SOCIETE') or '').strip() if isinstance(payload, dict) else ''
+                    if not sid:
+                        den = (payload.get('DEN_STE') or '').strip().lower() if isinstance(payload, dict) else ''
+                        societes = store.table('Societes')
+                        if den and 'DEN_STE' in societes.columns:
+                            matches = societes[as_text(societes['DEN_STE']).str.strip().str.lower() == den]
+                            if not matches.empty:
+                                sid = as_text(matches['ID_SOCIETE']).iloc[0].strip()
+
+                    if sid:
+                        # inverse mapping from canonical DB headers to AssocieForm keys
+                        # (typed store rows are turned back into the strings the forms show)
+                        inverse_assoc_map = _const.associe_form_keys
+                        for _, ar in to_text(store.rows_for_societe('Associes', sid)).iterrows():
+                            ad = {}
+                            for col in ar.index:
+                                if col in inverse_assoc_map:
+                                    ad[inverse_assoc_map[col]] = ar.get(col)
+                            associes_list.append(ad)
 
                         # take first contrat row if present
-                        if not contrat_df.empty:
-                            if sid and 'ID_SOCIETE' in contrat_df.columns:
-                                cands = contrat_df[contrat_df['ID_SOCIETE'].astype(str).str.strip() == str(sid).strip()]
-                            else:
-                                den = (payload.get('DEN_STE') or '').strip() if isinstance(payload, dict) else ''
-                                if not contrat_df.empty and 'DEN_STE' in contrat_df.columns:
-                                    cands = contrat_df[contrat_df['DEN_STE'].astype(str).str.strip().str.lower() == den.lower()]
-                                else:
-                                    cands = _pd.DataFrame()
-                            if not cands.empty:
-                                crow = cands.iloc[0]
-                                inverse_contrat_map = {
-                                    'DATE_CONTRAT': 'date_contrat', 'PERIOD_DOMCIL': 'period',
-                                    'PRIX_CONTRAT': 'prix_mensuel', 'PRIX_INTERMEDIARE_CONTRAT': 'prix_inter',
-                                    'DOM_DATEDEB': 'date_debut', 'DOM_DATEFIN': 'date_fin'
-                                }
-                                for col in crow.index:
-                                    if col in inverse_contrat_map:
-                                        contrat_vals[inverse_contrat_map[col]] = crow.get(col)
+                        cands = to_text(store.rows_for_societe('Contrats', sid))
+                        if not cands.empty:
+                            crow = cands.iloc[0]
+                            inverse_contrat_map = _const.contrat_form_keys
+                            for col in crow.index:
+                                if col in inverse_contrat_map:
+                                    contrat_vals[inverse_contrat_map[col]] = crow.get(col)
                 except Exception:
                     # ignore data load errors; fallback to partial prefill
                     pass
@@ -702,78 +719,25 @@ class MainForm(ttk.Frame):
                 if not messagebox.askyesno('Confirmation', f"Voulez-vous vraiment supprimer la société '{den}' ?"):
                     return
 
-                # Remove rows from the Excel workbook
+                # Remove the rows through the shared data store; open views
+                # (the dashboard) are notified of the deleted rows
+                from ..utils.coordinator import WorkbookBusyError
                 try:
-                    import pandas as _pd
-                    db_path = Path(PathManager.DATABASE_DIR) / _const.DB_FILENAME
-                    if not db_path.exists():
+                    from ..utils.store import DataStore
+                    store = DataStore.instance()
+                    if not store.path.exists():
                         messagebox.showerror('Erreur', 'Fichier de base de données introuvable.')
                         return
 
-                    # Read canonical sheets
-                    try:
-                        soc_df = _pd.read_excel(db_path, sheet_name='Societes', dtype=str).fillna('')
-                    except Exception:
-                        soc_df = _pd.DataFrame()
-                    try:
-                        assoc_df = _pd.read_excel(db_path, sheet_name='Associes', dtype=str).fillna('')
-                    except Exception:
-                        assoc_df = _pd.DataFrame()
-                    try:
-                        contrat_df = _pd.read_excel(db_path, sheet_name='Contrats', dtype=str).fillna('')
-                    except Exception:
-                        contrat_df = _pd.DataFrame()
-
-                    if sid:
-                        if not soc_df.empty and 'ID_SOCIETE' in soc_df.columns:
-                            soc_df = soc_df[~(soc_df['ID_SOCIETE'].astype(str).str.strip() == str(sid).strip())]
-                        if not assoc_df.empty and 'ID_SOCIETE' in assoc_df.columns:
-                            assoc_df = assoc_df[~(assoc_df['ID_SOCIETE'].astype(str).str.strip() == str(sid).strip())]
-                        if not contrat_df.empty and 'ID_SOCIETE' in contrat_df.columns:
-                            contrat_df = contrat_df[~(contrat_df['ID_SOCIETE'].astype(str).str.strip() == str(sid).strip())]
-                    else:
-                        # fallback to DEN_STE match
-                        if not soc_df.empty and 'DEN_STE' in soc_df.columns:
-                            soc_df = soc_df[~(soc_df['DEN_STE'].astype(str).str.strip().str.lower() == den.strip().lower())]
-                        if not assoc_df.empty and 'DEN_STE' in assoc_df.columns:
-                            assoc_df = assoc_df[~(assoc_df['DEN_STE'].astype(str).str.strip().str.lower() == den.strip().lower())]
-                        if not contrat_df.empty and 'DEN_STE' in contrat_df.columns:
-                            contrat_df = contrat_df[~(contrat_df['DEN_STE'].astype(str).str.strip().str.lower() == den.strip().lower())]
-
-                    # Write back sheets replacing them
-                    try:
-                        with _pd.ExcelWriter(db_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
-                            soc_df.to_excel(writer, sheet_name='Societes', index=False)
-                            assoc_df.to_excel(writer, sheet_name='Associes', index=False)
-                            contrat_df.to_excel(writer, sheet_name='Contrats', index=False)
-                    except TypeError:
-                        # pandas older version fallback
-                        from openpyxl import load_workbook
-                        wb = load_workbook(db_path)
-                        for sname, df in (('Societes', soc_df), ('Associes', assoc_df), ('Contrats', contrat_df)):
-                            if sname in wb.sheetnames:
-                                try:
-                                    std = wb[sname]
-                                    wb.remove(std)
-                                except Exception:
-                                    pass
-                        wb.save(db_path)
-                        with _pd.ExcelWriter(db_path, engine='openpyxl', mode='a') as writer:
-                            soc_df.to_excel(writer, sheet_name='Societes', index=False)
-                            assoc_df.to_excel(writer, sheet_name='Associes', index=False)
-                            contrat_df.to_excel(writer, sheet_name='Contrats', index=False)
-
+                    store.delete_societe(sid, den)
                     messagebox.showinfo('Succès', f"Société '{den}' supprimée avec succès.")
-                    # Refresh dashboard if it exists
-                    if self.dashboard and hasattr(self.dashboard, 'refresh_after_action'):
-                        try:
-                            self.dashboard.refresh_after_action()
-                        except Exception:
-                            pass
                     return
                 except PermissionError:
                     messagebox.showerror('Erreur', 'Le fichier Excel est ouvert dans une autre application. Fermez Excel et réessayez.')
                     return
+                except WorkbookBusyError:
+                    messagebox.showerror('Erreur', 'La base de données est en cours de modification sur un autre poste. Réessayez dans un instant.')
+                    return
                 except Exception as e:
                     try:
                         from ..utils.utils import ErrorHandler
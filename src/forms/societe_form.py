@@ -235,6 +235,26 @@ class SocieteForm(ttk.Frame):
         self.activites_vars.remove(var)
         frame.destroy()
 
+    @staticmethod
+    def default_values():
+        """Ce que get_values() renvoie pour un formulaire neuf, sans créer de widgets"""
+        import datetime
+        from ..utils.utils import get_reference_data
+
+        ste_adresses = get_reference_data('SteAdresses')
+        tribunaux = get_reference_data('Tribunaux')
+        return {
+            'denomination': DenSte[0] if DenSte else "",
+            'forme_juridique': Formjur[0] if Formjur else "",
+            'ice': "",
+            'date_ice': datetime.date.today().strftime('%d/%m/%Y'),
+            'capital': Capital[0] if Capital else "",
+            'parts_social': PartsSocial[0] if PartsSocial else "",
+            'adresse': ste_adresses[0] if ste_adresses else "",
+            'tribunal': tribunaux[0] if tribunaux else "",
+            'activites': [],
+        }
+
     def get_values(self):
         """Récupère toutes les valeurs du formulaire"""
         return {
@@ -1,8 +1,16 @@
 # Utils package initialization
+# The GUI helpers are imported on first use, so that tkinter-free modules
+# (storage, store, cli, ...) can be imported without loading tkinter.
 from .constants import *
-from .utils import ThemeManager, WidgetFactory, WindowManager, ToolTip, ErrorHandler, PathManager
 
 __all__ = [
     'ThemeManager', 'WidgetFactory', 'WindowManager',
     'ToolTip', 'ErrorHandler', 'PathManager'
 ]
+
+
+def __getattr__(name):
+    if name in __all__:
+        from . import utils
+        return getattr(utils, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
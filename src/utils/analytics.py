@@ -0,0 +1,247 @@
+"""Revenue and occupancy analytics over the Societes/Contrats tables.
+
+`Analytics` parses the contract columns once (prices, periods, billed
+months) into numpy arrays; every report is then a bincount or a groupby
+over those arrays and is memoized on the instance. `analytics_for` hands
+out the same instance for as long as the data version does not change, so
+switching between dashboard reports or exporting never recomputes.
+
+Conventions:
+- a contract bills PRIX_CONTRAT every month from the month of DOM_DATEDEB
+  up to (excluding) the month of DOM_DATEFIN, or for PERIOD_DOMCIL months
+  when the end date is missing;
+- PRIX_INTERMEDIARE_CONTRAT is a one-off intermediary commission counted in
+  the month of DATE_CONTRAT (DOM_DATEDEB when the contract date is empty).
+"""
+import datetime
+import html
+import logging
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .contracts import DEFAULT_PERIOD_MONTHS, DateLike, _day
+from .sorting import as_text, parse_dates, parse_numbers
+
+logger = logging.getLogger(__name__)
+
+# Occupancy reports: key -> (société column, title)
+GROUP_REPORTS = {
+    'adresse': ('STE_ADRESS', 'Sociétés par adresse'),
+    'tribunal': ('TRIBUNAL', 'Sociétés par tribunal'),
+    'forme': ('FORME_JUR', 'Sociétés par forme juridique'),
+}
+MONTHLY_REPORT = ('mensuel', 'Revenus mensuels')
+# Months shown by the monthly revenue report (ending with the current month)
+DEFAULT_MONTHS = 12
+
+
+def _months(values: pd.Series) -> np.ndarray:
+    """Month numbers (months since 1970-01) of dates or dd/mm/yyyy strings, -1 when missing."""
+    dates = parse_dates(values).to_numpy(dtype='datetime64[M]')
+    months = dates.astype(np.int64)
+    months[np.isnat(dates)] = -1
+    return months
+
+
+def _month_label(month: int) -> str:
+    return str(np.datetime64(int(month), 'M'))
+
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    if name in df.columns:
+        return df[name].reset_index(drop=True)
+    return pd.Series([''] * len(df), dtype=object)
+
+
+def _text(series: pd.Series) -> np.ndarray:
+    """Stripped strings, stripping each distinct value once."""
+    codes, uniques = pd.factorize(as_text(series))
+    return np.array([u.strip() for u in uniques] or [''], dtype=object)[codes]
+
+
+class Analytics:
+    """Memoized revenue/occupancy reports for one version of the data."""
+
+    def __init__(self, societes: Optional[pd.DataFrame], contrats: Optional[pd.DataFrame], version=None):
+        self.version = version
+        self.societes = societes if societes is not None else pd.DataFrame()
+        self.contrats = contrats if contrats is not None else pd.DataFrame()
+        self._results: Dict = {}
+
+        c = self.contrats
+        self.prices = parse_numbers(_column(c, 'PRIX_CONTRAT')).fillna(0).to_numpy(dtype=float)
+        self.commissions = parse_numbers(_column(c, 'PRIX_INTERMEDIARE_CONTRAT')).fillna(0).to_numpy(dtype=float)
+        periods = parse_numbers(_column(c, 'PERIOD_DOMCIL'))
+        periods = periods.where(periods > 0, DEFAULT_PERIOD_MONTHS).to_numpy(dtype=np.int64)
+
+        self.start_months = _months(_column(c, 'DOM_DATEDEB'))
+        end_months = _months(_column(c, 'DOM_DATEFIN'))
+        end_months = np.where(end_months < 0, self.start_months + periods, end_months)
+        # Every dated contract bills at least its first month
+        self.end_months = np.maximum(end_months, self.start_months + 1)
+        self.dated = self.start_months >= 0
+
+        signed = _months(_column(c, 'DATE_CONTRAT'))
+        self.signed_months = np.where(signed < 0, self.start_months, signed)
+
+        # Row of each contract's société in `societes` (-1 when unknown)
+        societe_ids = pd.Series(_text(_column(self.societes, 'ID_SOCIETE')))
+        first = np.flatnonzero(~societe_ids.duplicated().to_numpy())
+        found = pd.Index(societe_ids.iloc[first]).get_indexer(_text(_column(c, 'ID_SOCIETE')))
+        self.societe_rows = first[found] if len(first) else found
+        self.societe_rows[found < 0] = -1
+
+    def _memo(self, key, compute):
+        if key not in self._results:
+            self._results[key] = compute()
+        return self._results[key]
+
+    @staticmethod
+    def _current_month(today: DateLike) -> int:
+        return int(_day(today).astype('datetime64[M]').astype(np.int64))
+
+    def active(self, today: DateLike = None) -> np.ndarray:
+        """Boolean mask of the contracts billing in the month of `today`."""
+        month = self._current_month(today)
+        return self._memo(('active', month), lambda: self.dated & (self.start_months <= month) & (month < self.end_months))
+
+    def summary(self, today: DateLike = None) -> Dict[str, float]:
+        """Headline figures: sociétés, contracts, active contracts, MRR and commissions of the month."""
+        month = self._current_month(today)
+
+        def compute():
+            active = self.active(today)
+            return {
+                'societes': len(self.societes),
+                'contrats': len(self.contrats),
+                'contrats_actifs': int(active.sum()),
+                'mrr': float(self.prices[active].sum()),
+                'commissions_mois': float(self.commissions[self.signed_months == month].sum()),
+                'commissions_total': float(self.commissions.sum()),
+            }
+        return self._memo(('summary', month), compute)
+
+    def monthly_revenue(self, months: int = DEFAULT_MONTHS, today: DateLike = None) -> pd.DataFrame:
+        """Active contracts, recurring revenue and commissions for the `months` months up to `today`."""
+        last = self._current_month(today)
+
+        def compute():
+            first = last - months + 1
+            # Difference arrays: +price on the first billed month, -price after the last one
+            starts = np.clip(self.start_months[self.dated] - first, 0, months)
+            ends = np.clip(self.end_months[self.dated] - first, 0, months)
+            prices = self.prices[self.dated]
+            counts = np.cumsum(np.bincount(starts, minlength=months + 1) - np.bincount(ends, minlength=months + 1))
+            revenue = np.cumsum(np.bincount(starts, weights=prices, minlength=months + 1)
+                                - np.bincount(ends, weights=prices, minlength=months + 1))
+            signed = self.signed_months - first
+            in_range = (self.signed_months >= 0) & (signed >= 0) & (signed < months)
+            commissions = np.bincount(signed[in_range], weights=self.commissions[in_range], minlength=months)
+            return pd.DataFrame({
+                'MOIS': [_month_label(m) for m in range(first, last + 1)],
+                'CONTRATS_ACTIFS': counts[:months].astype(int),
+                'MRR': revenue[:months].astype(float).round(2),
+                'COMMISSIONS': commissions[:months].astype(float).round(2),
+            })
+        return self._memo(('monthly', months, last), compute)
+
+    def by_societe_column(self, column: str, today: DateLike = None) -> pd.DataFrame:
+        """Sociétés, active sociétés, MRR and commissions per value of a Societes column."""
+        month = self._current_month(today)
+
+        def compute():
+            keys = _text(_column(self.societes, column))
+            keys[keys == ''] = '(vide)'
+            codes, labels = pd.factorize(pd.Series(keys, dtype=object))
+            groups = len(labels)
+
+            active = self.active(today)
+            known = self.societe_rows >= 0
+            contract_groups = codes[self.societe_rows[known]]
+            active_rows = np.unique(self.societe_rows[known & active])
+            report = pd.DataFrame({
+                column: labels,
+                'SOCIETES': np.bincount(codes, minlength=groups),
+                'SOCIETES_ACTIVES': np.bincount(codes[active_rows], minlength=groups),
+                'MRR': np.bincount(contract_groups, weights=np.where(active, self.prices, 0.0)[known],
+                                   minlength=groups).astype(float).round(2),
+                'COMMISSIONS': np.bincount(contract_groups, weights=self.commissions[known],
+                                           minlength=groups).astype(float).round(2),
+            })
+            return report.sort_values(['SOCIETES', column], ascending=[False, True], ignore_index=True)
+        return self._memo(('group', column, month), compute)
+
+    def reports(self, today: DateLike = None) -> Dict[str, pd.DataFrame]:
+        """Every report keyed by its title (monthly revenue first)."""
+        tables = {MONTHLY_REPORT[1]: self.monthly_revenue(today=today)}
+        for column, title in GROUP_REPORTS.values():
+            tables[title] = self.by_societe_column(column, today=today)
+        return tables
+
+    def report(self, key: str, today: DateLike = None) -> pd.DataFrame:
+        """One report by key ('mensuel' or a GROUP_REPORTS key)."""
+        if key == MONTHLY_REPORT[0]:
+            return self.monthly_revenue(today=today)
+        return self.by_societe_column(GROUP_REPORTS[key][0], today=today)
+
+    def export_xlsx(self, path, today: DateLike = None) -> Path:
+        """Write the summary and every report to an Excel workbook (one sheet each)."""
+        path = Path(path)
+        summary = pd.DataFrame(list(self.summary(today).items()), columns=['INDICATEUR', 'VALEUR'])
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            summary.to_excel(writer, sheet_name='Résumé', index=False)
+            for title, table in self.reports(today).items():
+                # Excel limits sheet names to 31 characters
+                table.to_excel(writer, sheet_name=title[:31], index=False)
+        logger.info("Saved analytics workbook to %s", path)
+        return path
+
+    def export_html(self, path, today: DateLike = None) -> Path:
+        """Write the summary and every report to a standalone HTML page."""
+        path = Path(path)
+        day = _day(today).astype(datetime.date).strftime('%d/%m/%Y')
+        cards = ''.join(
+            f'<div class="card"><strong>{html.escape(name)}</strong><div>{value:,.2f}</div></div>'
+            if isinstance(value, float) else
+            f'<div class="card"><strong>{html.escape(name)}</strong><div>{value}</div></div>'
+            for name, value in self.summary(today).items()
+        )
+        sections = ''.join(
+            f'<h2>{html.escape(title)}</h2>\n{table.to_html(index=False, border=0)}\n'
+            for title, table in self.reports(today).items()
+        )
+        path.write_text(f"""<!doctype html>
+<html lang="fr">
+<head>
+  <meta charset="utf-8">
+  <title>Statistiques — {day}</title>
+  <style>
+    body{{font-family:Segoe UI,Arial,Helvetica,sans-serif;margin:18px}}
+    .summary{{display:flex;gap:12px;margin-top:12px}}
+    .card{{background:#f8f9fb;padding:10px;border-radius:6px;border:1px solid #e6e9ef}}
+    table{{border-collapse:collapse;width:100%;margin-top:12px}}
+    th,td{{border:1px solid #ddd;padding:8px;text-align:left}}
+    th{{background:#f2f2f2}}
+  </style>
+</head>
+<body>
+<h1>Statistiques au {day}</h1>
+<section class="summary">{cards}</section>
+{sections}</body>
+</html>""", encoding='utf-8')
+        logger.info("Saved analytics report to %s", path)
+        return path
+
+
+_current: Optional[Analytics] = None
+
+
+def analytics_for(societes: Optional[pd.DataFrame], contrats: Optional[pd.DataFrame], version) -> Analytics:
+    """Analytics of the given data, reused as long as `version` is unchanged."""
+    global _current
+    if _current is None or version is None or _current.version != version:
+        _current = Analytics(societes, contrats, version=version)
+    return _current
@@ -0,0 +1,452 @@
+"""Incremental, deduplicated backups of the xlsx database.
+
+Each backup is a small JSON manifest listing, for every sheet, its columns
+and the chunks of rows it is made of. Chunks are zlib-compressed JSON row
+lists stored once under their SHA-256 (content addressed), so a chunk that
+did not change is never written again. Chunk boundaries are content defined
+(a row whose hash ends with CHUNK_BITS zero bits closes a chunk), so an
+insertion or deletion only changes the chunk around it, not every chunk
+after it. A backup therefore writes the changed chunks plus the manifest:
+its I/O follows the size of the change, not the size of the workbook.
+
+Layout, next to the workbook:
+
+    .backups/<workbook stem>/objects/ab/ab12...   compressed chunks
+    .backups/<workbook stem>/manifests/20250301_101500_000000.json
+
+`BackupRepository(path).create()` backs up synchronously; the data store
+calls `schedule_backup(path, tables, signature=...)` after each write, which
+backs up the in-memory tables on a background thread (pending requests for
+the same workbook are coalesced); the (size, mtime) signature of the file
+written with them makes the thread skip the backup once the file moved on. `prune()` applies the hourly/daily/monthly
+RetentionPolicy and deletes the chunks no manifest uses anymore.
+`restore(at=...)` rebuilds the workbook as it was at any backed-up moment.
+The background thread reads its retention from `config/backup.json`, e.g.::
+
+    {"recent": 10, "hourly": 24, "daily": 30, "monthly": 12}
+"""
+import bisect
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import weakref
+import zlib
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import constants as _const
+from .schema import to_cells, to_text, to_typed
+
+logger = logging.getLogger(__name__)
+
+BACKUP_DIRNAME = '.backups'
+MANIFEST_FORMAT = 1
+MANIFEST_TIME_FORMAT = '%Y%m%d_%H%M%S_%f'
+# About one chunk boundary every 2**CHUNK_BITS rows (256)
+CHUNK_BITS = 8
+# Forced boundary so repeated identical rows cannot make one huge chunk
+MAX_CHUNK_ROWS = 2048
+COMPRESSION_LEVEL = 6
+CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / 'config' / 'backup.json'
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """How many backups to keep: the `recent` newest ones, then the newest
+    backup of each of the last `hourly` hours, `daily` days and `monthly` months."""
+    recent: int = 10
+    hourly: int = 24
+    daily: int = 30
+    monthly: int = 12
+
+
+DEFAULT_RETENTION = RetentionPolicy()
+
+
+def load_retention(config_path=None) -> RetentionPolicy:
+    """RetentionPolicy of `config/backup.json`; missing keys keep their default."""
+    path = Path(config_path) if config_path else CONFIG_PATH
+    try:
+        if path.exists():
+            with path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+            known = {field.name for field in fields(RetentionPolicy)}
+            values = {key: int(value) for key, value in (data or {}).items() if key in known}
+            if any(value < 0 for value in values.values()):
+                raise ValueError('retention counts must be >= 0')
+            return RetentionPolicy(**values)
+    except Exception:
+        # A broken config must not stop the backups
+        logger.warning('Ignoring invalid backup config %s', path, exc_info=True)
+    return DEFAULT_RETENTION
+
+
+@dataclass(frozen=True)
+class BackupInfo:
+    """One backup (manifest) of the workbook."""
+    backup_id: str
+    created: datetime.datetime
+    label: str
+    path: Path
+
+
+def chunk_bounds(hashes: np.ndarray, bits: int = CHUNK_BITS, max_rows: int = MAX_CHUNK_ROWS) -> List[int]:
+    """End offsets of the content-defined chunks of rows with the given hashes."""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    mask = np.uint64((1 << bits) - 1)
+    ends = (np.flatnonzero((hashes & mask) == 0) + 1).tolist()
+    bounds, start = [], 0
+    for end in ends + [len(hashes)]:
+        while end - start > max_rows:
+            start += max_rows
+            bounds.append(start)
+        if end > start:
+            bounds.append(end)
+            start = end
+    return bounds
+
+
+class BackupRepository:
+    """Content-addressed backup store of one workbook."""
+
+    def __init__(self, path, root=None):
+        self.path = Path(path)
+        self.root = Path(root) if root is not None else self.path.parent / BACKUP_DIRNAME / self.path.stem
+        self.objects_dir = self.root / 'objects'
+        self.manifests_dir = self.root / 'manifests'
+        self._lock = threading.RLock()
+        # Sheet name -> (weak reference to the frame, columns, chunk hashes):
+        # the data store replaces frames instead of modifying them, so an
+        # unchanged sheet is recognised without serializing it again
+        self._chunked: Dict[str, tuple] = {}
+        # Sheet name -> (columns, {hash of a chunk's row hashes: object digest})
+        # of its last backup: only the chunks a write touched are serialized again
+        self._chunk_objects: Dict[str, tuple] = {}
+
+    # -- objects -----------------------------------------------------------
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        target = self._object_path(digest)
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp = target.with_name(target.name + '.tmp')
+            tmp.write_bytes(zlib.compress(data, COMPRESSION_LEVEL))
+            os.replace(tmp, target)
+        return digest
+
+    def _get(self, digest: str) -> bytes:
+        return zlib.decompress(self._object_path(digest).read_bytes())
+
+    def _chunks(self, name: str, df: pd.DataFrame) -> tuple:
+        cached = self._chunked.get(name)
+        if cached is not None and cached[0]() is df:
+            return cached[1], cached[2]
+        text = to_text(df)
+        columns = [str(c) for c in text.columns]
+        hashes = pd.util.hash_pandas_object(text, index=False).to_numpy() if len(text) else np.array([], dtype=np.uint64)
+        known_columns, known = self._chunk_objects.get(name, (None, {}))
+        if known_columns != columns:
+            known = {}
+        objects: Dict[bytes, str] = {}
+        chunks, start = [], 0
+        for end in chunk_bounds(hashes):
+            key = hashlib.sha1(hashes[start:end].tobytes()).digest()
+            digest = known.get(key)
+            if digest is None or not self._object_path(digest).exists():
+                rows = text.iloc[start:end].to_numpy(dtype=object).tolist()
+                digest = self._put(json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            objects[key] = digest
+            chunks.append(digest)
+            start = end
+        self._chunk_objects[name] = (columns, objects)
+        try:
+            self._chunked[name] = (weakref.ref(df), columns, chunks)
+        except TypeError:
+            pass
+        return columns, chunks
+
+    # -- manifests ---------------------------------------------------------
+
+    def backups(self) -> List[BackupInfo]:
+        """Every backup, oldest first."""
+        infos = []
+        for manifest in sorted(self.manifests_dir.glob('*.json')):
+            try:
+                created = datetime.datetime.strptime(manifest.stem, MANIFEST_TIME_FORMAT)
+            except ValueError:
+                continue
+            label = ''
+            try:
+                label = json.loads(manifest.read_text(encoding='utf-8')).get('label', '')
+            except Exception:
+                logger.warning('Unreadable backup manifest %s', manifest.name)
+            infos.append(BackupInfo(manifest.stem, created, label, manifest))
+        return infos
+
+    def _manifest(self, backup_id: str) -> dict:
+        return json.loads((self.manifests_dir / f'{backup_id}.json').read_text(encoding='utf-8'))
+
+    def _latest(self) -> Optional[dict]:
+        manifests = sorted(self.manifests_dir.glob('*.json'))
+        if not manifests:
+            return None
+        data = json.loads(manifests[-1].read_text(encoding='utf-8'))
+        data['id'] = manifests[-1].stem
+        return data
+
+    def _write_manifest(self, backup_id: str, manifest: dict):
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        target = self.manifests_dir / f'{backup_id}.json'
+        tmp = target.with_name(target.name + '.tmp')
+        tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, target)
+
+    def create(self, tables: Optional[Dict[str, pd.DataFrame]] = None, label: str = '',
+               signature: Optional[tuple] = None) -> Optional[str]:
+        """Back up the workbook and return the backup id (None if there is no workbook).
+
+        `tables` are the current frames of some sheets (e.g. the data store's);
+        the other sheets are taken from the previous backup, or parsed from the
+        workbook when there is none. Without `tables`, nothing is written when
+        the workbook is still the one of the latest backup. With `signature`
+        (the file's (size, mtime_ns) when `tables` were written), nothing is
+        backed up and None is returned if the file has changed since: the
+        tables and label would not match the file anymore.
+        """
+        from .snapshot import file_digest
+
+        with self._lock:
+            try:
+                digest = file_digest(self.path)
+                # Checked after hashing, so the digest is the one of that state
+                current = os.stat(self.path)
+            except OSError:
+                return None
+            if signature is not None and (current.st_size, current.st_mtime_ns) != tuple(signature):
+                logger.info('Skipping backup of %s: the workbook changed since it was written', self.path.name)
+                return None
+            latest = self._latest()
+            if tables is None and latest is not None and latest.get('sha256') == digest:
+                return latest['id']
+
+            sheets = dict(latest.get('sheets', {})) if latest is not None and tables is not None else {}
+            frames = dict(tables or {})
+            if tables is None or latest is None:
+                with pd.ExcelFile(self.path, engine='openpyxl') as workbook:
+                    for name in workbook.sheet_names:
+                        if name not in frames:
+                            frames[name] = workbook.parse(name, dtype=str).fillna('')
+            for name, df in frames.items():
+                columns, chunks = self._chunks(name, df)
+                sheets[name] = {'columns': columns, 'chunks': chunks}
+
+            if latest is not None and latest.get('sheets') == sheets:
+                backup_id = latest.pop('id')
+                if latest.get('sha256') != digest:
+                    # Same content in a rewritten file (formats, column widths)
+                    latest['sha256'] = digest
+                    self._write_manifest(backup_id, latest)
+                return backup_id
+            now = datetime.datetime.now()
+            if latest is not None and now.strftime(MANIFEST_TIME_FORMAT) <= latest['id']:
+                # Keep ids strictly increasing even if the clock went back
+                now = datetime.datetime.strptime(latest['id'], MANIFEST_TIME_FORMAT) + datetime.timedelta(microseconds=1)
+            backup_id = now.strftime(MANIFEST_TIME_FORMAT)
+            self._write_manifest(backup_id, {'format': MANIFEST_FORMAT, 'label': label, 'sha256': digest, 'sheets': sheets})
+            logger.info('Backed up %s (%s)', self.path.name, backup_id)
+            return backup_id
+
+    # -- restore -----------------------------------------------------------
+
+    def find(self, at: Optional[datetime.datetime] = None) -> Optional[BackupInfo]:
+        """Latest backup taken at or before `at` (the latest one when None)."""
+        infos = self.backups()
+        if at is None:
+            return infos[-1] if infos else None
+        i = bisect.bisect_right([info.created for info in infos], at)
+        return infos[i - 1] if i else None
+
+    def tables(self, backup_id: str) -> Dict[str, pd.DataFrame]:
+        """Sheets of a backup as string frames."""
+        tables = {}
+        for name, sheet in self._manifest(backup_id).get('sheets', {}).items():
+            rows = [row for digest in sheet['chunks'] for row in json.loads(self._get(digest))]
+            tables[name] = pd.DataFrame(rows, columns=sheet['columns'], dtype=object)
+        return tables
+
+    def restore(self, at: Optional[datetime.datetime] = None, backup_id: Optional[str] = None,
+                target=None) -> Path:
+        """Rebuild the workbook as backed up at `at` (or as backup `backup_id`).
+
+        Writes to `target` when given, else replaces the workbook itself after
+        backing up its current content (so a restore can be undone), as a
+        coordinated write (see src/utils/coordinator.py). Cells are written
+        back with the exact text they were backed up with.
+        """
+        from .coordinator import WriteCoordinator
+
+        if backup_id is None:
+            info = self.find(at)
+            if info is None:
+                raise FileNotFoundError(f'No backup of {self.path.name} before {at}')
+            backup_id = info.backup_id
+        tables = self.tables(backup_id)
+        target = Path(target) if target is not None else self.path
+        if target != self.path:
+            self._write_workbook(target, tables)
+        else:
+            with WriteCoordinator.instance(self.path).transaction():
+                if self.path.exists():
+                    self.create(label='before restore')
+                self._write_workbook(target, tables)
+        logger.info('Restored %s from backup %s', target.name, backup_id)
+        return target
+
+    @staticmethod
+    def _write_workbook(target: Path, tables: Dict[str, pd.DataFrame]):
+        tmp = target.with_name(f'.{target.stem}.restore{target.suffix}')
+        try:
+            with pd.ExcelWriter(tmp, engine='openpyxl') as writer:
+                for name, df in tables.items():
+                    if name in _const.excel_sheets:
+                        # Numbers and dates become cells again only where their
+                        # text reads back unchanged (see to_typed); the rest stays text
+                        df = to_cells(to_typed(df, name))
+                    df.where(df != '', None).to_excel(writer, sheet_name=name, index=False)
+            os.replace(tmp, target)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+
+    # -- retention ---------------------------------------------------------
+
+    def prune(self, policy: RetentionPolicy = DEFAULT_RETENTION, now: Optional[datetime.datetime] = None) -> int:
+        """Delete the backups `policy` does not keep and the chunks nobody uses; returns the count."""
+        with self._lock:
+            infos = self.backups()
+            keep = {info.backup_id for info in infos[-policy.recent:]} if policy.recent else set()
+            now = now or datetime.datetime.now()
+            periods = (
+                (policy.hourly, lambda t: (t.year, t.month, t.day, t.hour), now - datetime.timedelta(hours=policy.hourly)),
+                (policy.daily, lambda t: (t.year, t.month, t.day), now - datetime.timedelta(days=policy.daily)),
+                (policy.monthly, lambda t: (t.year, t.month), now - datetime.timedelta(days=31 * policy.monthly)),
+            )
+            for count, bucket, since in periods:
+                newest = {}
+                for info in infos:
+                    if count and info.created > since:
+                        newest[bucket(info.created)] = info.backup_id
+                keep.update(newest.values())
+
+            removed = [info for info in infos if info.backup_id not in keep]
+            for info in removed:
+                info.path.unlink(missing_ok=True)
+            if removed:
+                self._collect_garbage()
+            return len(removed)
+
+    def _collect_garbage(self):
+        used = set()
+        for manifest in self.manifests_dir.glob('*.json'):
+            try:
+                sheets = json.loads(manifest.read_text(encoding='utf-8')).get('sheets', {})
+            except Exception:
+                # Keep every chunk rather than break a backup we cannot read
+                logger.warning('Unreadable backup manifest %s; skipping cleanup', manifest.name)
+                return
+            used.update(digest for sheet in sheets.values() for digest in sheet['chunks'])
+        for obj in self.objects_dir.glob('*/*'):
+            if obj.name not in used:
+                obj.unlink(missing_ok=True)
+
+
+class BackupWorker:
+    """Background thread running the backups requested by `schedule`.
+
+    Without an explicit `policy`, the retention is read from the config file
+    (see load_retention) before the first prune.
+    """
+
+    def __init__(self, policy: Optional[RetentionPolicy] = None):
+        self.policy = policy
+        self._repositories: Dict[Path, BackupRepository] = {}
+        self._pending: Dict[Path, tuple] = {}
+        self._condition = threading.Condition()
+        self._busy = False
+        self._thread: Optional[threading.Thread] = None
+
+    def repository(self, path) -> BackupRepository:
+        key = Path(path).resolve()
+        with self._condition:
+            repository = self._repositories.get(key)
+            if repository is None:
+                repository = self._repositories[key] = BackupRepository(key)
+            return repository
+
+    def schedule(self, path, tables: Optional[Dict[str, pd.DataFrame]] = None, label: str = '',
+                 signature: Optional[tuple] = None):
+        """Back up `path` soon; a request still pending for the same workbook is replaced."""
+        key = Path(path).resolve()
+        with self._condition:
+            self._pending[key] = (tables, label, signature)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='db-backup', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every requested backup is written; False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                key, (tables, label, signature) = self._pending.popitem()
+                self._busy = True
+            try:
+                repository = self.repository(key)
+                repository.create(tables, label=label, signature=signature)
+                if self.policy is None:
+                    self.policy = load_retention()
+                repository.prune(self.policy)
+            except Exception:
+                logger.exception('Backup of %s failed', key.name)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+
+_worker = BackupWorker()
+
+
+def schedule_backup(path, tables: Optional[Dict[str, pd.DataFrame]] = None, label: str = '',
+                    signature: Optional[tuple] = None):
+    """Back up the workbook at `path` on the background backup thread (see BackupRepository.create)."""
+    _worker.schedule(path, tables, label, signature)
+
+
+def flush_backups(timeout: Optional[float] = None) -> bool:
+    return _worker.flush(timeout)
+
+
+def backup_repository(path) -> BackupRepository:
+    """The repository shared with the background thread for `path`."""
+    return _worker.repository(path)
+
+
+def list_backups(path) -> Sequence[BackupInfo]:
+    return backup_repository(path).backups()
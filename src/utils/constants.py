@@ -33,6 +33,9 @@ SteAdresse = [
 # Court locations
 Tribunnaux = ["Casablanca", "Berrechid", "Mohammedia"]
 
+# Birth places offered when the database is created
+LieuxNaissance = ["Casablanca", "Rabat", "Fes", "Marrakech", "Agadir"]
+
 # Manager roles
 QualityGerant = ["Associé Gérant", "Associé Unique Gérant", "Associé"]
 
@@ -63,6 +66,27 @@ contrat_headers = [
     "DOM_DATEFIN"
 ]
 
+# Canonical headers -> form keys (the reverse of the write_records_to_db mapping)
+societe_form_keys = {
+    "DEN_STE": "denomination", "FORME_JUR": "forme_juridique", "ICE": "ice",
+    "DATE_ICE": "date_ice", "CAPITAL": "capital", "PART_SOCIAL": "parts_social",
+    "STE_ADRESS": "adresse", "TRIBUNAL": "tribunal"
+}
+
+associe_form_keys = {
+    "CIVIL": "civilite", "PRENOM": "prenom", "NOM": "nom",
+    "PARTS": "num_parts", "DATE_NAISS": "date_naiss", "LIEU_NAISS": "lieu_naiss",
+    "NATIONALITY": "nationalite", "CIN_NUM": "num_piece", "CIN_VALIDATY": "validite_piece",
+    "ADRESSE": "adresse", "PHONE": "telephone", "EMAIL": "email",
+    "IS_GERANT": "est_gerant", "QUALITY": "qualite", "CAPITAL_DETENU": "capital_detenu"
+}
+
+contrat_form_keys = {
+    "DATE_CONTRAT": "date_contrat", "PERIOD_DOMCIL": "period",
+    "PRIX_CONTRAT": "prix_mensuel", "PRIX_INTERMEDIARE_CONTRAT": "prix_inter",
+    "DOM_DATEDEB": "date_debut", "DOM_DATEFIN": "date_fin"
+}
+
 # Reference sheets for dropdown lists and lookups
 ste_adresses_headers = ["STE_ADRESSE"]
 tribunaux_headers = ["TRIBUNAL"]
@@ -82,5 +106,14 @@ excel_sheets = {
     "LieuxNaissance": lieux_naissance_headers
 }
 
+# Values seeded into the reference sheets of a new database (and used when they are empty)
+reference_values = {
+    "SteAdresses": SteAdresse,
+    "Tribunaux": Tribunnaux,
+    "Activites": Activities,
+    "Nationalites": Nationalite,
+    "LieuxNaissance": LieuxNaissance
+}
+
 # Default database filename used across the app
 DB_FILENAME = "DataBase_domiciliation.xlsx"
@@ -0,0 +1,226 @@
+"""Contract expiry index and bulk renewals.
+
+`ExpiryIndex` keeps the parsed `DOM_DATEFIN` of every contract as a sorted
+numpy datetime64 array alongside the matching row positions and IDs, so
+"contracts ending between two dates" is two binary searches. Build it once
+per data load with `ExpiryIndex.from_frame(contrats_df)`.
+
+`plan_renewals` turns every contract ending in a window into its follow-up
+contract (new start = old end, new end = start + PERIOD_DOMCIL months) with
+array arithmetic; `renew_contracts` appends them through the data store in a
+single workbook save.
+"""
+import datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from . import constants as _const
+from .schema import to_text
+from .sorting import as_text, parse_dates, parse_numbers
+
+DateLike = Union[datetime.date, datetime.datetime, np.datetime64, str, None]
+
+# Contract length (months) used when PERIOD_DOMCIL is empty or invalid
+DEFAULT_PERIOD_MONTHS = 12
+DATE_FORMAT = '%d/%m/%Y'
+# Columns stored as numbers in the workbook (see write_records_to_db). PERIOD_DOMCIL
+# is not one: it keeps the form's zero-padded text ('06').
+_NUMBER_COLUMNS = ('ID_SOCIETE', 'PRIX_CONTRAT', 'PRIX_INTERMEDIARE_CONTRAT')
+
+
+def _day(value: DateLike) -> np.datetime64:
+    if value is None:
+        return np.datetime64(datetime.date.today(), 'D')
+    if isinstance(value, str):
+        return np.datetime64(pd.to_datetime(value, dayfirst=True).date(), 'D')
+    return np.datetime64(value, 'D')
+
+
+class ExpiryIndex:
+    """Contracts ordered by end date (contracts without a valid end date are left out)."""
+
+    def __init__(self, end_dates: np.ndarray, positions: np.ndarray,
+                 contrat_ids: np.ndarray, societe_ids: np.ndarray):
+        self.end_dates = end_dates
+        self.positions = positions
+        self.contrat_ids = contrat_ids
+        self.societe_ids = societe_ids
+
+    @classmethod
+    def from_frame(cls, contrats: Optional[pd.DataFrame], column: str = 'DOM_DATEFIN') -> 'ExpiryIndex':
+        if contrats is None or contrats.empty or column not in contrats.columns:
+            empty = np.array([], dtype=object)
+            return cls(np.array([], dtype='datetime64[D]'), np.array([], dtype=np.intp), empty, empty)
+        dates = parse_dates(contrats[column].reset_index(drop=True)).to_numpy(dtype='datetime64[D]')
+        valid = np.flatnonzero(~np.isnat(dates))
+        order = valid[np.argsort(dates[valid], kind='stable')]
+
+        def _ids(name):
+            if name not in contrats.columns:
+                return np.full(len(order), '', dtype=object)
+            return as_text(contrats[name]).to_numpy(dtype=object)[order]
+
+        return cls(dates[order], order, _ids('ID_CONTRAT'), _ids('ID_SOCIETE'))
+
+    def __len__(self) -> int:
+        return len(self.end_dates)
+
+    def between(self, start: DateLike = None, end: DateLike = None) -> slice:
+        """Slice (into the index arrays) of contracts ending in [start, end]; open-ended when None."""
+        lo = 0 if start is None else int(np.searchsorted(self.end_dates, _day(start), side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.end_dates, _day(end), side='right'))
+        return slice(lo, max(lo, hi))
+
+    def expiring_within(self, days: int, today: DateLike = None, include_expired: bool = False) -> slice:
+        """Contracts ending within `days` days from `today` (and already ended ones if asked)."""
+        start = _day(today)
+        end = start + np.timedelta64(int(days), 'D')
+        return self.between(None if include_expired else start, end)
+
+    def days_left(self, window: slice, today: DateLike = None) -> np.ndarray:
+        """Days remaining until each end date in `window` (negative when expired)."""
+        return (self.end_dates[window] - _day(today)).astype(int)
+
+
+def add_months(dates, months) -> np.ndarray:
+    """Shift datetime64 dates by whole months, clamping the day to the target month's end.
+
+    Array counterpart of ContratForm._update_date_fin: 31/01/2025 + 1 month is
+    28/02/2025. `months` is a scalar or an array matching `dates`; NaT stays NaT.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    months = np.asarray(months, dtype=np.int64)
+    missing = np.isnat(dates)
+    dates = np.where(missing, np.datetime64('1970-01-01', 'D'), dates)
+    month_start = dates.astype('datetime64[M]')
+    day = (dates - month_start.astype('datetime64[D]')).astype(np.int64)
+    target = month_start + months
+    month_len = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(np.int64)
+    shifted = target.astype('datetime64[D]') + np.minimum(day, month_len - 1)
+    return np.where(missing, np.datetime64('NaT', 'D'), shifted)
+
+
+def _format_dates(dates: np.ndarray) -> np.ndarray:
+    return pd.Series(dates).dt.strftime(DATE_FORMAT).fillna('').to_numpy(dtype=object)
+
+
+def _as_cells(series: pd.Series) -> np.ndarray:
+    """Numbers as int/float (as write_records_to_db stores them), empty as None, other text unchanged."""
+    numbers = parse_numbers(series, strict=True).to_numpy()
+    cells = as_text(series).to_numpy(dtype=object)
+    cells[cells == ''] = None
+    for i in np.flatnonzero(~np.isnan(numbers)):
+        cells[i] = int(numbers[i]) if numbers[i].is_integer() else float(numbers[i])
+    return cells
+
+
+def plan_renewals(contrats: Optional[pd.DataFrame], days: int = 30, today: DateLike = None,
+                  include_expired: bool = True) -> pd.DataFrame:
+    """New Contrats rows renewing every contract that ends within `days` days of `today`.
+
+    Only the latest contract of each société is considered, so once a société
+    has been renewed it no longer shows up: planning again is a no-op. Every
+    column of the renewed contract is carried over except the IDs, which
+    continue from the highest ID_CONTRAT, and the dates: DATE_CONTRAT is
+    `today`, DOM_DATEDEB the previous DOM_DATEFIN and DOM_DATEFIN is
+    DOM_DATEDEB + PERIOD_DOMCIL months (DEFAULT_PERIOD_MONTHS when missing).
+    A contract expired for so long that this range would already be over is
+    renewed from `today` instead. PERIOD_DOMCIL is written as the contract
+    form stores it ('06', '12').
+    """
+    columns = list(contrats.columns) if contrats is not None and len(contrats.columns) else list(_const.contrat_headers)
+    index = ExpiryIndex.from_frame(contrats)
+    if not len(index):
+        return pd.DataFrame(columns=columns)
+
+    # Latest contract per société (contracts without a société stand alone)
+    keys = np.where(index.societe_ids != '', index.societe_ids, '#' + index.contrat_ids.astype(str))
+    latest = ~pd.Series(keys).duplicated(keep='last').to_numpy()
+    window = np.zeros(len(index), dtype=bool)
+    window[index.expiring_within(days, today=today, include_expired=include_expired)] = True
+    selected = np.flatnonzero(latest & window)
+    if not len(selected):
+        return pd.DataFrame(columns=columns)
+
+    source = contrats.iloc[index.positions[selected]].reset_index(drop=True)
+    renewals = source.reindex(columns=columns).astype(object)
+
+    periods = pd.Series(np.nan, index=source.index)
+    if 'PERIOD_DOMCIL' in source.columns:
+        periods = parse_numbers(source['PERIOD_DOMCIL'])
+    periods = periods.where(periods > 0, DEFAULT_PERIOD_MONTHS).astype(np.int64).to_numpy()
+
+    starts = index.end_dates[selected]
+    # No renewal entirely in the past: long-expired contracts restart today
+    starts = np.where(add_months(starts, periods) < _day(today), _day(today), starts)
+    renewals['DOM_DATEDEB'] = _format_dates(starts)
+    renewals['DOM_DATEFIN'] = _format_dates(add_months(starts, periods))
+    renewals['DATE_CONTRAT'] = _day(today).astype(datetime.date).strftime(DATE_FORMAT)
+    renewals['PERIOD_DOMCIL'] = [f'{p:02d}' for p in periods]
+
+    first_id = 1
+    if 'ID_CONTRAT' in contrats.columns:
+        ids = parse_numbers(contrats['ID_CONTRAT'], strict=True)
+        if ids.notna().any():
+            first_id = int(ids.max()) + 1
+    renewals['ID_CONTRAT'] = list(range(first_id, first_id + len(renewals)))
+    for column in _NUMBER_COLUMNS:
+        if column in source.columns:
+            renewals[column] = _as_cells(source[column])
+    return renewals
+
+
+def renew_contracts(path=None, days: int = 30, today: DateLike = None,
+                    include_expired: bool = True) -> pd.DataFrame:
+    """Plan the renewals for the workbook at `path` and append them in one save.
+
+    Goes through the shared DataStore so open views receive the new rows and
+    concurrent writers on other PCs are accounted for.
+    Returns the rows written (empty when there was nothing to renew).
+    """
+    from .store import DataStore
+
+    store = DataStore.instance(path)
+    store.load()
+    plan = {}
+
+    def _plan(contrats):
+        # Planned again on the fresh table if another PC wrote meanwhile
+        plan['renewals'] = plan_renewals(contrats, days=days, today=today, include_expired=include_expired)
+        return plan['renewals']
+
+    store.append('Contrats', _plan(store.table('Contrats')), rebase=_plan)
+    return plan['renewals']
+
+
+def _form_values(row, keys: Dict[str, str]) -> Dict:
+    return {key: ('' if pd.isna(row.get(col)) else str(row.get(col))) for col, key in keys.items() if col in row}
+
+
+def renewal_values(renewals: pd.DataFrame, societes: Optional[pd.DataFrame],
+                   associes: Optional[pd.DataFrame]) -> List[Dict]:
+    """Generation values ({'societe', 'associes', 'contrat'} in form keys) for each renewal."""
+    renewed = set(as_text(renewals['ID_SOCIETE']).str.strip()) if 'ID_SOCIETE' in renewals.columns else set()
+
+    def _by_societe(df):
+        if df is None or df.empty or 'ID_SOCIETE' not in df.columns:
+            return {}
+        keys = as_text(df['ID_SOCIETE']).str.strip()
+        linked = keys.isin(renewed)
+        return dict(iter(to_text(df[linked]).groupby(keys[linked])))
+
+    societe_rows = _by_societe(societes)
+    associe_rows = _by_societe(associes)
+    values = []
+    for _, contrat in to_text(renewals).iterrows():
+        sid = contrat.get('ID_SOCIETE', '').strip()
+        societe = societe_rows.get(sid)
+        values.append({
+            'societe': _form_values(societe.iloc[0], _const.societe_form_keys) if societe is not None else {},
+            'associes': [_form_values(row, _const.associe_form_keys)
+                         for _, row in associe_rows.get(sid, pd.DataFrame()).iterrows()],
+            'contrat': _form_values(contrat, _const.contrat_form_keys),
+        })
+    return values
@@ -0,0 +1,262 @@
+"""Write coordination for a workbook shared by several processes or PCs.
+
+The workbook usually sits on a shared drive. Each write is a
+read-modify-write of the whole file, so two unsynchronized saves lose one
+another's rows. `WriteCoordinator` serializes only the short commit step:
+
+- an advisory lock file (`.<workbook name>.lock`, created with O_EXCL, which
+  network shares honour) is held while a writer checks the version and
+  writes. The holder touches it every LOCK_HEARTBEAT_SECONDS, so a lock not
+  touched for LOCK_STALE_SECONDS belongs to a crashed holder and is broken:
+  renamed away first (only one waiter can win the rename), then checked to
+  still be the stale lock that was looked at, and only then deleted. A lock
+  that turns out to be fresh is put back, and removed again when its holder
+  released it in the meantime;
+- a version stamp (`.<workbook name>.version`) is incremented by every
+  commit. A writer remembers the stamp of the data it prepared its change
+  from; at commit, a different stamp means another process wrote since.
+  The data store then rebases: it reloads the tables and renumbers the IDs
+  of the rows it appends before writing.
+
+Preparation (loading the tables, planning renewals, building rows) stays
+outside the lock, so operators and batch workers only wait for each
+other's commits, never for each other's sessions.
+
+    coordinator = WriteCoordinator.instance(path)
+    with coordinator.transaction() as txn:
+        if txn.version != my_version:
+            ...  # rebase
+        ...  # write the workbook
+    # txn.version is now the stamp of our own commit
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# How long a writer waits for the lock before giving up
+LOCK_TIMEOUT = 30.0
+# A lock file not touched for this long belongs to a crashed writer
+LOCK_STALE_SECONDS = 120.0
+# How often the holder touches its lock file (at most a quarter of the stale delay)
+LOCK_HEARTBEAT_SECONDS = 20.0
+LOCK_POLL_SECONDS = 0.05
+LOCK_POLL_MAX_SECONDS = 0.5
+
+
+class WorkbookBusyError(TimeoutError):
+    """Another writer kept the workbook locked for longer than the timeout."""
+
+
+def lock_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(f'.{path.name}.lock')
+
+
+def version_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(f'.{path.name}.version')
+
+
+def writer_id() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class Transaction:
+    """Commit step in progress: `version` is the stamp found when the lock was taken."""
+
+    def __init__(self, version: int):
+        self.version = version
+        self.committed = False
+
+
+class WriteCoordinator:
+    """Advisory lock and version stamp of one workbook."""
+
+    _instances: Dict[Path, 'WriteCoordinator'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path, timeout: float = LOCK_TIMEOUT, stale_after: float = LOCK_STALE_SECONDS):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.lock_file = lock_path(self.path)
+        self.version_file = version_path(self.path)
+        # Threads of this process queue here; the lock file is taken once per process
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._heartbeat_stop: Optional[threading.Event] = None
+        # Content of the lock file we hold (it carries a unique token)
+        self._content: Optional[str] = None
+
+    @classmethod
+    def instance(cls, path) -> 'WriteCoordinator':
+        key = Path(path).resolve()
+        with cls._instances_lock:
+            coordinator = cls._instances.get(key)
+            if coordinator is None:
+                coordinator = cls._instances[key] = cls(key)
+            return coordinator
+
+    # -- version stamp -----------------------------------------------------
+
+    def version(self) -> int:
+        """Number of commits made through coordinators so far (0 when none)."""
+        try:
+            with open(self.version_file, 'r', encoding='utf-8') as f:
+                return int(json.load(f).get('version', 0))
+        except FileNotFoundError:
+            return 0
+        except Exception:
+            logger.warning('Unreadable version stamp %s', self.version_file.name, exc_info=True)
+            return 0
+
+    def _bump(self) -> int:
+        version = self.version() + 1
+        tmp = self.version_file.with_name(f'{self.version_file.name}.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'writer': writer_id(), 'time': time.time()}, f)
+        os.replace(tmp, self.version_file)
+        return version
+
+    # -- lock file ---------------------------------------------------------
+
+    def _try_lock(self, content: str) -> bool:
+        try:
+            fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return True
+
+    def _discard(self, path: Path, content: str) -> bool:
+        """Delete a lock file (or a moved-aside copy) if it holds `content`."""
+        try:
+            if path.read_text(encoding='utf-8') != content:
+                return False
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _lock_state(self, path: Path):
+        """(content, age in seconds) of a lock file."""
+        age = time.time() - os.stat(path).st_mtime
+        try:
+            content = path.read_text(encoding='utf-8')
+        except OSError:
+            content = '?'
+        return content, age
+
+    def _break_stale_lock(self) -> bool:
+        try:
+            observed, age = self._lock_state(self.lock_file)
+        except FileNotFoundError:
+            return True
+        if age < self.stale_after:
+            return False
+        # Another waiter may break the same lock and take a fresh one meanwhile:
+        # move it out of the way atomically, then make sure it is the one we saw
+        moved = self.lock_file.with_name(f'{self.lock_file.name}.{uuid.uuid4().hex}.stale')
+        try:
+            os.rename(self.lock_file, moved)
+        except FileNotFoundError:
+            return True
+        except OSError:
+            return False
+        try:
+            owner, age = self._lock_state(moved)
+        except FileNotFoundError:
+            return True
+        if owner != observed or age < self.stale_after:
+            # A fresh lock: put it back unless someone took the free lock already
+            if not self._try_lock(owner):
+                logger.warning('Lock of %s was taken while being checked', self.path.name)
+            elif not moved.exists():
+                # Its holder released it meanwhile and removed the moved copy
+                # (see _release): the lock we put back would be an orphan
+                self._discard(self.lock_file, owner)
+            moved.unlink(missing_ok=True)
+            return False
+        logger.warning('Breaking stale lock of %s (%.0fs old, %s)', self.path.name, age, owner)
+        moved.unlink(missing_ok=True)
+        return True
+
+    def _heartbeat(self, stop: threading.Event):
+        interval = min(LOCK_HEARTBEAT_SECONDS, self.stale_after / 4)
+        while not stop.wait(interval):
+            try:
+                os.utime(self.lock_file)
+            except FileNotFoundError:
+                # Moved aside by a waiter checking it: it is put back shortly
+                logger.debug('Lock of %s missing while held', self.path.name)
+            except OSError:
+                logger.debug('Could not touch the lock of %s', self.path.name, exc_info=True)
+
+    def _acquire(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        delay = LOCK_POLL_SECONDS
+        content = json.dumps({'writer': writer_id(), 'token': uuid.uuid4().hex, 'time': time.time()})
+        while not self._try_lock(content):
+            if self._break_stale_lock():
+                continue
+            if time.monotonic() >= deadline:
+                raise WorkbookBusyError(f'{self.path.name} est en cours de modification par un autre poste')
+            time.sleep(delay)
+            delay = min(delay * 2, LOCK_POLL_MAX_SECONDS)
+        self._content = content
+        # Long commits (large workbooks) must not look like a crashed holder
+        stop = self._heartbeat_stop = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(stop,), name='lock-heartbeat', daemon=True).start()
+
+    def _release(self):
+        if self._heartbeat_stop is not None:
+            self._heartbeat_stop.set()
+            self._heartbeat_stop = None
+        content, self._content = self._content, None
+        if self._discard(self.lock_file, content):
+            return
+        # A waiter moved it aside to check whether it is stale: remove the
+        # moved copy so the waiter does not put it back, then the lock in
+        # case it was put back already
+        moved = [p for p in self.lock_file.parent.glob(f'{self.lock_file.name}.*.stale')
+                 if self._discard(p, content)]
+        if not self._discard(self.lock_file, content) and not moved:
+            logger.warning('Lock of %s vanished while held', self.path.name)
+
+    @contextmanager
+    def lock(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """Hold the workbook's advisory lock (re-entrant within the process)."""
+        timeout = self.timeout if timeout is None else timeout
+        if not self._thread_lock.acquire(timeout=timeout):
+            raise WorkbookBusyError(f'{self.path.name} est en cours de modification')
+        try:
+            if self._depth == 0:
+                self._acquire(timeout)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._release()
+        finally:
+            self._thread_lock.release()
+
+    @contextmanager
+    def transaction(self, timeout: Optional[float] = None) -> Iterator[Transaction]:
+        """Lock, expose the current version, and bump it if the block completes."""
+        with self.lock(timeout):
+            txn = Transaction(self.version())
+            yield txn
+            txn.version = self._bump()
+            txn.committed = True
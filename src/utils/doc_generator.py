@@ -3,25 +3,66 @@ import json
 import logging
 import re
 import shutil
+import threading
 from pathlib import Path
 from typing import Dict, List, Optional, Union, Callable
 import time
 
+from .perf import timed
+
 logger = logging.getLogger(__name__)
 
 
-def _render_docx_template(template_path: Path, context: Dict, out_path: Path) -> None:
-    """Render a docx template with docxtpl and save to out_path."""
+# Environment variable enabling the profiling mode of render_templates when the
+# `profile` argument is left to None (any of "1", "true", "yes", "on").
+PROFILE_ENV_VAR = "DOMICILIATION_PROFILE"
+
+# Ordered list of the per-template stages reported under entry['stages'].
+STAGES = ('context', 'load', 'render', 'save', 'pdf')
+
+# cProfile and tracemalloc are process-wide: profiled generations (possibly
+# running on several JobScheduler workers) take turns so that each profile and
+# memory peak only covers its own run.
+_PROFILE_LOCK = threading.Lock()
+
+
+def _profiling_requested(profile: Optional[bool]) -> bool:
+    """Resolve the profiling flag from the explicit argument or the environment."""
+    if profile is not None:
+        return bool(profile)
+    return os.environ.get(PROFILE_ENV_VAR, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _render_docx_template(template_path: Path, context: Dict, out_path: Path,
+                          timings: Optional[Dict[str, float]] = None) -> None:
+    """Render a docx template with docxtpl and save to out_path.
+
+    When `timings` is provided it is filled with the duration (seconds) of the
+    'load' (docx parsing), 'render' (Jinja + XML rebuild) and 'save'
+    (XML serialization + zip write) stages.
+    """
     try:
         from docxtpl import DocxTemplate
     except Exception as e:
         raise RuntimeError("docxtpl is required to render templates") from e
 
+    t0 = time.perf_counter()
     tpl = DocxTemplate(str(template_path))
+    # DocxTemplate loads the underlying document lazily; force it here so the
+    # parsing cost is not attributed to the render stage.
+    tpl.init_docx()
+    t1 = time.perf_counter()
     tpl.render(context)
+    t2 = time.perf_counter()
     tpl.save(str(out_path))
+    t3 = time.perf_counter()
+    if timings is not None:
+        timings['load'] = t1 - t0
+        timings['render'] = t2 - t1
+        timings['save'] = t3 - t2
 
 
+@timed('_convert_to_pdf', reads='docx_path', writes='pdf_path')
 def _convert_to_pdf(docx_path: Path, pdf_path: Path) -> None:
     """Convert a docx file to PDF using docx2pdf if available."""
     # Prefer docx2pdf (Windows + MS Word) if available
@@ -65,6 +106,51 @@ def _convert_to_pdf(docx_path: Path, pdf_path: Path) -> None:
         raise
 
 
+def _save_profile(profiler, out_dir: Path, base_name: str, top: int = 40) -> List[Path]:
+    """Persist a cProfile run (and the current tracemalloc state) into out_dir.
+
+    Writes `<base_name>.prof` (loadable with pstats/snakeviz) and a readable
+    `<base_name>.txt` summary with the top functions by cumulative time and
+    the top allocation sites. Must be called while tracemalloc is still tracing.
+    Returns the list of written files.
+    """
+    import io
+    import pstats
+    import tracemalloc
+
+    written: List[Path] = []
+    prof_path = out_dir / f"{base_name}.prof"
+    txt_path = out_dir / f"{base_name}.txt"
+    try:
+        profiler.dump_stats(str(prof_path))
+        written.append(prof_path)
+
+        buf = io.StringIO()
+        stats = pstats.Stats(profiler, stream=buf)
+        stats.sort_stats('cumulative').print_stats(top)
+        lines = ["== cProfile (cumulative) ==", buf.getvalue()]
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append("== tracemalloc ==")
+            lines.append(f"current: {current / 1024:.1f} KiB, peak: {peak / 1024:.1f} KiB")
+            snapshot = tracemalloc.take_snapshot()
+            for stat in snapshot.statistics('lineno')[:top]:
+                lines.append(str(stat))
+
+        txt_path.write_text("\n".join(lines), encoding='utf-8')
+        written.append(txt_path)
+        logger.info("Saved generation profile to %s", prof_path)
+    except Exception:
+        logger.exception("Failed to write generation profile")
+    return written
+
+
+def _documents_size(report) -> int:
+    return sum(int(e.get('out_docx_size') or 0) + int(e.get('out_pdf_size') or 0) for e in report or [])
+
+
+@timed('render_templates', rows=len, written=_documents_size)
 def render_templates(
     values: Dict,
     templates_dir: Optional[Union[str, Path]] = None,
@@ -73,13 +159,26 @@ def render_templates(
     templates_list: Optional[List[str]] = None,
     progress_callback: Optional[Callable[[int, int, str, Dict], None]] = None,
     cleanup_tmp: bool = False,
+    profile: Optional[bool] = None,
+    cancel_token=None,
 ) -> List[Dict]:
     """Render .docx templates.
 
     Can either render a provided list of template file paths (templates_list),
     or scan a templates_dir for all `*.docx` files if templates_list is None.
 
-    Returns a list with report entries: {template, out_docx, out_pdf (optional), status, error}
+    Each entry carries a `stages` dict with the seconds spent in context
+    building, template load, render, save and PDF conversion (see STAGES).
+    When `profile` is True (or None and the DOMICILIATION_PROFILE environment
+    variable is set) the whole generation runs under cProfile and tracemalloc
+    and the results are saved next to the HTML report; concurrent profiled
+    generations run one after the other.
+
+    `cancel_token` (e.g. `src.utils.jobs.CancelToken`) is checked between
+    templates through its `is_cancelled()` method; once set, the remaining
+    templates are skipped and the report only covers what was generated.
+
+    Returns a list with report entries: {template, out_docx, out_pdf (optional), status, error, stages}
     """
     if out_dir is None:
         raise ValueError("out_dir is required")
@@ -350,83 +449,128 @@ def render_templates(
     total_files = len(templates) * (1 + (1 if to_pdf else 0))
     processed_files = 0
 
-    # Use out_subdir for generated files and report
-    for tpl in templates:
+    profiler = None
+    tracing_started = False
+    if _profiling_requested(profile):
+        import cProfile
+        import tracemalloc
+        _PROFILE_LOCK.acquire()
+        profiler = cProfile.Profile()
         try:
-            # Prefix filenames with date and sanitized company name
-            prefix = f"{gen_date}_{company_clean}_"
-            # Clean the template stem: remove leading 'My_' and trailing '_filled' if present
-            stem = tpl.stem
-            if stem.startswith('My_'):
-                stem = stem[3:]
-            if stem.endswith('_filled'):
-                stem = stem[:-7]
-            out_docx = out_subdir / f"{prefix}{stem}.docx"
-
-            # Skip if docx already exists
-            if out_docx.exists():
-                duration = 0.0
-                size_bytes = out_docx.stat().st_size
-                entry = {
-                    'template': str(tpl.name),
-                    'out_docx': str(out_docx),
-                    'status': 'skipped',
-                    'error': None,
-                    'duration_seconds': round(duration, 3),
-                    'out_docx_size': int(size_bytes),
-                }
-                processed_files += 1
-                if progress_callback:
-                    progress_callback(processed_files, total_files, str(tpl.name), dict(entry))
-            else:
-                start = time.time()
-                # Build a forgiving context for templates (flat + nested)
-                context = _build_context(values or {})
-                # Also keep the original values under 'values' key for templates that expect it
-                context['values'] = values or {}
-                _render_docx_template(tpl, context, out_docx)
-                duration = time.time() - start
-                size_bytes = out_docx.stat().st_size if out_docx.exists() else 0
-                entry = {
-                    'template': str(tpl.name),
-                    'out_docx': str(out_docx),
-                    'status': 'ok',
-                    'error': None,
-                    'duration_seconds': round(duration, 3),
-                    'out_docx_size': int(size_bytes),
-                }
-                processed_files += 1
-                if progress_callback:
-                    progress_callback(processed_files, total_files, str(tpl.name), dict(entry))
-
-            # PDF conversion (optional)
-            if to_pdf:
-                out_pdf = out_subdir / f"{prefix}{stem}.pdf"
-                # Skip if PDF exists
-                if out_pdf.exists():
-                    entry['out_pdf'] = str(out_pdf)
-                    entry['out_pdf_size'] = int(out_pdf.stat().st_size)
-                    # mark skipped only if docx was skipped earlier and pdf exists too
-                    if entry.get('status') == 'skipped':
-                        entry['status'] = 'skipped'
+            profiler.enable()
+        except ValueError as e:
+            # A profiler outside of render_templates is already active
+            logger.warning("Generation not profiled: %s", e)
+            profiler = None
+            _PROFILE_LOCK.release()
+        else:
+            # Only start tracemalloc if nobody else is tracing, and only stop it
+            # afterwards in that case.
+            tracing_started = not tracemalloc.is_tracing()
+            if tracing_started:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+    profile_paths: List[Path] = []
+    try:
+        # Use out_subdir for generated files and report
+        for tpl in templates:
+            if cancel_token is not None and cancel_token.is_cancelled():
+                logger.info("Generation cancelled after %d/%d templates", len(report), len(templates))
+                break
+            stages = {name: 0.0 for name in STAGES}
+            try:
+                # Prefix filenames with date and sanitized company name
+                prefix = f"{gen_date}_{company_clean}_"
+                # Clean the template stem: remove leading 'My_' and trailing '_filled' if present
+                stem = tpl.stem
+                if stem.startswith('My_'):
+                    stem = stem[3:]
+                if stem.endswith('_filled'):
+                    stem = stem[:-7]
+                out_docx = out_subdir / f"{prefix}{stem}.docx"
+
+                # Skip if docx already exists
+                if out_docx.exists():
+                    duration = 0.0
+                    size_bytes = out_docx.stat().st_size
+                    entry = {
+                        'template': str(tpl.name),
+                        'out_docx': str(out_docx),
+                        'status': 'skipped',
+                        'error': None,
+                        'duration_seconds': round(duration, 3),
+                        'out_docx_size': int(size_bytes),
+                        'stages': dict(stages),
+                    }
+                    processed_files += 1
+                    if progress_callback:
+                        progress_callback(processed_files, total_files, str(tpl.name), dict(entry))
                 else:
-                    try:
-                        _convert_to_pdf(out_docx, out_pdf)
+                    start = time.perf_counter()
+                    # Build a forgiving context for templates (flat + nested)
+                    context = _build_context(values or {})
+                    # Also keep the original values under 'values' key for templates that expect it
+                    context['values'] = values or {}
+                    stages['context'] = time.perf_counter() - start
+                    _render_docx_template(tpl, context, out_docx, timings=stages)
+                    duration = time.perf_counter() - start
+                    size_bytes = out_docx.stat().st_size if out_docx.exists() else 0
+                    entry = {
+                        'template': str(tpl.name),
+                        'out_docx': str(out_docx),
+                        'status': 'ok',
+                        'error': None,
+                        'duration_seconds': round(duration, 3),
+                        'out_docx_size': int(size_bytes),
+                        'stages': {k: round(v, 4) for k, v in stages.items()},
+                    }
+                    processed_files += 1
+                    if progress_callback:
+                        progress_callback(processed_files, total_files, str(tpl.name), dict(entry))
+
+                # PDF conversion (optional)
+                if to_pdf:
+                    out_pdf = out_subdir / f"{prefix}{stem}.pdf"
+                    # Skip if PDF exists
+                    if out_pdf.exists():
                         entry['out_pdf'] = str(out_pdf)
-                        entry['out_pdf_size'] = int(out_pdf.stat().st_size) if out_pdf.exists() else 0
-                    except Exception as e:
-                        entry['out_pdf'] = None
-                        entry['status'] = 'partial'
-                        entry['error'] = f"PDF conversion failed: {e}"
-                processed_files += 1
-                if progress_callback:
-                    progress_callback(processed_files, total_files, str(tpl.name), dict(entry))
-
-            report.append(entry)
-            logger.info("Processed template %s -> %s", tpl, out_docx)
-        except Exception as e:
-            logger.exception("Failed to render template %s: %s", tpl, e)
-            report.append({'template': str(tpl.name), 'out_docx': None, 'status': 'error', 'error': str(e)})
+                        entry['out_pdf_size'] = int(out_pdf.stat().st_size)
+                        # mark skipped only if docx was skipped earlier and pdf exists too
+                        if entry.get('status') == 'skipped':
+                            entry['status'] = 'skipped'
+                    else:
+                        pdf_start = time.perf_counter()
+                        try:
+                            _convert_to_pdf(out_docx, out_pdf)
+                            entry['out_pdf'] = str(out_pdf)
+                            entry['out_pdf_size'] = int(out_pdf.stat().st_size) if out_pdf.exists() else 0
+                        except Exception as e:
+                            entry['out_pdf'] = None
+                            entry['status'] = 'partial'
+                            entry['error'] = f"PDF conversion failed: {e}"
+                        entry['stages']['pdf'] = round(time.perf_counter() - pdf_start, 4)
+                    processed_files += 1
+                    if progress_callback:
+                        progress_callback(processed_files, total_files, str(tpl.name), dict(entry))
+
+                report.append(entry)
+                logger.info("Processed template %s -> %s", tpl, out_docx)
+            except Exception as e:
+                logger.exception("Failed to render template %s: %s", tpl, e)
+                report.append({'template': str(tpl.name), 'out_docx': None, 'status': 'error', 'error': str(e),
+                               'stages': {k: round(v, 4) for k, v in stages.items()}})
+    finally:
+        # Also on an unexpected error: never leave the profiler or tracemalloc running
+        if profiler is not None:
+            profiler.disable()
+            try:
+                profile_paths = _save_profile(profiler, out_subdir, f"{gen_date}_{company_clean}_Profil_{gen_time}")
+            finally:
+                if tracing_started:
+                    import tracemalloc
+                    tracemalloc.stop()
+                _PROFILE_LOCK.release()
 
     # Save report (write both a human-named JSON matching the HTML report,
     # and keep the legacy `generation_report.json` for backward compatibility)
@@ -459,6 +603,7 @@ def render_templates(
         total = len(report)
         counts = {'ok': 0, 'skipped': 0, 'partial': 0, 'error': 0}
         total_duration = 0.0
+        stage_totals = {name: 0.0 for name in STAGES}
         for e in report:
             st = (e.get('status') or 'unknown')
             if st in counts:
@@ -467,14 +612,30 @@ def render_templates(
                 total_duration += float(e.get('duration_seconds') or 0.0)
             except Exception:
                 pass
+            for name, secs in (e.get('stages') or {}).items():
+                if name in stage_totals:
+                    stage_totals[name] += float(secs or 0.0)
 
         rows_html = []
         for e in report:
+            stages = e.get('stages') or {}
             rows_html.append('<tr>' +
                              ''.join(f"<td>{_escape(e.get(k,''))}</td>" for k in ('template', 'out_docx', 'out_pdf', 'status', 'error', 'duration_seconds', 'out_docx_size', 'out_pdf_size')) +
+                             ''.join(f"<td>{_escape(stages.get(name, ''))}</td>" for name in STAGES) +
                              '</tr>')
 
         table_header = ''.join(f"<th>{_escape(h)}</th>" for h in ('template', 'out_docx', 'out_pdf', 'status', 'error', 'duration_seconds', 'out_docx_size', 'out_pdf_size'))
+        table_header += ''.join(f"<th>{_escape(name)} (s)</th>" for name in STAGES)
+
+        stage_cards = ''.join(
+            f"<div class=\"card\"><strong>{_escape(name)} (s)</strong><div>{round(secs, 3)}</div></div>"
+            for name, secs in stage_totals.items()
+        )
+        profile_html = ''
+        if profile_paths:
+            profile_html = '<h2>Profil</h2><ul>' + ''.join(
+                f"<li><a class=\"filelink\" href=\"{_escape(p.name)}\">{_escape(p.name)}</a></li>" for p in profile_paths
+            ) + '</ul>'
 
         # Enhanced HTML with summary and links
         html_content = f"""<!doctype html>
@@ -513,6 +674,9 @@ def render_templates(
   <div class=\"card\"><strong>Erreurs</strong><div>{counts['error']}</div></div>
   <div class=\"card\"><strong>Durée totale (s)</strong><div>{round(total_duration,3)}</div></div>
 </section>
+<section class=\"summary\">
+  {stage_cards}
+</section>
 
 <h2>Fichiers générés</h2>
 <table>
@@ -521,6 +685,7 @@ def render_templates(
 {''.join(rows_html)}
 </tbody>
 </table>
+{profile_html}
 
 <h2>Données brutes (JSON)</h2>
 <pre id=\"genjson\">{_escape(json.dumps(report, ensure_ascii=False, indent=2))}</pre>
@@ -0,0 +1,255 @@
+"""Background job scheduler for document generation.
+
+Generation requests are queued and executed by a bounded pool of worker
+threads. Each job owns a CancelToken that `render_templates` checks between
+templates, so a running job stops cleanly after the current template and a
+queued job never starts. Listeners are notified from the worker threads; GUI
+code must marshal those notifications onto the Tk thread itself.
+"""
+import copy
+import itertools
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+ERROR = 'error'
+FINISHED_STATES = (DONE, CANCELLED, ERROR)
+
+
+class CancelToken:
+    """Thread-safe cancellation flag shared between the scheduler and a job.
+
+    `observed` records that the job saw the flag set, i.e. that it skipped
+    work: a cancellation arriving after the last template leaves the job DONE.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.observed = False
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def is_cancelled(self) -> bool:
+        cancelled = self._event.is_set()
+        if cancelled:
+            self.observed = True
+        return cancelled
+
+
+class GenerationJob:
+    """A single queued generation request and its live state."""
+
+    def __init__(self, job_id: int, values: Dict, out_dir: str, to_pdf: bool = False,
+                 templates_list: Optional[List[str]] = None, templates_dir: Optional[str] = None,
+                 label: str = ''):
+        self.id = job_id
+        # Snapshot the values so later edits in the forms do not leak into the job
+        self.values = copy.deepcopy(values or {})
+        self.out_dir = out_dir
+        self.to_pdf = to_pdf
+        self.templates_list = list(templates_list) if templates_list else None
+        self.templates_dir = templates_dir
+        self.label = label or f'Tâche {job_id}'
+        self.token = CancelToken()
+        self.status = QUEUED
+        self.processed = 0
+        self.total = 0
+        # Details of the most recent progress callback (template name, report entry)
+        self.last_template: Optional[str] = None
+        self.last_entry: Optional[Dict] = None
+        self.report: Optional[List[Dict]] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def output_folder(self) -> Optional[str]:
+        """Best-effort folder containing the generated files."""
+        try:
+            import os
+            from pathlib import Path
+            paths = [str(Path(e['out_docx']).parent) for e in (self.report or []) if e.get('out_docx')]
+            return os.path.commonpath(paths) if paths else self.out_dir
+        except Exception:
+            return self.out_dir
+
+
+class JobScheduler:
+    """Queue of GenerationJobs executed by at most `max_workers` threads.
+
+    `runner` defaults to `render_templates` and is called with the job
+    arguments plus `progress_callback` and `cancel_token`. Listeners receive
+    `(job, event)` where event is one of 'queued', 'started', 'progress',
+    'finished'.
+    """
+
+    def __init__(self, max_workers: int = 2, runner: Optional[Callable] = None):
+        if max_workers < 1:
+            raise ValueError('max_workers must be >= 1')
+        self.max_workers = max_workers
+        self._runner = runner
+        self._queue: 'queue.Queue[Optional[GenerationJob]]' = queue.Queue()
+        self._jobs: Dict[int, GenerationJob] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[GenerationJob, str], None]] = []
+        self._workers: List[threading.Thread] = []
+        self._closed = False
+
+    # --- listeners ---
+    def add_listener(self, callback: Callable[[GenerationJob, str], None]) -> None:
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[GenerationJob, str], None]) -> None:
+        with self._lock:
+            try:
+                self._listeners.remove(callback)
+            except ValueError:
+                pass
+
+    def _notify(self, job: GenerationJob, event: str) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for cb in listeners:
+            try:
+                cb(job, event)
+            except Exception:
+                logger.exception('Job listener failed for job %s (%s)', job.id, event)
+
+    # --- public API ---
+    def submit(self, values: Dict, out_dir: str, to_pdf: bool = False,
+               templates_list: Optional[List[str]] = None, templates_dir: Optional[str] = None,
+               label: str = '') -> GenerationJob:
+        """Queue a generation and return its job (starts workers lazily)."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('JobScheduler is shut down')
+            job = GenerationJob(next(self._ids), values, out_dir, to_pdf=to_pdf,
+                                templates_list=templates_list, templates_dir=templates_dir, label=label)
+            self._jobs[job.id] = job
+            self._ensure_workers()
+        self._queue.put(job)
+        logger.info('Queued generation job %s (%s)', job.id, job.label)
+        self._notify(job, 'queued')
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Request cancellation. Queued jobs are dropped, running jobs stop after the current template."""
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.token.cancel()
+        with self._lock:
+            dropped = job.status == QUEUED
+            if dropped:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        if dropped:
+            self._notify(job, 'finished')
+        logger.info('Cancellation requested for job %s', job_id)
+        return True
+
+    def cancel_all(self) -> None:
+        for job in self.jobs():
+            self.cancel(job.id)
+
+    def get(self, job_id: int) -> Optional[GenerationJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[GenerationJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def pending_count(self) -> int:
+        return sum(1 for j in self.jobs() if not j.finished)
+
+    def clear_finished(self) -> None:
+        with self._lock:
+            for jid in [jid for jid, j in self._jobs.items() if j.finished]:
+                del self._jobs[jid]
+
+    def shutdown(self, wait: bool = False, cancel: bool = True) -> None:
+        """Stop accepting jobs; optionally cancel pending ones and join workers."""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+        if cancel:
+            self.cancel_all()
+        for _ in workers:
+            self._queue.put(None)
+        if wait:
+            for t in workers:
+                t.join()
+
+    # --- workers ---
+    def _ensure_workers(self) -> None:
+        # Called with self._lock held
+        self._workers = [t for t in self._workers if t.is_alive()]
+        while len(self._workers) < self.max_workers:
+            t = threading.Thread(target=self._worker_loop, name=f'gen-worker-{len(self._workers) + 1}', daemon=True)
+            self._workers.append(t)
+            t.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: GenerationJob) -> None:
+        runner = self._runner
+        if runner is None:
+            from .doc_generator import render_templates as runner
+
+        def _progress(processed, total, template_name, entry):
+            job.processed = processed
+            job.total = total
+            job.last_template = template_name
+            job.last_entry = entry
+            self._notify(job, 'progress')
+
+        with self._lock:
+            if job.status != QUEUED:
+                # Cancelled while still queued; already reported by cancel()
+                return
+            job.status = RUNNING
+        job.started_at = time.time()
+        self._notify(job, 'started')
+        try:
+            job.report = runner(
+                job.values,
+                job.templates_dir,
+                job.out_dir,
+                to_pdf=job.to_pdf,
+                templates_list=job.templates_list,
+                progress_callback=_progress,
+                cancel_token=job.token,
+            )
+            job.status = CANCELLED if job.token.observed else DONE
+        except Exception as e:
+            logger.exception('Generation job %s failed: %s', job.id, e)
+            job.error = str(e)
+            job.status = ERROR
+        finally:
+            job.finished_at = time.time()
+            logger.info('Generation job %s finished with status %s', job.id, job.status)
+            self._notify(job, 'finished')
@@ -0,0 +1,324 @@
+"""GUI latency harness: event-loop stalls during scripted interactions.
+
+Benchmarks of the storage functions miss what users feel: the Tk loop not
+processing events while a callback runs. A heartbeat scheduled with
+`after(HEARTBEAT_MS)` measures it: every beat late by more than
+STALL_THRESHOLD_MS is a stall, and for each interaction the harness reports
+the worst stall and the total time blocked in stalls.
+
+`run_harness()` starts MainApp on a synthetic database (src/utils/synthetic.py,
+selected through DOMICILIATION_DB) and plays SCENARIO: open the dashboard,
+switch pages, search, select and edit a company, save it under a new name and
+generate its documents. Dialogs are answered automatically. It needs a
+display; on a headless machine run it under Xvfb::
+
+    xvfb-run -a python -m src.utils.latency --companies 5000 --out latency.json
+    xvfb-run -a python -m src.utils.latency --compare latency.json --threshold 0.5
+
+With --compare (or --max-stall) the exit code is 1 when an interaction's
+worst stall regressed, so the command can gate a CI job.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_MS = 10
+# Lateness perceptible to a user (a frame at ~20 fps)
+STALL_THRESHOLD_MS = 50
+# Delay between the scripted actions of an interaction (a fast user)
+ACTION_GAP_MS = 100
+# Quiet time after an interaction before it is considered finished
+SETTLE_MS = 300
+INTERACTION_TIMEOUT = 120.0
+DEFAULT_COMPANIES = 2000
+DEFAULT_THRESHOLD = 0.5
+# Worst stalls shorter than this are never reported as regressions
+MIN_STALL_DELTA_MS = 50
+
+
+class Interaction(NamedTuple):
+    """Actions run one per event-loop callback, then wait for `until()` and SETTLE_MS."""
+    name: str
+    actions: Sequence[Callable[[], object]]
+    until: Optional[Callable[[], bool]] = None
+
+
+def summarize_gaps(gaps_ms: Sequence[float], interval_ms: float = HEARTBEAT_MS,
+                   threshold_ms: float = STALL_THRESHOLD_MS) -> Dict:
+    """Worst lateness, blocked time and stall count of heartbeat gaps (all in ms)."""
+    late = [max(0.0, gap - interval_ms) for gap in gaps_ms]
+    stalls = [value for value in late if value > threshold_ms]
+    return {
+        'worst_stall_ms': round(max(late, default=0.0), 1),
+        'blocked_ms': round(sum(stalls), 1),
+        'stalls': len(stalls),
+    }
+
+
+class StallMonitor:
+    """Heartbeat on a Tk widget recording the gaps between beats."""
+
+    def __init__(self, widget, interval_ms: int = HEARTBEAT_MS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._gaps: List[float] = []
+        self._last: Optional[float] = None
+        self._after_id = None
+
+    def start(self):
+        self._last = time.perf_counter()
+        self._after_id = self.widget.after(self.interval_ms, self._beat)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _beat(self):
+        now = time.perf_counter()
+        self._gaps.append((now - self._last) * 1000)
+        self._last = now
+        self._after_id = self.widget.after(self.interval_ms, self._beat)
+
+    def take(self) -> List[float]:
+        """Gaps since the previous call, including the beat in progress."""
+        now = time.perf_counter()
+        gaps, self._gaps = self._gaps, []
+        gaps.append((now - self._last) * 1000)
+        self._last = now
+        return gaps
+
+
+class ScenarioRunner:
+    """Plays interactions from the event loop and measures each one."""
+
+    def __init__(self, app, interactions: Sequence[Interaction], threshold_ms: float = STALL_THRESHOLD_MS):
+        self.app = app
+        self.interactions = list(interactions)
+        self.threshold_ms = threshold_ms
+        self.monitor = StallMonitor(app)
+        self.results: List[Dict] = []
+        self._index = 0
+        self._failed = False
+
+    def run(self) -> List[Dict]:
+        self.monitor.start()
+        self.app.after(SETTLE_MS, self._next)
+        self.app.mainloop()
+        self.monitor.stop()
+        return self.results
+
+    def _next(self):
+        if self._index >= len(self.interactions):
+            self.app.quit()
+            return
+        interaction = self.interactions[self._index]
+        self._index += 1
+        self._failed = False
+        self.monitor.take()
+        started = time.perf_counter()
+        self._act(interaction, 0, started)
+
+    def _act(self, interaction: Interaction, step: int, started: float):
+        if step < len(interaction.actions):
+            try:
+                interaction.actions[step]()
+            except Exception:
+                logger.exception('Interaction %s failed at step %d', interaction.name, step)
+                self._failed = True
+            self.app.after(ACTION_GAP_MS, self._act, interaction, step + 1, started)
+        else:
+            self._wait(interaction, started)
+
+    def _wait(self, interaction: Interaction, started: float):
+        done = True
+        if interaction.until is not None:
+            try:
+                done = interaction.until()
+            except Exception:
+                logger.exception('Interaction %s: completion check failed', interaction.name)
+        if not done and time.perf_counter() - started < INTERACTION_TIMEOUT:
+            self.app.after(ACTION_GAP_MS, self._wait, interaction, started)
+            return
+        self.app.after(SETTLE_MS, self._finish, interaction, started, done)
+
+    def _finish(self, interaction: Interaction, started: float, done: bool):
+        result = {'name': interaction.name, 'seconds': round(time.perf_counter() - started, 3),
+                  'completed': done and not self._failed}
+        result.update(summarize_gaps(self.monitor.take(), self.monitor.interval_ms, self.threshold_ms))
+        self.results.append(result)
+        logger.info('%-18s worst %7.1f ms  blocked %8.1f ms', interaction.name,
+                    result['worst_stall_ms'], result['blocked_ms'])
+        self._next()
+
+
+def _answer_dialogs(out_dir: Path, answers: List[Dict]) -> Callable[[], None]:
+    """Replace the blocking dialogs by automatic answers; returns the restore function."""
+    from tkinter import filedialog, messagebox
+
+    replaced = {}
+
+    def _replace(module, name, value):
+        def _answer(*args, **kwargs):
+            answers.append({'dialog': name, 'title': args[0] if args else kwargs.get('title', '')})
+            return value
+        replaced[(module, name)] = getattr(module, name)
+        setattr(module, name, _answer)
+
+    for name in ('showinfo', 'showwarning', 'showerror'):
+        _replace(messagebox, name, 'ok')
+    # Generation: do not save again (the scenario saved already), then confirm
+    _replace(messagebox, 'askyesnocancel', False)
+    _replace(messagebox, 'askyesno', True)
+    _replace(filedialog, 'askdirectory', str(out_dir))
+
+    def restore():
+        for (module, name), original in replaced.items():
+            setattr(module, name, original)
+    return restore
+
+
+def scenario(app, template: Optional[str] = None) -> List[Interaction]:
+    """The interactions played by run_harness()."""
+    from .storage import MODELS_DIR
+
+    def dashboard():
+        return app.main_form.dashboard
+
+    def search(text):
+        return lambda: dashboard().search_var.set(text)
+
+    def select_first_company():
+        tree = dashboard().trees['societe']
+        children = tree.get_children()
+        if children:
+            tree.selection_set(children[0])
+
+    def rename_and_save():
+        values = app.main_form.get_values()
+        values.setdefault('societe', {})['denomination'] = f'LATENCE {time.time_ns()}'
+        app.main_form.set_values(values)
+        # save_to_db reports its errors in a dialog and returns None
+        if app.save_to_db() is None:
+            raise RuntimeError('save_to_db did not save')
+
+    templates = sorted(MODELS_DIR.glob('*.docx'))
+    chosen = [str(MODELS_DIR / template)] if template else [str(templates[0])] if templates else []
+    app.choose_templates_with_format = lambda: (chosen, False)
+    jobs_before = len(app.job_scheduler.jobs())
+
+    pages = ('associe', 'contrat', 'alertes', 'stats', 'perf', 'societe')
+    return [
+        Interaction('open_dashboard', [app.main_form.show_dashboard]),
+        Interaction('switch_pages', [lambda p=page: dashboard()._show_page(p) for page in pages]),
+        Interaction('search', [search('s'), search('sk'), search('sky'), search('')],
+                    until=lambda: dashboard()._search_after_id is None),
+        Interaction('select_and_edit', [select_first_company, lambda: dashboard()._action('edit')]),
+        Interaction('save', [rename_and_save]),
+        Interaction('generate', [app.generate_documents],
+                    until=lambda: len(app.job_scheduler.jobs()) > jobs_before and app.job_scheduler.pending_count() == 0),
+    ]
+
+
+def run_harness(companies: int = DEFAULT_COMPANIES, seed: int = 0, workdir: Optional[Path] = None,
+                template: Optional[str] = None, threshold_ms: float = STALL_THRESHOLD_MS) -> Dict:
+    """Play the scenario on MainApp with a synthetic database of `companies` sociétés."""
+    from . import synthetic
+    from .storage import DB_PATH_ENV_VAR
+
+    with tempfile.TemporaryDirectory(prefix='domiciliation-latency-') as tmp:
+        root = Path(workdir) if workdir else Path(tmp)
+        db_path = root / f'latency_{companies}_{seed}.xlsx'
+        if not db_path.exists():
+            synthetic.write_workbook(db_path, companies, seed)
+        out_dir = root / 'generation'
+        out_dir.mkdir(parents=True, exist_ok=True)
+        previous_db = os.environ.get(DB_PATH_ENV_VAR)
+        os.environ[DB_PATH_ENV_VAR] = str(db_path)
+        dialogs: List[Dict] = []
+        restore = _answer_dialogs(out_dir, dialogs)
+        try:
+            import main
+            app = main.MainApp()
+            try:
+                interactions = ScenarioRunner(app, scenario(app, template), threshold_ms).run()
+            finally:
+                app.job_scheduler.shutdown(wait=True, cancel=True)
+                app.destroy()
+        finally:
+            restore()
+            if previous_db is None:
+                os.environ.pop(DB_PATH_ENV_VAR, None)
+            else:
+                os.environ[DB_PATH_ENV_VAR] = previous_db
+    return {
+        'companies': companies,
+        'seed': seed,
+        'heartbeat_ms': HEARTBEAT_MS,
+        'threshold_ms': threshold_ms,
+        'interactions': interactions,
+        'dialogs': dialogs,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD,
+            max_stall_ms: Optional[float] = None) -> List[Dict]:
+    """Interactions whose worst stall regressed against `baseline` or exceeds `max_stall_ms`."""
+    before = {i['name']: i for i in (baseline or {}).get('interactions', [])}
+    regressions = []
+    for interaction in current['interactions']:
+        worst = interaction['worst_stall_ms']
+        old = before.get(interaction['name'])
+        if old and worst > old['worst_stall_ms'] * (1 + threshold) and worst - old['worst_stall_ms'] > MIN_STALL_DELTA_MS:
+            regressions.append({'name': interaction['name'], 'baseline_ms': old['worst_stall_ms'], 'worst_stall_ms': worst})
+        elif max_stall_ms is not None and worst > max_stall_ms:
+            regressions.append({'name': interaction['name'], 'budget_ms': max_stall_ms, 'worst_stall_ms': worst})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m src.utils.latency', description=__doc__.splitlines()[0])
+    parser.add_argument('--companies', type=int, default=DEFAULT_COMPANIES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', type=Path, help='keep the synthetic database here between runs')
+    parser.add_argument('--template', help='model generated by the scenario (first of Models/ by default)')
+    parser.add_argument('--out', type=Path, help='write the results (JSON) to this file')
+    parser.add_argument('--compare', type=Path, help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed worst-stall increase')
+    parser.add_argument('--max-stall', type=float, help='worst stall budget per interaction (ms)')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger('src').setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    from .startup import has_display
+    if not has_display():
+        print('No display: run under Xvfb (xvfb-run -a python -m src.utils.latency)', file=sys.stderr)
+        return 2
+    results = run_harness(args.companies, args.seed, args.workdir, args.template)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding='utf-8')
+    if args.compare or args.max_stall is not None:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8')) if args.compare else None
+        regressions = compare(results, baseline, args.threshold, args.max_stall)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
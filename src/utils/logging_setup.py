@@ -0,0 +1,101 @@
+"""Application logging pipeline.
+
+Loggers never write to disk on the thread that emits a record (typically the
+Tk thread): the root logger only has a QueueHandler, and a QueueListener
+thread drains the queue into a size-rotated `app.log`. Levels can be tuned per
+module in `config/logging.json`, e.g.::
+
+    {
+      "level": "INFO",
+      "max_bytes": 2097152,
+      "backup_count": 5,
+      "loggers": {"src.forms.dashboard_view": "WARNING"}
+    }
+
+Call `setup_logging()` once at application start; it is idempotent and
+`shutdown_logging()` (also registered with atexit) flushes pending records.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from pathlib import Path
+from typing import Optional, Union
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_LOG_FILE = 'app.log'
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / 'config' / 'logging.json'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+
+
+def _load_config(config_path: Optional[Path]) -> dict:
+    path = Path(config_path) if config_path else CONFIG_PATH
+    try:
+        if path.exists():
+            with path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+    except Exception:
+        # A broken config must not prevent the application from starting
+        logging.getLogger(__name__).warning('Ignoring invalid logging config %s', path, exc_info=True)
+    return {}
+
+
+def setup_logging(log_file: Union[str, Path] = DEFAULT_LOG_FILE, level: Optional[Union[int, str]] = None,
+                  max_bytes: Optional[int] = None, backup_count: Optional[int] = None,
+                  config_path: Optional[Path] = None) -> logging.handlers.QueueListener:
+    """Install the queue-based rotating file logging and return its listener.
+
+    Explicit arguments win over `config/logging.json`, which wins over the
+    defaults (INFO, 2 MiB per file, 5 backups).
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    cfg = _load_config(config_path)
+    level = level if level is not None else cfg.get('level', logging.INFO)
+    max_bytes = max_bytes if max_bytes is not None else int(cfg.get('max_bytes', DEFAULT_MAX_BYTES))
+    backup_count = backup_count if backup_count is not None else int(cfg.get('backup_count', DEFAULT_BACKUP_COUNT))
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        str(log_file), maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    log_queue: 'queue.SimpleQueue[logging.LogRecord]' = queue.SimpleQueue()
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    for name, module_level in (cfg.get('loggers') or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Stop the listener thread after writing every queued record."""
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    try:
+        _listener.stop()
+    finally:
+        for handler in _listener.handlers:
+            try:
+                handler.close()
+            except Exception:
+                pass
+        if _queue_handler is not None:
+            logging.getLogger().removeHandler(_queue_handler)
+        _listener = None
+        _queue_handler = None
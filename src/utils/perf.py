@@ -0,0 +1,265 @@
+"""Operation timings: what was slow, how often, on how much data.
+
+Functions are instrumented with a decorator; every call is recorded in an
+in-memory ring buffer with its duration, the rows it touched and the bytes
+it read or wrote::
+
+    @timed('write_records_to_db', reads='path', writes='path', rows=_new_rows)
+    def write_records_to_db(path, ...): ...
+
+    @timed('_load_data')
+    def _load_data(self):
+        ...
+        annotate(rows=len(df))   # details known only inside the call
+
+`reads`/`writes` name a path parameter: its size before the call counts as
+read, its size after the call as written when the file changed. Recording is
+a few microseconds and never touches the disk on the calling thread:
+`setup_perf()` (called once at application start, like setup_logging) loads
+the previous sessions from `perf.jsonl` and appends new records to it from a
+background thread every PERSIST_INTERVAL seconds. The dashboard's
+"Performances" page shows `recorder.summary()` (p50/p95 per operation).
+"""
+import atexit
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERF_FILE = 'perf.jsonl'
+DEFAULT_CAPACITY = 5000
+PERSIST_INTERVAL = 30.0
+# The file is rewritten from the ring buffer beyond this size
+MAX_FILE_BYTES = 2 * 1024 * 1024
+SUMMARY_COLUMNS = ['OPERATION', 'APPELS', 'P50_MS', 'P95_MS', 'MAX_MS', 'LIGNES', 'LU_KO', 'ECRIT_KO', 'ERREURS']
+
+
+class OperationRecord(NamedTuple):
+    operation: str
+    started: float
+    seconds: float
+    rows: Optional[int] = None
+    bytes_read: Optional[int] = None
+    bytes_written: Optional[int] = None
+    ok: bool = True
+
+
+class Measurement:
+    """Details of the call in progress, filled by `annotate()`."""
+
+    __slots__ = ('operation', 'rows', 'bytes_read', 'bytes_written')
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.rows: Optional[int] = None
+        self.bytes_read: Optional[int] = None
+        self.bytes_written: Optional[int] = None
+
+
+class PerfRecorder:
+    """Ring buffer of OperationRecords, optionally persisted to a JSON lines file."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._records: deque = deque(maxlen=capacity)
+        self._pending: List[OperationRecord] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.path: Optional[Path] = None
+        self._stop: Optional[threading.Event] = None
+
+    def record(self, record: OperationRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+            if self.path is not None:
+                self._pending.append(record)
+
+    def records(self, operation: Optional[str] = None) -> List[OperationRecord]:
+        with self._lock:
+            records = list(self._records)
+        return [r for r in records if operation is None or r.operation == operation]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._pending.clear()
+
+    def summary(self):
+        """One row per operation: calls, p50/p95/max in ms, rows and KB (slowest p95 first)."""
+        import numpy as np
+        import pandas as pd
+
+        by_operation: Dict[str, List[OperationRecord]] = {}
+        for record in self.records():
+            by_operation.setdefault(record.operation, []).append(record)
+        rows = []
+        for operation, records in by_operation.items():
+            ms = np.array([r.seconds for r in records]) * 1000
+
+            def _total(field):
+                values = [getattr(r, field) for r in records if getattr(r, field) is not None]
+                return sum(values) if values else None
+
+            read, written = _total('bytes_read'), _total('bytes_written')
+            rows.append([operation, len(records), round(float(np.percentile(ms, 50)), 1),
+                         round(float(np.percentile(ms, 95)), 1), round(float(ms.max()), 1), _total('rows'),
+                         None if read is None else round(read / 1024), None if written is None else round(written / 1024),
+                         sum(not r.ok for r in records)])
+        df = pd.DataFrame(rows, columns=SUMMARY_COLUMNS)
+        return df.sort_values('P95_MS', ascending=False, ignore_index=True)
+
+    # -- persistence -------------------------------------------------------
+
+    def load(self, path: Union[str, Path]) -> int:
+        """Put the most recent records of `path` in the ring buffer; returns how many."""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        loaded: deque = deque(maxlen=self._records.maxlen)
+        with path.open('r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    loaded.append(OperationRecord(**json.loads(line)))
+                except (ValueError, TypeError):
+                    continue
+        with self._lock:
+            current = list(self._records)
+            self._records.clear()
+            self._records.extend(list(loaded) + current)
+        return len(loaded)
+
+    def flush(self) -> None:
+        """Append the records made since the last flush to the file."""
+        if self.path is None:
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending:
+                return
+            try:
+                rewrite = self.path.exists() and self.path.stat().st_size > MAX_FILE_BYTES
+                lines = self.records() if rewrite else pending
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with self.path.open('w' if rewrite else 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(r._asdict()) + '\n' for r in lines)
+            except OSError:
+                logger.warning('Could not write operation timings to %s', self.path, exc_info=True)
+
+    def persist(self, path: Union[str, Path], interval: float = PERSIST_INTERVAL) -> None:
+        """Load the history of `path` and flush new records to it every `interval` seconds."""
+        self.stop_persistence()
+        self.path = Path(path)
+        try:
+            self.load(self.path)
+        except OSError:
+            logger.warning('Could not read operation timings from %s', self.path, exc_info=True)
+        stop = self._stop = threading.Event()
+
+        def _loop():
+            while not stop.wait(interval):
+                self.flush()
+
+        threading.Thread(target=_loop, name='perf-flush', daemon=True).start()
+
+    def stop_persistence(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+        self.flush()
+        self.path = None
+
+
+recorder = PerfRecorder()
+_active = threading.local()
+
+
+def _file_state(path) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def annotate(rows: Optional[int] = None, bytes_read: Optional[int] = None,
+             bytes_written: Optional[int] = None) -> None:
+    """Set details of the innermost timed call running on this thread (no-op outside one)."""
+    stack = getattr(_active, 'stack', None)
+    if not stack:
+        return
+    current = stack[-1]
+    if rows is not None:
+        current.rows = int(rows)
+    if bytes_read is not None:
+        current.bytes_read = int(bytes_read)
+    if bytes_written is not None:
+        current.bytes_written = int(bytes_written)
+
+
+def timed(operation: str, rows: Optional[Callable] = None, reads: Optional[str] = None,
+          writes: Optional[str] = None, written: Optional[Callable] = None):
+    """Decorator recording each call in `recorder`.
+
+    `rows(result)` and `written(result)` compute details from the return
+    value; `reads`/`writes` name a path parameter whose file size is counted.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            paths = {}
+            if reads or writes:
+                try:
+                    bound = signature.bind_partial(*args, **kwargs).arguments
+                    paths = {name: bound.get(name) for name in (reads, writes) if name}
+                except TypeError:
+                    pass
+            before = {name: _file_state(path) for name, path in paths.items()}
+            measurement = Measurement(operation)
+            stack = _active.__dict__.setdefault('stack', [])
+            stack.append(measurement)
+            ok = False
+            started = time.time()
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                seconds = time.perf_counter() - start
+                stack.pop()
+                try:
+                    if ok and rows is not None and measurement.rows is None:
+                        measurement.rows = rows(result)
+                    if ok and written is not None and measurement.bytes_written is None:
+                        measurement.bytes_written = written(result)
+                    if reads and measurement.bytes_read is None and before.get(reads):
+                        measurement.bytes_read = before[reads][0]
+                    if writes and measurement.bytes_written is None:
+                        after = _file_state(paths.get(writes))
+                        if after is not None and after != before.get(writes):
+                            measurement.bytes_written = after[0]
+                except Exception:
+                    logger.debug('Could not compute details of %s', operation, exc_info=True)
+                recorder.record(OperationRecord(operation, started, seconds, measurement.rows,
+                                                measurement.bytes_read, measurement.bytes_written, ok))
+        return wrapper
+    return decorator
+
+
+def setup_perf(path: Union[str, Path] = DEFAULT_PERF_FILE, interval: float = PERSIST_INTERVAL) -> PerfRecorder:
+    """Persist the application's timings to `path` (history included in the summary)."""
+    recorder.persist(path, interval)
+    return recorder
+
+
+atexit.register(recorder.flush)
@@ -0,0 +1,116 @@
+"""Thread-safe progress channel between worker threads and the Tk loop.
+
+Workers `post()` as often as they like; nothing touches Tk from their side.
+The Tk side drains the channel on a fixed tick (see ProgressPump), so one
+`after()` callback per frame applies a whole batch of updates. State updates
+are coalesced per key (only the latest one survives) and log lines are kept
+in a bounded buffer, so UI cost no longer depends on worker throughput.
+"""
+import collections
+import logging
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ProgressBatch:
+    """What a drain returns: latest state per key, new log lines, dropped line count."""
+
+    __slots__ = ('states', 'lines', 'dropped')
+
+    def __init__(self, states: Dict[Hashable, Any], lines: List[str], dropped: int):
+        self.states = states
+        self.lines = lines
+        self.dropped = dropped
+
+    def __bool__(self):
+        return bool(self.states or self.lines or self.dropped)
+
+
+class ProgressChannel:
+    """Coalescing mailbox: many producers, one consumer (the Tk thread)."""
+
+    def __init__(self, max_lines: int = 500):
+        self._lock = threading.Lock()
+        self._states: Dict[Hashable, Any] = {}
+        self._lines: 'collections.deque[str]' = collections.deque(maxlen=max_lines)
+        self._dropped = 0
+
+    def post(self, key: Optional[Hashable] = None, state: Any = None, line: Optional[str] = None) -> None:
+        """Record the latest `state` for `key` and/or append a log `line`."""
+        with self._lock:
+            if key is not None:
+                self._states[key] = state
+            if line is not None:
+                if len(self._lines) == self._lines.maxlen:
+                    self._dropped += 1
+                self._lines.append(line)
+
+    def drain(self) -> ProgressBatch:
+        """Take everything posted since the previous drain."""
+        with self._lock:
+            batch = ProgressBatch(self._states, list(self._lines), self._dropped)
+            self._states = {}
+            self._lines.clear()
+            self._dropped = 0
+        return batch
+
+
+class ProgressPump:
+    """Drains a ProgressChannel every `interval_ms` on the Tk thread.
+
+    `widget` is any Tk widget (used for `after`), `handler` receives each
+    non-empty ProgressBatch. The pump stops by itself when the widget is
+    destroyed, and when `keep_running` (if given) returns False and the
+    drain that follows it is empty, so an idle window costs no wake-ups;
+    `start()` it again when new work is queued. `keep_running` is called
+    before draining: whatever was posted before it returned False is applied.
+    """
+
+    def __init__(self, widget, channel: ProgressChannel, handler: Callable[[ProgressBatch], None],
+                 interval_ms: int = 100, keep_running: Optional[Callable[[], bool]] = None):
+        self.widget = widget
+        self.channel = channel
+        self.handler = handler
+        self.interval_ms = interval_ms
+        self.keep_running = keep_running
+        self._after_id = None
+
+    @property
+    def running(self) -> bool:
+        return self._after_id is not None
+
+    def start(self) -> None:
+        if self._after_id is None:
+            self._after_id = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self) -> None:
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def flush(self) -> bool:
+        """Apply pending updates immediately (Tk thread only); True if there were some."""
+        batch = self.channel.drain()
+        if batch:
+            try:
+                self.handler(batch)
+            except Exception:
+                logger.exception('Progress handler failed')
+        return bool(batch)
+
+    def _tick(self) -> None:
+        self._after_id = None
+        busy = self.keep_running is None or self.keep_running()
+        if not self.flush() and not busy:
+            return
+        try:
+            if self.widget.winfo_exists():
+                self._after_id = self.widget.after(self.interval_ms, self._tick)
+        except Exception:
+            # Widget destroyed: let the pump die
+            pass
@@ -0,0 +1,148 @@
+"""Company records without the GUI: save, query and generation values.
+
+Shared by the command line (src/cli.py) and the local API (src/api.py).
+A company *aggregate* is the values dict the forms produce and
+`render_templates` consumes:
+
+    {'societe': {'denomination': ..., ...},
+     'associes': [{'nom': ..., ...}, ...],
+     'contrat': {'date_debut': ..., ...}}
+
+Writes go through the shared DataStore, so they are coordinated with the
+other PCs using the workbook (see src/utils/coordinator.py). Nothing here
+imports tkinter.
+"""
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import constants as _const
+from .contracts import renewal_values
+from .schema import to_text
+from .search import PREFIX, SUBSTRING, SearchIndex
+from .sorting import as_text
+from .store import DataStore
+
+logger = logging.getLogger(__name__)
+
+# Société columns returned by queries (the full row with `columns=None`)
+SUMMARY_COLUMNS = ['ID_SOCIETE', 'DEN_STE', 'FORME_JUR', 'ICE', 'STE_ADRESS', 'TRIBUNAL']
+
+
+class DuplicateCompanyError(ValueError):
+    """A société with the same name already exists in the database."""
+
+
+def open_store(path=None, prepare: bool = False) -> DataStore:
+    """Loaded store of the database at `path` (the application database by default).
+
+    With `prepare`, the workbook is created if missing and legacy sheets are
+    migrated first, as the application does before saving.
+    """
+    from .storage import bootstrap_database, default_db_path, migrate_excel_workbook
+    from .coordinator import WriteCoordinator
+
+    path = Path(path) if path is not None else default_db_path()
+    if prepare:
+        bootstrap_database(path, _const.excel_sheets)
+        try:
+            with WriteCoordinator.instance(path).transaction():
+                migrate_excel_workbook(path)
+        except Exception:
+            logger.exception('Migration of legacy sheets failed')
+    store = DataStore.instance(path)
+    store.load()
+    return store
+
+
+def _aggregate(values: Dict) -> Dict:
+    if not isinstance(values, dict):
+        raise ValueError('A company aggregate must be an object with societe/associes/contrat')
+    return {
+        'societe': dict(values.get('societe') or {}),
+        'associes': [dict(a) for a in values.get('associes') or []],
+        'contrat': dict(values.get('contrat') or {}),
+    }
+
+
+def company_exists(store: DataStore, name: str) -> bool:
+    societes = store.table('Societes')
+    target = (name or '').strip().lower()
+    if not target or 'DEN_STE' not in societes.columns:
+        return False
+    return bool((as_text(societes['DEN_STE']).str.strip().str.lower() == target).any())
+
+
+def save_company(store: DataStore, values: Dict, allow_duplicate: bool = False) -> Dict[str, List[str]]:
+    """Save one aggregate; returns the new IDs per sheet.
+
+    Raises DuplicateCompanyError when the société name already exists (the
+    GUI forbids duplicates too) unless `allow_duplicate`.
+    """
+    values = _aggregate(values)
+    name = values['societe'].get('denomination') or values['societe'].get('DEN_STE')
+    if name and not allow_duplicate and company_exists(store, name):
+        raise DuplicateCompanyError(f"La société '{name}' existe déjà dans la base")
+    changes = store.save_records(values['societe'], values['associes'], values['contrat'])
+    return {change.table: list(change.keys) for change in changes}
+
+
+def find_companies(store: DataStore, query: str = '', ids: Iterable = (), prefix: bool = False,
+                   limit: Optional[int] = None, columns: Optional[List[str]] = SUMMARY_COLUMNS) -> pd.DataFrame:
+    """Sociétés matching `query` (dashboard search rules) and/or with the given IDs, as text."""
+    societes = store.table('Societes')
+    positions = np.arange(len(societes))
+    if query:
+        positions = SearchIndex(societes).search(query, PREFIX if prefix else SUBSTRING)
+    ids = {str(i).strip() for i in ids}
+    if ids:
+        keys = as_text(societes['ID_SOCIETE']).str.strip().to_numpy(dtype=object)
+        positions = positions[np.isin(keys[positions], list(ids))]
+    if limit is not None:
+        positions = positions[:limit]
+    rows = societes.iloc[positions]
+    if columns is not None:
+        rows = rows.reindex(columns=[c for c in columns if c in societes.columns])
+    return to_text(rows).reset_index(drop=True)
+
+
+def company_values(store: DataStore, societe_ids: Iterable) -> List[Dict]:
+    """Generation aggregates of the given sociétés (with their latest contract), in the given order."""
+    ids = [str(i).strip() for i in societe_ids]
+    contrats = store.table('Contrats')
+    latest = {}
+    if 'ID_SOCIETE' in contrats.columns:
+        keys = as_text(contrats['ID_SOCIETE']).str.strip()
+        linked = keys.isin(ids) & ~keys.duplicated(keep='last')
+        latest = dict(zip(keys[linked], to_text(contrats[linked]).to_dict('records')))
+    rows = [latest.get(sid, {'ID_SOCIETE': sid}) for sid in ids]
+    return renewal_values(pd.DataFrame(rows, columns=list(contrats.columns) or ['ID_SOCIETE']).fillna(''),
+                          store.table('Societes'), store.table('Associes'))
+
+
+def template_paths(templates: Optional[Iterable[str]], templates_dir=None) -> Optional[List[str]]:
+    """Template file paths (names are looked up in `templates_dir`, Models/ by default); None for all."""
+    from .storage import MODELS_DIR
+
+    if not templates:
+        return None
+    templates_dir = Path(templates_dir) if templates_dir is not None else MODELS_DIR
+    return [str(t if Path(t).is_absolute() else templates_dir / t) for t in templates]
+
+
+def generate(values: Dict, templates_dir=None, out_dir=None, to_pdf: bool = False,
+             templates_list: Optional[List[str]] = None, **kwargs) -> List[Dict]:
+    """Run `render_templates` for one aggregate (all models of `templates_dir`, Models/ by default).
+
+    Takes the `render_templates` arguments, so it is the JobScheduler runner
+    of both the command line and the API.
+    """
+    from .doc_generator import render_templates
+    from .storage import MODELS_DIR
+
+    templates_dir = Path(templates_dir) if templates_dir is not None else MODELS_DIR
+    return render_templates(_aggregate(values), templates_dir, out_dir, to_pdf=to_pdf,
+                            templates_list=templates_list, **kwargs)
@@ -0,0 +1,151 @@
+"""Typed in-memory schema of the canonical sheets.
+
+The workbook is read as strings, which keeps every cell as a Python object.
+`to_typed(df, sheet)` converts each column according to its kind, derived
+from the headers in `constants.excel_sheets`:
+
+- CATEGORY: low-cardinality text (legal form, tribunal, address, ...) as
+  pandas categoricals, so filters and groupbys work on integer codes;
+- ID: ID_* columns as nullable integers (Int64);
+- NUMBER: amounts, parts and periods as float64;
+- DATE: DATE_* and DOM_* dates as datetime64;
+- TEXT: everything else stays as strings.
+
+A column is only typed when every value converts and formats back to the
+exact same text; otherwise ('10 000', '06', '1/3/2025', ...) it is left as
+text, so no value is ever changed when the tables are written back. `to_text` turns any
+frame back into display strings and `to_cells` into workbook cell values
+(dates as dd/mm/yyyy strings, like write_records_to_db stores them).
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from . import constants as _const
+from .sorting import NUMERIC_COLUMNS, as_text, is_date_column, parse_dates, parse_numbers
+
+logger = logging.getLogger(__name__)
+
+TEXT = 'text'
+CATEGORY = 'category'
+ID = 'id'
+NUMBER = 'number'
+DATE = 'date'
+
+# Few distinct values, repeated on many rows
+CATEGORY_COLUMNS = ('FORME_JUR', 'TRIBUNAL', 'NATIONALITY', 'CIVIL', 'QUALITY', 'IS_GERANT', 'STE_ADRESS')
+ID_PREFIX = 'ID_'
+# Canonical data sheets (the reference sheets are tiny lists of strings)
+DATA_SHEETS = ('Societes', 'Associes', 'Contrats')
+
+
+def column_kind(column: str) -> str:
+    if column.startswith(ID_PREFIX):
+        return ID
+    if column in CATEGORY_COLUMNS:
+        return CATEGORY
+    if column in NUMERIC_COLUMNS:
+        return NUMBER
+    if is_date_column(column):
+        return DATE
+    return TEXT
+
+
+SCHEMA: Dict[str, Dict[str, str]] = {
+    sheet: {column: column_kind(column) for column in _const.excel_sheets[sheet]} for sheet in DATA_SHEETS
+}
+
+
+def _typed_column(series: pd.Series, kind: str) -> pd.Series:
+    text = as_text(series).str.strip()
+    if kind == CATEGORY:
+        return text.astype('category')
+    converted = parse_dates(text) if kind == DATE else parse_numbers(text, strict=True)
+    present = text != ''
+    unconverted = converted[present].isna().any()
+    if not unconverted and kind == ID:
+        unconverted = not (converted[present] % 1 == 0).all()
+    if not unconverted:
+        # Typed values must read back as the original text once written
+        unconverted = not (as_text(converted) == as_text(series)).all()
+    if unconverted:
+        # Keep the strings rather than lose the values that do not convert
+        logger.debug('Column %s kept as text: values that do not convert exactly', series.name)
+        return as_text(series)
+    if kind == ID:
+        return converted.astype('Int64')
+    return converted
+
+
+def _is_typed(series: pd.Series, kind: str) -> bool:
+    dtype = series.dtype
+    if kind == CATEGORY:
+        return isinstance(dtype, pd.CategoricalDtype)
+    if kind == ID:
+        return isinstance(dtype, pd.Int64Dtype)
+    if kind == NUMBER:
+        return pd.api.types.is_float_dtype(dtype)
+    if kind == DATE:
+        return pd.api.types.is_datetime64_any_dtype(dtype)
+    # Text columns are normalised to str values (as_text is cheap on them)
+    return False
+
+
+def to_typed(df: pd.DataFrame, sheet: Optional[str] = None) -> pd.DataFrame:
+    """Compact typed copy of a canonical table read as strings.
+
+    Columns are typed from the sheet's schema when `sheet` is given, else
+    from their names; columns that are already typed are left untouched.
+    """
+    kinds = SCHEMA.get(sheet, {})
+    typed = {}
+    for column in df.columns:
+        series = df[column]
+        kind = kinds.get(column) or column_kind(str(column))
+        if _is_typed(series, kind):
+            typed[column] = series
+        elif kind == TEXT:
+            typed[column] = as_text(series)
+        else:
+            typed[column] = _typed_column(series, kind)
+    return pd.DataFrame(typed, index=df.index)
+
+
+def to_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Display strings for every column ('' when missing)."""
+    return pd.DataFrame({column: as_text(df[column]) for column in df.columns}, index=df.index)
+
+
+def row_text(row: pd.Series) -> dict:
+    """One row (e.g. a selected dashboard row) as a dict of display strings."""
+    return dict(zip(row.index, as_text(pd.Series(list(row), dtype=object))))
+
+
+def to_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """Workbook cell values: dates as dd/mm/yyyy text, numbers as numbers, None when missing."""
+    cells = {}
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            series = as_text(series).replace('', None)
+        cells[column] = series.astype(object).where(series.notna(), None)
+    return pd.DataFrame(cells, index=df.index)
+
+
+def concat(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate typed tables, keeping categoricals categorical (categories are merged)."""
+    frames = list(frames)
+    # Empty frames carry no dtype information and would turn typed columns to object
+    frames = [f for f in frames if len(f)] or frames[:1]
+    for column in {c for f in frames for c in f.columns}:
+        parts = [f[column] for f in frames if column in f.columns]
+        if len(parts) > 1 and all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            dtype = pd.CategoricalDtype(pd.api.types.union_categoricals(parts, ignore_order=True).categories)
+            frames = [f.astype({column: dtype}) if column in f.columns else f for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    """Memory held by a frame, counting the Python string objects."""
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,124 @@
+"""Vectorized search over the dashboard DataFrames.
+
+A SearchIndex precomputes, once per data load, a normalized (lowercase,
+accent-free) haystack per row built from the searchable columns, plus a
+digits-only haystack for phone numbers. A query is split into tokens; a row
+matches when every token matches it, either as a substring anywhere or, in
+prefix mode, at the start of a word. Queries that only refine the previous
+one (typing more characters) are evaluated on the previous result only.
+"""
+import re
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .sorting import as_text
+
+# Columns searched when present in the DataFrame (all columns otherwise)
+SEARCH_COLUMNS = ('DEN_STE', 'ICE', 'CIN_NUM', 'NOM', 'PRENOM', 'PHONE')
+PHONE_COLUMNS = ('PHONE',)
+# Shorter digit tokens would match nearly every phone number
+MIN_PHONE_DIGITS = 3
+
+SUBSTRING = 'substring'
+PREFIX = 'prefix'
+
+_SEP = '\x1f'
+_PHONE_TOKEN = re.compile(r'^[\d\s+().-]*\d[\d\s+().-]*$')
+
+
+def normalize_text(value) -> str:
+    """Lowercase, accent-free form of `value` ('Société' -> 'societe')."""
+    return normalize_series(pd.Series([value])).iloc[0]
+
+
+def normalize_series(series: pd.Series) -> pd.Series:
+    return (as_text(series)
+            .str.normalize('NFKD')
+            .str.replace('[\u0300-\u036f]', '', regex=True)
+            .str.casefold())
+
+
+def _digits(series: pd.Series) -> pd.Series:
+    return as_text(series).str.replace(r'\D', '', regex=True)
+
+
+def _haystack(parts: List[pd.Series], size: int) -> pd.Series:
+    """One string per row where every word starts with _SEP.
+
+    With that layout a substring match is `token in row` and a word-prefix
+    match is `_SEP + token in row`, both plain (non-regex) scans.
+    """
+    if not parts:
+        return pd.Series([''] * size, dtype=object)
+    columns = [as_text(part).tolist() for part in parts]
+    # A single pass over row tuples is several times faster than chaining
+    # Series concatenations and a regex replace
+    return pd.Series([_SEP + _SEP.join(' '.join(row).split()) for row in zip(*columns)], dtype=object)
+
+
+class SearchIndex:
+    """Precomputed search haystacks for one DataFrame (positional results)."""
+
+    def __init__(self, df: pd.DataFrame, columns: Optional[Iterable[str]] = None,
+                 phone_columns: Sequence[str] = PHONE_COLUMNS):
+        wanted = list(columns) if columns is not None else list(SEARCH_COLUMNS)
+        cols = [c for c in wanted if c in df.columns] or list(df.columns)
+        self.columns = cols
+        self.size = len(df)
+        # Normalize the joined row once rather than each column separately
+        self._text = normalize_series(_haystack([df[c] for c in cols], self.size))
+        phones = [_digits(df[c]) for c in phone_columns if c in df.columns]
+        self._phones = _haystack(phones, self.size) if phones else None
+        self._last = None
+
+    def search(self, query: str, mode: str = SUBSTRING) -> np.ndarray:
+        """Return the positions (ascending) of the rows matching `query`."""
+        query = (query or '').strip()
+        if _PHONE_TOKEN.match(query):
+            # '06 12 34 56 78' is one phone number, not five tokens
+            tokens = [re.sub(r'\s+', '', query)]
+        else:
+            tokens = normalize_text(query).split()
+        if not tokens:
+            return np.arange(self.size)
+
+        positions = np.arange(self.size)
+        if self._last is not None:
+            last_mode, last_tokens, last_positions = self._last
+            if last_mode == mode and self._refines(last_tokens, tokens, mode):
+                positions = last_positions
+
+        for token in tokens:
+            if not len(positions):
+                break
+            positions = positions[self._match(token, mode, positions)]
+
+        self._last = (mode, tokens, positions)
+        return positions
+
+    @staticmethod
+    def _refines(old: List[str], new: List[str], mode: str) -> bool:
+        # Matches of `new` are a subset of matches of `old` when each old token
+        # is contained in (substring mode) / a prefix of (prefix mode) the new one
+        if len(new) < len(old):
+            return False
+        if mode == PREFIX:
+            return all(n.startswith(o) for o, n in zip(old, new))
+        return all(o in n for o, n in zip(old, new))
+
+    def _match(self, token: str, mode: str, positions: np.ndarray) -> np.ndarray:
+        full = len(positions) == self.size
+        text = self._text if full else self._text.iloc[positions]
+        mask = self._contains(text, token, mode)
+        digits = re.sub(r'\D', '', token)
+        if self._phones is not None and len(digits) >= MIN_PHONE_DIGITS and _PHONE_TOKEN.match(token):
+            phones = self._phones if full else self._phones.iloc[positions]
+            mask |= self._contains(phones, digits, mode)
+        return mask
+
+    @staticmethod
+    def _contains(haystack: pd.Series, token: str, mode: str) -> np.ndarray:
+        needle = _SEP + token if mode == PREFIX else token
+        return haystack.str.contains(needle, regex=False).to_numpy(dtype=bool)
@@ -0,0 +1,212 @@
+"""Binary snapshot of the canonical sheets next to the xlsx database.
+
+Parsing the workbook (zip inflation, XML, one object per cell) is the
+slowest read in the application. `read_tables(path)` keeps a binary copy
+of the Societes/Associes/Contrats frames in `.<workbook name>.snapshot`
+(same folder) and returns it instead of parsing, as long as the workbook is
+the one the snapshot was taken from:
+
+- same size and mtime: the snapshot is used as is;
+- same size but another mtime (file copied, touched, restored): the
+  workbook's SHA-256 decides, and a match refreshes the stored mtime;
+- anything else means the workbook was edited outside the application: it
+  is parsed once and the snapshot rewritten.
+
+Frames are returned typed (categoricals, nullable int IDs, floats, dates;
+see src/utils/schema.py) and stored that way, which also makes the
+snapshot smaller and faster to load than the string frames. The file is a
+numpy .npz archive of plain arrays (text as one UTF-8 buffer plus offsets)
+read with `allow_pickle=False`: the snapshot sits next to the workbook on
+the shared drive, so loading it must never be able to run code.
+
+After the application writes the workbook itself, `save_snapshot(path,
+tables)` records the frames it already has in memory so the next read does
+not parse either. The snapshot is only a cache: deleting it is always safe.
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import constants as _const
+from .schema import to_typed
+from .sorting import as_text
+
+logger = logging.getLogger(__name__)
+
+# Sheets kept in the snapshot
+SNAPSHOT_SHEETS = ('Societes', 'Associes', 'Contrats')
+# Bumped whenever the stored layout or the typing rules change; older snapshots are ignored
+FORMAT_VERSION = 4
+# Column encodings: plain numpy array, nullable int (values + mask),
+# categorical (codes + text categories), text
+_ARRAY, _INT, _CATEGORY, _TEXT = 'array', 'int', 'category', 'text'
+# (resolved path, size, mtime_ns) -> SHA-256 of the files hashed lately
+_DIGESTS: Dict[tuple, str] = {}
+_MAX_DIGESTS = 64
+
+
+def snapshot_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(f'.{path.name}.snapshot')
+
+
+def file_digest(path) -> str:
+    """SHA-256 of the file, computed once per (size, mtime) of it.
+
+    A write is hashed by save_snapshot and again by the backup of the same
+    state; the second call is served from the cache.
+    """
+    size, mtime_ns = _stat(path)
+    key = (str(Path(path).resolve()), size, mtime_ns)
+    cached = _DIGESTS.get(key)
+    if cached is not None:
+        return cached
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    if len(_DIGESTS) >= _MAX_DIGESTS:
+        _DIGESTS.clear()
+    _DIGESTS[key] = digest.hexdigest()
+    return _DIGESTS[key]
+
+
+def _stat(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def parse_tables(path, sheets: Iterable[str] = SNAPSHOT_SHEETS) -> Dict[str, pd.DataFrame]:
+    """Parse the canonical sheets from the workbook (one zip/XML pass for all of them), typed."""
+    tables = {}
+    with pd.ExcelFile(path, engine='openpyxl') as workbook:
+        for name in sheets:
+            try:
+                tables[name] = to_typed(workbook.parse(name, dtype=str).fillna(''), name)
+            except Exception as e:
+                logger.warning("Error loading sheet %s: %s", name, e)
+                tables[name] = pd.DataFrame(columns=_const.excel_sheets.get(name, []))
+    return tables
+
+
+def _encode_text(values) -> Dict[str, np.ndarray]:
+    values = [str(v) for v in values]
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    return {'text': np.frombuffer(''.join(values).encode('utf-8'), dtype=np.uint8), 'offsets': offsets}
+
+
+def _decode_text(arrays, prefix: str) -> np.ndarray:
+    text = arrays[f'{prefix}text'].tobytes().decode('utf-8')
+    offsets = arrays[f'{prefix}offsets'].tolist()
+    return np.array([text[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)], dtype=object)
+
+
+def _encode_column(series: pd.Series):
+    """(encoding, arrays) of one column, with arrays numpy can store without pickling."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) and pd.api.types.infer_dtype(dtype.categories) == 'string':
+        return _CATEGORY, {'codes': series.cat.codes.to_numpy(), **_encode_text(dtype.categories)}
+    if isinstance(dtype, pd.Int64Dtype):
+        return _INT, {'values': series.to_numpy(dtype=np.int64, na_value=0), 'mask': series.isna().to_numpy()}
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biufM':
+        return _ARRAY, {'values': series.to_numpy()}
+    # Text and anything mixed: stored as the display text, which is what gets written back
+    return _TEXT, _encode_text(as_text(series))
+
+
+def _decode_column(arrays, prefix: str, encoding: str) -> pd.Series:
+    if encoding == _CATEGORY:
+        categories = _decode_text(arrays, prefix)
+        return pd.Series(pd.Categorical.from_codes(arrays[f'{prefix}codes'], categories=categories))
+    if encoding == _INT:
+        return pd.Series(pd.arrays.IntegerArray(arrays[f'{prefix}values'], arrays[f'{prefix}mask']))
+    if encoding == _ARRAY:
+        return pd.Series(arrays[f'{prefix}values'])
+    return pd.Series(_decode_text(arrays, prefix), dtype=object)
+
+
+def _load_snapshot(path) -> Optional[dict]:
+    try:
+        with np.load(snapshot_path(path), allow_pickle=False) as arrays:
+            data = json.loads(arrays['meta'].tobytes().decode('utf-8'))
+            if not isinstance(data, dict) or data.get('format') != FORMAT_VERSION:
+                return None
+            tables = {}
+            for t, (name, columns) in enumerate(data['tables'].items()):
+                series = {column: _decode_column(arrays, f'{t}_{c}_', encoding)
+                          for c, (column, encoding) in enumerate(columns)}
+                tables[name] = pd.DataFrame(series, columns=[column for column, _ in columns],
+                                            index=pd.RangeIndex(data['rows'][name]))
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning('Ignoring unreadable snapshot of %s', path, exc_info=True)
+        return None
+    data['tables'] = tables
+    return data
+
+
+def _write_snapshot(path, data: dict):
+    target = snapshot_path(path)
+    tmp = target.with_name(target.name + '.tmp')
+    try:
+        meta = {key: value for key, value in data.items() if key != 'tables'}
+        meta['tables'], meta['rows'] = {}, {}
+        arrays = {}
+        for t, (name, df) in enumerate(data['tables'].items()):
+            columns = []
+            for c, column in enumerate(df.columns):
+                encoding, column_arrays = _encode_column(df[column])
+                columns.append((str(column), encoding))
+                arrays.update({f'{t}_{c}_{key}': value for key, value in column_arrays.items()})
+            meta['tables'][name] = columns
+            meta['rows'][name] = len(df)
+        arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, target)
+    except Exception:
+        logger.warning('Failed to write snapshot of %s', path, exc_info=True)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def save_snapshot(path, tables: Dict[str, pd.DataFrame]):
+    """Record `tables` as the content of the workbook at `path` as it is now on disk."""
+    try:
+        size, mtime_ns = _stat(path)
+        digest = file_digest(path)
+    except OSError:
+        return
+    _write_snapshot(path, {
+        'format': FORMAT_VERSION, 'size': size, 'mtime_ns': mtime_ns, 'sha256': digest,
+        'tables': {name: tables[name] for name in SNAPSHOT_SHEETS if name in tables},
+    })
+
+
+def read_tables(path) -> Dict[str, pd.DataFrame]:
+    """Canonical sheets of the workbook, from the snapshot whenever it is still valid."""
+    size, mtime_ns = _stat(path)
+    data = _load_snapshot(path)
+    if data is not None and data.get('size') == size and set(SNAPSHOT_SHEETS) <= set(data.get('tables', {})):
+        if data.get('mtime_ns') == mtime_ns:
+            return data['tables']
+        digest = file_digest(path)
+        if data.get('sha256') == digest:
+            data['mtime_ns'] = mtime_ns
+            _write_snapshot(path, data)
+            return data['tables']
+
+    logger.info('Parsing %s (snapshot missing or outdated)', Path(path).name)
+    tables = parse_tables(path)
+    save_snapshot(path, tables)
+    return tables
@@ -0,0 +1,154 @@
+"""Cached sort permutations for the dashboard tables.
+
+A SortCache belongs to one DataFrame. The first time a column is sorted its
+sort key is derived (real dates for DATE_* columns, numbers for amounts,
+natural order for text) and the ascending/descending row permutations are
+stored; toggling between columns afterwards is a dictionary lookup. Build a
+new SortCache when the data changes.
+"""
+import re
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Columns holding dd/mm/yyyy dates
+DATE_COLUMNS = ('DOM_DATEDEB', 'DOM_DATEFIN', 'CIN_VALIDATY')
+DATE_PREFIX = 'DATE_'
+# Columns holding amounts / counts, possibly formatted ('10 000', '1 500,50')
+NUMERIC_COLUMNS = ('CAPITAL', 'PART_SOCIAL', 'PARTS', 'CAPITAL_DETENU', 'PERIOD_DOMCIL',
+                   'PRIX_CONTRAT', 'PRIX_INTERMEDIARE_CONTRAT')
+
+_DIGIT_RUNS = re.compile(r'(\d+)')
+
+
+def is_date_column(column: str) -> bool:
+    return column.startswith(DATE_PREFIX) or column in DATE_COLUMNS
+
+
+def _cell_text(value) -> str:
+    if hasattr(value, 'strftime'):
+        return value.strftime('%d/%m/%Y')
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def as_text(series: pd.Series) -> pd.Series:
+    """Values as display strings whatever the dtype ('' for missing, dd/mm/yyyy dates, 12 not 12.0).
+
+    Typed columns (see src/utils/schema.py) are formatted once per distinct value.
+    """
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=False) == 'string':
+        return series
+    codes, uniques = pd.factorize(series)
+    texts = np.array([_cell_text(u) for u in uniques] + [''], dtype=object)
+    return pd.Series(texts[codes], index=series.index)
+
+
+def _per_unique(series: pd.Series, parse) -> pd.Series:
+    """Apply `parse` to the distinct values of `series` only and broadcast the result back.
+
+    Dates, prices and periods repeat a lot, so this parses a few hundred
+    strings instead of every row.
+    """
+    codes, uniques = pd.factorize(as_text(series))
+    parsed = parse(pd.Series(uniques, dtype=object)).to_numpy()
+    return pd.Series(parsed[codes], index=series.index)
+
+
+def _parse_date_text(text: pd.Series) -> pd.Series:
+    text = text.str.strip()
+    parsed = pd.to_datetime(text, format='%d/%m/%Y', errors='coerce')
+    rest = parsed.isna() & (text != '')
+    if rest.any():
+        # Excel exports may contain ISO dates or full timestamps
+        parsed[rest] = pd.to_datetime(text[rest], errors='coerce', format='mixed', dayfirst=True)
+    return parsed
+
+
+def parse_dates(series: pd.Series) -> pd.Series:
+    """dd/mm/yyyy strings (or ISO dates/timestamps) to datetimes, NaT when unparsable."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return _per_unique(series, _parse_date_text)
+
+
+def parse_numbers(series: pd.Series, strict: bool = False) -> pd.Series:
+    """'10 000' / '1 500,50' to floats, NaN when empty or not a number.
+
+    Unless `strict`, other characters are dropped too ('1500 MAD' -> 1500).
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return pd.Series(series.to_numpy(dtype=float, na_value=np.nan), index=series.index)
+
+    def parse(text):
+        text = (text.str.replace('[\\s\u00a0\u202f]', '', regex=True)
+                .str.replace(',', '.', regex=False))
+        if not strict:
+            text = text.str.replace(r'[^\d.+-]', '', regex=True)
+        return pd.to_numeric(text, errors='coerce').astype(float)
+    return _per_unique(series, parse)
+
+
+def natural_key(value) -> Tuple:
+    """Case-insensitive key ordering 'Lot 9' before 'Lot 10'."""
+    parts = _DIGIT_RUNS.split(str(value).casefold())
+    return tuple((0, int(p), '') if p.isdigit() else (1, 0, p) for p in parts if p)
+
+
+class SortCache:
+    """Ascending/descending row permutations per column, computed once."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._perms: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def permutation(self, column: str, ascending: bool = True) -> np.ndarray:
+        """Positions of the rows ordered by `column`; empty values always come last."""
+        perms = self._perms.get(column)
+        if perms is None:
+            perms = self._build(column)
+            self._perms[column] = perms
+        return perms[0] if ascending else perms[1]
+
+    def _build(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(self.df)
+        if column not in self.df.columns:
+            identity = np.arange(n)
+            return identity, identity
+        series = self.df[column].reset_index(drop=True)
+
+        if is_date_column(column) or pd.api.types.is_datetime64_any_dtype(series):
+            keys = parse_dates(series)
+            missing = keys.isna().to_numpy()
+            keys = keys.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            # Natural order of the few categories, then rows by category rank
+            categories = [str(c) for c in series.cat.categories]
+            ranks = np.empty(len(categories) + 1)
+            ranks[sorted(range(len(categories)), key=lambda i: natural_key(categories[i]))] = np.arange(len(categories))
+            codes = series.cat.codes.to_numpy()
+            empty = np.array([c.strip() == '' for c in categories] + [True])
+            missing = empty[codes]
+            keys = ranks[codes]
+        else:
+            known = column in NUMERIC_COLUMNS
+            # Other columns sort numerically only if every value is a plain number
+            numbers = parse_numbers(series, strict=not known)
+            text_present = as_text(series).str.strip() != ''
+            if known or (text_present.any() and numbers[text_present].notna().all()):
+                missing = numbers.isna().to_numpy()
+                keys = numbers.to_numpy(dtype=float)
+            else:
+                missing = ~text_present.to_numpy()
+                keys = None
+
+        present = np.flatnonzero(~missing)
+        absent = np.flatnonzero(missing)
+        if keys is None:
+            values = series.to_numpy()
+            ordered = np.array(sorted(present, key=lambda i: natural_key(values[i])), dtype=np.intp)
+        else:
+            ordered = present[np.argsort(keys[present], kind='stable')]
+        return np.concatenate([ordered, absent]), np.concatenate([ordered[::-1], absent])
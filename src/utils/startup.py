@@ -0,0 +1,120 @@
+"""Startup-time helpers: deferred loading of the data stack and measurements.
+
+The GUI must not pay for pandas/openpyxl before its first window appears.
+`preload_in_background()` imports them on a daemon thread once the window is
+shown, so the first save or dashboard open does not stall either.
+
+`measure_import_time()` and `measure_time_to_first_frame()` run a fresh
+interpreter so results reflect a cold(ish) start; STARTUP_BUDGET holds the
+regression budget enforced by tests/test_startup_budget.py. Run
+`python -m src.utils.startup` to print the current numbers.
+"""
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Modules that must not be imported before the first frame
+HEAVY_MODULES = ('pandas', 'openpyxl', 'numpy', 'docxtpl')
+
+# Regression budget (seconds), deliberately generous for slow office PCs/CI
+STARTUP_BUDGET = {
+    'import_seconds': 1.5,
+    'first_frame_seconds': 5.0,
+}
+
+ROOT_DIR = Path(__file__).resolve().parent.parent.parent
+
+_preload_thread: Optional[threading.Thread] = None
+
+
+def preload_in_background(modules: Iterable[str] = ('pandas', 'openpyxl')) -> threading.Thread:
+    """Import `modules` on a daemon thread (idempotent) and return the thread."""
+    global _preload_thread
+    if _preload_thread is not None:
+        return _preload_thread
+
+    names = tuple(modules)
+
+    def _run():
+        import importlib
+        import time
+        start = time.perf_counter()
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                logger.debug('Background preload of %s failed', name, exc_info=True)
+        logger.info('Preloaded %s in %.3fs', ', '.join(names), time.perf_counter() - start)
+
+    _preload_thread = threading.Thread(target=_run, name='preload-data-stack', daemon=True)
+    _preload_thread.start()
+    return _preload_thread
+
+
+def _run_probe(code: str, timeout: float = 120.0) -> Dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = str(ROOT_DIR) + os.pathsep + env.get('PYTHONPATH', '')
+    proc = subprocess.run([sys.executable, '-c', code], cwd=str(ROOT_DIR), env=env,
+                          capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        raise RuntimeError(f'Startup probe failed: {proc.stderr.strip()}')
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure_import_time(module: str = 'main') -> Dict:
+    """Import `module` in a fresh interpreter.
+
+    Returns {'module', 'import_seconds', 'heavy_modules_loaded'}.
+    """
+    code = (
+        "import json, sys, time\n"
+        "t0 = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - t0\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        f"print(json.dumps({{'module': {module!r}, 'import_seconds': elapsed, 'heavy_modules_loaded': heavy}}))\n"
+    )
+    return _run_probe(code)
+
+
+def measure_time_to_first_frame() -> Dict:
+    """Start MainApp in a fresh interpreter and time until its first frame is drawn.
+
+    Requires a display (use Xvfb on headless machines). Returns
+    {'first_frame_seconds', 'heavy_modules_loaded'} where the latter lists the
+    heavy modules already imported when the frame was drawn.
+    """
+    code = (
+        "import json, sys, time\n"
+        "t0 = time.perf_counter()\n"
+        "import main\n"
+        "app = main.MainApp()\n"
+        "app.update_idletasks()\n"
+        "app.update()\n"
+        "elapsed = time.perf_counter() - t0\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "app.destroy()\n"
+        "print(json.dumps({'first_frame_seconds': elapsed, 'heavy_modules_loaded': heavy}))\n"
+    )
+    return _run_probe(code)
+
+
+def has_display() -> bool:
+    """True when Tk can open a window (always assumed on Windows/macOS)."""
+    if sys.platform.startswith('linux'):
+        return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return True
+
+
+if __name__ == '__main__':
+    results = {'budget': STARTUP_BUDGET, 'import': measure_import_time()}
+    if has_display():
+        results['first_frame'] = measure_time_to_first_frame()
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,1090 @@
+"""Workbook storage: creation, reference data, record writes and migration.
+
+Everything here works on the xlsx database with pandas/openpyxl only and
+never imports tkinter, so the command line (src/cli.py), the local API and
+batch scripts can use it without a display. src/utils/utils.py re-exports
+these functions for the GUI code.
+"""
+import datetime
+import json
+import logging
+import os
+import zipfile
+from pathlib import Path
+from pathlib import Path as _Path
+from typing import List, Optional, Tuple
+
+from .perf import timed
+
+# NOTE: pandas and openpyxl are imported inside the functions that need them
+# (see src/utils/startup.py).
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+MODELS_DIR = BASE_DIR / "Models"
+DATABASE_DIR = BASE_DIR / "databases"
+CONFIG_DIR = BASE_DIR / "config"
+DB_PATH_ENV_VAR = "DOMICILIATION_DB"
+# Layout version stamped by bootstrap_database as a custom document property.
+# needs_bootstrap only compares sheet names and this stamp: bump it whenever
+# a column is added to constants.excel_sheets, or existing workbooks never get it.
+SCHEMA_VERSION = 1
+SCHEMA_PROPERTY = "DomiciliationSchemaVersion"
+_MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_CUSTOM_NS = "http://schemas.openxmlformats.org/officeDocument/2006/custom-properties"
+
+
+def default_db_path() -> Path:
+    """Path of the application database (it may not exist yet).
+
+    The DB_PATH_ENV_VAR environment variable points the whole application at
+    another workbook (load tests, GUI latency harness).
+    """
+    from . import constants as _const
+    override = os.environ.get(DB_PATH_ENV_VAR)
+    return Path(override) if override else DATABASE_DIR / _const.DB_FILENAME
+
+
+def ensure_excel_db(path, sheets: dict):
+    """Create an Excel workbook at `path` with given sheets dict (name -> columns).
+
+    The application uses bootstrap_database, which also seeds the reference
+    sheets and stamps the schema version. Idempotent: if the file exists, ensure missing sheets are added with headers.
+    Also attempts to set basic date column formatting where column names contain 'date'.
+    """
+    try:
+        import openpyxl
+        import pandas as pd
+    except Exception:
+        raise RuntimeError('openpyxl is required for ensure_excel_db')
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if not path.exists():
+        # create new workbook
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            for name, cols in sheets.items():
+                pd.DataFrame(columns=cols).to_excel(writer, sheet_name=name, index=False)
+        return
+
+    # If exists, open and add missing sheets
+    wb = openpyxl.load_workbook(path)
+    modified = False
+    for name, cols in sheets.items():
+        if name not in wb.sheetnames:
+            # create sheet with header row
+            ws = wb.create_sheet(title=name)
+            for c, col in enumerate(cols, start=1):
+                ws.cell(row=1, column=c, value=col)
+            modified = True
+    if modified:
+        wb.save(path)
+    return
+
+
+def read_schema(path) -> Tuple[List[str], Optional[int]]:
+    """Sheet names and schema version (None when not stamped) of the workbook at `path`.
+
+    Only xl/workbook.xml and docProps/custom.xml are read from the archive,
+    a few hundred bytes whatever the number of rows.
+    """
+    from xml.etree import ElementTree
+
+    with zipfile.ZipFile(path) as archive:
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        try:
+            custom = archive.read('docProps/custom.xml')
+        except KeyError:
+            custom = None
+    names = [sheet.get('name') for sheet in workbook.iter(f'{{{_MAIN_NS}}}sheet')]
+    version = None
+    if custom is not None:
+        for prop in ElementTree.fromstring(custom).iter(f'{{{_CUSTOM_NS}}}property'):
+            if prop.get('name') == SCHEMA_PROPERTY and len(prop):
+                try:
+                    version = int(prop[0].text)
+                except (TypeError, ValueError):
+                    pass
+    return names, version
+
+
+def needs_bootstrap(path, sheets: Optional[dict] = None) -> bool:
+    """True unless the workbook exists, carries the current schema stamp and all `sheets`."""
+    from . import constants as _const
+
+    sheets = _const.excel_sheets if sheets is None else sheets
+    path = Path(path)
+    if not path.exists():
+        return True
+    try:
+        names, version = read_schema(path)
+    except Exception:
+        # Not a readable package: let the full load report the problem
+        return True
+    return version is None or version < SCHEMA_VERSION or any(name not in names for name in sheets)
+
+
+@timed('bootstrap_database', reads='path', writes='path')
+def bootstrap_database(path, sheets: Optional[dict] = None) -> bool:
+    """Create or complete the workbook at `path` in a single load and save.
+
+    Missing sheets are added with their headers, missing columns are appended
+    to the header row, date columns get the DD/MM/YYYY number format, empty
+    reference sheets are seeded from constants.reference_values and the
+    workbook is stamped with SCHEMA_VERSION. A workbook already stamped with all its sheets is left
+    untouched, checked by read_schema without parsing any sheet. Returns
+    True when the workbook was written.
+    """
+    from openpyxl import Workbook, load_workbook
+    from openpyxl.packaging.custom import IntProperty
+    from openpyxl.utils import get_column_letter
+    from . import constants as _const
+    from .coordinator import WriteCoordinator
+
+    sheets = _const.excel_sheets if sheets is None else sheets
+    path = Path(path)
+    if not needs_bootstrap(path, sheets):
+        return False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with WriteCoordinator.instance(path).transaction():
+        # Another writer may have done it while we waited for the lock
+        if not needs_bootstrap(path, sheets):
+            return False
+        if path.exists():
+            wb = load_workbook(path)
+        else:
+            wb = Workbook()
+            wb.remove(wb.active)
+        for name, cols in sheets.items():
+            if name in wb.sheetnames:
+                ws = wb[name]
+            else:
+                ws = wb.create_sheet(title=name)
+            headers = [cell.value for cell in ws[1]]
+            while headers and headers[-1] is None:
+                headers.pop()
+            # Columns added to the layout since the workbook was created go at the end
+            for col in cols:
+                if col not in headers:
+                    headers.append(col)
+                    ws.cell(row=1, column=len(headers), value=col)
+            values = _const.reference_values.get(name)
+            if values and ws.max_row <= 1:
+                for value in values:
+                    ws.append([value])
+            for idx, col in enumerate(headers, start=1):
+                if isinstance(col, str) and 'DATE' in col.upper():
+                    # The column format also applies to rows typed later in Excel
+                    ws.column_dimensions[get_column_letter(idx)].number_format = 'DD/MM/YYYY'
+                    for row in range(2, ws.max_row + 1):
+                        ws.cell(row=row, column=idx).number_format = 'DD/MM/YYYY'
+
+        props = wb.custom_doc_props
+        props.props = [p for p in props.props if p.name != SCHEMA_PROPERTY]
+        props.append(IntProperty(name=SCHEMA_PROPERTY, value=SCHEMA_VERSION))
+
+        tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+        try:
+            wb.save(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+    logger.info('Database %s bootstrapped (schema %d)', path.name, SCHEMA_VERSION)
+    return True
+
+
+# Reference sheet values keyed by workbook path, valid for a given (size, mtime)
+_REFERENCE_CACHE: dict = {}
+
+
+def _read_reference_sheets(db_path) -> dict:
+    """Read the first column of every reference sheet in a single read-only pass.
+
+    Uses openpyxl in read-only mode (only the requested sheets' XML is parsed,
+    pandas is not imported) and caches the result until the workbook changes
+    on disk, so the four lookups done while building the forms cost one read.
+    """
+    from . import constants as _const
+
+    db_path = _Path(db_path)
+    st = db_path.stat()
+    key = str(db_path.resolve())
+    stamp = (st.st_size, st.st_mtime_ns)
+    cached = _REFERENCE_CACHE.get(key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    from openpyxl import load_workbook
+
+    result = {}
+    ref_sheets = [n for n in _const.excel_sheets if n not in ('Societes', 'Associes', 'Contrats')]
+    wb = load_workbook(db_path, read_only=True, data_only=True)
+    try:
+        for name in ref_sheets:
+            if name not in wb.sheetnames:
+                continue
+            vals = []
+            for (val,) in wb[name].iter_rows(min_row=2, max_col=1, values_only=True):
+                if val is None:
+                    continue
+                if isinstance(val, float) and val.is_integer():
+                    val = int(val)
+                text = str(val).strip()
+                if text:
+                    vals.append(text)
+            result[name] = vals
+    finally:
+        wb.close()
+    _REFERENCE_CACHE[key] = (stamp, result)
+    return result
+
+
+def get_reference_data(sheet_name: str, path: Optional[_Path] = None) -> list:
+    """Load reference data from a reference sheet (SteAdresses, Tribunaux, Activites, Nationalites, LieuxNaissance).
+
+    Returns a list of values from the reference sheet. If the sheet doesn't exist or is empty,
+    returns a fallback list from constants.
+
+    Args:
+        sheet_name: Name of the reference sheet (e.g., 'SteAdresses', 'Tribunaux', etc.)
+        path: Path to the Excel workbook. If not provided, uses default DB path.
+
+    Returns:
+        List of values from the sheet or from constants as fallback.
+    """
+    try:
+        from . import constants as _const
+
+        # Determine the DB path
+        if path is None:
+            db_path = default_db_path()
+        else:
+            db_path = _Path(path)
+
+        fallback_map = _const.reference_values
+
+        if not db_path.exists():
+            # Fallback to constants if DB doesn't exist
+            return list(fallback_map.get(sheet_name, []))
+
+        values = _read_reference_sheets(db_path).get(sheet_name)
+        if not values:
+            # Sheet is missing or empty, use fallback
+            return list(fallback_map.get(sheet_name, []))
+        return list(values)
+
+    except Exception as e:
+        logger.exception('Failed to get reference data for %s: %s', sheet_name, e)
+        # Final fallback to constants
+        try:
+            from . import constants as _const
+            return list(_const.reference_values.get(sheet_name, []))
+        except Exception:
+            return []
+
+
+def initialize_reference_sheets(path):
+    """Seed the empty reference sheets (SteAdresses, Tribunaux, Activites, Nationalites,
+    LieuxNaissance) of an existing workbook with the defaults from constants.
+
+    Kept for callers of the former two-step setup: bootstrap_database does it
+    together with the sheet creation, in the same save.
+    """
+    try:
+        path = Path(path)
+        if not path.exists():
+            return
+        bootstrap_database(path)
+    except Exception as e:
+        logger.exception('Failed to initialize reference sheets: %s', e)
+
+
+def _new_rows(tables) -> int:
+    return sum(len(rows) for rows in (tables or {}).values() if rows is not None)
+
+
+@timed('write_records_to_db', rows=_new_rows, reads='path', writes='path')
+def write_records_to_db(path, societe_vals: dict, associes_list: list, contrat_vals: dict):
+    """Write the provided records into the Excel workbook at `path`.
+
+    This function is idempotent and will compute incremental integer IDs
+    for Societes/Associes/Contrats based on existing rows in the workbook.
+    Date-like fields are converted to datetime so Excel stores them as dates.
+    Returns the new rows (with their IDs) per sheet name.
+    """
+    path = _Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    import pandas as _pd
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter
+
+    # import constants lazily to avoid circular imports
+    from . import constants as _const
+
+    # Helper to load existing sheet into DataFrame safely
+    def _load_sheet_df(sheet_name):
+        try:
+            return _pd.read_excel(path, sheet_name=sheet_name, dtype=str)
+        except Exception:
+            return _pd.DataFrame(columns=_const.excel_sheets.get(sheet_name, []))
+
+    # Helper next ID
+    def _next_id(sheet_name, id_col):
+        df = _load_sheet_df(sheet_name)
+        if id_col in df.columns and not df.empty:
+            try:
+                nums = _pd.to_numeric(df[id_col], errors='coerce').dropna()
+                if not nums.empty:
+                    return int(nums.max()) + 1
+            except Exception:
+                pass
+            return len(df) + 1
+        return 1
+
+    def _to_datetime(val):
+        # Return pandas.Timestamp or None
+        if val is None or (isinstance(val, str) and val.strip() == ''):
+            return None
+        try:
+            return _pd.to_datetime(val, dayfirst=True, errors='coerce')
+        except Exception:
+            return None
+
+    # Build rows aligned with headers
+    soc_df = _pd.DataFrame(columns=_const.societe_headers)
+    assoc_df = _pd.DataFrame(columns=_const.associe_headers)
+    contrat_df = _pd.DataFrame(columns=_const.contrat_headers)
+
+    # Societe
+    if societe_vals:
+        sid = _next_id('Societes', 'ID_SOCIETE')
+        # initialize with None so columns can hold datetimes or numbers
+        row: dict = {h: None for h in _const.societe_headers}
+        row['ID_SOCIETE'] = sid
+        # mapping from form keys to headers (best-effort)
+        mapping = {
+            'denomination': 'DEN_STE',
+            'forme_juridique': 'FORME_JUR',
+            'ice': 'ICE',
+            'date_ice': 'DATE_ICE',
+            'capital': 'CAPITAL',
+            'parts_social': 'PART_SOCIAL',
+            'adresse': 'STE_ADRESS',
+            'tribunal': 'TRIBUNAL'
+        }
+        for k, h in mapping.items():
+            if k in societe_vals:
+                v = societe_vals.get(k)
+                # try to parse dates into datetime and format as dd/mm/yyyy
+                if h.upper().find('DATE') >= 0:
+                    dt = _to_datetime(v)
+                    # Format as dd/mm/yyyy string without time
+                    row[h] = dt.strftime('%d/%m/%Y') if dt is not None else None
+                else:
+                    if v is None:
+                        row[h] = None
+                    elif isinstance(v, bool):
+                        row[h] = int(v)
+                    elif isinstance(v, (int, float)):
+                        row[h] = v
+                    else:
+                        row[h] = str(v)
+        soc_df = _pd.DataFrame([row])
+
+    # Associes
+    if associes_list:
+        aid = _next_id('Associes', 'ID_ASSOCIE')
+        assoc_rows = []
+        # Determine linked societe id
+        linked_sid = soc_df['ID_SOCIETE'].iloc[0] if not soc_df.empty else ''
+        for a in associes_list:
+            if not isinstance(a, dict):
+                continue
+            r: dict = {h: None for h in _const.associe_headers}
+            r['ID_ASSOCIE'] = aid
+            aid += 1
+            r['ID_SOCIETE'] = linked_sid
+            map_a = {
+                'civilite': 'CIVIL', 'prenom': 'PRENOM', 'nom': 'NOM',
+                'nationalite': 'NATIONALITY', 'num_piece': 'CIN_NUM',
+                'validite_piece': 'CIN_VALIDATY', 'date_naiss': 'DATE_NAISS',
+                'lieu_naiss': 'LIEU_NAISS', 'adresse': 'ADRESSE',
+                'telephone': 'PHONE', 'email': 'EMAIL',
+                # forms historically used either 'parts' or 'num_parts'
+                'parts': 'PARTS', 'num_parts': 'PARTS',
+                # form uses 'capital_detenu' variable, store it in CAPITAL_DETENU
+                'capital_detenu': 'CAPITAL_DETENU',
+                'est_gerant': 'IS_GERANT', 'qualite': 'QUALITY'
+            }
+            for k, h in map_a.items():
+                if k in a:
+                    v = a.get(k)
+                    if h.upper().find('DATE') >= 0:
+                        dt = _to_datetime(v)
+                        # Format as dd/mm/yyyy string without time
+                        r[h] = dt.strftime('%d/%m/%Y') if dt is not None else None
+                    else:
+                        if v is None:
+                            r[h] = None
+                        elif isinstance(v, bool):
+                            r[h] = int(v)
+                        elif isinstance(v, (int, float)):
+                            r[h] = v
+                        else:
+                            s = str(v).strip()
+                            # Try numeric conversion for parts / capital
+                            if h in ('PARTS', 'CAPITAL_DETENU'):
+                                try:
+                                    # remove spaces and parse comma/point
+                                    ns = s.replace(' ', '').replace(',', '.')
+                                    if '.' in ns:
+                                        r[h] = float(ns)
+                                    else:
+                                        r[h] = int(ns)
+                                except Exception:
+                                    r[h] = s
+                            else:
+                                r[h] = s
+            assoc_rows.append(r)
+        if assoc_rows:
+            assoc_df = _pd.DataFrame(assoc_rows)
+
+    # Contrat
+    if contrat_vals:
+        cid = _next_id('Contrats', 'ID_CONTRAT')
+        r: dict = {h: None for h in _const.contrat_headers}
+        r['ID_CONTRAT'] = cid
+        r['ID_SOCIETE'] = soc_df['ID_SOCIETE'].iloc[0] if not soc_df.empty else None
+        # Map keys used by ContratForm -> canonical headers
+        map_c = {
+            'date_contrat': 'DATE_CONTRAT',
+            # ContratForm uses 'period'
+            'period': 'PERIOD_DOMCIL',
+            # ContratForm uses 'prix_mensuel' and 'prix_inter'
+            'prix_mensuel': 'PRIX_CONTRAT', 'prix_inter': 'PRIX_INTERMEDIARE_CONTRAT',
+            'date_debut': 'DOM_DATEDEB', 'date_fin': 'DOM_DATEFIN'
+        }
+        for k, h in map_c.items():
+            if k in contrat_vals:
+                v = contrat_vals.get(k)
+                if h.upper().find('DATE') >= 0:
+                    dt = _to_datetime(v)
+                    # Format as dd/mm/yyyy string without time
+                    r[h] = dt.strftime('%d/%m/%Y') if dt is not None else None
+                else:
+                    if v is None:
+                        r[h] = None
+                    elif isinstance(v, (int, float)):
+                        r[h] = v
+                    else:
+                        s = str(v).strip()
+                        # Try to parse prices/numeric fields into numbers
+                        if h in ('PRIX_CONTRAT', 'PRIX_INTERMEDIARE_CONTRAT'):
+                            try:
+                                ns = s.replace(' ', '').replace(',', '.')
+                                if '.' in ns:
+                                    r[h] = float(ns)
+                                else:
+                                    r[h] = int(ns)
+                            except Exception:
+                                r[h] = s
+                        else:
+                            r[h] = s
+        contrat_df = _pd.DataFrame([r])
+
+    new_rows = {'Societes': soc_df, 'Associes': assoc_df, 'Contrats': contrat_df}
+
+    # Write into workbook
+    # If file exists, append; otherwise create fresh workbook
+    if not path.exists():
+        with _pd.ExcelWriter(path, engine='openpyxl') as writer:
+            if not soc_df.empty:
+                soc_df.to_excel(writer, sheet_name='Societes', index=False)
+            else:
+                # ensure header exists
+                _pd.DataFrame(columns=_const.societe_headers).to_excel(writer, sheet_name='Societes', index=False)
+            if not assoc_df.empty:
+                assoc_df.to_excel(writer, sheet_name='Associes', index=False)
+            else:
+                _pd.DataFrame(columns=_const.associe_headers).to_excel(writer, sheet_name='Associes', index=False)
+            if not contrat_df.empty:
+                contrat_df.to_excel(writer, sheet_name='Contrats', index=False)
+            else:
+                _pd.DataFrame(columns=_const.contrat_headers).to_excel(writer, sheet_name='Contrats', index=False)
+        return new_rows
+
+    # Append to existing workbook — safer approach:
+    # For each canonical sheet, read existing data, align columns to canonical headers,
+    # concat the new rows, then write back replacing the sheet. This avoids column
+    # shifts when the existing workbook has a different header layout.
+    try:
+        from . import constants as _const
+        sheets_to_write = [
+            ("Societes", soc_df, _const.societe_headers),
+            ("Associes", assoc_df, _const.associe_headers),
+            ("Contrats", contrat_df, _const.contrat_headers),
+        ]
+
+        for sheet_name, new_df, headers in sheets_to_write:
+            if new_df.empty:
+                # still ensure the sheet exists with correct headers
+                try:
+                    existing = _pd.read_excel(path, sheet_name=sheet_name, dtype=str)
+                except Exception:
+                    existing = _pd.DataFrame(columns=headers)
+                if set(existing.columns) != set(headers):
+                    # rewrite sheet with canonical headers but keep existing rows aligned if possible
+                    existing_aligned = existing.reindex(columns=headers, fill_value='')
+                    try:
+                        with _pd.ExcelWriter(path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+                            existing_aligned.to_excel(writer, sheet_name=sheet_name, index=False)
+                    except TypeError:
+                        # pandas older versions may not support if_sheet_exists; fallback
+                        wb = load_workbook(path)
+                        if sheet_name in wb.sheetnames:
+                            std = wb[sheet_name]
+                            wb.remove(std)
+                            wb.save(path)
+                        with _pd.ExcelWriter(path, engine='openpyxl', mode='a') as writer:
+                            existing_aligned.to_excel(writer, sheet_name=sheet_name, index=False)
+                continue
+
+            # Read existing sheet if present
+            try:
+                existing = _pd.read_excel(path, sheet_name=sheet_name, dtype=str)
+            except Exception:
+                existing = _pd.DataFrame(columns=headers)
+
+            # Reindex both to canonical headers to avoid column shifts
+            existing_aligned = existing.reindex(columns=headers, fill_value='')
+            new_aligned = new_df.reindex(columns=headers, fill_value='')
+
+            # Avoid concatenating empty or all-NA frames to prevent pandas FutureWarning
+            parts = []
+            try:
+                if not existing_aligned.dropna(how='all').empty:
+                    parts.append(existing_aligned)
+            except Exception:
+                # if dropna fails for any reason, fall back to using the raw frame
+                if not existing_aligned.empty:
+                    parts.append(existing_aligned)
+            try:
+                if not new_aligned.dropna(how='all').empty:
+                    parts.append(new_aligned)
+            except Exception:
+                if not new_aligned.empty:
+                    parts.append(new_aligned)
+
+            if parts:
+                combined = _pd.concat(parts, ignore_index=True)
+            else:
+                # both frames empty/all-NA -> produce an empty canonical DataFrame
+                combined = _pd.DataFrame(columns=headers)
+
+            # Write back replacing the sheet — use if_sheet_exists='replace' when available
+            try:
+                with _pd.ExcelWriter(path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+                    combined.to_excel(writer, sheet_name=sheet_name, index=False)
+            except TypeError:
+                # Fallback: remove sheet via openpyxl then append
+                wb = load_workbook(path)
+                if sheet_name in wb.sheetnames:
+                    try:
+                        std = wb[sheet_name]
+                        wb.remove(std)
+                        wb.save(path)
+                    except Exception:
+                        pass
+                with _pd.ExcelWriter(path, engine='openpyxl', mode='a') as writer:
+                    combined.to_excel(writer, sheet_name=sheet_name, index=False)
+    except Exception:
+        # In case of any failure fall back to the previous overlay append method
+        try:
+            with _pd.ExcelWriter(path, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
+                if not soc_df.empty:
+                    if 'Societes' in writer.book.sheetnames:
+                        start = writer.book['Societes'].max_row
+                        soc_df.to_excel(writer, sheet_name='Societes', index=False, header=False, startrow=start)
+                    else:
+                        soc_df.to_excel(writer, sheet_name='Societes', index=False)
+                if not assoc_df.empty:
+                    if 'Associes' in writer.book.sheetnames:
+                        start = writer.book['Associes'].max_row
+                        assoc_df.to_excel(writer, sheet_name='Associes', index=False, header=False, startrow=start)
+                    else:
+                        assoc_df.to_excel(writer, sheet_name='Associes', index=False)
+                if not contrat_df.empty:
+                    if 'Contrats' in writer.book.sheetnames:
+                        start = writer.book['Contrats'].max_row
+                        contrat_df.to_excel(writer, sheet_name='Contrats', index=False, header=False, startrow=start)
+                    else:
+                        contrat_df.to_excel(writer, sheet_name='Contrats', index=False)
+        except Exception:
+            logger.exception('Failed to append records to workbook')
+
+    # After writing/appending, ensure date columns have a proper Excel number format
+    try:
+        from . import constants as _const
+        wb = load_workbook(path)
+        # iterate canonical sheets and apply format to columns whose header contains 'DATE'
+        for sheet_name, headers in [('Societes', _const.societe_headers), ('Associes', _const.associe_headers), ('Contrats', _const.contrat_headers)]:
+            if sheet_name not in wb.sheetnames:
+                continue
+            ws = wb[sheet_name]
+            for idx, hdr in enumerate(headers, start=1):
+                if not hdr:
+                    continue
+                if 'DATE' in hdr.upper():
+                    col_letter = get_column_letter(idx)
+                    for r_i in range(2, ws.max_row + 1):
+                        try:
+                            cell = ws[f"{col_letter}{r_i}"]
+                            cell.number_format = 'DD/MM/YYYY'
+                        except Exception:
+                            pass
+        wb.save(path)
+    except Exception:
+        logger.exception('Failed to apply date number formats after writing records')
+
+    # Try to autofit column widths for all sheets to improve readability
+    try:
+        wb = load_workbook(path)
+        for ws in wb.worksheets:
+            try:
+                # compute max length per column (include header row)
+                for idx, col_cells in enumerate(ws.columns, start=1):
+                    max_len = 0
+                    col_letter = get_column_letter(idx)
+                    for cell in col_cells:
+                        try:
+                            val = cell.value
+                            if val is None:
+                                l = 0
+                            else:
+                                l = len(str(val))
+                            if l > max_len:
+                                max_len = l
+                        except Exception:
+                            continue
+                    # set width with some padding; guard minimum width
+                    width = max(8, float(max_len) + 2)
+                    try:
+                        ws.column_dimensions[col_letter].width = width
+                    except Exception:
+                        pass
+            except Exception:
+                continue
+        # Apply header style and column-specific formatting
+        try:
+            from openpyxl.styles import Font, Alignment, PatternFill
+            header_font = Font(bold=True)
+            header_fill = PatternFill(fill_type='solid', fgColor='DDDDDD')
+            header_align = Alignment(horizontal='center', vertical='center')
+            wrap_align = Alignment(wrap_text=True, vertical='top')
+
+            for ws in wb.worksheets:
+                try:
+                    # header row styling
+                    for cell in list(ws[1]):
+                        try:
+                            cell.font = header_font
+                            cell.fill = header_fill
+                            cell.alignment = header_align
+                        except Exception:
+                            pass
+                    # per-column formatting based on header name
+                    for idx in range(1, ws.max_column + 1):
+                        try:
+                            hdr = ws.cell(row=1, column=idx).value
+                            if not hdr:
+                                continue
+                            h = str(hdr).upper()
+                            col_letter = get_column_letter(idx)
+                            # numeric columns (integers)
+                            if h in ('CAPITAL', 'CAPITAL_DETENU', 'PARTS'):
+                                for row_idx in range(2, ws.max_row + 1):
+                                    try:
+                                        c = ws[f"{col_letter}{row_idx}"]
+                                        c.number_format = '#,##0'
+                                        c.alignment = Alignment(horizontal='right', vertical='top')
+                                    except Exception:
+                                        pass
+                            # pricing / currency columns
+                            if h in ('PRIX_CONTRAT', 'PRIX_INTERMEDIARE_CONTRAT'):
+                                for row_idx in range(2, ws.max_row + 1):
+                                    try:
+                                        c = ws[f"{col_letter}{row_idx}"]
+                                        c.number_format = '#,##0.00'
+                                        c.alignment = Alignment(horizontal='right', vertical='top')
+                                    except Exception:
+                                        pass
+                            # phone as text
+                            if h in ('PHONE',):
+                                for row_idx in range(2, ws.max_row + 1):
+                                    try:
+                                        c = ws[f"{col_letter}{row_idx}"]
+                                        c.number_format = '@'
+                                        c.alignment = Alignment(horizontal='left', vertical='top')
+                                    except Exception:
+                                        pass
+                            # long text fields -> wrap
+                            if h in ('ADRESSE', 'STE_ADRESS', 'LIEU_NAISS'):
+                                for row_idx in range(2, ws.max_row + 1):
+                                    try:
+                                        c = ws[f"{col_letter}{row_idx}"]
+                                        c.alignment = wrap_align
+                                    except Exception:
+                                        pass
+                        except Exception:
+                            # if anything fails for this header/column, continue with next
+                            continue
+                    # freeze header row for easier navigation
+                    try:
+                        ws.freeze_panes = ws['A2']
+                    except Exception:
+                        pass
+                except Exception:
+                    continue
+        except Exception:
+            logger.exception('Failed to apply header/column formatting')
+
+        wb.save(path)
+    except Exception:
+        logger.exception('Failed to autofit column widths after writing records')
+    return new_rows
+
+
+def append_rows_to_sheet(path, sheet_name: str, rows) -> int:
+    """Append the rows of a DataFrame to `sheet_name` with a single workbook save.
+
+    Values are aligned on the sheet's header row (missing columns stay empty).
+    The workbook is saved to a temporary file next to `path` and swapped in
+    with os.replace, so a failure leaves the original file untouched.
+    Returns the number of rows appended.
+    """
+    from openpyxl import load_workbook
+    from . import constants as _const
+
+    path = _Path(path)
+    if rows is None or rows.empty:
+        return 0
+
+    wb = load_workbook(path)
+    if sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+    else:
+        ws = wb.create_sheet(sheet_name)
+    headers = [c.value for c in ws[1]] if ws.max_row >= 1 else []
+    if not any(headers):
+        headers = list(_const.excel_sheets.get(sheet_name, rows.columns))
+        ws.delete_rows(1)
+        ws.append(headers)
+
+    aligned = rows.reindex(columns=[h if h is not None else '' for h in headers]).astype(object)
+    aligned = aligned.where(aligned.notna(), None)
+    for record in aligned.itertuples(index=False, name=None):
+        ws.append(list(record))
+
+    tmp_path = path.with_name(f".{path.stem}.tmp{path.suffix}")
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    logger.info("Appended %d rows to %s/%s", len(aligned), path.name, sheet_name)
+    return len(aligned)
+
+
+def cleanup_old_backups(db_path, max_backups=5):
+    """Keep only the most recent N full-copy backups (`<stem>_backup_*.xlsx`), delete older ones.
+
+    Those copies were made before backups became incremental; new backups
+    live in the backup repository and follow its retention policy.
+
+    Args:
+        db_path: Path to the main database file
+        max_backups: Maximum number of backups to keep (default: 5)
+    """
+    try:
+        db_path = _Path(db_path)
+        if not db_path.exists():
+            return
+
+        # Find all backup files for this database
+        backup_pattern = f"{db_path.stem}_backup_*.xlsx"
+        backup_dir = db_path.parent
+        backups = sorted(backup_dir.glob(backup_pattern), reverse=True)
+
+        # Delete backups beyond the limit
+        if len(backups) > max_backups:
+            for backup in backups[max_backups:]:
+                try:
+                    backup.unlink()
+                    logger.info("Deleted old backup: %s", backup.name)
+                except Exception as e:
+                    logger.warning("Failed to delete old backup %s: %s", backup.name, e)
+    except Exception as e:
+        logger.warning("Error during backup cleanup: %s", e)
+
+
+def _backup_before_migration(path):
+    """Back up the workbook before migrate_excel_workbook merges its legacy sheets.
+
+    A store backup still pending on the background thread would leave the
+    latest backup behind the file and make this one parse every sheet:
+    it is written first, so the backup below is normally a no-op.
+    """
+    try:
+        # Back up the workbook before modifying it: incremental and deduplicated,
+        # so nothing is written when the latest backup already has this content
+        # (see src/utils/backup.py for retention and restore)
+        from .backup import backup_repository, flush_backups
+        flush_backups(timeout=60)
+        repository = backup_repository(path)
+        backup_id = repository.create(label='migration')
+        backup_path = repository.manifests_dir / f"{backup_id}.json"
+        logger.info("Workbook backed up before migration: %s", backup_id)
+        # Also add the backup path to the generation report (if present)
+        try:
+            tmp_out = Path(__file__).resolve().parent.parent.parent / 'tmp_out'
+            tmp_out.mkdir(parents=True, exist_ok=True)
+
+            # Try to find an HTML generation report and update its embedded JSON
+            updated = False
+            try:
+                for html in tmp_out.glob('*_Raport_Docs_generer.html'):
+                    try:
+                        text = html.read_text(encoding='utf-8')
+                        start_tag = '<pre id="genjson">'
+                        end_tag = '</pre>'
+                        sidx = text.find(start_tag)
+                        if sidx != -1:
+                            sidx += len(start_tag)
+                            eidx = text.find(end_tag, sidx)
+                            if eidx != -1:
+                                raw = text[sidx:eidx]
+                                try:
+                                    rep = json.loads(raw)
+                                except Exception:
+                                    rep = {}
+                                rep['migration_backup'] = str(backup_path)
+                                # replace the JSON block
+                                new_raw = json.dumps(rep, ensure_ascii=False, indent=2)
+                                new_text = text[:sidx] + new_raw + text[eidx:]
+                                html.write_text(new_text, encoding='utf-8')
+                                updated = True
+                                break
+                    except Exception:
+                        continue
+            except Exception:
+                updated = False
+
+            if not updated:
+                # Fallback: write a named JSON report matching the HTML convention
+                # so external tooling can find it more reliably. Use a safe
+                # default company string if none is available.
+                try:
+                    import datetime as _dt
+                    gen_date = _dt.date.today().isoformat()
+                    gen_time = _dt.datetime.now().strftime('%H-%M-%S')
+                except Exception:
+                    gen_date = 'unknown_date'
+                    import time as _time
+                    gen_time = _time.strftime('%H-%M-%S')
+                company_clean = 'UnknownCompany'
+                gen_name = f"{gen_date}_{company_clean}_Raport_Docs_generer_{gen_time}.json"
+                gen_report = tmp_out / gen_name
+                if gen_report.exists():
+                    try:
+                        with gen_report.open('r', encoding='utf-8') as gf:
+                            rep = json.load(gf)
+                    except Exception:
+                        rep = {}
+                else:
+                    rep = {}
+                rep['migration_backup'] = str(backup_path)
+                with gen_report.open('w', encoding='utf-8') as gf:
+                    json.dump(rep, gf, ensure_ascii=False, indent=2)
+        except Exception:
+            logger.exception('Failed to update generation report with migration backup')
+    except Exception:
+        logger.exception('Failed to create backup before migration; continuing without backup')
+
+
+@timed('migrate_excel_workbook', reads='path', writes='path')
+def migrate_excel_workbook(path):
+    """Detects sheets that look like canonical sheets but have different names
+    and merges their rows into the canonical sheet, then removes the old sheet.
+    """
+    path = _Path(path)
+    if not path.exists():
+        return
+    import pandas as _pd
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter
+    from . import constants as _const
+    try:
+        legacy = [name for name in read_schema(path)[0] if name not in _const.excel_sheets]
+    except Exception:
+        legacy = None
+    if legacy != []:
+        # Only merging legacy sheets changes the content (formats and widths need no backup)
+        _backup_before_migration(path)
+    wb = load_workbook(path)
+    changed = False
+    # Build set of canonical header sets for quick matching
+    canonical = {name: set([h.upper() for h in cols]) for name, cols in _const.excel_sheets.items()}
+    to_remove = []
+    for sheet in list(wb.sheetnames):
+        if sheet in canonical:
+            continue
+        try:
+            df = _pd.read_excel(path, sheet_name=sheet, dtype=str)
+        except Exception:
+            continue
+        hdrs = set([c.upper() for c in df.columns])
+        # find best matching canonical sheet
+        for cname, cheaders in canonical.items():
+            # if overlap is large relative to the legacy sheet size, consider it a match
+            # this lets small legacy extracts (few columns) be merged
+            overlap = len(hdrs & cheaders)
+            if overlap >= max(1, int(len(hdrs) * 0.5)):
+                # append df to canonical sheet
+                try:
+                    existing = _pd.read_excel(path, sheet_name=cname, dtype=str)
+                except Exception:
+                    existing = _pd.DataFrame(columns=_const.excel_sheets.get(cname, []))
+                # Align legacy df to canonical headers to ensure correct column placement
+                canonical_cols = _const.excel_sheets.get(cname, [])
+                df_aligned = df.reindex(columns=canonical_cols, fill_value='')
+                # write back by appending
+                with _pd.ExcelWriter(path, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
+                    startrow = writer.book[cname].max_row if cname in writer.book.sheetnames else 0
+                    df_aligned.to_excel(writer, sheet_name=cname, index=False, header=False, startrow=startrow)
+                to_remove.append(sheet)
+                changed = True
+                break
+    if to_remove:
+        # reload workbook to ensure any appended data is present before removing old sheets
+        wb = load_workbook(path)
+        for s in to_remove:
+            try:
+                std = wb[s]
+                wb.remove(std)
+            except Exception:
+                pass
+        wb.save(path)
+    # Ensure Excel date columns use a readable date number format
+    try:
+        # Reload constants to get canonical headers
+        from . import constants as _const
+        wb = load_workbook(path)
+        for cname, cols in _const.excel_sheets.items():
+            if cname not in wb.sheetnames:
+                continue
+            ws = wb[cname]
+            for idx, col_name in enumerate(cols, start=1):
+                if not col_name:
+                    continue
+                if 'DATE' in col_name.upper():
+                    col_letter = get_column_letter(idx)
+                    # Apply number_format to all data cells in this column
+                    for row in range(2, ws.max_row + 1):
+                        try:
+                            cell = ws[f"{col_letter}{row}"]
+                            # set format regardless; Excel/openpyxl will ignore non-dates
+                            cell.number_format = 'DD/MM/YYYY'
+                        except Exception:
+                            pass
+        wb.save(path)
+    except Exception:
+        logger.exception('Failed to apply date number formats after migration')
+    # Autofit columns for all sheets after migration adjustments
+    try:
+        wb = load_workbook(path)
+        for ws in wb.worksheets:
+            try:
+                for idx, col_cells in enumerate(ws.columns, start=1):
+                    max_len = 0
+                    col_letter = get_column_letter(idx)
+                    for cell in col_cells:
+                        try:
+                            val = cell.value
+                            if val is None:
+                                l = 0
+                            else:
+                                l = len(str(val))
+                            if l > max_len:
+                                max_len = l
+                        except Exception:
+                            continue
+                    width = max(8, float(max_len) + 2)
+                    try:
+                        ws.column_dimensions[col_letter].width = width
+                    except Exception:
+                        pass
+            except Exception:
+                continue
+        wb.save(path)
+    except Exception:
+        logger.exception('Failed to autofit column widths after migration')
+
+
+def societe_exists(name: str, path: Optional[_Path] = None) -> bool:
+    """Check whether a société with the given name exists in the Excel database.
+
+    Args:
+        name: Company name to search for (case-insensitive, trimmed)
+        path: Optional path to the Excel workbook. If not provided, uses
+              the default databases path and filename from package constants.
+
+    Returns:
+        True if a matching company name is present in the 'Societes' sheet,
+        False otherwise.
+    """
+    try:
+        from . import constants as _const
+        # Default database path
+        if path is None:
+            db_path = default_db_path()
+        else:
+            db_path = _Path(path)
+
+        if not db_path.exists():
+            return False
+
+        # Read through the binary snapshot: no XML parsing unless the file was edited elsewhere
+        from .snapshot import read_tables
+        try:
+            df = read_tables(db_path)['Societes']
+        except Exception:
+            return False
+
+        if 'DEN_STE' not in df.columns:
+            # fallback: try to detect any column that looks like a company name
+            candidates = [c for c in df.columns if 'DEN' in str(c).upper() or 'STE' in str(c).upper() or 'NAME' in str(c).upper()]
+            if not candidates:
+                return False
+            col = candidates[0]
+        else:
+            col = 'DEN_STE'
+
+        target = (str(name or '')).strip().lower()
+        if not target:
+            return False
+
+        # check for exact matches (case-insensitive) or trimmed contains
+        for val in df[col].fillna('').astype(str):
+            if val.strip().lower() == target:
+                return True
+        return False
+    except Exception:
+        logger.exception('societe_exists check failed')
+        return False
+
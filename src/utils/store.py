@@ -0,0 +1,305 @@
+"""Process-wide in-memory copy of the Societes/Associes/Contrats tables.
+
+`DataStore.instance()` returns the store of the application database. It
+reads the workbook once (and again only when the file changed on disk;
+see src/utils/snapshot.py for the binary cache that avoids parsing it),
+applies every write both to the workbook and to its frames (and backs it
+up in the background, see src/utils/backup.py), and tells its subscribers
+which rows changed:
+
+    store = DataStore.instance()
+    unsubscribe = store.subscribe(lambda changes: ...)
+    store.delete_societe('12')   # -> [Change('Societes', 'delete', ('12',)), ...]
+
+Frames are typed (see src/utils/schema.py): categoricals for the repeated
+labels, nullable int IDs, float amounts and datetime dates. Key columns are
+compared as text through `_keys`, so '12' and 12 designate the same row.
+
+Subscribers are called synchronously on the thread that made the write
+(the Tk main thread for every write in this application). Frames returned
+by `table()` are replaced, never modified in place, so a view holding one
+keeps a consistent snapshot until it asks again.
+"""
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from . import constants as _const
+from .backup import schedule_backup
+from .coordinator import WriteCoordinator
+from .schema import concat, to_cells, to_typed
+from .snapshot import read_tables, save_snapshot
+from .sorting import as_text, parse_numbers
+
+logger = logging.getLogger(__name__)
+
+# Sheet name -> key column
+TABLE_KEYS = {
+    'Societes': 'ID_SOCIETE',
+    'Associes': 'ID_ASSOCIE',
+    'Contrats': 'ID_CONTRAT',
+}
+
+INSERT = 'insert'
+DELETE = 'delete'
+# Every row of the table may have changed (first load or external edit of the file)
+RELOAD = 'reload'
+
+
+@dataclass(frozen=True)
+class Change:
+    """Rows of one table affected by a write, identified by their key column value."""
+    table: str
+    kind: str
+    keys: Tuple[str, ...] = ()
+
+
+def _typed_rows(name: str, rows: pd.DataFrame) -> pd.DataFrame:
+    return to_typed(rows.reindex(columns=_const.excel_sheets[name]), name)
+
+
+def _renumber(rows: pd.DataFrame, table: pd.DataFrame, column: str) -> pd.DataFrame:
+    """`rows` with IDs following the highest ID of `table` when any of theirs is taken."""
+    if column not in rows.columns or not set(_keys(rows, column)) & set(_keys(table, column)):
+        return rows
+    ids = parse_numbers(table[column], strict=True) if column in table.columns else pd.Series(dtype=float)
+    first = int(ids.max()) + 1 if ids.notna().any() else 1
+    return rows.assign(**{column: list(range(first, first + len(rows)))})
+
+
+def _keys(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series([''] * len(df), index=df.index, dtype=object)
+    return as_text(df[column]).str.strip()
+
+
+class DataStore:
+    """In-memory canonical tables with write-through to the workbook and change events."""
+
+    _instances: Dict[Path, 'DataStore'] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.version = 0
+        self._lock = threading.RLock()
+        self._tables: Dict[str, pd.DataFrame] = {
+            name: pd.DataFrame(columns=_const.excel_sheets[name]) for name in TABLE_KEYS
+        }
+        self._signature = None
+        # Version stamp of the shared workbook the tables were read at
+        self._coordinator = WriteCoordinator.instance(self.path)
+        self._stamp = None
+        self._subscribers: List[Callable[[List[Change]], None]] = []
+
+    @classmethod
+    def instance(cls, path=None) -> 'DataStore':
+        """The shared store of `path` (the application database by default)."""
+        if path is None:
+            from .storage import default_db_path
+            path = default_db_path()
+        key = Path(path).resolve()
+        with cls._instances_lock:
+            store = cls._instances.get(key)
+            if store is None:
+                store = cls._instances[key] = cls(key)
+            return store
+
+    # -- reading -----------------------------------------------------------
+
+    def _file_signature(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self, force: bool = False) -> List[Change]:
+        """Re-read the tables if the workbook or its version stamp changed; returns the RELOAD changes."""
+        with self._lock:
+            signature = self._file_signature()
+            stamp = self._coordinator.version()
+            if not force and signature == self._signature and stamp == self._stamp and self.version:
+                return []
+            tables = {name: pd.DataFrame(columns=_const.excel_sheets[name]) for name in TABLE_KEYS}
+            if signature is not None:
+                try:
+                    # Binary snapshot when the workbook was not edited elsewhere
+                    tables.update(read_tables(self.path))
+                except Exception as e:
+                    logger.warning("Error loading %s: %s", self.path.name, e)
+            self._tables = tables
+            self._signature = signature
+            self._stamp = stamp
+            return [Change(name, RELOAD) for name in TABLE_KEYS]
+
+    def load(self, force: bool = False) -> bool:
+        """Read the workbook if it changed since the last read (or `force`).
+
+        Returns True when the tables were re-read; subscribers then get a
+        RELOAD change per table.
+        """
+        changes = self._read(force)
+        self._publish(changes)
+        return bool(changes)
+
+    def table(self, name: str) -> pd.DataFrame:
+        """Current (typed) frame of a canonical table."""
+        return self._tables[name]
+
+    def rows_for_societe(self, name: str, societe_id) -> pd.DataFrame:
+        """Rows of `name` linked to the société `societe_id`."""
+        df = self._tables[name]
+        return df[_keys(df, 'ID_SOCIETE') == str(societe_id).strip()]
+
+    # -- notifications -----------------------------------------------------
+
+    def subscribe(self, callback: Callable[[List[Change]], None]) -> Callable[[], None]:
+        """Call `callback(changes)` after every write; returns the unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _publish(self, changes: List[Change]):
+        changes = [c for c in changes if c.kind == RELOAD or c.keys]
+        if not changes:
+            return
+        with self._lock:
+            self.version += 1
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(changes)
+            except Exception:
+                logger.exception('Data store subscriber failed')
+
+    def _commit(self, tables: Dict[str, pd.DataFrame]):
+        """Swap in the new frames and remember the file state we just wrote."""
+        with self._lock:
+            self._tables = {**self._tables, **tables}
+            self._signature = self._file_signature()
+            save_snapshot(self.path, self._tables)
+            # Incremental backup of the new state, off the calling thread; skipped
+            # if another write lands first (it schedules its own backup)
+            schedule_backup(self.path, self._tables, signature=self._signature)
+
+    @contextmanager
+    def _writing(self) -> Iterator[Tuple[List[Change], bool]]:
+        """Commit step of a write, coordinated with the other processes using the workbook.
+
+        Other writers' changes are picked up before taking the lock, so the
+        lock is normally held for our own write only; if another process
+        committed in between, the tables are re-read under the lock. Yields
+        the RELOAD changes of that re-read (to publish with the write) and
+        whether the tables changed since the caller last saw them, in which
+        case rows the caller prepared must be rebased (see `append`).
+        """
+        seen = (self._stamp, self._signature)
+        self.load()
+        # The file lock may take long (another PC is writing): wait for it
+        # before taking the in-memory lock, so readers are not held meanwhile
+        with self._coordinator.transaction() as txn, self._lock:
+            changes = []
+            if txn.version != self._stamp or self._file_signature() != self._signature:
+                logger.info('%s changed since it was read; rebasing the write', self.path.name)
+                changes = self._read(force=True)
+            yield changes, (self._stamp, self._signature) != seen
+        self._stamp = txn.version
+
+    # -- writes ------------------------------------------------------------
+
+    def save_records(self, societe_vals: dict, associes_list: list, contrat_vals: dict) -> List[Change]:
+        """Write a new société with its associés and contract (see write_records_to_db).
+
+        IDs are computed from the workbook inside the commit step, so they
+        never collide with rows written meanwhile by another PC.
+        """
+        from .storage import write_records_to_db
+
+        with self._writing() as (changes, _):
+            new_rows = write_records_to_db(self.path, societe_vals, associes_list, contrat_vals) or {}
+            tables = {}
+            for name, rows in new_rows.items():
+                if rows is None or rows.empty:
+                    continue
+                rows = _typed_rows(name, rows)
+                tables[name] = concat([self._tables[name], rows])
+                changes.append(Change(name, INSERT, tuple(_keys(rows, TABLE_KEYS[name]))))
+            self._commit(tables)
+        self._publish(changes)
+        return [c for c in changes if c.kind == INSERT]
+
+    def append(self, name: str, rows: pd.DataFrame,
+               rebase: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None) -> List[Change]:
+        """Append rows (with their IDs already set) to one table in a single save.
+
+        When another process wrote since the rows were prepared, `rebase(table)`
+        rebuilds them from the fresh table (e.g. plans the renewals again);
+        by default the appended rows just get new IDs after the highest one.
+        """
+        from .storage import append_rows_to_sheet
+
+        if rows is None or rows.empty:
+            return []
+        with self._writing() as (changes, stale):
+            if stale:
+                rows = rebase(self._tables[name]) if rebase is not None else _renumber(rows, self._tables[name], TABLE_KEYS[name])
+            if rows is not None and not rows.empty:
+                append_rows_to_sheet(self.path, name, rows)
+                typed = _typed_rows(name, rows)
+                self._commit({name: concat([self._tables[name], typed])})
+                changes.append(Change(name, INSERT, tuple(_keys(typed, TABLE_KEYS[name]))))
+        self._publish(changes)
+        return [c for c in changes if c.kind == INSERT]
+
+    def delete_societe(self, societe_id=None, denomination: str = '') -> List[Change]:
+        """Delete a société with its associés and contracts (matched by ID, else by name)."""
+        with self._writing() as (changes, _):
+            societes = self._tables['Societes']
+            if societe_id not in (None, ''):
+                sid = str(societe_id).strip()
+            else:
+                names = as_text(societes['DEN_STE']).str.strip().str.lower() if 'DEN_STE' in societes else pd.Series(dtype=str)
+                matches = _keys(societes, 'ID_SOCIETE')[names == denomination.strip().lower()]
+                sid = matches.iloc[0] if not matches.empty else None
+
+            if sid is not None:
+                tables = {}
+                for name, key in TABLE_KEYS.items():
+                    df = self._tables[name]
+                    removed = _keys(df, 'ID_SOCIETE') == sid
+                    tables[name] = df[~removed].reset_index(drop=True)
+                    changes.append(Change(name, DELETE, tuple(_keys(df[removed], key))))
+                self._write_tables(tables)
+                self._commit(tables)
+        self._publish(changes)
+        return [c for c in changes if c.kind == DELETE]
+
+    def _write_tables(self, tables: Dict[str, pd.DataFrame]):
+        """Replace whole sheets of the workbook in one save.
+
+        The sheets are written into a copy next to the workbook that then
+        replaces it with os.replace, so a failure leaves the original intact.
+        """
+        tmp_path = self.path.with_name(f".{self.path.stem}.tmp{self.path.suffix}")
+        try:
+            shutil.copyfile(self.path, tmp_path)
+            with pd.ExcelWriter(tmp_path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+                for name, df in tables.items():
+                    to_cells(df).to_excel(writer, sheet_name=name, index=False)
+            os.replace(tmp_path, self.path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
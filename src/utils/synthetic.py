@@ -0,0 +1,347 @@
+"""Deterministic synthetic portfolios for load testing.
+
+`companies(count, seed)` streams companies shaped like the canonical sheets
+(`societe_headers`, `associe_headers`, `contrat_headers`): one to twelve
+associés (mostly one or two), consecutive contracts renewed until `until`
+or a churn, ICE numbers of 15 digits ending with a mod-97 check, CIN numbers
+of one or two letters and digits, and birth/creation/validity dates that
+agree with each other. The same seed always yields the same portfolio.
+
+Two sinks keep memory bounded whatever the count:
+
+    write_workbook('databases/load_test.xlsx', 100_000, seed=7)   # the database the app opens
+    write_json('societes.json', 1_000, seed=7)                    # for `python -m src.cli save` or POST /companies
+
+The workbook is written as SpreadsheetML directly, one temporary file per
+sheet zipped at the end, in the shape the application itself writes (dates as
+dd/mm/yyyy text, numbers as numbers): openpyxl, even in write-only mode,
+needs several minutes for 100k companies.
+"""
+import datetime
+import json
+import logging
+import os
+import random
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, TextIO, Union
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+
+from . import constants as _const
+from .storage import SCHEMA_PROPERTY, SCHEMA_VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNTIL = datetime.date(2025, 12, 31)
+FIRST_CREATION = datetime.date(2005, 1, 1)
+# Relative frequency of 1..12 associés per société
+ASSOCIE_WEIGHTS = (40, 25, 12, 7, 5, 3, 2, 2, 1, 1, 1, 1)
+# Probability that a contract is renewed when it ends
+RENEWAL_RATE = 0.85
+PART_VALUE = 100
+CAPITALS = (10000, 50000, 100000)
+
+FIRST_NAMES = {
+    'Monsieur': ('Mohamed', 'Youssef', 'Omar', 'Karim', 'Hamza', 'Mehdi', 'Anas', 'Rachid', 'Said', 'Amine',
+                 'Hicham', 'Khalid', 'Adil', 'Yassine', 'Driss', 'Abdellah'),
+    'Madame': ('Fatima', 'Khadija', 'Salma', 'Imane', 'Nadia', 'Sara', 'Meryem', 'Hanane', 'Loubna', 'Zineb',
+               'Asmae', 'Houda', 'Laila', 'Sanaa', 'Ghita', 'Nour'),
+}
+LAST_NAMES = ('Alaoui', 'Benali', 'Bennani', 'Berrada', 'Chraibi', 'El Amrani', 'El Idrissi', 'Fassi', 'Haddad',
+              'Kettani', 'Lahlou', 'Mansouri', 'Naciri', 'Ouazzani', 'Rami', 'Sebti', 'Tazi', 'Zniber')
+NAME_STEMS = tuple(_const.DenSte) + ('ATLAS', 'NOVA', 'ARGANE', 'DUNE', 'MEDINA', 'ZENITH', 'OASIS', 'CEDRE')
+SECTORS = ('TRADING', 'SERVICES', 'CONSULTING', 'IMMO', 'TRANS', 'DIGITAL', 'BTP', 'DISTRIBUTION')
+CITIES = ('Casablanca', 'Rabat', 'Fes', 'Marrakech', 'Agadir', 'Tanger', 'Meknes', 'Oujda', 'Kenitra', 'Tetouan')
+STREETS = ('Rue Ibn Batouta', 'Avenue Hassan II', 'Boulevard Zerktouni', 'Rue Allal Ben Abdellah',
+           'Avenue Mohammed V', 'Rue Moulay Youssef', 'Boulevard Anfa')
+CIN_PREFIXES = ('A', 'B', 'BE', 'BH', 'BJ', 'BK', 'C', 'CD', 'D', 'E', 'EE', 'F', 'G', 'H', 'I', 'J', 'JA', 'K',
+                'L', 'M', 'N', 'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z')
+EMAIL_DOMAINS = ('gmail.com', 'yahoo.fr', 'hotmail.com', 'outlook.fr', 'menara.ma')
+# Reference sheets seeded like bootstrap_database does
+REFERENCE_DATA = _const.reference_values
+
+
+class Company(NamedTuple):
+    """One société with its rows, keyed by the canonical headers."""
+    societe: Dict
+    associes: List[Dict]
+    contrats: List[Dict]
+
+
+def _add_months(day: datetime.date, months: int) -> datetime.date:
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    for last in (31, 30, 29, 28):
+        try:
+            return day.replace(year=year, month=month, day=min(day.day, last))
+        except ValueError:
+            continue
+
+
+def _days(rng: random.Random, start: datetime.date, end: datetime.date) -> datetime.date:
+    return start + datetime.timedelta(days=rng.randrange(max(1, (end - start).days)))
+
+
+def ice_number(rng: random.Random) -> str:
+    """15 digits: 13 identifying digits and a two-digit mod-97 check."""
+    base = rng.randrange(10 ** 12, 10 ** 13)
+    return f'{base}{base % 97:02d}'
+
+
+def cin_number(rng: random.Random) -> str:
+    return f'{rng.choice(CIN_PREFIXES)}{rng.randrange(10000, 1000000)}'
+
+
+def _split_parts(rng: random.Random, total: int, count: int) -> List[int]:
+    cuts = sorted(rng.sample(range(1, total), count - 1)) if count > 1 else []
+    bounds = [0] + cuts + [total]
+    return [b - a for a, b in zip(bounds, bounds[1:])]
+
+
+def companies(count: int, seed: int = 0, until: datetime.date = DEFAULT_UNTIL) -> Iterator[Company]:
+    """Stream `count` companies; the same seed always yields the same companies."""
+    rng = random.Random(seed)
+    associe_id = contrat_id = 0
+    sizes = range(1, len(ASSOCIE_WEIGHTS) + 1)
+    latest_creation = until - datetime.timedelta(days=60)
+    for societe_id in range(1, count + 1):
+        created = _days(rng, FIRST_CREATION, latest_creation)
+        members = rng.choices(sizes, ASSOCIE_WEIGHTS)[0]
+        capital = rng.choice(CAPITALS) if members < 5 else CAPITALS[-1]
+        total_parts = capital // PART_VALUE
+        societe = {
+            'ID_SOCIETE': societe_id,
+            'DEN_STE': f'{rng.choice(NAME_STEMS)} {rng.choice(SECTORS)} {societe_id}',
+            'FORME_JUR': 'SARL AU' if members == 1 else 'SA' if members >= 7 and rng.random() < 0.5 else 'SARL',
+            'ICE': ice_number(rng),
+            'DATE_ICE': created,
+            'CAPITAL': capital,
+            'PART_SOCIAL': total_parts,
+            'STE_ADRESS': rng.choice(_const.SteAdresse),
+            'TRIBUNAL': rng.choice(_const.Tribunnaux),
+        }
+
+        associes = []
+        for index, parts in enumerate(_split_parts(rng, total_parts, members)):
+            associe_id += 1
+            civility = rng.choice(_const.Civility)
+            first, last = rng.choice(FIRST_NAMES[civility]), rng.choice(LAST_NAMES)
+            manager = index == 0 or rng.random() < 0.15
+            issued = _days(rng, created - datetime.timedelta(days=3650), created)
+            associes.append({
+                'ID_ASSOCIE': associe_id,
+                'ID_SOCIETE': societe_id,
+                'CIVIL': civility,
+                'PRENOM': first,
+                'NOM': last.upper(),
+                'NATIONALITY': _const.Nationalite[0] if rng.random() < 0.9 else rng.choice(_const.Nationalite),
+                'CIN_NUM': cin_number(rng),
+                'CIN_VALIDATY': _add_months(issued, 120),
+                'DATE_NAISS': created - datetime.timedelta(days=rng.randrange(20 * 365, 70 * 365)),
+                'LIEU_NAISS': rng.choice(CITIES),
+                'ADRESSE': f'{rng.randrange(1, 300)} {rng.choice(STREETS)}, {rng.choice(CITIES)}',
+                'PHONE': f'0{rng.choice((6, 7))}{rng.randrange(10 ** 7, 10 ** 8)}',
+                'EMAIL': f"{first.lower()}.{last.lower().replace(' ', '')}{associe_id}@{rng.choice(EMAIL_DOMAINS)}",
+                'PARTS': parts,
+                'CAPITAL_DETENU': parts * PART_VALUE,
+                'IS_GERANT': int(manager),
+                'QUALITY': _const.QualityGerant[1] if members == 1 else
+                           _const.QualityGerant[0] if manager else _const.QualityGerant[2],
+            })
+
+        contrats = []
+        start = created + datetime.timedelta(days=rng.randrange(30))
+        price = rng.randrange(300, 1550, 50)
+        while start <= until:
+            contrat_id += 1
+            months = int(rng.choice(_const.Nbmois))
+            end = _add_months(start, months) - datetime.timedelta(days=1)
+            contrats.append({
+                'ID_CONTRAT': contrat_id,
+                'ID_SOCIETE': societe_id,
+                'DATE_CONTRAT': start - datetime.timedelta(days=rng.randrange(10)),
+                'PERIOD_DOMCIL': months,
+                'PRIX_CONTRAT': price,
+                'PRIX_INTERMEDIARE_CONTRAT': rng.choice((0, 0, 0, 100, 200)),
+                'DOM_DATEDEB': start,
+                'DOM_DATEFIN': end,
+            })
+            if rng.random() > RENEWAL_RATE:
+                break
+            start = end + datetime.timedelta(days=1)
+        yield Company(societe, associes, contrats)
+
+
+# -- JSON ------------------------------------------------------------------
+
+def _form_value(value):
+    return value.strftime('%d/%m/%Y') if isinstance(value, datetime.date) else value
+
+
+def aggregate(company: Company) -> Dict:
+    """Form-key aggregate (see src/utils/records.py) with the latest contract."""
+    def _form(row, keys):
+        return {key: _form_value(row[header]) for header, key in keys.items() if header in row}
+
+    associes = []
+    for row in company.associes:
+        values = _form(row, _const.associe_form_keys)
+        values['est_gerant'] = bool(row['IS_GERANT'])
+        associes.append(values)
+    contrat = _form(company.contrats[-1], _const.contrat_form_keys) if company.contrats else {}
+    return {'societe': _form(company.societe, _const.societe_form_keys), 'associes': associes, 'contrat': contrat}
+
+
+def write_json(target: Union[str, Path, TextIO], count: int, seed: int = 0, **kwargs) -> int:
+    """Write a JSON list of aggregates, one per line, without holding them in memory."""
+    def _write(out: TextIO) -> int:
+        written = 0
+        out.write('[')
+        for company in companies(count, seed, **kwargs):
+            out.write((',\n' if written else '\n') + json.dumps(aggregate(company), ensure_ascii=False))
+            written += 1
+        out.write('\n]\n')
+        return written
+
+    if hasattr(target, 'write'):
+        return _write(target)
+    with open(target, 'w', encoding='utf-8') as out:
+        return _write(out)
+
+
+# -- workbook --------------------------------------------------------------
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/docProps/custom.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.custom-properties+xml"/>'
+    '{sheets}</Types>'
+)
+_SHEET_TYPE = ('<Override PartName="/xl/worksheets/sheet{n}.xml" '
+               'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '<Relationship Id="rId2" Target="docProps/custom.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/custom-properties"/>'
+    '</Relationships>'
+)
+# The schema stamp of bootstrap_database: the workbook needs no setup when opened
+_CUSTOM_PROPERTIES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/custom-properties" '
+    'xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes">'
+    '<property fmtid="{{D5CDD505-2E9C-101B-9397-08002B2CF9AE}}" pid="2" name="{name}"><vt:i4>{version}</vt:i4></property>'
+    '</Properties>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>{sheets}</sheets></workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">{sheets}'
+    '<Relationship Id="rIdStyles" Target="styles.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"/></Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs><cellXfs count="1"><xf xfId="0"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles></styleSheet>'
+)
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+class _SheetWriter:
+    """Rows of one sheet, streamed as worksheet XML into a temporary file."""
+
+    def __init__(self, name: str, headers: List[str], directory: str):
+        self.name = name
+        self.headers = list(headers)
+        self._letters = [get_column_letter(i + 1) for i in range(len(self.headers))]
+        self._file = tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.xml', dir=directory, delete=False)
+        self._file.write(_SHEET_HEAD)
+        self.rows = 0
+        self.append_values(self.headers)
+
+    def append_values(self, values):
+        self.rows += 1
+        r = self.rows
+        cells = []
+        for letter, value in zip(self._letters, values):
+            if value is None or value == '':
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                cells.append(f'<c r="{letter}{r}"><v>{value}</v></c>')
+            else:
+                if isinstance(value, datetime.date):
+                    value = value.strftime('%d/%m/%Y')
+                cells.append(f'<c r="{letter}{r}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+        self._file.write(f'<row r="{r}">{"".join(cells)}</row>')
+
+    def append(self, row: Dict):
+        self.append_values([row.get(h) for h in self.headers])
+
+    def close(self) -> str:
+        self._file.write(_SHEET_TAIL)
+        self._file.close()
+        return self._file.name
+
+
+def write_workbook(path: Union[str, Path], count: int, seed: int = 0, **kwargs) -> Dict[str, int]:
+    """Write a complete database (data and reference sheets); returns the data rows per sheet."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        writers = [_SheetWriter(name, headers, tmp) for name, headers in _const.excel_sheets.items()]
+        societes, associes, contrats = writers[:3]
+        for company in companies(count, seed, **kwargs):
+            societes.append(company.societe)
+            for row in company.associes:
+                associes.append(row)
+            for row in company.contrats:
+                contrats.append(row)
+        for writer in writers[3:]:
+            for value in REFERENCE_DATA.get(writer.name, ()):
+                writer.append_values([value])
+
+        partial = path.with_name(path.name + '.partial')
+        # Level 1: the XML is very repetitive, higher levels mostly cost time
+        with zipfile.ZipFile(partial, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            archive.writestr('[Content_Types].xml', _CONTENT_TYPES.format(
+                sheets=''.join(_SHEET_TYPE.format(n=n) for n in range(1, len(writers) + 1))))
+            archive.writestr('_rels/.rels', _ROOT_RELS)
+            archive.writestr('docProps/custom.xml', _CUSTOM_PROPERTIES.format(
+                name=SCHEMA_PROPERTY, version=SCHEMA_VERSION))
+            archive.writestr('xl/workbook.xml', _WORKBOOK.format(sheets=''.join(
+                f'<sheet name="{escape(w.name)}" sheetId="{n}" r:id="rId{n}"/>' for n, w in enumerate(writers, 1))))
+            archive.writestr('xl/_rels/workbook.xml.rels', _WORKBOOK_RELS.format(sheets=''.join(
+                f'<Relationship Id="rId{n}" Target="worksheets/sheet{n}.xml" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+                for n in range(1, len(writers) + 1))))
+            archive.writestr('xl/styles.xml', _STYLES)
+            for n, writer in enumerate(writers, 1):
+                archive.write(writer.close(), f'xl/worksheets/sheet{n}.xml')
+        os.replace(partial, path)
+    counts = {w.name: w.rows - 1 for w in writers[:3]}
+    logger.info('Synthetic workbook %s: %s', path, counts)
+    return counts
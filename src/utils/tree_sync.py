@@ -0,0 +1,92 @@
+"""Incremental Treeview refresh.
+
+A `TreeSync` remembers, for one ttk.Treeview, the item id and a content
+hash of every row it shows, keyed by a stable row key (the table's ID
+column). `sync(rows, keys)` then only inserts new rows, rewrites rows whose
+hash changed, deletes rows that went away and reorders the items with a
+single `set_children` call when the order changed. Hashes are computed for
+all rows at once with `pandas.util.hash_pandas_object`, so a refresh after
+a one-row change costs a few milliseconds whatever the table size.
+"""
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def unique_keys(keys: Sequence) -> np.ndarray:
+    """Row keys made unique: repeated keys (e.g. empty IDs) get a '#n' suffix."""
+    keys = np.array(['' if k is None else str(k) for k in keys], dtype=object)
+    if len(set(keys)) == len(keys):
+        return keys
+    repeat = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+    suffix = np.where(repeat > 0, '#' + repeat.astype(str), '')
+    return (keys + suffix).astype(object)
+
+
+class TreeSync:
+    """Row key -> item id / content hash of one Treeview."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._items: Dict[str, str] = {}
+        self._hashes: Dict[str, int] = {}
+        self._order = np.array([], dtype=object)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def clear(self):
+        """Remove every item (e.g. when the tree's columns change)."""
+        if self._items:
+            self.tree.delete(*self._items.values())
+        self._items = {}
+        self._hashes = {}
+        self._order = np.array([], dtype=object)
+
+    def sync(self, rows: pd.DataFrame, keys: Sequence,
+             render: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None) -> Dict[str, int]:
+        """Make the tree show `rows` (already in display order, one column per tree column).
+
+        `keys` identifies each row across refreshes. `render` turns rows into
+        the displayed strings (`str()` of each value by default); it is only
+        applied to the rows that changed. Returns the number of inserted,
+        updated and deleted items.
+        """
+        keys = unique_keys(keys)
+        hashes = pd.util.hash_pandas_object(rows, index=False).to_numpy() if len(rows) else np.array([], dtype=np.uint64)
+
+        wanted = set(keys)
+        gone = [k for k in self._items if k not in wanted]
+        if gone:
+            self.tree.delete(*[self._items.pop(k) for k in gone])
+            for k in gone:
+                self._hashes.pop(k, None)
+
+        known = self._hashes
+        previous = np.array([known.get(k, -1) for k in keys], dtype=object)
+        changed = np.flatnonzero(previous != hashes)
+        values = []
+        if len(changed):
+            changed_rows = rows.iloc[changed]
+            values = (render(changed_rows) if render is not None else changed_rows.astype(str)).to_numpy().tolist()
+        new_keys = []
+        updated = 0
+        for i, row_values in zip(changed, values):
+            key = keys[i]
+            iid = self._items.get(key)
+            if iid is None:
+                self._items[key] = self.tree.insert('', 'end', values=row_values)
+                new_keys.append(key)
+            else:
+                self.tree.item(iid, values=row_values)
+                updated += 1
+            self._hashes[key] = hashes[i]
+
+        # Items are now in their previous order with the new ones appended;
+        # reorder (one Tcl call) only if that is not the wanted order
+        current = [k for k in self._order if k in wanted] if gone else list(self._order)
+        if current + new_keys != list(keys):
+            self.tree.set_children('', *[self._items[k] for k in keys])
+        self._order = keys
+        return {'inserted': len(new_keys), 'updated': updated, 'deleted': len(gone)}
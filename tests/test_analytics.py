@@ -0,0 +1,112 @@
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.utils import analytics as analytics_mod
+from src.utils.analytics import Analytics, analytics_for
+
+TODAY = datetime.date(2025, 3, 10)
+
+
+def _societes():
+    return pd.DataFrame({
+        'ID_SOCIETE': ['1', '2', '3'],
+        'DEN_STE': ['ASTRAPIA', 'SKY NEST', 'LOHACOM'],
+        'FORME_JUR': ['SARL', 'SARL AU', 'SARL'],
+        'STE_ADRESS': ['46 BD ZERKTOUNI', '46 BD ZERKTOUNI', ''],
+        'TRIBUNAL': ['Casablanca', 'Casablanca', 'Berrechid'],
+    })
+
+
+def _contrats():
+    return pd.DataFrame({
+        'ID_CONTRAT': ['1', '2', '3', '4'],
+        'ID_SOCIETE': ['1', '2', '3', '1'],
+        'DATE_CONTRAT': ['01/01/2025', '15/02/2025', '', '01/01/2024'],
+        'PERIOD_DOMCIL': ['12', '06', '12', '12'],
+        'PRIX_CONTRAT': ['1 000', '500', '300', '900'],
+        'PRIX_INTERMEDIARE_CONTRAT': ['200', '', '100', '150'],
+        'DOM_DATEDEB': ['01/01/2025', '15/02/2025', '01/03/2025', '01/01/2024'],
+        'DOM_DATEFIN': ['01/01/2026', '15/08/2025', '', '01/01/2025'],
+    })
+
+
+def test_summary_counts_contracts_billing_this_month():
+    summary = Analytics(_societes(), _contrats()).summary(TODAY)
+
+    assert summary['contrats_actifs'] == 3
+    assert summary['mrr'] == 1800.0
+    # Contract 3 has no DATE_CONTRAT: its commission falls in its start month
+    assert summary['commissions_mois'] == 100.0
+    assert summary['commissions_total'] == 450.0
+
+
+def test_monthly_revenue():
+    report = Analytics(_societes(), _contrats()).monthly_revenue(months=4, today=TODAY)
+
+    assert list(report['MOIS']) == ['2024-12', '2025-01', '2025-02', '2025-03']
+    assert list(report['CONTRATS_ACTIFS']) == [1, 1, 2, 3]
+    assert list(report['MRR']) == [900.0, 1000.0, 1500.0, 1800.0]
+    assert list(report['COMMISSIONS']) == [0.0, 200.0, 0.0, 100.0]
+
+
+def test_companies_per_address():
+    report = Analytics(_societes(), _contrats()).by_societe_column('STE_ADRESS', today=TODAY)
+
+    assert report.to_dict('records') == [
+        {'STE_ADRESS': '46 BD ZERKTOUNI', 'SOCIETES': 2, 'SOCIETES_ACTIVES': 2, 'MRR': 1500.0, 'COMMISSIONS': 350.0},
+        {'STE_ADRESS': '(vide)', 'SOCIETES': 1, 'SOCIETES_ACTIVES': 1, 'MRR': 300.0, 'COMMISSIONS': 100.0},
+    ]
+
+
+def test_results_are_memoized_per_data_version(monkeypatch):
+    first = analytics_for(_societes(), _contrats(), version=1)
+    report = first.by_societe_column('TRIBUNAL', today=TODAY)
+
+    assert analytics_for(_societes(), _contrats(), version=1) is first
+    assert first.by_societe_column('TRIBUNAL', today=TODAY) is report
+    assert analytics_for(_societes(), _contrats(), version=2) is not first
+    monkeypatch.setattr(analytics_mod, '_current', None)
+
+
+def test_exports(tmp_path):
+    analytics = Analytics(_societes(), _contrats())
+    xlsx = analytics.export_xlsx(tmp_path / 'stats.xlsx', today=TODAY)
+    page = analytics.export_html(tmp_path / 'stats.html', today=TODAY)
+
+    sheets = pd.read_excel(xlsx, sheet_name=None)
+    assert list(sheets) == ['Résumé', 'Revenus mensuels', 'Sociétés par adresse',
+                            'Sociétés par tribunal', 'Sociétés par forme juridique']
+    assert 'Sociétés par tribunal' in page.read_text(encoding='utf-8')
+
+
+def test_100k_contracts_stay_interactive():
+    n = 100000
+    rng = np.random.default_rng(0)
+    starts = pd.Timestamp('2022-01-01') + pd.to_timedelta(rng.integers(0, 1000, n), unit='D')
+    societes = pd.DataFrame({
+        'ID_SOCIETE': [str(i) for i in range(n)],
+        'STE_ADRESS': rng.choice(['A', 'B', 'C'], n),
+        'TRIBUNAL': rng.choice(['Casablanca', 'Berrechid'], n),
+        'FORME_JUR': rng.choice(['SARL', 'SARL AU', 'SA'], n),
+    })
+    contrats = pd.DataFrame({
+        'ID_SOCIETE': societes['ID_SOCIETE'],
+        'DATE_CONTRAT': starts.strftime('%d/%m/%Y'),
+        'PERIOD_DOMCIL': '12',
+        'PRIX_CONTRAT': rng.integers(100, 1000, n).astype(str),
+        'PRIX_INTERMEDIARE_CONTRAT': '100',
+        'DOM_DATEDEB': starts.strftime('%d/%m/%Y'),
+        'DOM_DATEFIN': (starts + pd.DateOffset(months=12)).strftime('%d/%m/%Y'),
+    })
+
+    begin = time.perf_counter()
+    analytics = Analytics(societes, contrats)
+    analytics.summary(TODAY)
+    analytics.reports(TODAY)
+    elapsed = time.perf_counter() - begin
+
+    # Generous bound for slow CI machines; ~0.4s on a typical desktop
+    assert elapsed < 3
@@ -0,0 +1,200 @@
+import http.client
+import io
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from src.api import ApiServer, load_token
+
+TOKEN = 'test-token'
+
+
+def _fake_runner(values, templates_dir, out_dir, to_pdf=False, templates_list=None,
+                 progress_callback=None, cancel_token=None):
+    folder = Path(out_dir) / values['societe']['denomination']
+    folder.mkdir(parents=True, exist_ok=True)
+    report = []
+    for name in ('Statuts.docx', 'Attestation.docx'):
+        path = folder / name
+        path.write_bytes(b'docx ' + name.encode())
+        report.append({'template': name, 'status': 'ok', 'out_docx': str(path)})
+    return report
+
+
+@pytest.fixture
+def api(tmp_path):
+    server = ApiServer(tmp_path / 'db.xlsx', port=0, out_dir=tmp_path / 'out', runner=_fake_runner,
+                       token=TOKEN).start()
+    yield server
+    server.stop()
+
+
+def _call(api, method, path, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {TOKEN}', **(headers or {})}
+    request = urllib.request.Request(api.url + path, data=data, method=method, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read(), response.headers
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), e.headers
+
+
+def test_save_query_and_read_company(api):
+    status, body, _ = _call(api, 'POST', '/companies', [
+        {'societe': {'denomination': 'ALPHA'}, 'associes': [{'nom': 'Alaoui'}]},
+        {'societe': {'denomination': 'BETA'}},
+    ])
+    assert status == 201
+    assert [ids['Societes'] for ids in json.loads(body)['saved']] == [['1'], ['2']]
+
+    status, body, _ = _call(api, 'POST', '/companies', {'societe': {'denomination': 'alpha'}})
+    assert status == 409 and json.loads(body)['errors'][0]['status'] == 'duplicate'
+
+    status, body, _ = _call(api, 'GET', '/companies?q=bet')
+    assert status == 200 and [r['DEN_STE'] for r in json.loads(body)] == ['BETA']
+
+    status, body, _ = _call(api, 'GET', '/companies/1')
+    values = json.loads(body)
+    assert status == 200 and values['societe']['denomination'] == 'ALPHA'
+    assert [a['nom'] for a in values['associes']] == ['Alaoui']
+
+    assert _call(api, 'GET', '/companies/99')[0] == 404
+    assert _call(api, 'GET', '/nowhere')[0] == 404
+
+
+def test_generate_then_download_zip(api):
+    status, body, _ = _call(api, 'POST', '/generate', {'values': {'societe': {'denomination': 'GAMMA'}}})
+    assert status == 202
+    job_id = json.loads(body)['jobs'][0]['id']
+
+    deadline = time.time() + 10
+    while True:
+        job = json.loads(_call(api, 'GET', f'/jobs/{job_id}')[1])
+        if job['status'] == 'done' or time.time() > deadline:
+            break
+        time.sleep(0.02)
+    assert job['status'] == 'done' and job['documents'] == ['Statuts.docx', 'Attestation.docx']
+
+    status, body, headers = _call(api, 'GET', f'/jobs/{job_id}/download')
+    assert status == 200 and headers['Transfer-Encoding'] == 'chunked'
+    with zipfile.ZipFile(io.BytesIO(body)) as archive:
+        assert archive.read('Statuts.docx') == b'docx Statuts.docx'
+        assert sorted(archive.namelist()) == ['Attestation.docx', 'Statuts.docx']
+
+
+def test_generate_checks_ids_and_values(api):
+    assert _call(api, 'POST', '/companies', {'societe': {'denomination': 'ALPHA'}})[0] == 201
+
+    status, body, _ = _call(api, 'POST', '/generate', {'ids': ['1', '42']})
+    assert status == 404 and '42' in json.loads(body)['error']
+    assert _call(api, 'POST', '/generate', {'values': [{'societe': {}}, 'ALPHA']})[0] == 400
+    assert json.loads(_call(api, 'GET', '/health')[1])['pending_jobs'] == 0
+
+    status, body, _ = _call(api, 'POST', '/generate', {'ids': ['1']})
+    assert status == 202 and json.loads(body)['jobs'][0]['label'] == 'ALPHA'
+
+
+def test_generate_refused_beyond_pending_limit(tmp_path):
+    release = threading.Event()
+
+    def slow_runner(*args, **kwargs):
+        release.wait(10)
+        return []
+
+    server = ApiServer(tmp_path / 'db.xlsx', port=0, out_dir=tmp_path, runner=slow_runner,
+                       generation_workers=1, max_pending_jobs=2, token=TOKEN).start()
+    try:
+        values = {'values': [{'societe': {'denomination': 'A'}}, {'societe': {'denomination': 'B'}}]}
+        assert _call(server, 'POST', '/generate', values)[0] == 202
+        status, body, headers = _call(server, 'POST', '/generate', {'values': {'societe': {}}})
+        assert status == 429 and headers['Retry-After']
+        assert json.loads(_call(server, 'GET', '/health')[1])['pending_jobs'] == 2
+    finally:
+        release.set()
+        server.stop()
+
+
+def test_only_loopback_addresses(tmp_path):
+    with pytest.raises(ValueError):
+        ApiServer(tmp_path / 'db.xlsx', host='0.0.0.0', port=0)
+
+
+def test_requests_need_the_token_and_a_local_host(api):
+    assert _call(api, 'GET', '/health')[0] == 200
+    status, _, headers = _call(api, 'GET', '/health', headers={'Authorization': 'Bearer wrong'})
+    assert status == 401 and headers['WWW-Authenticate'] == 'Bearer'
+
+    # A page served by evil.example resolving to 127.0.0.1 (DNS rebinding) sends its own Host
+    connection = http.client.HTTPConnection(*api.httpd.server_address[:2], timeout=10)
+    connection.request('GET', '/health', headers={'Host': f'evil.example:{api.httpd.server_address[1]}',
+                                                  'Authorization': f'Bearer {TOKEN}'})
+    assert connection.getresponse().status == 403
+    connection.close()
+
+
+def test_json_bodies_need_the_json_content_type(api):
+    # A cross-site form post cannot send application/json without a preflight
+    status, _, _ = _call(api, 'POST', '/companies', {'societe': {'denomination': 'ALPHA'}},
+                         headers={'Content-Type': 'text/plain'})
+    assert status == 415
+    assert json.loads(_call(api, 'GET', '/companies')[1]) == []
+
+
+def test_token_is_created_once_for_the_owner_only(tmp_path):
+    path = tmp_path / 'config' / 'api_token'
+    token = load_token(path)
+    assert len(token) >= 32 and load_token(path) == token
+    if os.name == 'posix':
+        assert path.stat().st_mode & 0o077 == 0
+
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_malformed_content_length_is_a_bad_request(api, length):
+    connection = http.client.HTTPConnection(*api.httpd.server_address[:2], timeout=10)
+    connection.putrequest('POST', '/companies')
+    for name, value in (('Content-Type', 'application/json'), ('Content-Length', length),
+                        ('Authorization', f'Bearer {TOKEN}')):
+        connection.putheader(name, value)
+    connection.endheaders()
+    response = connection.getresponse()
+    assert response.status == 400
+    assert json.loads(response.read()) == {'error': 'Invalid Content-Length'}
+    connection.close()
+
+
+def test_concurrent_first_saves_prepare_the_workbook_once(api, monkeypatch):
+    from src.utils import records
+
+    real_open_store = records.open_store
+    events = []
+
+    def open_store(path=None, prepare=False):
+        if not prepare:
+            events.append('open')
+            return real_open_store(path)
+        events.append('prepare')
+        time.sleep(0.2)
+        store = real_open_store(path, prepare=True)
+        events.append('prepared')
+        return store
+
+    monkeypatch.setattr(records, 'open_store', open_store)
+    statuses = []
+    threads = [threading.Thread(target=lambda i=i: statuses.append(
+        _call(api, 'POST', '/companies', {'societe': {'denomination': f'STE {i}'}})[0])) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert statuses == [201] * 4
+    # The other saves waited for the migration instead of skipping it
+    assert events == ['prepare', 'prepared'] + ['open'] * 3
@@ -0,0 +1,190 @@
+import datetime
+
+import pandas as pd
+
+from src.utils import backup as backup_module
+from src.utils import constants as _const
+from src.utils.backup import BackupRepository, RetentionPolicy, backup_repository, chunk_bounds, flush_backups
+from src.utils.coordinator import WriteCoordinator
+from src.utils.store import DataStore
+from src.utils.utils import ensure_excel_db
+
+
+def _workbook(path, n=2000):
+    ensure_excel_db(path, _const.excel_sheets)
+    societes = pd.DataFrame({'ID_SOCIETE': [str(i + 1) for i in range(n)], 'DEN_STE': [f'SOCIETE {i}' for i in range(n)]})
+    with pd.ExcelWriter(path, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+        societes.to_excel(writer, sheet_name='Societes', index=False)
+    return societes
+
+
+def _objects(repository):
+    return set(p.name for p in repository.objects_dir.glob('*/*'))
+
+
+def test_chunk_bounds_cover_every_row():
+    hashes = [1, 256, 3, 512, 5]
+    assert chunk_bounds(hashes, bits=8) == [2, 4, 5]
+    assert chunk_bounds([1] * 5, bits=8, max_rows=2) == [2, 4, 5]
+
+
+def test_unchanged_workbook_writes_nothing_and_a_change_writes_its_chunk(tmp_path):
+    path = tmp_path / 'db.xlsx'
+    societes = _workbook(path)
+    repository = BackupRepository(path)
+
+    first = repository.create()
+    assert repository.create() == first
+    objects = _objects(repository)
+
+    changed = societes.copy()
+    changed.loc[1500, 'DEN_STE'] = 'RENAMED'
+    second = repository.create({'Societes': changed})
+
+    assert second != first
+    assert 1 <= len(_objects(repository) - objects) <= 2
+    assert list(repository.tables(second)['Societes']['DEN_STE'])[1500] == 'RENAMED'
+    assert set(repository.tables(second)) == set(repository.tables(first))
+
+
+def test_point_in_time_restore(tmp_path):
+    path = tmp_path / 'db.xlsx'
+    societes = _workbook(path, n=10)
+    repository = BackupRepository(path)
+    first = repository.create()
+    repository.create({'Societes': societes.iloc[:3]})
+    moment = repository.backups()[0].created
+
+    restored = repository.restore(at=moment, target=tmp_path / 'restored.xlsx')
+
+    assert repository.find(moment).backup_id == first
+    assert list(pd.read_excel(restored, sheet_name='Societes', dtype=str)['DEN_STE']) == list(societes['DEN_STE'])
+    assert 'Associes' in pd.ExcelFile(restored).sheet_names
+
+
+def test_prune_keeps_one_backup_per_period_and_drops_unused_chunks(tmp_path):
+    path = tmp_path / 'db.xlsx'
+    societes = _workbook(path, n=10)
+    repository = BackupRepository(path)
+    for i in range(4):
+        repository.create({'Societes': societes.iloc[:i + 1]})
+
+    removed = repository.prune(RetentionPolicy(recent=1, hourly=24, daily=0, monthly=0))
+
+    assert removed == 3
+    (kept,) = repository.backups()
+    assert len(repository.tables(kept.backup_id)['Societes']) == 4
+    used = {d for s in repository._manifest(kept.backup_id)['sheets'].values() for d in s['chunks']}
+    assert _objects(repository) == used
+
+
+def test_store_writes_are_backed_up_in_the_background(tmp_path):
+    path = tmp_path / 'db.xlsx'
+    _workbook(path, n=2)
+    store = DataStore(path)
+    store.load()
+
+    store.delete_societe('1')
+    assert flush_backups(timeout=30)
+
+    (backup,) = backup_repository(path).backups()
+    assert list(backup_repository(path).tables(backup.backup_id)['Societes']['DEN_STE']) == ['SOCIETE 1']
+    assert backup.created <= datetime.datetime.now()
+
+
+def test_backup_and_restore_keep_the_cell_text(tmp_path):
+    path = tmp_path / 'db.xlsx'
+    _workbook(path, n=2)
+    store = DataStore(path)
+    store.load()
+    store.save_records({'denomination': 'LOHACOM', 'capital': '10 000'}, [{'nom': 'Omar'}],
+                       {'period': '06', 'prix_mensuel': '1500', 'date_debut': '01/03/2025'})
+    assert flush_backups(timeout=30)
+    written = {name: pd.read_excel(path, sheet_name=name, dtype=str) for name in ('Societes', 'Contrats')}
+    repository = backup_repository(path)
+    backup_id = repository.backups()[-1].backup_id
+
+    store.delete_societe('3')
+    repository.restore(backup_id=backup_id)
+
+    for name, df in written.items():
+        restored = pd.read_excel(path, sheet_name=name, dtype=str)
+        pd.testing.assert_frame_equal(restored, df)
+        pd.testing.assert_frame_equal(repository.tables(backup_id)[name], df.fillna('').astype(object))
+    # The restore was a coordinated write
+    assert WriteCoordinator.instance(path).version() == 3
+
+
+def test_a_write_only_serializes_the_chunks_it_changed(tmp_path, monkeypatch):
+    path = tmp_path / 'db.xlsx'
+    societes = _workbook(path)
+    repository = BackupRepository(path)
+    repository.create({'Societes': societes})
+    dumped = []
+    real_dumps = backup_module.json.dumps
+    monkeypatch.setattr(backup_module.json, 'dumps', lambda obj, **kw: dumped.append(obj) or real_dumps(obj, **kw))
+
+    changed = societes.copy()
+    changed.loc[1500, 'DEN_STE'] = 'RENAMED'
+    repository.create({'Societes': changed})
+
+    # The changed chunk and the manifest
+    assert len(dumped) == 2
+
+
+def test_retention_is_read_from_the_config(tmp_path):
+    config = tmp_path / 'backup.json'
+    config.write_text('{"recent": 3, "daily": 7}', encoding='utf-8')
+    assert backup_module.load_retention(config) == RetentionPolicy(recent=3, hourly=24, daily=7, monthly=12)
+
+    assert backup_module.load_retention(tmp_path / 'missing.json') == RetentionPolicy()
+    config.write_text('{"recent": "many"}', encoding='utf-8')
+    assert backup_module.load_retention(config) == RetentionPolicy()
+
+
+def test_background_backups_prune_with_the_configured_retention(tmp_path, monkeypatch):
+    config = tmp_path / 'backup.json'
+    config.write_text('{"recent": 1, "hourly": 0, "daily": 0, "monthly": 0}', encoding='utf-8')
+    monkeypatch.setattr(backup_module, 'CONFIG_PATH', config)
+    path = tmp_path / 'db.xlsx'
+    societes = _workbook(path, n=10)
+    worker = backup_module.BackupWorker()
+
+    for i in range(3):
+        worker.schedule(path, {'Societes': societes.assign(DEN_STE=f'V{i}')})
+        assert worker.flush(timeout=30)
+
+    assert worker.policy.recent == 1
+    assert len(worker.repository(path).backups()) == 1
+
+
+def test_a_backup_is_skipped_once_the_workbook_moved_on(tmp_path):
+    import os
+
+    path = tmp_path / 'db.xlsx'
+    societes = _workbook(path, n=10)
+    stat = os.stat(path)
+    saved = (stat.st_size, stat.st_mtime_ns)
+    repository = BackupRepository(path)
+    assert repository.create({'Societes': societes}, label='first save', signature=saved) is not None
+
+    # A later save rewrites the file before the backup of the earlier one runs
+    _workbook(path, n=12)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert repository.create({'Societes': societes}, label='second save', signature=saved) is None
+    assert [info.label for info in repository.backups()] == ['first save']
+
+
+def test_store_backups_carry_the_signature_of_their_write(tmp_path, monkeypatch):
+    path = tmp_path / 'db.xlsx'
+    _workbook(path, n=10)
+    scheduled = []
+    monkeypatch.setattr('src.utils.store.schedule_backup',
+                        lambda p, tables, label='', signature=None: scheduled.append(signature))
+    store = DataStore(path)
+    store.load()
+    store.save_records({'denomination': 'NOUVELLE'}, [], {})
+
+    import os
+    stat = os.stat(path)
+    assert scheduled == [(stat.st_size, stat.st_mtime_ns)]
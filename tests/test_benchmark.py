@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / 'scripts' / 'benchmark.py'
+
+
+def _run(*args):
+    return subprocess.run([sys.executable, str(SCRIPT), '--sizes', '20', '--repeat', '1', '--no-templates', *args],
+                          cwd=ROOT, capture_output=True, text=True, timeout=300)
+
+
+def test_baseline_then_compare_flags_regressions(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    result = _run('--workdir', str(tmp_path / 'work'), '--out', str(baseline))
+    assert result.returncode == 0, result.stderr
+    data = json.loads(baseline.read_text(encoding='utf-8'))
+    assert {'write_records_to_db@20', 'societe_exists[warm]@20', 'migrate_excel_workbook@20',
+            'dashboard_load[cold]@20', 'store_save_records@20'} <= set(data['results'])
+
+    # A baseline ten times faster than reality: the slow operations are regressions
+    for result_data in data['results'].values():
+        result_data['median'] /= 10
+    faster = tmp_path / 'faster.json'
+    faster.write_text(json.dumps(data), encoding='utf-8')
+    result = _run('--workdir', str(tmp_path / 'work'), '--compare', str(faster))
+    assert result.returncode == 1
+    assert 'REGRESSION' in result.stdout and 'write_records_to_db@20' in result.stdout
@@ -0,0 +1,92 @@
+import openpyxl
+import pandas as pd
+
+from src.utils import constants as _const
+from src.utils.storage import SCHEMA_VERSION, bootstrap_database, needs_bootstrap, read_schema
+
+
+def test_bootstrap_creates_seeded_and_stamped_database(tmp_path):
+    db = tmp_path / 'databases' / 'db.xlsx'
+
+    assert bootstrap_database(db) is True
+
+    names, version = read_schema(db)
+    assert names == list(_const.excel_sheets)
+    assert version == SCHEMA_VERSION
+    wb = openpyxl.load_workbook(db)
+    assert [c.value for c in wb['Societes'][1]] == _const.societe_headers
+    assert wb['Societes'].max_row == 1
+    for sheet, values in _const.reference_values.items():
+        column = [c.value for c in wb[sheet]['A']]
+        assert column == _const.excel_sheets[sheet] + list(values)
+
+
+def test_bootstrap_is_a_noop_on_initialized_database(tmp_path):
+    db = tmp_path / 'db.xlsx'
+    bootstrap_database(db)
+    before = db.stat().st_mtime_ns
+
+    assert needs_bootstrap(db) is False
+    assert bootstrap_database(db) is False
+    assert db.stat().st_mtime_ns == before
+
+
+def test_bootstrap_completes_legacy_workbook(tmp_path):
+    db = tmp_path / 'legacy.xlsx'
+    # An older database: no stamp, a data row, a custom reference list, sheets missing
+    with pd.ExcelWriter(db, engine='openpyxl') as writer:
+        pd.DataFrame([{'ID_SOCIETE': 1, 'DEN_STE': 'ANCIENNE'}], columns=_const.societe_headers).to_excel(
+            writer, sheet_name='Societes', index=False)
+        pd.DataFrame({'TRIBUNAL': ['Tanger']}).to_excel(writer, sheet_name='Tribunaux', index=False)
+        pd.DataFrame(columns=['NATIONALITE']).to_excel(writer, sheet_name='Nationalites', index=False)
+    assert read_schema(db)[1] is None
+
+    assert bootstrap_database(db) is True
+
+    assert read_schema(db)[1] == SCHEMA_VERSION
+    wb = openpyxl.load_workbook(db)
+    assert set(_const.excel_sheets) <= set(wb.sheetnames)
+    assert wb['Societes']['B2'].value == 'ANCIENNE'
+    assert [c.value for c in wb['Tribunaux']['A']] == ['TRIBUNAL', 'Tanger']
+    assert [c.value for c in wb['Nationalites']['A']] == ['NATIONALITE'] + _const.Nationalite
+    assert [c.value for c in wb['Associes'][1]] == _const.associe_headers
+
+
+def test_bootstrap_formats_date_columns(tmp_path):
+    db = tmp_path / 'legacy.xlsx'
+    pd.DataFrame([{'ID_SOCIETE': 1, 'DEN_STE': 'ANCIENNE', 'DATE_ICE': pd.Timestamp('2024-03-01')}]).to_excel(
+        db, sheet_name='Societes', index=False)
+
+    bootstrap_database(db)
+
+    ws = openpyxl.load_workbook(db)['Societes']
+    headers = [c.value for c in ws[1]]
+    # The legacy sheet keeps its columns and gets the ones it lacked
+    assert headers[:3] == ['ID_SOCIETE', 'DEN_STE', 'DATE_ICE']
+    assert set(_const.societe_headers) <= set(headers)
+    assert ws['C2'].number_format == 'DD/MM/YYYY'
+    for idx, name in enumerate(headers, start=1):
+        if 'DATE' in name:
+            letter = openpyxl.utils.get_column_letter(idx)
+            assert ws.column_dimensions[letter].number_format == 'DD/MM/YYYY', name
+
+
+def test_saving_from_the_application_bootstraps_a_legacy_workbook(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from main import MainApp
+
+    db = tmp_path / 'legacy.xlsx'
+    pd.DataFrame([{'ID_SOCIETE': 1, 'DEN_STE': 'ANCIENNE'}], columns=_const.societe_headers).to_excel(
+        db, sheet_name='Societes', index=False)
+    monkeypatch.setenv('DOMICILIATION_DB', str(db))
+    app = SimpleNamespace(collect_values=lambda: None, values={'societe': {'denomination': 'NOUVELLE'}})
+
+    assert MainApp.save_to_db(app) == db
+
+    names, version = read_schema(db)
+    assert version == SCHEMA_VERSION and set(_const.excel_sheets) <= set(names)
+    assert needs_bootstrap(db) is False
+    wb = openpyxl.load_workbook(db)
+    assert [c.value for c in wb['Societes']['B']][1:] == ['ANCIENNE', 'NOUVELLE']
+    assert [c.value for c in wb['Tribunaux']['A']][1:] == list(_const.reference_values['Tribunaux'])
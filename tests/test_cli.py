@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from src.cli import main
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _lines(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_save_then_query(tmp_path, capsys):
+    db = tmp_path / 'db.xlsx'
+    source = tmp_path / 'societes.json'
+    source.write_text(json.dumps([
+        {'societe': {'denomination': 'ALPHA'}, 'associes': [{'nom': 'Alaoui'}], 'contrat': {'date_debut': '01/03/2025'}},
+        {'societe': {'denomination': 'BETA'}},
+    ]), encoding='utf-8')
+
+    assert main(['--db', str(db), 'save', str(source)]) == 0
+    assert [r['ids']['Societes'] for r in _lines(capsys)] == [['1'], ['2']]
+
+    # Saving the same names again is refused, like in the application
+    assert main(['--db', str(db), 'save', str(source)]) == 1
+    assert {r['status'] for r in _lines(capsys)} == {'duplicate'}
+
+    assert main(['--db', str(db), 'query', 'alp']) == 0
+    assert [(r['ID_SOCIETE'], r['DEN_STE']) for r in _lines(capsys)] == [('1', 'ALPHA')]
+
+
+def test_cli_never_imports_tkinter(tmp_path):
+    code = ('import sys; from src.cli import main; '
+            f'main(["--db", {str(tmp_path / "db.xlsx")!r}, "query"]); '
+            'assert "tkinter" not in sys.modules, "tkinter imported"')
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True)
+
+
+def test_database_can_be_selected_by_environment(tmp_path, monkeypatch, capsys):
+    db = tmp_path / 'other.xlsx'
+    monkeypatch.setenv('DOMICILIATION_DB', str(db))
+    source = tmp_path / 'societe.json'
+    source.write_text(json.dumps({'societe': {'denomination': 'GAMMA'}}), encoding='utf-8')
+
+    assert main(['save', str(source)]) == 0
+    assert db.exists()
+    capsys.readouterr()
+    assert main(['query', 'gam']) == 0
+    assert [r['DEN_STE'] for r in _lines(capsys)] == ['GAMMA']
+
+
+def test_generate_runs_each_aggregate_through_records(tmp_path, monkeypatch, capsys):
+    calls = []
+
+    def fake_render(values, templates_dir, out_dir, **kwargs):
+        calls.append((values, Path(templates_dir)))
+        return [{'status': 'ok'}]
+
+    monkeypatch.setattr('src.utils.doc_generator.render_templates', fake_render)
+    source = tmp_path / 'values.json'
+    source.write_text(json.dumps({'societe': {'denomination': 'ALPHA'}}), encoding='utf-8')
+
+    assert main(['generate', '--values', str(source), '--out', str(tmp_path / 'out'),
+                 '--templates-dir', str(tmp_path)]) == 0
+    # records.generate fills in the missing parts of the aggregate
+    assert calls == [({'societe': {'denomination': 'ALPHA'}, 'associes': [], 'contrat': {}}, tmp_path)]
+    assert [r['status'] for r in _lines(capsys)] == ['done']
@@ -0,0 +1,113 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.utils import constants as _const
+from src.utils.contracts import ExpiryIndex, add_months, plan_renewals, renew_contracts, renewal_values
+
+
+def _contrats():
+    return pd.DataFrame({
+        'ID_CONTRAT': ['1', '2', '3', '4', '5'],
+        'ID_SOCIETE': ['10', '20', '30', '40', '50'],
+        'DOM_DATEFIN': ['15/01/2025', '', '01/03/2025', '31/12/2024', 'pas une date'],
+    })
+
+
+def test_index_is_sorted_by_end_date_and_skips_invalid_dates():
+    index = ExpiryIndex.from_frame(_contrats())
+
+    assert len(index) == 3
+    assert list(index.contrat_ids) == ['4', '1', '3']
+    assert list(index.positions) == [3, 0, 2]
+
+
+def test_expiring_within_window():
+    index = ExpiryIndex.from_frame(_contrats())
+    today = datetime.date(2025, 1, 1)
+
+    window = index.expiring_within(30, today=today)
+    assert list(index.societe_ids[window]) == ['10']
+    assert list(index.days_left(window, today=today)) == [14]
+
+    window = index.expiring_within(60, today=today, include_expired=True)
+    assert list(index.contrat_ids[window]) == ['4', '1', '3']
+    assert list(index.days_left(window, today=today)) == [-1, 14, 59]
+
+
+def test_empty_frame_gives_empty_index():
+    index = ExpiryIndex.from_frame(pd.DataFrame(columns=['ID_CONTRAT', 'DOM_DATEFIN']))
+    assert len(index) == 0
+    assert index.expiring_within(30).stop == 0
+
+
+def test_add_months_clamps_to_month_end():
+    dates = np.array(['2025-01-31', '2024-01-31', '2025-03-15', 'NaT'], dtype='datetime64[D]')
+
+    assert [str(d) for d in add_months(dates, 1)] == ['2025-02-28', '2024-02-29', '2025-04-15', 'NaT']
+    assert [str(d) for d in add_months(dates, [12, 13, -3, 1])][:3] == ['2026-01-31', '2025-02-28', '2024-12-15']
+
+
+def _renewable():
+    return pd.DataFrame({
+        'ID_CONTRAT': ['1', '2', '3'],
+        'ID_SOCIETE': ['10', '20', '10'],
+        'DATE_CONTRAT': ['31/01/2024', '15/07/2024', '31/12/2023'],
+        'PERIOD_DOMCIL': ['12', '06', ''],
+        'PRIX_CONTRAT': ['1500', '900', ''],
+        'PRIX_INTERMEDIARE_CONTRAT': ['', '', ''],
+        'DOM_DATEDEB': ['31/01/2024', '15/07/2024', '31/12/2023'],
+        'DOM_DATEFIN': ['31/01/2025', '15/01/2025', '31/12/2024'],
+    })
+
+
+def test_plan_renewals_extends_the_latest_contract_of_each_societe():
+    today = datetime.date(2025, 1, 1)
+    renewals = plan_renewals(_renewable(), days=30, today=today)
+
+    assert list(renewals['ID_CONTRAT']) == [4, 5]
+    assert list(renewals['ID_SOCIETE']) == [20, 10]
+    assert list(renewals['DOM_DATEDEB']) == ['15/01/2025', '31/01/2025']
+    assert list(renewals['DOM_DATEFIN']) == ['15/07/2025', '31/01/2026']
+    assert list(renewals['DATE_CONTRAT']) == ['01/01/2025', '01/01/2025']
+    assert list(renewals['PRIX_CONTRAT']) == [900, 1500]
+    assert list(renewals['PERIOD_DOMCIL']) == ['06', '12']
+
+    # Planning again once the renewals are stored finds nothing left to do
+    stored = pd.concat([_renewable(), renewals.astype(str)], ignore_index=True)
+    assert plan_renewals(stored, days=30, today=today).empty
+
+
+def test_plan_renewals_restarts_long_expired_contracts_today():
+    today = datetime.date(2025, 1, 1)
+    contrats = _renewable().assign(DOM_DATEFIN=['31/01/2025', '15/01/2025', '31/12/2020'], ID_SOCIETE=['10', '20', '30'])
+    renewals = plan_renewals(contrats, days=30, today=today, include_expired=True)
+
+    expired = renewals[renewals['ID_SOCIETE'] == 30].iloc[0]
+    assert expired['DOM_DATEDEB'] == '01/01/2025'
+    assert expired['DOM_DATEFIN'] == '01/01/2026'
+    assert expired['PERIOD_DOMCIL'] == '12'
+
+
+def test_renew_contracts_appends_rows_in_one_save(tmp_path):
+    path = tmp_path / 'db.xlsx'
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame([['10', 'ASTRAPIA']], columns=['ID_SOCIETE', 'DEN_STE']).reindex(
+            columns=_const.societe_headers).to_excel(writer, sheet_name='Societes', index=False)
+        _renewable().to_excel(writer, sheet_name='Contrats', index=False)
+
+    renewals = renew_contracts(path, days=30, today=datetime.date(2025, 1, 1))
+    stored = pd.read_excel(path, sheet_name='Contrats', dtype=str)
+
+    assert len(renewals) == 2
+    assert list(stored['ID_CONTRAT']) == ['1', '2', '3', '4', '5']
+    assert list(stored['DOM_DATEFIN'])[-2:] == ['15/07/2025', '31/01/2026']
+    # The periods keep the form's text in the workbook
+    assert list(stored['PERIOD_DOMCIL'])[-2:] == ['06', '12']
+    assert renew_contracts(path, days=30, today=datetime.date(2025, 1, 1)).empty
+    assert not list(tmp_path.glob('.*.tmp*'))
+
+    values = renewal_values(renewals, pd.read_excel(path, sheet_name='Societes', dtype=str), None)
+    assert values[1]['societe']['denomination'] == 'ASTRAPIA'
+    assert values[1]['contrat']['date_fin'] == '31/01/2026'
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from src.utils import constants as _const
+from src.utils.coordinator import WorkbookBusyError, WriteCoordinator, lock_path
+from src.utils.store import DataStore
+
+
+def _workbook(path):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        for name in ('Societes', 'Associes', 'Contrats'):
+            pd.DataFrame(columns=_const.excel_sheets[name]).to_excel(writer, sheet_name=name, index=False)
+    return path
+
+
+def _other_pc(path):
+    """A store whose coordinator shares nothing with ours but the files (like another process)."""
+    store = DataStore(path)
+    store._coordinator = WriteCoordinator(path)
+    store.load()
+    return store
+
+
+def test_lock_excludes_other_writers_and_transaction_bumps_the_version(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    ours, theirs = WriteCoordinator(path), WriteCoordinator(path, timeout=0.2)
+
+    with ours.transaction() as txn:
+        assert txn.version == 0
+        with ours.lock():  # re-entrant
+            pass
+        with pytest.raises(WorkbookBusyError):
+            with theirs.lock():
+                pass
+    assert ours.version() == theirs.version() == 1
+    assert not lock_path(path).exists()
+
+
+def test_stale_lock_is_broken(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    lock_path(path).write_text('{"writer": "crashed"}')
+    old = time.time() - 3600
+    os.utime(lock_path(path), (old, old))
+
+    with WriteCoordinator(path, timeout=0.2).lock():
+        pass
+
+
+def test_concurrent_appends_are_rebased(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    a, b = _other_pc(path), _other_pc(path)
+
+    b.append('Contrats', pd.DataFrame({'ID_CONTRAT': [1], 'ID_SOCIETE': [1]}))
+    # `a` prepared its row before seeing b's write: same ID
+    a.append('Contrats', pd.DataFrame({'ID_CONTRAT': [1], 'ID_SOCIETE': [2]}))
+
+    contrats = pd.read_excel(path, sheet_name='Contrats', dtype=str)
+    assert list(contrats['ID_SOCIETE']) == ['1', '2']
+    assert list(contrats['ID_CONTRAT']) == ['1', '2']
+    assert list(a.table('Contrats')['ID_CONTRAT']) == [1, 2]
+
+
+def test_parallel_saves_keep_every_row(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    stores = [_other_pc(path) for _ in range(3)]
+    errors = []
+
+    def save(store, i):
+        try:
+            store.save_records({'denomination': f'STE {i}'}, [], {})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(store, i)) for i, store in enumerate(stores)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    societes = pd.read_excel(path, sheet_name='Societes', dtype=str)
+    assert sorted(societes['DEN_STE']) == ['STE 0', 'STE 1', 'STE 2']
+    assert sorted(societes['ID_SOCIETE']) == ['1', '2', '3']
+
+
+def test_breaking_a_stale_lock_never_removes_a_fresh_one(tmp_path, monkeypatch):
+    from src.utils import coordinator as coordinator_module
+
+    path = _workbook(tmp_path / 'db.xlsx')
+    lock_path(path).write_text('{"writer": "crashed"}')
+    old = time.time() - 3600
+    os.utime(lock_path(path), (old, old))
+    real_rename = os.rename
+
+    def rename_after_another_waiter(src, dst):
+        # Another waiter broke the stale lock and took a fresh one first
+        lock_path(path).unlink()
+        lock_path(path).write_text('{"writer": "other waiter"}')
+        monkeypatch.setattr(coordinator_module.os, 'rename', real_rename)
+        real_rename(src, dst)
+
+    monkeypatch.setattr(coordinator_module.os, 'rename', rename_after_another_waiter)
+
+    assert not WriteCoordinator(path)._break_stale_lock()
+    assert lock_path(path).read_text() == '{"writer": "other waiter"}'
+    assert list(tmp_path.glob('*.stale')) == []
+
+
+def test_a_long_commit_keeps_its_lock_fresh(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    holder = WriteCoordinator(path, stale_after=0.4)
+    waiter = WriteCoordinator(path, timeout=0.3, stale_after=0.4)
+
+    with holder.lock():
+        time.sleep(0.8)
+        with pytest.raises(WorkbookBusyError):
+            with waiter.lock():
+                pass
+    assert not lock_path(path).exists()
+
+
+def test_readers_are_not_blocked_while_a_write_waits_for_the_lock(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    store = DataStore(path)
+    store.load()
+    saved = threading.Event()
+
+    def save():
+        store.save_records({'denomination': 'ALPHA'}, [], {})
+        saved.set()
+
+    with WriteCoordinator(path).lock():
+        writer = threading.Thread(target=save)
+        writer.start()
+        time.sleep(0.3)
+        assert not saved.is_set()
+        # The waiting write holds no in-memory lock: reading and subscribing go through
+        reader = threading.Thread(target=lambda: (store.load(force=True), store.subscribe(lambda changes: None)))
+        reader.start()
+        reader.join(2)
+        assert not reader.is_alive()
+    writer.join(10)
+    assert saved.is_set()
+    assert list(store.table('Societes')['DEN_STE']) == ['ALPHA']
+
+
+@pytest.mark.parametrize('step', ['check', 'put back'])
+def test_a_lock_released_while_being_broken_is_not_put_back(tmp_path, monkeypatch, step):
+    path = _workbook(tmp_path / 'db.xlsx')
+    holder = WriteCoordinator(path)
+    held = holder.lock()
+    held.__enter__()
+    waiter = WriteCoordinator(path, timeout=0.2)
+    real_state, real_try_lock = waiter._lock_state, waiter._try_lock
+
+    def lock_state(p):
+        # The holder's heartbeat looked late to the waiter, then came in
+        content, age = real_state(p)
+        if p == lock_path(path):
+            return content, age + 3600
+        if step == 'check':
+            held.__exit__(None, None, None)
+        return content, age
+
+    def try_lock(content):
+        if step == 'put back':
+            held.__exit__(None, None, None)
+        return real_try_lock(content)
+
+    monkeypatch.setattr(waiter, '_lock_state', lock_state)
+    monkeypatch.setattr(waiter, '_try_lock', try_lock)
+    waiter._break_stale_lock()
+
+    assert not lock_path(path).exists()
+    assert list(tmp_path.glob('*.stale')) == []
+    with WriteCoordinator(path, timeout=0.2).lock():
+        pass
@@ -0,0 +1,85 @@
+from src.utils.doc_generator import render_templates, STAGES
+from pathlib import Path
+
+
+def test_report_entries_have_stage_timings(tmp_path):
+    out_dir = tmp_path / 'out'
+    report = render_templates({'societe': {'denomination': 'Stage Co'}}, templates_dir=str(Path('Models')),
+                              out_dir=str(out_dir), to_pdf=False, profile=False)
+
+    assert len(report) > 0
+    for entry in report:
+        if entry['status'] == 'error':
+            continue
+        stages = entry['stages']
+        assert set(stages) == set(STAGES)
+        assert all(v >= 0 for v in stages.values())
+        # Stages are measured within the template's own duration (pdf excluded)
+        assert sum(stages[k] for k in ('context', 'load', 'render', 'save')) <= entry['duration_seconds'] + 0.01
+
+
+def test_profile_mode_writes_profile_next_to_html_report(tmp_path, monkeypatch):
+    monkeypatch.setenv('DOMICILIATION_PROFILE', '1')
+    out_dir = tmp_path / 'out'
+    render_templates({'societe': {'denomination': 'Profile Co'}}, templates_dir=str(Path('Models')),
+                     out_dir=str(out_dir), to_pdf=False)
+
+    gen_folder = next(p for p in out_dir.iterdir() if p.is_dir())
+    assert list(gen_folder.glob('*_Raport_Docs_generer_*.html'))
+    assert list(gen_folder.glob('*_Profil_*.prof'))
+    summary = next(gen_folder.glob('*_Profil_*.txt')).read_text(encoding='utf-8')
+    assert 'cProfile' in summary and 'tracemalloc' in summary
+
+
+def test_profile_mode_stops_profiling_when_generation_fails(tmp_path):
+    import cProfile
+    import tracemalloc
+
+    import pytest
+
+    class BrokenToken:
+        def is_cancelled(self):
+            raise RuntimeError('token failure')
+
+    with pytest.raises(RuntimeError):
+        render_templates({'societe': {'denomination': 'Broken Co'}}, templates_dir=str(Path('Models')),
+                         out_dir=str(tmp_path / 'out'), to_pdf=False, profile=True, cancel_token=BrokenToken())
+
+    assert not tracemalloc.is_tracing()
+    # Fails if the generation left its profiler enabled
+    profiler = cProfile.Profile()
+    profiler.enable()
+    profiler.disable()
+
+
+def test_concurrent_profiled_generations_take_turns(tmp_path):
+    import threading
+
+    reports = {}
+
+    def run(name):
+        reports[name] = render_templates({'societe': {'denomination': name}}, templates_dir=str(Path('Models')),
+                                         out_dir=str(tmp_path / name), to_pdf=False, profile=True)
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ('Alpha Co', 'Beta Co')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    for name in ('Alpha Co', 'Beta Co'):
+        assert reports[name] and all(e['status'] != 'error' for e in reports[name])
+        gen_folder = next(p for p in (tmp_path / name).iterdir() if p.is_dir())
+        assert list(gen_folder.glob('*_Profil_*.prof'))
+
+
+def test_error_entries_have_stage_timings(tmp_path):
+    templates = tmp_path / 'Models'
+    templates.mkdir()
+    (templates / 'Broken.docx').write_bytes(b'not a zip')
+
+    report = render_templates({'societe': {'denomination': 'Broken Co'}}, templates_dir=str(templates),
+                              out_dir=str(tmp_path / 'out'), to_pdf=False, profile=False)
+
+    assert [e['status'] for e in report] == ['error']
+    assert set(report[0]['stages']) == set(STAGES)
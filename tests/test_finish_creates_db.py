@@ -24,3 +24,25 @@ def test_finish_creates_database(tmp_path, monkeypatch):
     wb = openpyxl.load_workbook(db_file)
     expected_sheets = set(_const.excel_sheets.keys())
     assert expected_sheets.issubset(set(wb.sheetnames))
+
+
+def test_save_to_db_writes_the_form_values(tmp_path, monkeypatch):
+    """Run MainApp.save_to_db on a stand-in for the window (no Tk root needed)."""
+    from types import SimpleNamespace
+
+    import pandas as pd
+    from main import MainApp
+
+    db_file = tmp_path / 'db.xlsx'
+    monkeypatch.setenv('DOMICILIATION_DB', str(db_file))
+    app = SimpleNamespace(collect_values=lambda: None, values={
+        'societe': {'denomination': 'ALPHA'},
+        'associes': [{'nom': 'Alaoui'}],
+        'contrat': {'date_debut': '01/03/2025'},
+    })
+
+    assert MainApp.save_to_db(app) == db_file
+
+    societes = pd.read_excel(db_file, sheet_name='Societes', dtype=str)
+    assert list(societes['DEN_STE']) == ['ALPHA']
+    assert list(pd.read_excel(db_file, sheet_name='Associes', dtype=str)['NOM']) == ['Alaoui']
@@ -0,0 +1,106 @@
+import threading
+import time
+
+from src.utils.doc_generator import render_templates
+from src.utils.jobs import JobScheduler, CancelToken, DONE, CANCELLED, ERROR
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_scheduler_bounds_concurrency_and_runs_all_jobs():
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0}
+
+    def runner(values, templates_dir, out_dir, **kwargs):
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.05)
+        kwargs['progress_callback'](1, 1, 'tpl', {})
+        with lock:
+            state['running'] -= 1
+        return [{'template': 'tpl', 'out_docx': None, 'status': 'ok'}]
+
+    scheduler = JobScheduler(max_workers=2, runner=runner)
+    jobs = [scheduler.submit({'n': i}, 'out') for i in range(5)]
+    assert _wait(lambda: all(j.finished for j in jobs))
+    assert all(j.status == DONE for j in jobs)
+    assert state['peak'] <= 2
+    scheduler.shutdown(wait=True)
+
+
+def test_cancel_queued_and_running_jobs():
+    started = threading.Event()
+    release = threading.Event()
+    seen_tokens = []
+
+    def runner(values, templates_dir, out_dir, cancel_token=None, **kwargs):
+        seen_tokens.append(cancel_token)
+        started.set()
+        release.wait(5)
+        # Like render_templates before its next template
+        cancel_token.is_cancelled()
+        return []
+
+    scheduler = JobScheduler(max_workers=1, runner=runner)
+    running = scheduler.submit({}, 'out', label='A')
+    queued = scheduler.submit({}, 'out', label='B')
+    assert started.wait(5)
+
+    assert scheduler.cancel(queued.id)
+    assert queued.status == CANCELLED
+    assert scheduler.cancel(running.id)
+    release.set()
+
+    assert _wait(lambda: running.finished)
+    assert running.status == CANCELLED
+    # the queued job never reached the runner
+    assert seen_tokens == [running.token]
+    scheduler.shutdown(wait=True)
+
+
+def test_cancel_after_the_last_template_leaves_the_job_done():
+    finished = threading.Event()
+    release = threading.Event()
+
+    def runner(values, templates_dir, out_dir, cancel_token=None, **kwargs):
+        # All the work is done; the token is not checked again
+        finished.set()
+        release.wait(5)
+        return [{'template': 'tpl', 'out_docx': None, 'status': 'ok'}]
+
+    scheduler = JobScheduler(max_workers=1, runner=runner)
+    job = scheduler.submit({}, 'out')
+    assert finished.wait(5)
+    scheduler.cancel(job.id)
+    release.set()
+
+    assert _wait(lambda: job.finished)
+    assert job.status == DONE
+    scheduler.shutdown(wait=True)
+
+
+def test_runner_errors_are_reported_on_the_job():
+    def runner(*args, **kwargs):
+        raise RuntimeError('boom')
+
+    scheduler = JobScheduler(max_workers=1, runner=runner)
+    job = scheduler.submit({}, 'out')
+    assert _wait(lambda: job.finished)
+    assert job.status == ERROR and job.error == 'boom'
+    scheduler.shutdown(wait=True)
+
+
+def test_render_templates_honours_cancel_token(tmp_path):
+    token = CancelToken()
+    token.cancel()
+    report = render_templates({'societe': {'denomination': 'Stop Co'}}, templates_dir='Models',
+                              out_dir=str(tmp_path), cancel_token=token)
+    assert report == []
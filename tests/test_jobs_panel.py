@@ -0,0 +1,78 @@
+from src.forms.jobs_panel import JobsPanel
+
+
+class _FakeWindow:
+    """Records the grab/transient calls JobsPanel makes (no Tk needed)."""
+
+    def __init__(self, log, name):
+        self.log = log
+        self.name = name
+        self.destroy_handlers = []
+
+    def grab_set(self):
+        self.log.append((self.name, 'grab_set'))
+
+    def grab_release(self):
+        self.log.append((self.name, 'grab_release'))
+
+    def transient(self, master):
+        self.log.append((self.name, 'transient', master.name))
+
+    def bind(self, sequence, handler, add=None):
+        self.destroy_handlers.append(handler)
+
+    def winfo_exists(self):
+        return True
+
+
+class _FakePanel(_FakeWindow):
+    show_over = JobsPanel.show_over
+    hide = JobsPanel.hide
+    _take_grab = JobsPanel._take_grab
+    _return_grab = JobsPanel._return_grab
+
+    def __init__(self, log, parent):
+        super().__init__(log, 'panel')
+        self.parent = parent
+        self._grab_owner = None
+        self.pump = type('Pump', (), {'stop': lambda self: None})()
+
+    def show(self):
+        self.log.append(('panel', 'show'))
+
+    def withdraw(self):
+        self.log.append(('panel', 'withdraw'))
+
+
+def test_panel_takes_the_dashboard_grab_and_gives_it_back():
+    log = []
+    app, dashboard = _FakeWindow(log, 'app'), _FakeWindow(log, 'dashboard')
+    panel = _FakePanel(log, app)
+
+    panel.show_over(dashboard)
+    assert log == [('panel', 'transient', 'dashboard'), ('dashboard', 'grab_release'),
+                   ('panel', 'show'), ('panel', 'grab_set')]
+
+    log.clear()
+    panel.hide()
+    assert log == [('panel', 'withdraw'), ('panel', 'grab_release'), ('panel', 'transient', 'app'),
+                   ('dashboard', 'grab_set')]
+
+    # Hiding again does not touch the dashboard
+    log.clear()
+    panel.hide()
+    assert ('dashboard', 'grab_set') not in log
+
+
+def test_closing_the_dashboard_releases_the_panel_grab():
+    log = []
+    app, dashboard = _FakeWindow(log, 'app'), _FakeWindow(log, 'dashboard')
+    panel = _FakePanel(log, app)
+    panel.show_over(dashboard)
+
+    log.clear()
+    event = type('Event', (), {'widget': dashboard})()
+    for handler in dashboard.destroy_handlers:
+        handler(event)
+    assert log == [('panel', 'grab_release'), ('panel', 'transient', 'app')]
+    assert panel._grab_owner is None
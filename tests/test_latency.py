@@ -0,0 +1,75 @@
+import heapq
+import itertools
+import time
+
+import pytest
+
+from src.utils import latency
+from src.utils.startup import has_display
+
+
+class FakeLoop:
+    """The subset of the Tk event loop the runner uses, driven by real time."""
+
+    def __init__(self):
+        self._queue = []
+        self._ids = itertools.count()
+        self._cancelled = set()
+        self._running = False
+
+    def after(self, ms, func, *args):
+        after_id = next(self._ids)
+        heapq.heappush(self._queue, (time.perf_counter() + ms / 1000, after_id, func, args))
+        return after_id
+
+    def after_cancel(self, after_id):
+        self._cancelled.add(after_id)
+
+    def quit(self):
+        self._running = False
+
+    def mainloop(self):
+        self._running = True
+        while self._running and self._queue:
+            due, after_id, func, args = heapq.heappop(self._queue)
+            time.sleep(max(0.0, due - time.perf_counter()))
+            if after_id not in self._cancelled:
+                func(*args)
+
+
+def test_summarize_gaps():
+    summary = latency.summarize_gaps([10, 11, 90, 10, 260], interval_ms=10, threshold_ms=50)
+    assert summary == {'worst_stall_ms': 250.0, 'blocked_ms': 330.0, 'stalls': 2}
+
+
+def test_runner_attributes_stalls_to_the_blocking_interaction():
+    done = []
+    interactions = [
+        latency.Interaction('quick', [lambda: None, lambda: None]),
+        latency.Interaction('blocking', [lambda: time.sleep(0.25)]),
+        latency.Interaction('waits', [lambda: done.append(time.perf_counter())],
+                            until=lambda: time.perf_counter() - done[0] > 0.2),
+    ]
+    results = {r['name']: r for r in latency.ScenarioRunner(FakeLoop(), interactions).run()}
+
+    assert list(results) == ['quick', 'blocking', 'waits']
+    assert results['blocking']['worst_stall_ms'] >= 200 and results['blocking']['stalls'] == 1
+    assert results['quick']['stalls'] == 0 and results['waits']['stalls'] == 0
+    assert results['waits']['completed'] and results['waits']['seconds'] >= 0.2
+
+
+def test_compare_flags_regressions_and_budget():
+    baseline = {'interactions': [{'name': 'save', 'worst_stall_ms': 400}, {'name': 'search', 'worst_stall_ms': 20}]}
+    current = {'interactions': [{'name': 'save', 'worst_stall_ms': 900}, {'name': 'search', 'worst_stall_ms': 40},
+                                {'name': 'generate', 'worst_stall_ms': 3000}]}
+    flagged = [r['name'] for r in latency.compare(current, baseline, threshold=0.5, max_stall_ms=2000)]
+    # search doubled but by less than MIN_STALL_DELTA_MS
+    assert flagged == ['save', 'generate']
+
+
+@pytest.mark.skipif(not has_display(), reason='no display available')
+def test_harness_plays_the_scenario(tmp_path):
+    results = latency.run_harness(companies=50, workdir=tmp_path)
+    names = [i['name'] for i in results['interactions']]
+    assert names == ['open_dashboard', 'switch_pages', 'search', 'select_and_edit', 'save', 'generate']
+    assert all(i['completed'] for i in results['interactions'])
@@ -0,0 +1,74 @@
+import pytest
+
+from src.utils.startup import has_display
+
+needs_display = pytest.mark.skipif(not has_display(), reason='no display available')
+
+
+@pytest.fixture
+def root():
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+@needs_display
+def test_main_form_builds_pages_on_first_show(root):
+    from src.forms.main_form import MainForm
+
+    form = MainForm(root, {})
+    assert [form is not None for _, _, form in form.pages] == [True, False, False]
+
+    # Values set on an unbuilt page are applied when it is built
+    form.set_values({'contrat': {'period': '24'}})
+    form.show_page(2)
+    assert form.pages[2][2] is not None
+    assert form.get_values()['contrat']['period'] == '24'
+    # Collecting the values does not build the associés page
+    assert form.pages[1][2] is None
+    assert [a['nom'] for a in form.get_values()['associes']] == ['']
+
+
+@needs_display
+def test_associe_cards_collapse_beyond_threshold(root):
+    from src.forms.associe_form import AssocieForm, COLLAPSE_THRESHOLD
+    import tkinter as tk
+
+    form = AssocieForm(root)
+    associes = [{'nom': f'Nom{i}', 'prenom': 'A', 'num_parts': '10'} for i in range(COLLAPSE_THRESHOLD + 2)]
+    form.set_values(associes)
+
+    # Collapsed entries are plain values, no Tk variables yet
+    assert not any(isinstance(v, tk.Variable) for e in form.associe_vars for v in e.values())
+    assert [a['nom'] for a in form.get_values()] == [a['nom'] for a in associes]
+
+    frame = form.associes_frame.winfo_children()[1]
+    form.expand_associe(frame, form.associe_vars[1])
+    assert isinstance(form.associe_vars[1]['nom'], tk.StringVar)
+    assert form.get_values()[1]['nom'] == 'Nom1'
+
+
+def test_unbuilt_pages_give_their_pending_or_default_values():
+    from types import SimpleNamespace
+
+    from src.forms.associe_form import AssocieForm
+    from src.forms.contrat_form import ContratForm
+    from src.forms.main_form import MainForm
+
+    # A MainForm whose only built page is the société one, without Tk
+    form = SimpleNamespace(pages=[('societe', None, SimpleNamespace(get_values=lambda: {'denomination': 'ALPHA'})),
+                                  ('associes', None, None), ('contrat', None, None)],
+                           _pending_values={'contrat': {'period': '24'}}, values={})
+    form._page_forms = {'associes': AssocieForm, 'contrat': ContratForm}
+    form._unbuilt_page_values = lambda key: MainForm._unbuilt_page_values(form, key)
+
+    values = MainForm.get_values(form)
+
+    assert values['societe'] == {'denomination': 'ALPHA'}
+    assert values['contrat'] == {'period': '24'}
+    assert values['associes'] == AssocieForm.default_values()
+    assert values['associes'][0]['qualite'] == 'Associé Gérant'
+    assert set(ContratForm.default_values()) == {'date_contrat', 'period', 'prix_mensuel', 'prix_inter',
+                                                 'date_debut', 'date_fin'}
@@ -0,0 +1,47 @@
+import json
+import logging
+
+import pytest
+
+from src.utils import logging_setup
+
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    level = root.level
+    yield
+    logging_setup.shutdown_logging()
+    root.setLevel(level)
+    logging.getLogger('tests.quiet').setLevel(logging.NOTSET)
+
+
+def test_records_are_written_by_listener_and_rotated(tmp_path, restore_logging):
+    log_file = tmp_path / 'app.log'
+    logging_setup.setup_logging(log_file, level=logging.INFO, max_bytes=400, backup_count=2,
+                                config_path=tmp_path / 'missing.json')
+    # Idempotent: a second call keeps the same pipeline
+    assert logging_setup.setup_logging(log_file) is logging_setup._listener
+
+    log = logging.getLogger('tests.rotation')
+    for i in range(50):
+        log.info('message %d', i)
+    logging_setup.shutdown_logging()
+
+    assert 'message 49' in log_file.read_text(encoding='utf-8')
+    assert (tmp_path / 'app.log.1').exists()
+    assert not (tmp_path / 'app.log.3').exists()
+
+
+def test_per_module_levels_from_config(tmp_path, restore_logging):
+    config = tmp_path / 'logging.json'
+    config.write_text(json.dumps({'level': 'DEBUG', 'loggers': {'tests.quiet': 'ERROR'}}), encoding='utf-8')
+    log_file = tmp_path / 'app.log'
+    logging_setup.setup_logging(log_file, config_path=config)
+
+    logging.getLogger('tests.quiet').warning('hidden')
+    logging.getLogger('tests.loud').debug('shown')
+    logging_setup.shutdown_logging()
+
+    content = log_file.read_text(encoding='utf-8')
+    assert 'shown' in content and 'hidden' not in content
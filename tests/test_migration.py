@@ -30,3 +30,18 @@ def test_migration_moves_old_sheets(tmp_path):
     import openpyxl
     wb = openpyxl.load_workbook(db)
     assert 'OldAssoc' not in wb.sheetnames
+
+
+def test_migration_backs_up_only_when_there_are_legacy_sheets(tmp_path):
+    from src.utils.backup import backup_repository
+
+    db = tmp_path / "test_db_canonical.xlsx"
+    ensure_excel_db(db, _const.excel_sheets)
+
+    migrate_excel_workbook(db)
+    assert backup_repository(db).backups() == []
+
+    with pd.ExcelWriter(db, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
+        pd.DataFrame([{'PRENOM': 'Jean', 'NOM': 'Dupont'}]).to_excel(writer, sheet_name='OldAssoc', index=False)
+    migrate_excel_workbook(db)
+    assert [b.label for b in backup_repository(db).backups()] == ['migration']
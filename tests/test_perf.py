@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from src.utils import perf
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    fresh = perf.PerfRecorder(capacity=50)
+    monkeypatch.setattr(perf, 'recorder', fresh)
+    yield fresh
+    fresh.stop_persistence()
+
+
+def test_timed_records_duration_rows_and_file_sizes(recorder, tmp_path):
+    target = tmp_path / 'out.bin'
+    target.write_bytes(b'x' * 10)
+
+    @perf.timed('write', reads='path', writes='path', rows=len)
+    def write(path, data):
+        path.write_bytes(data)
+        return data
+
+    write(target, b'y' * 100)
+    (record,) = recorder.records('write')
+    assert record.ok and record.seconds >= 0
+    assert (record.rows, record.bytes_read, record.bytes_written) == (100, 10, 100)
+
+
+def test_annotate_and_failures(recorder):
+    @perf.timed('inner')
+    def inner():
+        perf.annotate(rows=3)
+
+    @perf.timed('outer')
+    def outer(fail):
+        inner()
+        perf.annotate(rows=7)
+        if fail:
+            raise RuntimeError('boom')
+
+    outer(False)
+    with pytest.raises(RuntimeError):
+        outer(True)
+    perf.annotate(rows=1)  # outside a timed call: ignored
+
+    assert [r.rows for r in recorder.records('inner')] == [3, 3]
+    assert [(r.rows, r.ok) for r in recorder.records('outer')] == [(7, True), (7, False)]
+
+
+def test_summary_percentiles_and_ring_buffer(recorder):
+    for ms in range(1, 101):
+        recorder.record(perf.OperationRecord('op', 0.0, ms / 1000, rows=1))
+    # Capacity 50: only the 50 most recent calls (51..100 ms) are kept
+    summary = recorder.summary().set_index('OPERATION').loc['op']
+    assert summary['APPELS'] == 50 and summary['LIGNES'] == 50
+    assert summary['P50_MS'] == pytest.approx(75.5) and summary['MAX_MS'] == 100
+    assert summary['P95_MS'] == pytest.approx(97.55, abs=0.1)
+
+
+def test_records_persist_across_sessions(recorder, tmp_path):
+    path = tmp_path / 'perf.jsonl'
+    recorder.persist(path, interval=3600)
+    recorder.record(perf.OperationRecord('save_to_db', 1.0, 0.5, rows=4, bytes_written=2048))
+    recorder.flush()
+    assert json.loads(path.read_text(encoding='utf-8').splitlines()[0])['operation'] == 'save_to_db'
+
+    other = perf.PerfRecorder()
+    other.persist(path, interval=3600)
+    try:
+        assert [r.rows for r in other.records('save_to_db')] == [4]
+    finally:
+        other.stop_persistence()
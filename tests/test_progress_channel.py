@@ -0,0 +1,94 @@
+import threading
+
+from src.utils.progress import ProgressChannel
+
+
+def test_states_are_coalesced_per_key():
+    channel = ProgressChannel()
+    for i in range(1000):
+        channel.post('job-1', i)
+    channel.post('job-2', 'x')
+
+    batch = channel.drain()
+    assert batch.states == {'job-1': 999, 'job-2': 'x'}
+    # a second drain is empty
+    assert not channel.drain()
+
+
+def test_log_lines_are_bounded_and_drops_counted():
+    channel = ProgressChannel(max_lines=10)
+    for i in range(25):
+        channel.post(line=f'line {i}')
+
+    batch = channel.drain()
+    assert batch.lines == [f'line {i}' for i in range(15, 25)]
+    assert batch.dropped == 15
+
+
+def test_concurrent_producers_do_not_lose_final_state():
+    channel = ProgressChannel(max_lines=100)
+
+    def produce(key):
+        for i in range(500):
+            channel.post(key, i, line=f'{key}:{i}')
+
+    threads = [threading.Thread(target=produce, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    batch = channel.drain()
+    assert batch.states == {k: 499 for k in range(8)}
+    assert len(batch.lines) + batch.dropped == 8 * 500
+
+
+class _FakeWidget:
+    """The `after` subset ProgressPump uses, run by hand."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+        return len(self.callbacks)
+
+    def after_cancel(self, after_id):
+        pass
+
+    def winfo_exists(self):
+        return True
+
+    def run_pending(self):
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+def test_pump_stops_when_idle_and_drained():
+    from src.utils.progress import ProgressPump
+
+    channel = ProgressChannel()
+    widget = _FakeWidget()
+    applied = []
+    busy = [True]
+    pump = ProgressPump(widget, channel, lambda batch: applied.append(batch.states),
+                        keep_running=lambda: busy[0])
+    pump.start()
+    widget.run_pending()
+    assert pump.running and applied == []
+
+    # The job finishes: its last update is still applied
+    channel.post('job', 'finished')
+    busy[0] = False
+    widget.run_pending()
+    assert applied == [{'job': 'finished'}] and pump.running
+
+    # Nothing left: the pump no longer wakes up
+    widget.run_pending()
+    assert not pump.running and widget.callbacks == []
+
+    channel.post('job', 'queued')
+    pump.start()
+    widget.run_pending()
+    assert applied[-1] == {'job': 'queued'}
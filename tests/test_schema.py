@@ -0,0 +1,65 @@
+import pandas as pd
+
+from src.utils.schema import concat, memory_bytes, to_cells, to_text, to_typed
+
+
+def _societes(n=3000):
+    formes = ['SARL', 'SARL AU', 'SA', 'SNC']
+    return pd.DataFrame({
+        'ID_SOCIETE': [str(i + 1) for i in range(n)],
+        'DEN_STE': [f'SOCIETE {i}' for i in range(n)],
+        'FORME_JUR': [formes[i % 4] for i in range(n)],
+        'TRIBUNAL': ['Casablanca' if i % 3 else 'Rabat' for i in range(n)],
+        'STE_ADRESS': [f'{i % 5} Rue Soumaya' for i in range(n)],
+        'CAPITAL': [str(10000 * (i % 7 + 1)) for i in range(n)],
+        'DATE_ICE': [f'{i % 28 + 1:02d}/01/2024' for i in range(n)],
+    })
+
+
+def test_typed_columns_use_less_memory():
+    df = _societes()
+    typed = to_typed(df, 'Societes')
+
+    assert isinstance(typed['FORME_JUR'].dtype, pd.CategoricalDtype)
+    assert str(typed['ID_SOCIETE'].dtype) == 'Int64'
+    assert typed['CAPITAL'].dtype == float
+    assert pd.api.types.is_datetime64_any_dtype(typed['DATE_ICE'])
+    assert memory_bytes(typed) * 2 < memory_bytes(df)
+
+
+def test_round_trip_to_text_and_cells():
+    df = _societes(4)
+    df.loc[1, ['ID_SOCIETE', 'CAPITAL', 'DATE_ICE']] = ''
+    typed = to_typed(df, 'Societes')
+
+    pd.testing.assert_frame_equal(to_text(typed), df)
+    cells = to_cells(typed)
+    assert cells.loc[0, 'CAPITAL'] == 10000 and cells.loc[0, 'DATE_ICE'] == '01/01/2024'
+    assert cells.loc[1, 'ID_SOCIETE'] is None and cells.loc[1, 'DATE_ICE'] is None
+
+
+def test_unparsable_values_keep_the_column_as_text():
+    df = pd.DataFrame({'ID_SOCIETE': ['1', 'A2'], 'CAPITAL': ['1000', 'mille'], 'DATE_ICE': ['01/01/2024', 'bientôt']})
+    typed = to_typed(df, 'Societes')
+
+    assert list(typed['ID_SOCIETE']) == ['1', 'A2']
+    assert list(typed['CAPITAL']) == ['1000', 'mille']
+    assert list(typed['DATE_ICE']) == ['01/01/2024', 'bientôt']
+
+
+def test_values_that_would_change_keep_the_column_as_text():
+    df = pd.DataFrame({'ID_SOCIETE': ['1', '02'], 'CAPITAL': ['10 000', '5000'], 'DATE_ICE': ['1/3/2025', '01/04/2025']})
+    typed = to_typed(df, 'Societes')
+
+    pd.testing.assert_frame_equal(to_text(typed), df)
+    assert typed['CAPITAL'].dtype == object and list(to_cells(typed)['CAPITAL']) == ['10 000', '5000']
+
+
+def test_concat_merges_categories():
+    first = to_typed(_societes(4), 'Societes')
+    added = to_typed(pd.DataFrame({'ID_SOCIETE': [5], 'FORME_JUR': ['SAS']}), 'Societes')
+    merged = concat([first, added])
+
+    assert isinstance(merged['FORME_JUR'].dtype, pd.CategoricalDtype)
+    assert list(merged['FORME_JUR'])[-1] == 'SAS'
+    assert list(merged['ID_SOCIETE']) == [1, 2, 3, 4, 5]
@@ -0,0 +1,63 @@
+import time
+
+import pandas as pd
+
+from src.utils.search import SearchIndex, PREFIX, normalize_text
+
+
+def _societes(n):
+    return pd.DataFrame({
+        'ID_SOCIETE': [str(i) for i in range(n)],
+        'DEN_STE': [f'Société {i} Sky' for i in range(n)],
+        'ICE': [str(10 ** 14 + i) for i in range(n)],
+        'FORME_JUR': ['SARL'] * n,
+    })
+
+
+def test_normalize_text_strips_case_and_accents():
+    assert normalize_text('Société ÉRIC') == 'societe eric'
+
+
+def test_substring_and_prefix_matching():
+    df = pd.DataFrame({
+        'DEN_STE': ['ASTRAPIA', 'SKY NEST', 'Nest Café'],
+        'NOM': ['Alaoui', 'Bennani', 'El Idrissi'],
+        'PRENOM': ['Éric', 'Sara', 'Omar'],
+        'PHONE': ['06 12 34 56 78', '+212 6 99 88 77 66', ''],
+        'CIN_NUM': ['BK123', 'AB987', 'CD555'],
+    })
+    idx = SearchIndex(df)
+
+    assert list(idx.search('nest')) == [1, 2]
+    assert list(idx.search('cafe')) == [2]
+    assert list(idx.search('eric alaoui')) == [0]
+    assert list(idx.search('ab98')) == [1]
+    # Phone numbers match whatever the spacing
+    assert list(idx.search('0612345678')) == [0]
+    assert list(idx.search('99 88')) == [1]
+    # Prefix mode only matches at the start of a word
+    assert list(idx.search('est', PREFIX)) == []
+    assert list(idx.search('nes', PREFIX)) == [1, 2]
+    # An empty query returns every row
+    assert list(idx.search('')) == [0, 1, 2]
+
+
+def test_refined_query_reuses_previous_result():
+    idx = SearchIndex(_societes(100))
+    first = idx.search('societe 1')
+    refined = idx.search('societe 12')
+    assert set(refined) <= set(first)
+    assert list(refined) == [12]
+    # A broader query starts over from all rows
+    assert len(idx.search('sky')) == 100
+
+
+def test_search_50k_rows_is_interactive():
+    idx = SearchIndex(_societes(50000))
+    start = time.perf_counter()
+    result = idx.search('societe 4242')
+    elapsed = time.perf_counter() - start
+
+    assert 4242 in result
+    # Generous bound for slow CI machines; ~10ms on a typical desktop
+    assert elapsed < 0.25
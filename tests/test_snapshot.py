@@ -0,0 +1,99 @@
+import os
+import pickle
+
+import pandas as pd
+
+from src.utils import snapshot
+from src.utils.schema import to_typed
+from src.utils.snapshot import read_tables, save_snapshot, snapshot_path
+
+
+def _workbook(path, names=('ASTRAPIA', 'SKY NEST')):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame({'ID_SOCIETE': [str(i + 1) for i in range(len(names))], 'DEN_STE': list(names)}).to_excel(
+            writer, sheet_name='Societes', index=False)
+        pd.DataFrame(columns=['ID_ASSOCIE', 'ID_SOCIETE']).to_excel(writer, sheet_name='Associes', index=False)
+        pd.DataFrame(columns=['ID_CONTRAT', 'ID_SOCIETE']).to_excel(writer, sheet_name='Contrats', index=False)
+    return path
+
+
+def _count_parses(monkeypatch):
+    calls = []
+    real = snapshot.parse_tables
+    monkeypatch.setattr(snapshot, 'parse_tables', lambda path: calls.append(path) or real(path))
+    return calls
+
+
+def test_second_read_comes_from_the_snapshot(tmp_path, monkeypatch):
+    path = _workbook(tmp_path / 'db.xlsx')
+    calls = _count_parses(monkeypatch)
+
+    first = read_tables(path)
+    again = read_tables(path)
+
+    assert len(calls) == 1
+    assert snapshot_path(path).exists()
+    assert list(again['Societes']['DEN_STE']) == ['ASTRAPIA', 'SKY NEST']
+    assert set(first) == {'Societes', 'Associes', 'Contrats'}
+
+
+def test_external_edit_is_parsed_and_touch_is_not(tmp_path, monkeypatch):
+    path = _workbook(tmp_path / 'db.xlsx')
+    read_tables(path)
+    calls = _count_parses(monkeypatch)
+
+    # Same bytes, new mtime: the content hash proves the snapshot is still valid
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    read_tables(path)
+    assert calls == []
+
+    _workbook(path, names=('ASTRAPIA', 'SKY NEST', 'LOHACOM'))
+    assert list(read_tables(path)['Societes']['DEN_STE'])[-1] == 'LOHACOM'
+    assert len(calls) == 1
+
+
+def test_save_snapshot_records_our_own_writes(tmp_path, monkeypatch):
+    path = _workbook(tmp_path / 'db.xlsx')
+    tables = snapshot.parse_tables(path)
+    _workbook(path, names=('OLA MOVING',))
+    tables['Societes'] = pd.DataFrame({'ID_SOCIETE': ['1'], 'DEN_STE': ['OLA MOVING']})
+    save_snapshot(path, tables)
+    calls = _count_parses(monkeypatch)
+
+    assert list(read_tables(path)['Societes']['DEN_STE']) == ['OLA MOVING']
+    assert calls == []
+
+
+def test_corrupt_snapshot_falls_back_to_parsing(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    snapshot_path(path).write_bytes(b'not a pickle')
+    assert list(read_tables(path)['Societes']['DEN_STE']) == ['ASTRAPIA', 'SKY NEST']
+
+
+def test_snapshot_keeps_typed_columns(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    tables = snapshot.parse_tables(path)
+    tables['Societes'] = to_typed(pd.DataFrame({
+        'ID_SOCIETE': ['1', '', '3'], 'DEN_STE': ['ASTRAPIA', 'Société é', ''], 'FORME_JUR': ['SARL', '', 'SA'],
+        'CAPITAL': ['10000', '', '2500.5'], 'DATE_ICE': ['01/02/2024', '', '31/12/2023'],
+    }), 'Societes')
+    save_snapshot(path, tables)
+
+    loaded = snapshot._load_snapshot(path)['tables']['Societes']
+    pd.testing.assert_frame_equal(loaded, tables['Societes'])
+
+
+class _Payload:
+    executed = []
+
+    def __reduce__(self):
+        return (_Payload.executed.append, ('ran',))
+
+
+def test_snapshot_never_unpickles(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    snapshot_path(path).write_bytes(pickle.dumps({'format': snapshot.FORMAT_VERSION, 'payload': _Payload()}))
+
+    assert list(read_tables(path)['Societes']['DEN_STE']) == ['ASTRAPIA', 'SKY NEST']
+    assert _Payload.executed == []
@@ -0,0 +1,41 @@
+import pandas as pd
+
+from src.utils import sorting
+from src.utils.sorting import SortCache
+
+
+def _contrats():
+    return pd.DataFrame({
+        'PRIX_CONTRAT': ['1 500', '900', '', '10 000,50'],
+        'DATE_CONTRAT': ['01/02/2024', '15/01/2024', '', '31/12/2023'],
+        'DOM_DATEFIN': ['01/01/2030', '', '01/06/2025', '01/01/2026'],
+        'DEN_STE': ['Lot 10', 'lot 9', 'Alpha', ''],
+        'CIN_NUM': ['BK9', 'BK10', 'A2', 'C1'],
+    })
+
+
+def test_numeric_date_and_natural_orders_with_empty_last():
+    cache = SortCache(_contrats())
+
+    assert list(cache.permutation('PRIX_CONTRAT')) == [1, 0, 3, 2]
+    assert list(cache.permutation('PRIX_CONTRAT', ascending=False)) == [3, 0, 1, 2]
+    assert list(cache.permutation('DATE_CONTRAT')) == [3, 1, 0, 2]
+    assert list(cache.permutation('DOM_DATEFIN', ascending=False)) == [0, 3, 2, 1]
+    assert list(cache.permutation('DEN_STE')) == [2, 1, 0, 3]
+    # Mixed letters/digits are not mistaken for numbers
+    assert list(cache.permutation('CIN_NUM')) == [2, 0, 1, 3]
+
+
+def test_permutations_are_computed_once_per_column(monkeypatch):
+    cache = SortCache(_contrats())
+    calls = []
+    real_parse = sorting.parse_dates
+    monkeypatch.setattr(sorting, 'parse_dates', lambda s: calls.append(1) or real_parse(s))
+
+    first = cache.permutation('DATE_CONTRAT')
+    cache.permutation('PRIX_CONTRAT')
+    again = cache.permutation('DATE_CONTRAT')
+    cache.permutation('DATE_CONTRAT', ascending=False)
+
+    assert again is first
+    assert len(calls) == 1
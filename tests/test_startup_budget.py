@@ -0,0 +1,19 @@
+import pytest
+
+from src.utils.startup import (STARTUP_BUDGET, has_display, measure_import_time,
+                               measure_time_to_first_frame)
+
+
+def test_main_import_is_within_budget_and_skips_data_stack():
+    result = measure_import_time('main')
+
+    assert result['heavy_modules_loaded'] == []
+    assert result['import_seconds'] < STARTUP_BUDGET['import_seconds']
+
+
+@pytest.mark.skipif(not has_display(), reason='no display available')
+def test_time_to_first_frame_within_budget():
+    result = measure_time_to_first_frame()
+
+    assert 'pandas' not in result['heavy_modules_loaded']
+    assert result['first_frame_seconds'] < STARTUP_BUDGET['first_frame_seconds']
@@ -0,0 +1,109 @@
+import pandas as pd
+import pytest
+
+from src.utils import constants as _const
+from src.utils.store import DataStore, Change, INSERT, DELETE, RELOAD
+
+
+def _workbook(path):
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame([['1', 'ASTRAPIA'], ['2', 'SKY NEST']], columns=['ID_SOCIETE', 'DEN_STE']).reindex(
+            columns=_const.societe_headers).to_excel(writer, sheet_name='Societes', index=False)
+        pd.DataFrame([['1', '1', 'Alaoui'], ['2', '2', 'Bennani'], ['3', '2', 'Idrissi']],
+                     columns=['ID_ASSOCIE', 'ID_SOCIETE', 'NOM']).reindex(
+            columns=_const.associe_headers).to_excel(writer, sheet_name='Associes', index=False)
+        pd.DataFrame([['1', '1', '01/01/2025'], ['2', '2', '01/02/2025']],
+                     columns=['ID_CONTRAT', 'ID_SOCIETE', 'DOM_DATEDEB']).reindex(
+            columns=_const.contrat_headers).to_excel(writer, sheet_name='Contrats', index=False)
+    return path
+
+
+def test_instance_is_shared_per_path(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    assert DataStore.instance(path) is DataStore.instance(str(path))
+    assert DataStore.instance(path) is not DataStore.instance(tmp_path / 'other.xlsx')
+
+
+def test_load_reads_only_when_the_file_changed(tmp_path):
+    store = DataStore(_workbook(tmp_path / 'db.xlsx'))
+    events = []
+    store.subscribe(events.append)
+
+    assert store.load()
+    assert list(store.table('Societes')['DEN_STE']) == ['ASTRAPIA', 'SKY NEST']
+    assert not store.load()
+    assert events == [[Change(name, RELOAD) for name in ('Societes', 'Associes', 'Contrats')]]
+
+
+def test_delete_societe_writes_through_and_notifies_rows(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    store = DataStore(path)
+    store.load()
+    events = []
+    unsubscribe = store.subscribe(events.append)
+
+    store.delete_societe(denomination='sky nest')
+
+    assert events == [[Change('Societes', DELETE, ('2',)), Change('Associes', DELETE, ('2', '3')),
+                       Change('Contrats', DELETE, ('2',))]]
+    assert list(pd.read_excel(path, sheet_name='Associes', dtype=str)['NOM']) == ['Alaoui']
+    assert list(store.table('Contrats')['ID_CONTRAT']) == [1]
+    # Our own write does not count as an external change
+    assert not store.load()
+
+    unsubscribe()
+    store.delete_societe('1')
+    assert len(events) == 1
+
+
+def test_save_records_appends_rows_with_their_ids(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    store = DataStore(path)
+    store.load()
+    events = []
+    store.subscribe(events.append)
+
+    store.save_records({'denomination': 'LOHACOM'}, [{'nom': 'Omar'}], {'date_debut': '01/03/2025'})
+
+    assert events == [[Change('Societes', INSERT, ('3',)), Change('Associes', INSERT, ('4',)),
+                       Change('Contrats', INSERT, ('3',))]]
+    row = store.table('Contrats').iloc[-1]
+    assert (row['ID_SOCIETE'], row['DOM_DATEDEB']) == (3, pd.Timestamp(2025, 3, 1))
+    assert list(pd.read_excel(path, sheet_name='Societes', dtype=str)['DEN_STE']) == ['ASTRAPIA', 'SKY NEST', 'LOHACOM']
+
+
+def test_delete_societe_keeps_the_text_of_the_other_rows(tmp_path):
+    path = _workbook(tmp_path / 'db.xlsx')
+    store = DataStore(path)
+    store.load()
+    store.save_records({'denomination': 'LOHACOM', 'capital': '10 000'}, [{'nom': 'Omar', 'num_parts': '100'}],
+                       {'period': '06', 'prix_mensuel': '500', 'date_debut': '01/03/2025'})
+    store.save_records({'denomination': 'OLA MOVING', 'capital': '50 000'}, [{'nom': 'Sara'}],
+                       {'period': '12', 'date_debut': '01/04/2025'})
+    before = {name: pd.read_excel(path, sheet_name=name, dtype=str) for name in ('Societes', 'Contrats')}
+
+    store.delete_societe('2')
+
+    for name, df in before.items():
+        after = pd.read_excel(path, sheet_name=name, dtype=str)
+        kept = df[df['ID_SOCIETE'] != '2'].reset_index(drop=True)
+        pd.testing.assert_frame_equal(after, kept)
+    assert list(pd.read_excel(path, sheet_name='Contrats', dtype=str)['PERIOD_DOMCIL'])[-2:] == ['06', '12']
+
+
+def test_failed_write_leaves_the_workbook_intact(tmp_path, monkeypatch):
+    path = _workbook(tmp_path / 'db.xlsx')
+    store = DataStore(path)
+    store.load()
+    before = path.read_bytes()
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(pd.DataFrame, 'to_excel', fail)
+    with pytest.raises(OSError):
+        store.delete_societe('2')
+
+    assert path.read_bytes() == before
+    assert not (tmp_path / '.db.tmp.xlsx').exists()
+    assert list(store.table('Societes')['DEN_STE']) == ['ASTRAPIA', 'SKY NEST']
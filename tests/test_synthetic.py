@@ -0,0 +1,52 @@
+import json
+import re
+
+from src.utils import constants as _const
+from src.utils import synthetic
+from src.utils.records import find_companies, open_store, save_company
+from src.utils.store import DataStore
+
+
+def test_companies_are_deterministic_and_consistent():
+    first = list(synthetic.companies(200, seed=5))
+    assert first == list(synthetic.companies(200, seed=5))
+    assert first != list(synthetic.companies(200, seed=6))
+
+    for company in first:
+        assert set(company.societe) == set(_const.societe_headers)
+        assert 1 <= len(company.associes) <= 12 and company.contrats
+        assert all(set(row) == set(_const.associe_headers) for row in company.associes)
+        assert all(set(row) == set(_const.contrat_headers) for row in company.contrats)
+
+        ice = company.societe['ICE']
+        assert re.fullmatch(r'\d{15}', ice) and int(ice[:13]) % 97 == int(ice[13:])
+        assert all(re.fullmatch(r'[A-Z]{1,2}\d{5,6}', a['CIN_NUM']) for a in company.associes)
+        assert sum(a['PARTS'] for a in company.associes) == company.societe['PART_SOCIAL']
+        assert all(a['DATE_NAISS'] < company.societe['DATE_ICE'] for a in company.associes)
+        # Renewals follow each other without gaps
+        for before, after in zip(company.contrats, company.contrats[1:]):
+            assert (after['DOM_DATEDEB'] - before['DOM_DATEFIN']).days == 1
+
+
+def test_workbook_opens_in_the_data_store(tmp_path):
+    path = tmp_path / 'load.xlsx'
+    counts = synthetic.write_workbook(path, 300, seed=2)
+
+    store = DataStore(path)
+    store.load()
+    assert {name: len(store.table(name)) for name in counts} == counts
+    companies = list(synthetic.companies(300, seed=2))
+    assert list(store.table('Societes')['DEN_STE'][:3]) == [c.societe['DEN_STE'] for c in companies[:3]]
+    assert store.table('Contrats')['DOM_DATEFIN'].notna().all()
+
+
+def test_json_aggregates_save_through_records(tmp_path):
+    target = tmp_path / 'societes.json'
+    assert synthetic.write_json(target, 5, seed=1) == 5
+    aggregates = json.loads(target.read_text(encoding='utf-8'))
+
+    store = open_store(tmp_path / 'db.xlsx', prepare=True)
+    for values in aggregates:
+        save_company(store, values)
+    saved = find_companies(store, columns=['DEN_STE'])
+    assert list(saved['DEN_STE']) == [a['societe']['denomination'] for a in aggregates]
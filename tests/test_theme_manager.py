@@ -0,0 +1,42 @@
+import pytest
+
+from src.utils.startup import has_display
+
+pytestmark = pytest.mark.skipif(not has_display(), reason='no display available')
+
+
+@pytest.fixture
+def root():
+    import tkinter as tk
+    root = tk.Tk()
+    yield root
+    root.destroy()
+
+
+def test_theme_manager_is_shared_and_schedules_nothing(root):
+    import tkinter as tk
+    from src.utils.utils import ThemeManager
+
+    frame = tk.Frame(root)
+    tm = ThemeManager(root)
+    assert ThemeManager(frame) is tm
+    # No periodic after() callbacks: idle cost is zero
+    assert root.tk.call('after', 'info') == ''
+
+
+def test_theme_switch_updates_registered_widgets(root, tmp_path, monkeypatch):
+    import tkinter as tk
+    from src.utils.utils import ThemeManager
+
+    tm = ThemeManager(root)
+    monkeypatch.setattr(tm, 'pref_path', tmp_path / 'preferences.json')
+    listbox = tk.Listbox(root)
+    listbox.pack()
+    root.update()
+    assert str(listbox) in tm._registry
+
+    tm.set_theme('light' if tm.theme.mode == 'dark' else 'dark')
+    assert listbox.cget('background') == tm.colors['bg']
+
+    listbox.destroy()
+    assert str(listbox) not in tm._registry